@@ -2,7 +2,7 @@ import operator
 import random
 from collections import namedtuple, Counter, defaultdict
 from functools import reduce, partial
-from statistics import median, mean
+from statistics import median
 from typing import List, NamedTuple, Mapping, Dict
 
 import numpy as np
@@ -915,55 +915,143 @@ def get_total_region_size(intervals: Dict[Protein, interval]):
     return sequence_region_size
 
 
-def sample_mean_counts(
+def random_generator(seed=None):
+    """Seeded Generator (NumPy >= 1.17) or RandomState (older NumPy versions)."""
+    if hasattr(np.random, 'default_rng'):
+        return np.random.default_rng(seed)
+    return np.random.RandomState(seed)
+
+
+def draw_integers(generator, high, size):
+    if hasattr(generator, 'integers'):
+        return generator.integers(0, high, size=size)
+    return generator.randint(0, high, size=size)
+
+
+def _sample_sums_block(task):
+    non_zero_values, values_count, size, repeats, seed = task
+    generator = random_generator(seed)
+
+    # only the draws hitting non-zero values contribute to the sums;
+    # their number (per repeat) follows the binomial distribution
+    hits = generator.binomial(size, len(non_zero_values) / values_count if values_count else 0, size=repeats)
+    drawn = non_zero_values[draw_integers(generator, max(len(non_zero_values), 1), hits.sum())]
+
+    return np.bincount(np.repeat(np.arange(repeats), hits), weights=drawn, minlength=repeats)
+
+
+def sample_sums(values: np.ndarray, size: int, repeats: int, seed=None, processes=None, max_draws_per_block=10 ** 7):
+    """Permutation test engine: sums of `size` values drawn (with replacement) from `values`.
+
+    Equivalent to `[np.sum(choice(values, size=size)) for repeat in range(repeats)]`,
+    but the repeats are drawn in blocks and only the draws of non-zero values are
+    materialised (values of mutation arrays are mostly zeros).
+
+    Args:
+        seed: seed for the random generator; each block uses its own generator,
+            seeded from the main one, so the results do not depend on `processes`
+        processes: number of processes to draw the blocks in (by default in the current process)
+        max_draws_per_block: limits the (expected) memory used by a single block
+    """
+    non_zero_values = values[values != 0]
+    expected_draws = max(size * len(non_zero_values) / max(len(values), 1), 1)
+    block_size = int(min(max(max_draws_per_block // expected_draws, 1), repeats))
+
+    blocks = [
+        min(block_size, repeats - start)
+        for start in range(0, repeats, block_size)
+    ]
+    seeds = draw_integers(random_generator(seed), 2 ** 31 - 1, len(blocks))
+
+    tasks = [
+        (non_zero_values, len(values), size, block_repeats, block_seed)
+        for block_repeats, block_seed in zip(blocks, seeds)
+    ]
+
+    if processes and processes > 1:
+        from multiprocessing import Pool
+
+        with Pool(processes) as pool:
+            sums = pool.map(_sample_sums_block, tasks)
+    else:
+        sums = [_sample_sums_block(task) for task in tqdm(tasks)]
+
+    return np.concatenate(sums)
+
+
+def sample_ptm_counts(
     ptm_muts,
     intervals_by_protein: Dict[Protein, interval],
     total_region_size: int,
-    repeats: int
-):
-    from numpy.random import choice
+    repeats: int,
+    distinct=True,
+    seed=None,
+    processes=None
+) -> np.ndarray:
+    """Counts of PTM mutations in regions of total_region_size drawn (with replacement) from PTM regions."""
     ptm_muts_by_protein = defaultdict(list)
     for mutation_details, mutation in ptm_muts:
         ptm_muts_by_protein[mutation.protein].append((mutation_details, mutation))
 
+    # components of all intervals (in order of proteins), as arrays
+    proteins_order = {protein: i for i, protein in enumerate(intervals_by_protein)}
+    components = [
+        (proteins_order[protein], int(component[0].inf), int(component[0].sup))
+        for protein, protein_interval in intervals_by_protein.items()
+        for component in protein_interval.components
+    ]
+    components_protein, components_inf, components_sup = np.array(components, dtype=np.int64).reshape(-1, 3).T
+
+    components_offsets = np.zeros(len(components), dtype=np.int64)
+    np.cumsum((components_sup - components_inf)[:-1], out=components_offsets[1:])
+
+    mutations = [
+        (proteins_order[protein], mutation.position, 1 if distinct else mutation_details.count)
+        for protein, protein_muts in ptm_muts_by_protein.items()
+        if protein in proteins_order
+        for mutation_details, mutation in protein_muts
+    ]
+    mutations_protein, mutations_position, mutations_count = np.array(mutations, dtype=np.int64).reshape(-1, 3).T
+
+    # locate the component of each mutation (components are sorted by protein and position)
+    stride = int(max(components_sup.max(initial=0), mutations_position.max(initial=0))) + 1
+    component = np.searchsorted(
+        components_protein * stride + components_inf,
+        mutations_protein * stride + mutations_position,
+        side='right'
+    ) - 1
+    component_found = component >= 0
+    component = np.where(component_found, component, 0)
+    in_component = (
+        component_found
+        & (components_protein[component] == mutations_protein)
+        & (mutations_position <= components_sup[component])
+    )
+
     ptm_mutations_array = np.zeros(total_region_size)
-    pos = 0
-
-    for protein, protein_interval in tqdm(intervals_by_protein.items(), total=len(intervals_by_protein)):
-        for mutation_details, mutation in ptm_muts_by_protein[protein]:
-            p = 0
-            for subinterval in protein_interval.components:
-                if mutation.position in subinterval:
-                    p += mutation.position - 1 - int(subinterval[0].inf)  # position in interval
-                    break
-                p += measure(subinterval)
-
-            if distinct:
-                ptm_mutations_array[pos + p] += 1
-            else:
-                ptm_mutations_array[pos + p] += mutation_details.count
-        pos += measure(protein_interval)
-
-    ptm_counts = []
-    for repeat in tqdm(range(repeats), total=repeats):
-        ptm_counts.append(np.sum(choice(ptm_mutations_array, size=total_region_size)))
-    print(Series(ptm_counts).describe())
-    ptm_muts_count = mean(ptm_counts)
-    return ptm_muts_count
+    positions_in_region = (
+        components_offsets[component] + mutations_position - 1 - components_inf[component]
+    )[in_component]
+    np.add.at(ptm_mutations_array, positions_in_region, mutations_count[in_component])
+
+    return sample_sums(ptm_mutations_array, total_region_size, repeats, seed=seed, processes=processes)
 
 
 def ptm_on_random(
     source=MC3Mutation, site_type='glycosylation',
     same_proteins=False, only_preferred=True, mode='occurrences',
     repeats=10000, ptm_proteins=False, same_ptm_proteins=False,
-    exclude_genes=None, mutation_filter=None, sample_ptm_muts=True
+    exclude_genes=None, mutation_filter=None, sample_ptm_muts=True,
+    seed=None, processes=None
 ):
     """"Compare frequencies of PTM mutations of given type with random proteome mutations
 
     from protein sequence regions of the same size as analysed PTM regions.
-    """
-    from numpy.random import choice
 
+    Args:
+        seed: seed of the random generator used for the permutation test
+        processes: number of processes to draw the permutations in
+    """
     assert mode in {'distinct', 'occurrences'}
     distinct = mode == 'distinct'
 
@@ -1027,12 +1115,17 @@ def ptm_on_random(
     ptm_muts = ptm_muts.group_by(source)
 
     if sample_ptm_muts:
-        ptm_muts_count = sample_mean_counts(
+        ptm_counts = sample_ptm_counts(
             ptm_muts=ptm_muts,
             intervals_by_protein=intervals_by_protein,
             total_region_size=glyco_sequence_region_size,
-            repeats=repeats
+            repeats=repeats,
+            distinct=distinct,
+            seed=seed,
+            processes=processes
         )
+        print(Series(ptm_counts).describe())
+        ptm_muts_count = ptm_counts.mean()
     else:
         if distinct:
             ptm_muts_count = ptm_muts.count()
@@ -1062,28 +1155,24 @@ def ptm_on_random(
         if not exclude_genes or protein.gene.name not in exclude_genes
     ]
 
-    weights = [p.length for p in proteins]
+    lengths = np.array([p.length for p in proteins], dtype=np.int64)
+    offsets = np.zeros(len(proteins), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
 
-    mutations_array = np.zeros(np.sum(weights))
-    pos = 0
-
-    for protein in tqdm(proteins):
-        for position, count in all_muts[protein].items():
-            try:
-                mutations_array[pos + position - 1] = count
-            except Exception:
-                print(protein, pos, position)
-                raise
-        pos += protein.length
+    mutated = [
+        (offset + position - 1, count)
+        for protein, offset in zip(proteins, offsets.tolist())
+        for position, count in all_muts[protein].items()
+    ]
+    indices, mutations_counts = np.array(mutated, dtype=np.int64).reshape(-1, 2).T
 
-    counts = []
-    append = counts.append
+    mutations_array = np.zeros(lengths.sum())
+    mutations_array[indices] = mutations_counts
 
-    for repeat in tqdm(range(repeats), total=repeats):
-        append(np.sum(choice(mutations_array, size=glyco_sequence_region_size)))
+    counts = sample_sums(mutations_array, glyco_sequence_region_size, repeats, seed=seed, processes=processes)
 
-    p_value = np.sum(1 for count in counts if count > ptm_muts_count) / repeats
-    count_of_sampled_muts = mean(counts)
+    p_value = np.sum(counts > ptm_muts_count) / repeats
+    count_of_sampled_muts = counts.mean()
     random_ratio = count_of_sampled_muts / glyco_sequence_region_size
 
     explanation = '(only the same proteins)' if same_proteins else ''
@@ -13,7 +13,6 @@ from flask_limiter.util import get_remote_address
 import csrf
 from database import db, get_engine
 from database import bdb
-from database import bdb_refseq
 from assets import bundles
 from assets import DependencyManager
 from flask_celery import Celery
@@ -115,7 +114,6 @@ def create_app(config_filename='config.py', config_override={}):
 
     readonly = app.config.get('HDB_READONLY', False)
     bdb.open(app.config['HDB_DNA_TO_PROTEIN_PATH'], readonly=readonly)
-    bdb_refseq.open(app.config['HDB_GENE_TO_ISOFORM_PATH'], readonly=readonly)
 
     if app.config['USE_LEVENSTHEIN_MYSQL_UDF']:
         with app.app_context():
@@ -15,7 +15,7 @@ except lmdb.Error as e:
             ' Invoke ./manage.py migrate to ensure all databases are created.'
         )
     raise
-from search.task import search_task
+from search.task import search_task, merge_search_results
 
 
-__all__ = ['celery', 'search_task']
+__all__ = ['celery', 'search_task', 'merge_search_results']
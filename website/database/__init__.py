@@ -14,6 +14,9 @@ from genomic_mappings import GenomicMappings
 
 db = SQLAlchemy()
 bdb = GenomicMappings()
+# Deprecated: gene_to_isoform mappings are no longer used by the search (see
+# search.isoform_index); these are not opened by the app, but only when imported
+# or migrated on request, with open_gene_to_isoform_mappings().
 bdb_refseq = HashSetWithCache(integer_values=True)
 
 Model = TypeVar('Model')
@@ -36,6 +39,14 @@ def get_or_create(model: Type[Model], **kwargs) -> Tuple[Model, bool]:
         return model(**kwargs), True
 
 
+def open_gene_to_isoform_mappings(**kwargs) -> HashSetWithCache:
+    """Open the deprecated gene_to_isoform mappings (bdb_refseq), unless already open."""
+    from flask import current_app
+    if not bdb_refseq.is_open:
+        bdb_refseq.open(current_app.config['HDB_GENE_TO_ISOFORM_PATH'], **kwargs)
+    return bdb_refseq
+
+
 def has_or_any(field, *args, **kwargs):
     method = field.any if field.property.uselist else field.has
     return method(*args, **kwargs)
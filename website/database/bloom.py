@@ -0,0 +1,99 @@
+"""Bloom filter answering "is this key definitely absent?" without touching LMDB.
+
+The filter is stored in a single file: a small header (see `header`)
+followed by the bit array, which is memory-mapped when loaded, so that
+all processes using a database share the same pages of the filter.
+
+Positions of bits are derived from a blake2b digest of the key with
+double hashing (h1 + i * h2), which - unlike Python's `hash` - is stable
+across processes and interpreter runs.
+"""
+from hashlib import blake2b
+from math import ceil, log
+from pathlib import Path
+from struct import Struct
+from typing import Iterable
+
+import numpy as np
+
+
+header = Struct('<8sQB')
+magic = b'BLOOMv1\0'
+
+
+def hash_pair(key: bytes):
+    digest = blake2b(key, digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+
+
+class BloomFilter:
+
+    def __init__(self, bits: np.ndarray, num_bits: int, num_hashes: int):
+        self.bits = bits
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+
+    @classmethod
+    def create(cls, path: Path, capacity: int, false_positive_rate=0.01) -> 'BloomFilter':
+        """Create an empty filter file, sized for `capacity` keys."""
+        capacity = max(capacity, 1)
+        num_bits = max(64, ceil(-capacity * log(false_positive_rate) / log(2) ** 2))
+        num_hashes = max(1, round(num_bits / capacity * log(2)))
+
+        with open(path, 'wb') as f:
+            f.write(header.pack(magic, num_bits, num_hashes))
+            f.truncate(header.size + ceil(num_bits / 8))
+
+        return cls.load(path)
+
+    @classmethod
+    def load(cls, path: Path, readonly=False) -> 'BloomFilter':
+        with open(path, 'rb') as f:
+            file_magic, num_bits, num_hashes = header.unpack(f.read(header.size))
+        if file_magic != magic:
+            raise ValueError(f'{path} is not a bloom filter file')
+        bits = np.memmap(path, dtype=np.uint8, mode='r' if readonly else 'r+', offset=header.size)
+        return cls(bits, num_bits, num_hashes)
+
+    def _positions(self, key: bytes):
+        h1, h2 = hash_pair(key)
+        h1 %= self.num_bits
+        h2 %= self.num_bits
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, key: bytes) -> bool:
+        bits = self.bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+    def add(self, key: bytes):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def add_many(self, keys: Iterable[bytes], batch_size=10 ** 6):
+        """Add keys, setting bits of each batch with a few vectorised operations."""
+        batch = []
+        for key in keys:
+            batch.append(hash_pair(key))
+            if len(batch) == batch_size:
+                self._add_hashes(batch)
+                batch = []
+        if batch:
+            self._add_hashes(batch)
+
+    def _add_hashes(self, hashes):
+        num_bits = np.uint64(self.num_bits)
+        h1 = np.array([h % self.num_bits for h, _ in hashes], dtype=np.uint64)
+        h2 = np.array([h % self.num_bits for _, h in hashes], dtype=np.uint64)
+        for i in range(self.num_hashes):
+            positions = (h1 + np.uint64(i) * h2) % num_bits
+            np.bitwise_or.at(
+                self.bits,
+                (positions >> np.uint64(3)).astype(np.int64),
+                (np.uint64(1) << (positions & np.uint64(7))).astype(np.uint8)
+            )
+
+    def flush(self):
+        self.bits.flush()
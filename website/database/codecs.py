@@ -0,0 +1,125 @@
+"""Codecs translating sets of items into LMDB values and back.
+
+The original HashSet format joins items with a pipe (|) character;
+it is retained as the default (text) codec. Binary codecs prefix each
+encoded value with a single header byte identifying the format (and
+its version), so that values written before a migration can still be
+recognised and decoded with the legacy (text) codec.
+"""
+from abc import ABC, abstractmethod
+from struct import Struct
+from typing import Dict, Iterable, Optional, Type
+
+
+codecs_by_name: Dict[str, Type['ValueCodec']] = {}
+
+
+def register_codec(codec_class):
+    codecs_by_name[codec_class.name] = codec_class
+    return codec_class
+
+
+def get_codec(name) -> 'ValueCodec':
+    return codecs_by_name[name]()
+
+
+def codec_reading_both(first: 'ValueCodec', second: 'ValueCodec') -> Optional['ValueCodec']:
+    """Return the codec which can decode values written by either of given codecs (if any)."""
+    if first.name == second.name:
+        return second
+    for codec, other in [(second, first), (first, second)]:
+        if isinstance(codec, BinaryCodec) and codec.legacy.name == other.name:
+            return codec
+    return None
+
+
+class ValueCodec(ABC):
+    """Encodes a set of items into a single value of a database and back."""
+
+    name: str
+
+    @abstractmethod
+    def encode(self, items: Iterable) -> bytes:
+        """Encode given items into a value."""
+
+    @abstractmethod
+    def decode(self, value: bytes) -> Iterable:
+        """Decode items from a value."""
+
+
+@register_codec
+class TextCodec(ValueCodec):
+    """Items (strings) joined with a pipe character (the legacy format)."""
+
+    name = 'text'
+    separator = '|'
+
+    def encode_item(self, item) -> str:
+        assert self.separator not in item
+        return item
+
+    def decode_item(self, item: str):
+        return item
+
+    def encode(self, items):
+        return bytes(self.separator.join(map(self.encode_item, items)), 'utf-8')
+
+    def decode(self, value):
+        return map(self.decode_item, filter(bool, value.decode().split(self.separator)))
+
+
+@register_codec
+class IntegerTextCodec(TextCodec):
+    """Integers written as decimal strings, joined with a pipe character."""
+
+    name = 'integer-text'
+
+    def encode_item(self, item) -> str:
+        return str(item)
+
+    decode_item = int
+
+
+class BinaryCodec(ValueCodec):
+    """Base for versioned binary formats.
+
+    Values which do not start with the `header` byte are assumed to be
+    written by the `legacy` codec, so that stores can be read (and
+    migrated) in place.
+    """
+
+    header: bytes
+    legacy: ValueCodec
+
+    def encode(self, items):
+        return self.header + self.pack(items)
+
+    def decode(self, value):
+        if value[:1] != self.header:
+            return self.legacy.decode(value)
+        return self.unpack(memoryview(value)[1:])
+
+    @abstractmethod
+    def pack(self, items) -> bytes:
+        """Pack items into the value (without the header)."""
+
+    @abstractmethod
+    def unpack(self, data: memoryview) -> Iterable:
+        """Unpack items from the value (without the header)."""
+
+
+@register_codec
+class UInt32SetCodec(BinaryCodec):
+    """Unsigned 32-bit integers stored as a fixed-width little-endian array."""
+
+    name = 'uint32-set'
+    header = b'\x01'
+    legacy = IntegerTextCodec()
+    item = Struct('<I')
+
+    def pack(self, items):
+        items = sorted(items)
+        return Struct('<%dI' % len(items)).pack(*items)
+
+    def unpack(self, data):
+        return Struct('<%dI' % (len(data) // self.item.size)).unpack(data)
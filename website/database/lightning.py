@@ -1,26 +1,140 @@
+from itertools import islice
+from pathlib import Path
+from typing import Callable, TypeVar
+
 import lmdb
 
 
+T = TypeVar('T')
+
+
 class LightningInterface:
-    """Minimal, pythonic interface for lmdb"""
+    """Minimal, pythonic interface for lmdb
+
+    The map (the maximal size of the database) grows geometrically
+    whenever a write transaction fills it up, so that environments
+    can be opened with a small initial size.
+    """
+
+    growth_factor = 2
 
     def __init__(self, path, **kwargs):
         self.path = path
         self.env = lmdb.Environment(str(self.path), max_dbs=1, **kwargs)
 
+    @property
+    def map_size(self) -> int:
+        return self.env.info()['map_size']
+
+    @property
+    def used_size(self) -> int:
+        """Number of bytes used by the pages of the database."""
+        return (self.env.info()['last_pgno'] + 1) * self.env.stat()['psize']
+
+    def grow(self):
+        """Enlarge the map; there must be no active transactions in this process."""
+        new_size = max(self.map_size, self.used_size) * self.growth_factor
+        self.env.set_mapsize(new_size)
+
+    def write(self, operation: Callable[[lmdb.Transaction], T]) -> T:
+        """Run the operation within a write transaction, growing the map if it gets full.
+
+        The transaction is aborted on MapFullError and the operation is run
+        again (in a new transaction) after the map was enlarged, so it should
+        not have side effects other than the writes to the transaction.
+        """
+        while True:
+            try:
+                with self.env.begin(write=True) as transaction:
+                    return operation(transaction)
+            except lmdb.MapFullError:
+                self.grow()
+
+    def compact(self, destination: Path):
+        """Write a compacted copy of the database (without free pages) to the destination directory."""
+        destination.mkdir(parents=True, exist_ok=True)
+        self.env.copy(str(destination), compact=True)
+
     def get(self, key, default=None):
         with self.env.begin() as transaction:
             return transaction.get(key, default=default)
 
+    def get_many(self, keys):
+        """Fetch values for all given keys within a single read transaction.
+
+        Keys are looked up in sorted order using one cursor, so that
+        subsequent lookups tend to touch already visited pages.
+
+        Returns:
+            dict with values of found keys (missing keys are omitted)
+        """
+        found = {}
+        with self.env.begin() as transaction:
+            cursor = transaction.cursor()
+            set_key = cursor.set_key
+            value = cursor.value
+            for key in sorted(set(keys)):
+                if set_key(key):
+                    found[key] = value()
+        return found
+
     def items(self):
         with self.env.begin() as transaction:
             cursor = transaction.cursor()
             for k, v in cursor:
                 yield k, v
 
+    def keys(self):
+        with self.env.begin() as transaction:
+            cursor = transaction.cursor()
+            for key in cursor.iternext(keys=True, values=False):
+                yield key
+
+    def items_in_range(self, first_key, last_key):
+        """Yields items with keys from first_key (inclusive) to last_key (exclusive), in order of keys."""
+        with self.env.begin() as transaction:
+            cursor = transaction.cursor()
+            if not cursor.set_range(first_key):
+                return
+            for key, value in cursor:
+                if key >= last_key:
+                    break
+                yield key, value
+
+    def append_sorted(self, items, batch_size=100000) -> int:
+        """Write (key, value) items given in ascending order of keys.
+
+        All keys have to be greater than keys already present in the database;
+        items are appended with `putmulti` in batches, each batch in a separate
+        write transaction, which avoids searching the tree for every key.
+
+        Raises:
+            ValueError: if a key is not greater than the preceding keys
+                (the transaction of the offending batch is aborted)
+
+        Returns:
+            number of written items
+        """
+        items = iter(items)
+        written = 0
+
+        def append_batch(transaction):
+            consumed, added = transaction.cursor().putmulti(batch, append=True)
+            if added != len(batch):
+                raise ValueError(
+                    f'Only {added} of {len(batch)} items were appended:'
+                    ' keys are not unique or not in ascending order'
+                )
+            return added
+
+        while True:
+            batch = list(islice(items, batch_size))
+            if not batch:
+                return written
+            written += self.write(append_batch)
+
     def __setitem__(self, key, value):
-        with self.env.begin(write=True) as transaction:
-            return transaction.put(key, value)
+        return self.write(lambda transaction: transaction.put(key, value))
 
     def __getitem__(self, item):
         with self.env.begin() as transaction:
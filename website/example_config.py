@@ -40,6 +40,9 @@ SQLALCHEMY_TRACK_MODIFICATIONS = True
 HDB_DNA_TO_PROTEIN_PATH = 'databases/dna_to_protein/'
 HDB_GENE_TO_ISOFORM_PATH = 'databases/gene_to_isoform/'
 HDB_READONLY = False
+# the maximal size (in bytes) of mappings gathered in memory during an import
+# before being written to the database; defaults to 2 GB
+HDB_IMPORT_MEMORY_BUDGET = None
 
 # -Application settings
 # counting everything in the database in order to prepare statistics might be
@@ -1,12 +1,138 @@
-from typing import List, TYPE_CHECKING
+from struct import Struct
+from typing import Iterable, Iterator, List, NamedTuple, Tuple, TYPE_CHECKING
 
-from hash_set_db import HashSetWithCache
+from database.codecs import BinaryCodec, TextCodec, register_codec
+from hash_set_db import HashSetWithCache, require_open
 
 if TYPE_CHECKING:
     from search.mutation_result import SearchResult
 
 
+class CodingSequenceVariant(NamedTuple):
+    """A single item of genomic mappings (a value of `snv` key)."""
+    strand: str
+    ref: str
+    alt: str
+    cdna_pos: int
+    exon: str
+    protein_id: int
+    is_ptm: bool
+
+    @property
+    def pos(self):
+        return (self.cdna_pos - 1) // 3 + 1
+
+    def as_dict(self):
+        """Same as decode_csv() output for the encoded variant."""
+        return {
+            'strand': self.strand, 'ref': self.ref, 'alt': self.alt, 'pos': self.pos,
+            'cdna_pos': self.cdna_pos, 'exon': self.exon, 'protein_id': self.protein_id, 'is_ptm': self.is_ptm
+        }
+
+
+@register_codec
+class CodingSequenceVariantsTextCodec(TextCodec):
+    """Variants encoded with encode_csv(), joined with a pipe character (the legacy format)."""
+
+    name = 'csv-text'
+
+    def encode_item(self, item: CodingSequenceVariant):
+        return encode_csv(*item)
+
+    def decode_item(self, item: str):
+        strand, ref, alt, is_ptm = item[:4]
+        cdna_pos, exon, protein_id = item[4:].split(':')
+        return CodingSequenceVariant(
+            strand, ref, alt, int(cdna_pos, base=16), exon, int(protein_id, base=16), is_ptm == '1'
+        )
+
+
+@register_codec
+class CodingSequenceVariantsRecordCodec(BinaryCodec):
+    """Variants stored as fixed-width records.
+
+    Each record holds: reference and alternative residues, flags (strand
+    and PTM-relation), cDNA position, protein identifier and an exon
+    identifier of up to four characters.
+    """
+
+    name = 'csv-record'
+    header = b'\x02'
+    legacy = CodingSequenceVariantsTextCodec()
+    record = Struct('<ccBII4s')
+
+    is_minus_strand = 1
+    is_ptm = 2
+
+    def pack(self, items):
+        pack = self.record.pack
+        records = []
+        for item in items:
+            exon = bytes(item.exon, 'utf-8')
+            if len(exon) > 4:
+                raise ValueError(f'Exon identifier {item.exon} is too long to be stored in a record')
+            flags = (self.is_minus_strand if item.strand == '-' else 0) | (self.is_ptm if item.is_ptm else 0)
+            records.append(
+                pack(bytes(item.ref, 'utf-8'), bytes(item.alt, 'utf-8'), flags, item.cdna_pos, item.protein_id, exon)
+            )
+        return b''.join(records)
+
+    def unpack(self, data):
+        minus_strand = self.is_minus_strand
+        is_ptm = self.is_ptm
+        return [
+            CodingSequenceVariant(
+                '-' if flags & minus_strand else '+',
+                ref.decode(), alt.decode(), cdna_pos,
+                exon.rstrip(b'\0').decode(), protein_id, bool(flags & is_ptm)
+            )
+            for ref, alt, flags, cdna_pos, protein_id, exon in self.record.iter_unpack(data)
+        ]
+
+
 class GenomicMappings(HashSetWithCache):
+    """Mappings of genomic SNVs to coding sequence variants (and thus protein mutations).
+
+    Keys are created with `make_snv_key`: those sort in genomic order,
+    which allows to iterate over all mappings of a region with a single
+    cursor. Databases created before the introduction of the sortable keys
+    use the legacy layout (see `make_legacy_snv_key`) until migrated with
+    `migrate_keys`; the layout is recorded in a small file next to the database.
+    """
+
+    key_layout_file_name = 'key_layout'
+
+    def __init__(self, name=None, integer_values=False, codec=None):
+        self.key_layout = 'sortable'
+        super().__init__(name=name, integer_values=integer_values, codec=codec)
+
+    def available_codecs(self):
+        return {'text': CodingSequenceVariantsTextCodec(), 'binary': CodingSequenceVariantsRecordCodec()}
+
+    def open(self, name, readonly=False, *args, **kwargs):
+        super().open(name, readonly, *args, **kwargs)
+        layout_path = self.path / self.key_layout_file_name
+        if layout_path.exists():
+            self.key_layout = layout_path.read_text().strip()
+        else:
+            # databases populated before the layout was recorded use legacy keys
+            self.key_layout = 'legacy' if len(self.db) else 'sortable'
+            if not readonly:
+                layout_path.write_text(self.key_layout)
+
+    @property
+    def key_maker(self):
+        """Module-level function making keys in the key layout of this database.
+
+        Unlike the `make_snv_key` method, it can be passed to other processes.
+        """
+        if self.key_layout == 'legacy':
+            return make_legacy_snv_key
+        return make_snv_key
+
+    def make_snv_key(self, chrom, pos, ref, alt):
+        """Make a key for given SNV in the key layout of this database."""
+        return self.key_maker(chrom, pos, ref, alt)
 
     def add_genomic_mut(self, chrom, dna_pos, dna_ref, dna_alt, aa_mut, strand='+', exon='EX1', is_ptm=False):
         """Add a genomic mutation mapping to provided 'mut' aminoacid mutation.
@@ -14,13 +140,13 @@ class GenomicMappings(HashSetWithCache):
         This is a testing convenience function. Please refrain from using
         it for full-database imports as it *may* be hugely inefficient.
         """
-        snv = make_snv_key(chrom, dna_pos, dna_ref, dna_alt)
-        csv = encode_csv(
+        snv = self.make_snv_key(chrom, dna_pos, dna_ref, dna_alt)
+        variant = CodingSequenceVariant(
             strand, aa_mut.ref, aa_mut.alt, cdna_pos_from_aa(aa_mut.position),
             exon, aa_mut.protein.id, is_ptm
         )
 
-        self.add(snv, csv)
+        self.add(snv, variant)
 
     def get_genomic_muts(self, chrom, dna_pos, dna_ref, dna_alt) -> List['SearchResult']:
         """Returns aminoacid mutations meeting provided criteria.
@@ -39,40 +165,164 @@ class GenomicMappings(HashSetWithCache):
         Returns:
             list of items where each item contains Mutation object and additional metadata
         """
-        from search.mutation_result import SearchResult
+        snv = self.make_snv_key(chrom, dna_pos, dna_ref, dna_alt)
 
-        from models import Protein, Mutation
-        from database import get_or_create
+        return self._make_results([self[snv]])[0]
 
-        snv = make_snv_key(chrom, dna_pos, dna_ref, dna_alt)
+    def get_genomic_muts_batch(self, variants: Iterable[Tuple]) -> List[List['SearchResult']]:
+        """Batch equivalent of `get_genomic_muts`.
 
-        items = [
-            decode_csv(item)
-            for item in self[snv]
-        ]
+        All mappings are retrieved within a single read transaction,
+        and the mutations are resolved in bulk (see `_make_results`).
 
-        # this could be speed up by: itemgetters, accumulative queries and so on
-        results = []
+        Args:
+            variants: (chrom, dna_pos, dna_ref, dna_alt) tuples,
+                as accepted by `get_genomic_muts`
 
-        for item in items:
+        Returns:
+            list of results for each of the variants, in the same order
+        """
+        snvs = [self.make_snv_key(*variant) for variant in variants]
+        found = self.get_many(snvs)
+
+        return self._make_results([found[snv] for snv in snvs])
 
-            protein = Protein.query.get(item['protein_id'])
-            mutation, created = get_or_create(
-                Mutation,
-                protein=protein,
-                protein_id=protein.id,  # TODO: should use either protein or protein_id
-                position=item['pos'],
-                alt=item['alt']
+    @require_open
+    def iterate_region(self, chrom, start, end) -> Iterator[Tuple[int, str, str, List[CodingSequenceVariant]]]:
+        """Yields mappings of all SNVs within given region, in genomic order.
+
+        All mappings are read with a single cursor, within one read transaction.
+
+        Args:
+            chrom: chromosome identifier, without 'chr' prefix
+            start: the first position of the region (inclusive)
+            end: the last position of the region (inclusive)
+
+        Returns:
+            (position, ref, alt, variants) tuples, with ref and alt in upper case
+        """
+        if self.key_layout != 'sortable':
+            raise ValueError(
+                'Region queries require sortable keys; migrate the database with `migrate_keys()` first'
             )
-            results.append(
-                SearchResult(
-                    protein=protein,
-                    mutation=mutation,
-                    is_mutation_novel=created,
-                    type='genomic',
-                    **item
+        decode = self.codec.decode
+        first_key = bytes(make_snv_key_prefix(chrom, start), 'utf-8')
+        last_key = bytes(make_snv_key_prefix(chrom, int(end) + 1), 'utf-8')
+
+        for key, value in self.db.items_in_range(first_key, last_key):
+            chrom, pos, ref, alt = parse_snv_key(key.decode())
+            yield pos, ref.upper(), alt.upper(), list(decode(value))
+
+    def get_genomic_muts_in_region(self, chrom, start, end) -> List[Tuple[Tuple[int, str, str], List['SearchResult']]]:
+        """Returns aminoacid mutations of all SNVs within given region.
+
+        Mutations are resolved in bulk (see `_make_results`).
+
+        Returns:
+            list of ((position, ref, alt), results) tuples, in genomic order
+        """
+        snvs = []
+        variants_groups = []
+        for pos, ref, alt, variants in self.iterate_region(chrom, start, end):
+            snvs.append((pos, ref, alt))
+            variants_groups.append(variants)
+
+        return list(zip(snvs, self._make_results(variants_groups)))
+
+    @require_open
+    def migrate_keys(self, batch_size=100000) -> int:
+        """Rewrite keys in the legacy layout into the sortable layout.
+
+        Keys are rewritten in batches, each in a separate write transaction.
+        Keys which are already in the sortable layout are skipped, so an
+        interrupted migration can be resumed.
+
+        Returns:
+            number of rewritten keys
+        """
+        decode = self.codec.decode
+        encode = self.codec.encode
+
+        last_key = None
+        migrated = 0
+
+        def migrate_batch(transaction):
+            cursor = transaction.cursor()
+            has_next = cursor.first() if last_key is None else cursor.set_range(last_key)
+
+            batch = []
+            while has_next and len(batch) < batch_size:
+                key = cursor.key()
+                if not is_sortable_snv_key(key.decode()):
+                    batch.append((key, cursor.value()))
+                has_next = cursor.next()
+
+            for key, value in batch:
+                new_key = bytes(make_snv_key(*parse_legacy_snv_key(key.decode())), 'utf-8')
+                items = set(decode(value))
+                existing = transaction.get(new_key)
+                if existing is not None:
+                    items.update(decode(existing))
+                transaction.delete(key)
+                transaction.put(new_key, encode(items))
+
+            return batch
+
+        while True:
+            batch = self.db.write(migrate_batch)
+
+            if not batch:
+                break
+
+            migrated += len(batch)
+            last_key = batch[-1][0]
+
+        self.key_layout = 'sortable'
+        (self.path / self.key_layout_file_name).write_text(self.key_layout)
+
+        if self.bloom_filter is not None:
+            self.build_filter()
+
+        return migrated
+
+    @staticmethod
+    def _make_results(variants_groups: List[Iterable[CodingSequenceVariant]]) -> List[List['SearchResult']]:
+        """Create search results for groups of variants (e.g. one group per genomic mutation).
+
+        Proteins and mutations of all groups are resolved together,
+        with a few bulk queries rather than two queries per variant.
+        """
+        from search.mutation_result import SearchResult, resolve_mutations
+
+        variants_groups = [list(variants) for variants in variants_groups]
+
+        resolved = resolve_mutations(
+            (variant.protein_id, variant.pos, variant.alt)
+            for variants in variants_groups
+            for variant in variants
+        )
+
+        results = []
+
+        for variants in variants_groups:
+            group_results = []
+
+            for variant in variants:
+                key = (variant.protein_id, variant.pos, variant.alt)
+                if key not in resolved:
+                    continue
+                protein, mutation, created = resolved[key]
+                group_results.append(
+                    SearchResult(
+                        protein=protein,
+                        mutation=mutation,
+                        is_mutation_novel=created,
+                        type='genomic',
+                        **variant.as_dict()
+                    )
                 )
-            )
+
+            results.append(group_results)
 
         return results
 
@@ -81,22 +331,31 @@ class GenomicMappings(HashSetWithCache):
         from tqdm import tqdm
 
         for value in tqdm(self.values(), total=len(self.db)):
-            for item in map(decode_csv, value):
+            for variant in value:
 
                 mutation = Mutation.query.filter_by(
-                    protein_id=item['protein_id'],
-                    position=item['pos'],
-                    alt=item['alt']
+                    protein_id=variant.protein_id,
+                    position=variant.pos,
+                    alt=variant.alt
                 ).first()
 
                 if mutation:
                     yield mutation
 
 
+def make_snv_key_prefix(chrom, pos):
+    """Beginning of keys of SNVs at given position (see `make_snv_key`)."""
+    return chrom.rjust(2, '0') + ':' + '%08x' % int(pos)
+
+
 def make_snv_key(chrom, pos, ref, alt):
     """Makes a key for given `snv` (Single Nucleotide Variation)
     to be used as a key in hashmap in snv -> csv mappings.
 
+    Keys are built of a fixed-width chromosome code and a fixed-width
+    (zero-padded, hexadecimal) position, so that these sort in genomic
+    order within a chromosome (e.g. '17:00737f1aga').
+
     Args:
         chrom:
             str representing one of human chromosomes
@@ -109,11 +368,38 @@ def make_snv_key(chrom, pos, ref, alt):
         alt:
             char representing alternative nucleotide
     """
+    return make_snv_key_prefix(chrom, pos) + ref.lower() + alt.lower()
+
+
+def parse_snv_key(key: str) -> Tuple[str, int, str, str]:
+    """Reverse `make_snv_key`, returning (chrom, pos, ref, alt) tuple."""
+    chrom_code, rest = key.split(':')
+    chrom = chrom_code.lstrip('0')
+    return chrom, int(rest[:8], base=16), rest[8], rest[9]
+
+
+def is_sortable_snv_key(key: str) -> bool:
+    """Check if the key is in the layout of `make_snv_key`.
+
+    Legacy keys could have eight hexadecimal digits of position only for positions
+    above 268,435,455 which are not present in the human genome.
+    """
+    chrom_code, rest = key.split(':')
+    return len(chrom_code) >= 2 and len(rest) == 10
+
+
+def make_legacy_snv_key(chrom, pos, ref, alt):
+    """Makes a key in the legacy layout (not sortable, as the position is not padded)."""
     return ':'.join(
         (chrom, '%x' % int(pos))
     ) + ref.lower() + alt.lower()
 
 
+def parse_legacy_snv_key(key: str) -> Tuple[str, int, str, str]:
+    chrom, rest = key.split(':')
+    return chrom, int(rest[:-2], base=16), rest[-2], rest[-1]
+
+
 def decode_csv(encoded_data):
     """Decode Coding Sequence Variant data from string made by encode_csv()."""
     strand, ref, alt, is_ptm = encoded_data[:4]
@@ -1,14 +1,23 @@
 from pathlib import Path
 
 import gc
+from sys import getsizeof
+from time import time
 from collections import defaultdict
 from contextlib import contextmanager
+from shutil import copyfile
 
-from typing import Iterable, Union
+from typing import Dict, Iterable, Tuple, Union
 
+from database.bloom import BloomFilter
+from database.codecs import ValueCodec, TextCodec, IntegerTextCodec, UInt32SetCodec, codec_reading_both, get_codec
 from database.lightning import LightningInterface
 
 
+# files created by LMDB in the directory of a database
+lmdb_files = {'data.mdb', 'lock.mdb'}
+
+
 class SetWithCallback(set):
     """A set implementation that triggers callbacks on `add` or `update`.
 
@@ -46,15 +55,41 @@ def require_open(func):
 
 
 class HashSet:
-    """A hash-indexed database where values are equivalent to Python's sets."""
+    """A hash-indexed database where values are equivalent to Python's sets.
+
+    Sets are stored as single values, serialized with a `ValueCodec`;
+    the codec used by a database is recorded in a small file next to
+    the database, so that it is restored when the database is reopened.
+
+    If a Bloom filter was built for the database (see `build_filter`),
+    it is consulted before every lookup, so that keys absent from
+    the database are rejected without any LMDB transaction.
+
+    Each write opens its own write transaction, unless made within
+    a `batch`; large, sorted streams of values can be written with
+    the bulk loader (`load_sorted`) instead.
+    """
+
+    codec_file_name = 'codec'
+    filter_file_name = 'bloom_filter'
 
-    def __init__(self, name=None, integer_values=False):
+    def __init__(self, name=None, integer_values=False, codec: ValueCodec = None):
         self.is_open = False
         self.path: Path
+        self.bloom_filter = None
+        # values written in the current batch, by key (None if not in a batch)
+        self.pending: Dict[bytes, set] = None
         self.integer_values = integer_values
+        self.codec = codec or self.available_codecs()['text']
         if name:
             self.open(name)
 
+    def available_codecs(self) -> Dict[str, ValueCodec]:
+        """Codecs which can be used to store values of this database, by format."""
+        if self.integer_values:
+            return {'text': IntegerTextCodec(), 'binary': UInt32SetCodec()}
+        return {'text': TextCodec()}
+
     def _create_path(self, name) -> Path:
         """Returns path to a file containing the database.
 
@@ -66,19 +101,33 @@ class HashSet:
         db_dir.mkdir(parents=True, exist_ok=True)
         return db_dir
 
-    def open(self, name, readonly=False, size=1e5, write_map=True, **kwargs):
+    def open(self, name, readonly=False, size=1e5, write_map=True, codec: ValueCodec = None, **kwargs):
         """Open hash database in a given mode.
 
         By default it opens a database in read-write mode and in case
         if a database of given name does not exists it creates one.
+
+        If no `codec` is given, the codec recorded for the database
+        (if any) will be used, falling back to the current one.
         """
         path = self._create_path(name)
         self.path = path
+        codec_path = path / self.codec_file_name
+        if codec:
+            self.codec = codec
+        elif codec_path.exists():
+            self.codec = get_codec(codec_path.read_text().strip())
         self.db = LightningInterface(path, map_size=size, readonly=readonly, writemap=write_map, **kwargs)
+        if not readonly:
+            codec_path.write_text(self.codec.name)
+        filter_path = path / self.filter_file_name
+        self.bloom_filter = BloomFilter.load(filter_path, readonly=readonly) if filter_path.exists() else None
         self.is_open = True
 
     def close(self):
+        self.bloom_filter = None
         self.db.close()
+        self.is_open = False
 
     @require_open
     def __getitem__(self, key) -> set:
@@ -86,98 +135,254 @@ class HashSet:
 
         key = bytes(key, 'utf-8')
 
-        try:
-            items = filter(
-                bool,
-                self.db.get(key).decode().split('|')
-            )
-            if self.integer_values:
-                items = map(int, items)
-        except (KeyError, AttributeError):
-            items = []
-
         return SetWithCallback(
-            items,
+            self._get(key),
             lambda new_set: self.__setitem__(key, new_set)
         )
 
+    @require_open
+    def get_many(self, keys: Iterable[str]) -> Dict[str, set]:
+        """Returns a dict with sets of items for given keys.
+
+        All keys are resolved within a single read transaction;
+        keys absent from the database are mapped to empty sets.
+        """
+        encoded_keys = {bytes(key, 'utf-8'): key for key in keys}
+        candidates = encoded_keys
+        if self.bloom_filter is not None:
+            candidates = [key for key in encoded_keys if key in self.bloom_filter]
+        found = self.db.get_many(candidates) if candidates else {}
+        decode = self.codec.decode
+        pending = self.pending or {}
+        return {
+            key: (
+                set(pending[encoded_key]) if encoded_key in pending else
+                set(decode(found[encoded_key])) if encoded_key in found else
+                set()
+            )
+            for encoded_key, key in encoded_keys.items()
+        }
+
     def items(self):
         """Yields (key, iterator over items from value set) tuples.
 
-        All atomic elements are returned as plain strings.
+        Items are decoded by the codec of the database
+        (plain strings or integers for the text codecs).
         """
-        decode = bytes.decode
-        split = str.split
+        decode = self.codec.decode
         for key, value in self.db.items():
-            try:
-                yield key.decode(), filter(bool, split(decode(value), '|'))
-            except (KeyError, AttributeError):
-                pass
+            yield key.decode(), decode(value)
 
     def values(self):
         """Yields iterators over items from value set.
 
-        All atomic elements are returned as plain strings.
+        Items are decoded by the codec of the database
+        (plain strings or integers for the text codecs).
         """
-        decode = bytes.decode
-        split = str.split
+        decode = self.codec.decode
         for key, value in self.db.items():
-            try:
-                yield filter(bool, split(decode(value), '|'))
-            except (KeyError, AttributeError):
-                pass
+            yield decode(value)
 
     def update(self, key, value):
         key = bytes(key, 'utf-8')
-        try:
-            items = self._to_set(self.db.get(key))
-        except (KeyError, AttributeError):
-            items = set()
-
-        assert '|' not in value
-        items.update((bytes(v, 'utf-8') for v in value))
-
-        self.db[key] = b'|'.join(items)
-
-    def _get(self, key):
-        try:
-            items = self._to_set(self.db.get(key))
-        except (KeyError, AttributeError):
-            items = set()
-        return items
-
-    @staticmethod
-    def _to_set(value: bytes):
-        return set(
-            filter(
-                bool,
-                value.split(b'|')
-            )
-        )
+        items = self._get(key)
+        items.update(value)
+        self._put(key, items)
+
+    def _get(self, key: bytes) -> set:
+        if self.pending is not None and key in self.pending:
+            return set(self.pending[key])
+        if self.bloom_filter is not None and key not in self.bloom_filter:
+            return set()
+        value = self.db.get(key)
+        if value is None:
+            return set()
+        return set(self.codec.decode(value))
 
     def add(self, key, value):
         key = bytes(key, 'utf-8')
         items = self._get(key)
-        assert '|' not in value
-        items.add(bytes(value, 'utf-8'))
-        self.db[key] = b'|'.join(items)
+        items.add(value)
+        self._put(key, items)
+
+    def _put(self, key: bytes, items):
+        if self.pending is not None:
+            self.pending[key] = set(items)
+            return
+        if self.bloom_filter is not None:
+            self.bloom_filter.add(key)
+        self.db[key] = self.codec.encode(items)
 
     @require_open
     def __setitem__(self, key: Union[str, bytes], items: Iterable[Union[str, int]]):
-        if self.integer_values:
-            items = map(str, items)
-        else:
-            assert all('|' not in item for item in items)
         if not isinstance(key, bytes):
             key = bytes(key, 'utf-8')
-        self.db[key] = bytes('|'.join(items), 'utf-8')
+        self._put(key, items)
+
+    @contextmanager
+    def batch(self):
+        """Collect all writes made within the context and commit them in a single transaction.
+
+        Values written in the batch are visible to reads from this HashSet
+        before the commit. Nested batches are merged into the outermost one.
+        If an exception is raised, no writes of the batch are committed.
+        """
+        if self.pending is not None:
+            yield
+            return
+
+        self.pending = {}
+        try:
+            yield
+            pending, self.pending = self.pending, None
+            self._write_pending(pending)
+        finally:
+            self.pending = None
+
+    def _write_pending(self, pending: Dict[bytes, set]):
+        encode = self.codec.encode
+        encoded_items = [(key, encode(items)) for key, items in sorted(pending.items())]
+        self.db.write(lambda transaction: transaction.cursor().putmulti(encoded_items))
+        if self.bloom_filter is not None:
+            self.bloom_filter.add_many(pending)
+
+    @require_open
+    def load_sorted(self, items: Iterable[Tuple[Union[str, bytes], Iterable]], batch_size=100000) -> int:
+        """Bulk-load (key, values) tuples, given in ascending order of (encoded) keys.
+
+        Keys have to be unique, and greater than any key already present
+        in the database (e.g. the database was just reset). The values are
+        appended with `putmulti`, skipping the search of the tree for each key;
+        ValueError is raised if the keys break this order.
+
+        Returns:
+            number of written keys
+        """
+        encode = self.codec.encode
+        bloom_filter = self.bloom_filter
+
+        def encoded_items():
+            for key, values in items:
+                if not isinstance(key, bytes):
+                    key = bytes(key, 'utf-8')
+                if bloom_filter is not None:
+                    bloom_filter.add(key)
+                yield key, encode(values)
+
+        return self.db.append_sorted(encoded_items(), batch_size=batch_size)
 
     @require_open
     def __len__(self):
         return len(self.db)
 
+    @require_open
+    def migrate(self, codec: ValueCodec, batch_size=100000) -> int:
+        """Rewrite all values of the database using given codec.
+
+        Values are re-encoded in batches of `batch_size` keys, each batch
+        in a separate write transaction, so that very large databases
+        can be migrated without holding a single, huge transaction.
+
+        Until the migration completes, the database is recorded to use
+        the codec which decodes values in both formats, so that the
+        database remains readable and an interrupted migration can be
+        resumed by calling `migrate` again.
+
+        Returns:
+            number of rewritten values
+        """
+        reader = codec_reading_both(self.codec, codec)
+        if reader is None:
+            raise ValueError(f'Values of {self.codec.name} format cannot be migrated to {codec.name} in place')
+
+        self.codec = reader
+        (self.path / self.codec_file_name).write_text(reader.name)
+
+        decode = reader.decode
+        encode = codec.encode
+
+        last_key = None
+        migrated = 0
+
+        def migrate_batch(transaction):
+            cursor = transaction.cursor()
+
+            if last_key is None:
+                has_next = cursor.first()
+            else:
+                has_next = cursor.set_range(last_key)
+                if has_next and cursor.key() == last_key:
+                    has_next = cursor.next()
+
+            batch = []
+            while has_next and len(batch) < batch_size:
+                batch.append(cursor.item())
+                has_next = cursor.next()
+
+            put = transaction.put
+            for key, value in batch:
+                put(key, encode(decode(value)))
+
+            return batch
+
+        while True:
+            batch = self.db.write(migrate_batch)
+
+            if not batch:
+                break
+
+            migrated += len(batch)
+            last_key = batch[-1][0]
+
+        self.codec = codec
+        (self.path / self.codec_file_name).write_text(codec.name)
+
+        return migrated
+
+    @require_open
+    def build_filter(self, false_positive_rate=0.01) -> BloomFilter:
+        """(Re)build the Bloom filter of all keys of the database.
+
+        The filter is written to a temporary file first and then moved
+        into place, so that a failed build never leaves a partial filter
+        (which would reject keys present in the database).
+        """
+        filter_path = self.path / self.filter_file_name
+        temporary_path = filter_path.with_suffix('.tmp')
+
+        bloom_filter = BloomFilter.create(temporary_path, len(self.db), false_positive_rate)
+        bloom_filter.add_many(self.db.keys())
+        bloom_filter.flush()
+
+        temporary_path.replace(filter_path)
+        self.bloom_filter = BloomFilter.load(filter_path)
+        return self.bloom_filter
+
+    @require_open
+    def compact(self, destination=None):
+        """Write a compacted copy of the database (e.g. for read-only serving) to the destination directory.
+
+        The files recorded next to the database (codec, filter, etc.) are
+        copied too. Without destination, the database is compacted in place.
+        """
+        in_place = destination is None
+        destination = self.path.with_name(self.path.name + '_compacted') if in_place else Path(destination)
+
+        self.db.compact(destination)
+        for path in self.path.iterdir():
+            if path.name not in lmdb_files:
+                copyfile(path, destination / path.name)
+
+        if in_place:
+            self.close()
+            for path in destination.iterdir():
+                path.replace(self.path / path.name)
+            destination.rmdir()
+            self.open(self.name)
+
     @require_open
     def drop(self, not_exists_ok=True):
+        self.bloom_filter = None
         try:
             for f in self.path.glob('*'):
                 f.unlink()
@@ -201,48 +406,136 @@ class HashSet:
         self.open(self.name)
 
 
+class FlushStatistics:
+    """Counters of flushes of the cache of HashSetWithCache."""
+
+    def __init__(self):
+        self.flushes = 0
+        self.entries_written = 0
+        self.bytes_written = 0
+        self.flush_time = 0.0
+
+    def __str__(self):
+        return (
+            f'{self.flushes} flushes, {self.entries_written} entries'
+            f' ({self.bytes_written / 2 ** 20:.1f} MB) written in {self.flush_time:.1f}s'
+        )
+
+
 class HashSetWithCache(HashSet):
+    """HashSet gathering added items in memory, to write those in bulk.
+
+    Within a `cached_session`, the cache is flushed whenever it holds more
+    than `max_entries` keys, or its (estimated) size exceeds `memory_budget`
+    bytes, so that the memory use of imports is bounded regardless of the
+    size of the imported files.
+    """
+
+    # rough estimate of memory used by a key of the cache: the bytes object,
+    # a slot in the dict and an (initially small) set of items
+    key_overhead = 350
+    # and by a single item: a slot in the set, in addition to the item itself
+    item_overhead = 40
+
+    default_memory_budget = 2 * 2 ** 30
+    default_max_entries = 5 * 10 ** 6
 
-    def __init__(self, name=None, integer_values=False):
+    def __init__(self, name=None, integer_values=False, codec: ValueCodec = None):
         self.in_cached_session = False
         self.cache = {}
+        self.cache_size = 0
+        self.memory_budget = self.default_memory_budget
+        self.max_entries = self.default_max_entries
+        self.flush_statistics = FlushStatistics()
         self.i = None
-        super().__init__(name=name, integer_values=integer_values)
+        super().__init__(name=name, integer_values=integer_values, codec=codec)
 
-    def cached_add(self, key: str, value: str):
-        self.cache[bytes(key, 'utf-8')].add(bytes(value, 'utf-8'))
+    def cached_add(self, key: str, value):
+        key = bytes(key, 'utf-8')
+        items = self.cache[key]
+        count = len(items)
+        items.add(value)
+
+        if len(items) != count:
+            self.cache_size += getsizeof(value) + self.item_overhead
+            if not count:
+                self.cache_size += len(key) + self.key_overhead
+                if len(self.cache) >= self.max_entries:
+                    self.flush_cache()
+                    return
+            if self.cache_size >= self.memory_budget:
+                self.flush_cache()
 
     def cached_add_integer(self, key: str, value: int):
-        self.cache[bytes(key, 'utf-8')].add(b'%d' % value)
+        self.cached_add(key, value)
 
     def flush_cache(self):
-        assert self.in_cached_session
-
-        with self.db.env.begin(write=True) as transaction:
-            put = transaction.put
-            get = transaction.get
-            to_set = self._to_set
+        """Write the cache to the database, merging it with values already stored.
 
-            for key, items in self.cache.items():
-                old_values = get(key)  # will return None if the key does not exist in the db
-                if old_values:
-                    items.update(to_set(old_values))
+        Keys are processed in sorted order with a single cursor,
+        so that consecutive keys hit nearby pages of the database.
+        """
+        assert self.in_cached_session
 
-            for key, items in self.cache.items():
-                put(key, b'|'.join(items))
+        start = time()
+        decode = self.codec.decode
+        encode = self.codec.encode
+
+        def write_cache(transaction) -> int:
+            cursor = transaction.cursor()
+            set_key = cursor.set_key
+            value = cursor.value
+            put = cursor.put
+            written = 0
+
+            for key in sorted(self.cache):
+                items = self.cache[key]
+                # old values of the key (if any) are merged with the cached ones
+                # (repeating the merge if the transaction is retried is harmless)
+                if set_key(key):
+                    old_values = value()
+                    if old_values:
+                        items.update(decode(old_values))
+                encoded = encode(items)
+                put(key, encoded)
+                written += len(encoded)
+
+            return written
+
+        written = self.db.write(write_cache)
+
+        if self.bloom_filter is not None:
+            self.bloom_filter.add_many(self.cache)
+
+        statistics = self.flush_statistics
+        statistics.flushes += 1
+        statistics.entries_written += len(self.cache)
+        statistics.bytes_written += written
+        statistics.flush_time += time() - start
 
         self.cache = defaultdict(set)
+        self.cache_size = 0
 
         self.i += 1
         if self.i % 100 == 99:
             gc.collect()
 
     @contextmanager
-    def cached_session(self):
+    def cached_session(self, memory_budget: int = None, max_entries: int = None):
+        """Gather added items in memory, flushing these when the limits are exceeded.
+
+        Args:
+            memory_budget: the maximal (estimated) size of the cache in bytes
+            max_entries: the maximal number of keys in the cache
+        """
         self.i = 0
         old_cache = self.cache
         self.in_cached_session = True
         self.cache = defaultdict(set)
+        self.cache_size = 0
+        self.memory_budget = memory_budget or self.default_memory_budget
+        self.max_entries = max_entries or self.default_max_entries
+        self.flush_statistics = FlushStatistics()
 
         yield
 
@@ -252,6 +545,8 @@ class HashSetWithCache(HashSet):
         self.cache = old_cache
         self.in_cached_session = False
 
+        print(f'Cache statistics: {self.flush_statistics}')
+
 
 def path_relative_to_app(path):
     path = Path(path)
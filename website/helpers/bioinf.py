@@ -19,6 +19,32 @@ aa_names = (
 )
 aa_name_to_symbol = dict(zip(aa_names, aa_symbols))
 
+# the standard genetic code; stop codons are represented with asterisks (*)
+nucleotides = 'TCAG'
+genetic_code = dict(zip(
+    (first + second + third for first in nucleotides for second in nucleotides for third in nucleotides),
+    'FFLLSSSSYY**CC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG'
+))
+
+# pairs of (ref, alt) residues such that a codon of the ref can be changed
+# into a codon of the alt by a substitution of a single nucleotide
+single_snv_substitutions = {
+    (residue, genetic_code[codon[:i] + nucleotide + codon[i + 1:]])
+    for codon, residue in genetic_code.items()
+    for i in range(3)
+    for nucleotide in nucleotides
+    if nucleotide != codon[i]
+}
+
+
+def can_be_result_of_single_snv(ref: str, alt: str) -> bool:
+    """Check if a substitution of ref residue with alt can be caused by a single SNV.
+
+    For example, F -> W cannot be a result of a single SNV as neither
+    TTT nor TTC could be changed to TGG (the only tryptophan codon) in one step.
+    """
+    return (ref, alt) in single_snv_substitutions
+
 
 class DataInconsistencyError(Exception):
     pass
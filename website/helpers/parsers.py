@@ -1,9 +1,15 @@
 import os
-from contextlib import contextmanager
+from collections import deque
+from contextlib import closing, contextmanager, ExitStack
+from functools import partial
 from glob import glob
 import gzip
-from typing import TextIO
+from queue import Queue, Full
+from shutil import which
+from threading import Event, Thread
+from typing import Iterator, List, NamedTuple, TextIO, Tuple
 
+import numpy as np
 from tqdm import tqdm
 import subprocess
 
@@ -30,41 +36,247 @@ def get_files(path, pattern):
     return glob(path + os.sep + pattern)
 
 
+class ReadProgress:
+    """Progress bar of reading files, measured in bytes read from the disk.
+
+    For compressed files these are the compressed bytes, so the total is
+    known without decompressing the files in advance. The position is taken
+    from the descriptor of the watched file, which is shared with the
+    decompressing readers (gzip module, or pigz process reading its stdin).
+    """
+
+    def __init__(self, file_names, update_every=10000, **tqdm_kwargs):
+        self.update_every = update_every
+        self.progress_bar = tqdm(
+            total=sum(os.path.getsize(file_name) for file_name in file_names),
+            unit='B', unit_scale=True, unit_divisor=1024, **tqdm_kwargs
+        )
+        # bytes of the files which were already read
+        self.done = 0
+        self.file_descriptor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.progress_bar.close()
+
+    @contextmanager
+    def watch(self, file_object):
+        """Report the position in given file (opened from one of the file names) while in the context."""
+        self.file_descriptor = file_object.fileno()
+        size = os.fstat(self.file_descriptor).st_size
+        try:
+            yield file_object
+        finally:
+            self.file_descriptor = None
+            self.file_read(size)
+
+    def file_read(self, size):
+        self.done += size
+        self.progress_bar.update(self.done - self.progress_bar.n)
+
+    def update(self, position=None):
+        """Move to given position in the current file (by default: read from the watched file)."""
+        if position is None:
+            if self.file_descriptor is None:
+                return
+            position = os.lseek(self.file_descriptor, 0, os.SEEK_CUR)
+        self.progress_bar.update(self.done + position - self.progress_bar.n)
+
+    def track(self, iterable):
+        """Yield from the iterable, updating the progress every `update_every` items."""
+        countdown = self.update_every
+        for item in iterable:
+            yield item
+            countdown -= 1
+            if not countdown:
+                self.update()
+                countdown = self.update_every
+
+
+def is_pigz_available():
+    return which('pigz') is not None
+
+
 @contextmanager
 def fast_gzip_read(file_name, mode='r', processes=4, as_str=False):
+    """Decompress the file with pigz, yielding its output stream.
+
+    Instead of a name, a file opened in binary mode can be given;
+    pigz will then read it from the current position.
+
+    If pigz is not installed, the file is decompressed in-process (zlib).
+    """
     if mode != 'r':
         raise ValueError('Only "r" mode is supported')
 
-    command = f'pigz -d -p {processes} -c {file_name}'
+    with ExitStack() as stack:
+        if hasattr(file_name, 'fileno'):
+            compressed = file_name
+        else:
+            compressed = stack.enter_context(open(file_name, 'rb'))
+
+        if not is_pigz_available():
+            yield stack.enter_context(gzip.open(compressed, 'rt' if as_str else 'rb'))
+            return
+
+        command = ['pigz', '-d', '-p', str(processes), '-c']
+
+        p = subprocess.Popen(
+            command,
+            stdin=compressed,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=as_str
+        )
+        try:
+            yield p.stdout
+        finally:
+            p.stdout.close()
+            return_code = p.wait()
+            errors = p.stderr.read()
+            p.stderr.close()
+
+        if return_code:
+            raise OSError(f'pigz failed to decompress {file_name}: {errors}')
+
+
+def gz_file_batches(file_name, skip_header=True, sep=None, batch_size=2 ** 20, processes=4) -> Iterator[Tuple[list, int]]:
+    """Decompress the file, yielding batches of lines with the number of compressed bytes read so far.
+
+    Args:
+        skip_header: whether to skip the first line
+        sep: if given, lines will be stripped and split by the separator
+        batch_size: approximate size of decompressed text in a batch
+    """
+    with open(file_name, 'rb') as compressed:
+        with fast_gzip_read(compressed, processes=processes, as_str=True) as f:
 
-    p = subprocess.Popen(
-        command.split(' '),
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        universal_newlines=as_str
-    )
-    yield p.stdout
+            if skip_header:
+                f.readline()    # TODO: force header checking, this allows errors to pass silently!
+
+            while True:
+                lines = f.readlines(batch_size)
+                if not lines:
+                    break
+                if sep:
+                    lines = [line.rstrip().split(sep) for line in lines]
+                yield lines, os.lseek(compressed.fileno(), 0, os.SEEK_CUR)
+
+
+class ReadAheadThread(Thread):
+    """Consumes given iterator in a background thread, keeping up to `queue_size` items ready in a queue."""
+
+    end = object()
+
+    def __init__(self, iterator_factory, queue_size):
+        super().__init__(daemon=True)
+        self.iterator_factory = iterator_factory
+        self.queue = Queue(queue_size)
+        self.stopped = Event()
+
+    def put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def run(self):
+        try:
+            with closing(self.iterator_factory()) as iterator:
+                for item in iterator:
+                    if not self.put(item):
+                        return
+            self.put(self.end)
+        except Exception as e:
+            self.put(e)
+
+    def stop(self):
+        self.stopped.set()
+
+    def __iter__(self):
+        while True:
+            item = self.queue.get()
+            if item is self.end:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+
+def read_ahead_gz_files(
+    files: List[str], skip_header=True, sep=None, files_ahead=1, queue_size=8, batch_size=2 ** 20, processes=4
+) -> Iterator[Tuple[str, Iterator[Tuple[list, int]]]]:
+    """Yield (file name, batches of lines) pairs, decompressing the next file(s) ahead of time.
+
+    Each file is decompressed (see `gz_file_batches`) in a background thread,
+    with up to `files_ahead` files being decompressed while the current one
+    is consumed; at most `queue_size` batches per file are kept in memory.
+    """
+    pending = iter(files)
+    readers = deque()
+
+    def start_next():
+        file_name = next(pending, None)
+        if file_name is None:
+            return
+        reader = ReadAheadThread(
+            partial(gz_file_batches, file_name, skip_header=skip_header, sep=sep, batch_size=batch_size, processes=processes),
+            queue_size=queue_size
+        )
+        reader.start()
+        readers.append((file_name, reader))
+
+    try:
+        for _ in range(files_ahead + 1):
+            start_next()
+
+        while readers:
+            file_name, reader = readers[0]
+            yield file_name, iter(reader)
+            # in case the consumer did not exhaust the batches
+            reader.stop()
+            readers.popleft()
+            start_next()
+    finally:
+        for file_name, reader in readers:
+            reader.stop()
+
+
+def read_batches_from_gz_files(directory, pattern, skip_header=True, after_batch=lambda: None, sep=None, **kwargs):
+    """Creates generator yielding batches of subsequent lines from compressed '.gz' files
+
+    If `sep` is given, the lines are stripped and split by the separator
+    (as part of the decompression pipeline). Keyword arguments are passed
+    to `read_ahead_gz_files`. Progress bar (in compressed bytes) is embedded.
+    """
 
+    files = get_files(directory, pattern)
 
-def read_from_gz_files(directory, pattern, skip_header=True, after_batch=lambda: None):
-    """Creates generator yielding subsequent lines from compressed '.gz' files
+    with ReadProgress(files, desc=f'{len(files)} files') as progress:
 
-    Progress bar is embedded.
-    """
+        for file_name, batches in read_ahead_gz_files(files, skip_header=skip_header, sep=sep, **kwargs):
 
-    files = get_files(directory, pattern)
+            for lines, position in batches:
+                progress.update(position)
+                yield lines
 
-    for filename in tqdm(files, unit=' files'):
+            progress.file_read(os.path.getsize(file_name))
 
-        with fast_gzip_read(filename, processes=4, as_str=True) as f:
+            after_batch()
 
-            if skip_header:
-                next(f)         # TODO: force header checking, this allows errors to pass silently!
 
-            for line in f:
-                yield line
+def read_from_gz_files(directory, pattern, skip_header=True, after_batch=lambda: None):
+    """Creates generator yielding subsequent lines from compressed '.gz' files
 
-        after_batch()
+    Progress bar (in compressed bytes of all files) is embedded.
+    """
+    for lines in read_batches_from_gz_files(directory, pattern, skip_header=skip_header, after_batch=after_batch):
+        yield from lines
 
 
 def count_lines(file_object: TextIO):
@@ -86,22 +298,20 @@ def iterate_tsv_gz_file(
 
     It checks if the file header is the same as given (if provided).
 
-    Progress bar is embedded.
+    Progress bar (in compressed bytes) is embedded.
     """
-    data_lines_count = count_lines_tsv_gz(filename)
-
-    with fast_gzip_read(filename) as f:
-        if file_header:
-            header = f.readline().decode('utf-8').rstrip().split('\t')
-            data_lines_count -= 1
-            if header != file_header:
-                raise ParsingError(
-                    'Given file header does not match to expected: '
-                    'expected: %s, found: %s' % (file_header, header)
-                )
-        for line in tqdm(f, total=data_lines_count, unit=' lines'):
-            line = line.decode('utf-8').rstrip().split('\t')
-            yield line
+    with ReadProgress([filename]) as progress, open(filename, 'rb') as compressed, progress.watch(compressed):
+        with fast_gzip_read(compressed) as f:
+            if file_header:
+                header = f.readline().decode('utf-8').rstrip().split('\t')
+                if header != file_header:
+                    raise ParsingError(
+                        'Given file header does not match to expected: '
+                        'expected: %s, found: %s' % (file_header, header)
+                    )
+            for line in progress.track(f):
+                line = line.decode('utf-8').rstrip().split('\t')
+                yield line
 
 
 def count_lines_tsv(filename, file_opener=open, mode='r'):
@@ -109,25 +319,113 @@ def count_lines_tsv(filename, file_opener=open, mode='r'):
         return count_lines(f)
 
 
+class LinesIndex(NamedTuple):
+    """Byte offsets of every `step`-th line of a file, allowing to start reading at any line without a full scan.
+
+    It is stored in a sidecar file (see `lines_index_path`) together with
+    the size and modification time of the indexed file, so that an outdated
+    index can be recognised and rebuilt.
+    """
+    step: int
+    lines_count: int
+    offsets: np.ndarray
+
+    def seek(self, file_object: TextIO, line_number: int):
+        """Move to the beginning of given (0-based) line in a file opened with `open`."""
+        if line_number >= self.lines_count:
+            file_object.seek(0, os.SEEK_END)
+            return
+        file_object.seek(int(self.offsets[line_number // self.step]))
+        for _ in range(line_number % self.step):
+            file_object.readline()
+
+
+def lines_index_path(filename):
+    return filename + '.lines.npy'
+
+
+def build_lines_index(filename, step=100000) -> LinesIndex:
+    """Find offsets of every `step`-th line of the file, in a single pass."""
+    offsets = [0]
+    position = 0
+    lines_count = 0
+    with open(filename, 'rb') as f:
+        for line in f:
+            position += len(line)
+            lines_count += 1
+            if lines_count % step == 0:
+                offsets.append(position)
+    return LinesIndex(step, lines_count, np.array(offsets, dtype=np.int64))
+
+
+def get_lines_index(filename, step=100000) -> LinesIndex:
+    """Load the index of lines of given file, creating (or updating) the sidecar file if needed."""
+    stat = os.stat(filename)
+    path = lines_index_path(filename)
+
+    try:
+        size, modified, stored_step, lines_count, *offsets = np.load(path)
+        if (size, modified) == (stat.st_size, stat.st_mtime_ns):
+            return LinesIndex(int(stored_step), int(lines_count), np.array(offsets, dtype=np.int64))
+    except (OSError, ValueError):
+        pass
+
+    index = build_lines_index(filename, step)
+    try:
+        with open(path, 'wb') as f:
+            np.save(f, np.array([stat.st_size, stat.st_mtime_ns, index.step, index.lines_count, *index.offsets], dtype=np.int64))
+    except OSError:
+        print(f'Could not save the index of lines of {filename}')
+    return index
+
+
 def tsv_file_iterator(
     filename, file_header=None, file_opener=open, mode='r',
     skip=None, limit=None, sep='\t'
 ):
-    data_lines_count = count_lines_tsv(filename, file_opener=file_opener, mode=mode)
+    """Iterate over lines of a tsv file, split into fields.
+
+    If only a range of lines is requested (with `skip` and/or `limit`)
+    of an uncompressed file, the lines index is used to jump directly
+    to the first line of the range. Otherwise, the progress is reported
+    in bytes read from the (possibly compressed) file, in a single pass.
+    """
+    ranged = skip is not None or limit is not None
+
+    if ranged:
+        lines_index = get_lines_index(filename) if file_opener is open else None
+        if lines_index:
+            data_lines_count = lines_index.lines_count
+        else:
+            data_lines_count = count_lines_tsv(filename, file_opener=file_opener, mode=mode)
+
+    with ExitStack() as stack:
+        f = stack.enter_context(file_opener(filename, mode=mode))
 
-    with file_opener(filename, mode=mode) as f:
         if file_header:
             header = f.readline().rstrip().split(sep)
-            data_lines_count -= 1
             if header != file_header:
                 raise ParsingError(
                     'Given file header does not match to expected: '
                     'expected: %s, found: %s' % (file_header, header)
                 )
 
+        if not ranged:
+            progress = stack.enter_context(ReadProgress([filename]))
+            stack.enter_context(progress.watch(f))
+            for line in progress.track(f):
+                yield line.rstrip().split(sep)
+            return
+
+        if file_header:
+            data_lines_count -= 1
+
         if skip:
-            for _ in range(skip):
-                f.readline()
+            if lines_index:
+                lines_index.seek(f, skip + (1 if file_header else 0))
+            else:
+                for _ in range(skip):
+                    f.readline()
 
         if limit:
             total = min([data_lines_count, limit])
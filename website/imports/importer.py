@@ -1,4 +1,5 @@
 from abc import ABCMeta, abstractmethod
+from functools import wraps
 from typing import Type, Callable
 
 from sqlalchemy.util import classproperty
@@ -54,6 +55,7 @@ def simple_importer(
         class FunctionImporter(importer_abstract_class):
 
             @staticmethod
+            @wraps(func)
             def load(*args, **kwargs):
                 return func(*args, **kwargs)
 
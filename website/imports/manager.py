@@ -1,3 +1,4 @@
+from inspect import signature
 from typing import Type, List
 
 from database import db
@@ -21,7 +22,8 @@ class ImportManager:
     def import_all(self):
         self.import_selected(importers_subset=self.ordered_importers)
 
-    def import_selected(self, importers_subset: List[str] = None):
+    def import_selected(self, importers_subset: List[str] = None, **options):
+        """Run selected importers; options (e.g. workers) are passed to the importers accepting them."""
 
         if not importers_subset:
             print('Importing all')
@@ -30,7 +32,12 @@ class ImportManager:
         for importer_name in importers_subset:
             importer = self.importers_by_name[importer_name]()
             print(f'Running {importer_name}:')
-            results = importer.load()
+            parameters = signature(importer.load).parameters
+            results = importer.load(**{
+                name: value
+                for name, value in options.items()
+                if name in parameters
+            })
             if results:
                 print(f'Got {len(results)} results.')
                 print(f'Adding {importer.name} results to the session...')
@@ -1,130 +1,254 @@
+import heapq
+import os
+import pickle
 from collections import defaultdict
+from functools import partial
+from itertools import chain, groupby
+from multiprocessing import Pool
+from operator import itemgetter
 from os.path import basename
-from typing import Dict
+from tempfile import mkstemp, TemporaryDirectory
+from typing import Dict, Iterable, Iterator, Tuple
 
-from genomic_mappings import make_snv_key, encode_csv
+from tqdm import tqdm
+
+from genomic_mappings import CodingSequenceVariant
 from helpers.bioinf import decode_mutation, DataInconsistencyError
 from helpers.bioinf import is_sequence_broken
-from helpers.parsers import read_from_gz_files
+from helpers.parsers import read_from_gz_files, get_files, gz_file_batches
 from helpers.bioinf import get_human_chromosomes
 from helpers.bioinf import determine_strand
 from flask import current_app
 from database import bdb, bdb_refseq
+from imports.mutations.mapped_protein import MappedProtein, summarise_proteins
 from models import Protein
 
 
-def import_genome_proteome_mappings(
-    proteins: Dict[str, Protein],
-    mappings_dir='data/200616/all_variants/playground',
-    mappings_file_pattern='annot_*.txt.gz',
-    bdb_dir=''
-):
-    print('Importing mappings:')
+def genome_proteome_mappings(
+    lines: Iterable[str], proteins: Dict[str, Protein], broken_seq: Dict[str, list], make_snv_key
+) -> Iterator[Tuple[str, CodingSequenceVariant]]:
+    """Parse lines of annotation files, yielding (snv key, coding sequence variant) tuples.
 
+    Mutations inconsistent with the sequence of the protein are not yielded,
+    but recorded in `broken_seq` instead.
+    """
     chromosomes = get_human_chromosomes()
-    broken_seq = defaultdict(list)
 
-    bdb.reset()
-    bdb.close()
+    for line in lines:
+        try:
+            chrom, pos, ref, alt, prot = line.rstrip().split('\t')
+        except ValueError as e:
+            print(e, line)
+            continue
 
-    path = current_app.config['HDB_DNA_TO_PROTEIN_PATH']
+        assert chrom.startswith('chr')
+        chrom = chrom[3:]
 
-    if bdb_dir:
-        path = bdb_dir + '/' + basename(path)
+        assert chrom in chromosomes
+        ref = ref.rstrip()
 
-    bdb.open(path, size=5*1e10)
+        # new Coding Sequence Variants to be added to those already
+        # mapped from given `snv` (Single Nucleotide Variation)
 
-    with bdb.cached_session():
-        add = bdb.cached_add
-        for line in read_from_gz_files(mappings_dir, mappings_file_pattern, after_batch=bdb.flush_cache):
+        for dest in filter(bool, prot.split(',')):
             try:
-                chrom, pos, ref, alt, prot = line.rstrip().split('\t')
+                name, refseq, exon, cdna_mut, prot_mut = dest.split(':')
             except ValueError as e:
                 print(e, line)
                 continue
 
-            assert chrom.startswith('chr')
-            chrom = chrom[3:]
+            try:
+                assert refseq.startswith('NM_')
+            except AssertionError as e:
+                print(e, line)
+                continue
+            # refseq = int(refseq[3:])
+            # name and refseq are redundant with respect one to another
 
-            assert chrom in chromosomes
-            ref = ref.rstrip()
+            assert exon.startswith('exon')
+            exon = exon[4:]
+
+            assert cdna_mut.startswith('c')
+            try:
+                cdna_ref, cdna_pos, cdna_alt = decode_mutation(cdna_mut)
+            except ValueError as e:
+                print(e, line)
+                continue
 
-            # new Coding Sequence Variants to be added to those already
-            # mapped from given `snv` (Single Nucleotide Variation)
+            try:
+                strand = determine_strand(ref, cdna_ref, alt, cdna_alt)
+            except DataInconsistencyError as e:
+                print(e, line)
+                continue
 
-            for dest in filter(bool, prot.split(',')):
-                try:
-                    name, refseq, exon, cdna_mut, prot_mut = dest.split(':')
-                except ValueError as e:
-                    print(e, line)
-                    continue
+            assert prot_mut.startswith('p')
+            # we can check here if a given reference nuc is consistent
+            # with the reference amino acid. For example cytosine in
+            # reference implies that there should't be a methionine,
+            # glutamic acid, lysine nor arginine. The same applies to
+            # alternative nuc/aa and their combinations (having
+            # references (nuc, aa): (G, K) and alt nuc C defines that
+            # the alt aa has to be Asparagine (N) - no other is valid).
+            # Note: it could be used to compress the data in memory too
+            aa_ref, aa_pos, aa_alt = decode_mutation(prot_mut)
 
-                try:
-                    assert refseq.startswith('NM_')
-                except AssertionError as e:
-                    print(e, line)
-                    continue
-                # refseq = int(refseq[3:])
-                # name and refseq are redundant with respect one to another
+            try:
+                # try to get it from cache (`proteins` dictionary)
+                protein = proteins[refseq]
+            except KeyError:
+                continue
 
-                assert exon.startswith('exon')
-                exon = exon[4:]
+            assert aa_pos == (int(cdna_pos) - 1) // 3 + 1
 
-                assert cdna_mut.startswith('c')
-                try:
-                    cdna_ref, cdna_pos, cdna_alt = decode_mutation(cdna_mut)
-                except ValueError as e:
-                    print(e, line)
-                    continue
+            broken_sequence_tuple = is_sequence_broken(protein, aa_pos, aa_ref, aa_alt)
 
-                try:
-                    strand = determine_strand(ref, cdna_ref, alt, cdna_alt)
-                except DataInconsistencyError as e:
-                    print(e, line)
-                    continue
+            if broken_sequence_tuple:
+                broken_seq[refseq].append(broken_sequence_tuple)
+                continue
 
-                assert prot_mut.startswith('p')
-                # we can check here if a given reference nuc is consistent
-                # with the reference amino acid. For example cytosine in
-                # reference implies that there should't be a methionine,
-                # glutamic acid, lysine nor arginine. The same applies to
-                # alternative nuc/aa and their combinations (having
-                # references (nuc, aa): (G, K) and alt nuc C defines that
-                # the alt aa has to be Asparagine (N) - no other is valid).
-                # Note: it could be used to compress the data in memory too
-                aa_ref, aa_pos, aa_alt = decode_mutation(prot_mut)
+            is_ptm_related = protein.would_affect_any_sites(aa_pos)
 
-                try:
-                    # try to get it from cache (`proteins` dictionary)
-                    protein = proteins[refseq]
-                except KeyError:
-                    continue
+            snv = make_snv_key(chrom, pos, cdna_ref, cdna_alt)
 
-                assert aa_pos == (int(cdna_pos) - 1) // 3 + 1
+            # add new item, emulating set update
+            item = CodingSequenceVariant(
+                strand,
+                aa_ref,
+                aa_alt,
+                int(cdna_pos),
+                exon,
+                protein.id,
+                bool(is_ptm_related)
+            )
 
-                broken_sequence_tuple = is_sequence_broken(protein, aa_pos, aa_ref, aa_alt)
+            yield snv, item
 
-                if broken_sequence_tuple:
-                    broken_seq[refseq].append(broken_sequence_tuple)
-                    continue
 
-                is_ptm_related = protein.would_affect_any_sites(aa_pos)
+def write_run(path, items, chunk_size=10000):
+    """Write sorted (key, items) tuples as consecutive pickled chunks."""
+    with open(path, 'wb') as f:
+        for start in range(0, len(items), chunk_size):
+            pickle.dump(items[start:start + chunk_size], f, protocol=4)
 
-                snv = make_snv_key(chrom, pos, cdna_ref, cdna_alt)
 
-                # add new item, emulating set update
-                item = encode_csv(
-                    strand,
-                    aa_ref,
-                    aa_alt,
-                    cdna_pos,
-                    exon,
-                    protein.id,
-                    is_ptm_related
-                )
+def read_run(path) -> Iterator[Tuple[bytes, set]]:
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield from pickle.load(f)
+            except EOFError:
+                return
 
+
+def merge_runs(paths) -> Iterator[Tuple[bytes, set]]:
+    """Merge sorted runs, joining the items of keys present in more than one run."""
+    merged = heapq.merge(*[read_run(path) for path in paths], key=itemgetter(0))
+    for key, group in groupby(merged, key=itemgetter(0)):
+        items = set()
+        for _, run_items in group:
+            items.update(run_items)
+        yield key, items
+
+
+# proteins to be used by the import workers, set by the pool initializer
+worker_proteins: Dict[str, MappedProtein] = {}
+
+
+def set_worker_proteins(proteins: Dict[str, MappedProtein]):
+    global worker_proteins
+    worker_proteins = proteins
+
+
+def map_file_to_runs(filename, runs_dir, make_snv_key, run_size):
+    """Parse a single annotation file into sorted runs (files) of mappings.
+
+    The mappings are spilled into a new run whenever `run_size` distinct
+    keys were gathered, so that the memory use of a worker is bounded.
+
+    Returns:
+        paths of the runs, and sequence inconsistencies found in the file
+    """
+    broken_seq = defaultdict(list)
+    runs = []
+    mappings = defaultdict(set)
+
+    def spill():
+        handle, path = mkstemp(dir=runs_dir, suffix='.run')
+        os.close(handle)
+        write_run(path, sorted(mappings.items()))
+        runs.append(path)
+        mappings.clear()
+
+    # the header is skipped, as in read_from_gz_files
+    lines = chain.from_iterable(lines for lines, position in gz_file_batches(filename, processes=1))
+
+    for snv, item in genome_proteome_mappings(lines, worker_proteins, broken_seq, make_snv_key):
+        mappings[bytes(snv, 'utf-8')].add(item)
+        if len(mappings) >= run_size:
+            spill()
+
+    if mappings:
+        spill()
+
+    return runs, broken_seq
+
+
+def import_genome_proteome_mappings(
+    proteins: Dict[str, Protein],
+    mappings_dir='data/200616/all_variants/playground',
+    mappings_file_pattern='annot_*.txt.gz',
+    bdb_dir='',
+    workers=1,
+    run_size=10 ** 6
+):
+    """Import mappings of SNVs to coding sequence variants from the annotation files.
+
+    With more than one worker, the files are parsed in parallel into
+    sorted runs, which are then merged by a single writer and appended
+    to the (freshly reset) database in order of keys.
+    """
+    print('Importing mappings:')
+
+    broken_seq = defaultdict(list)
+
+    bdb.reset()
+    bdb.close()
+
+    path = current_app.config['HDB_DNA_TO_PROTEIN_PATH']
+
+    if bdb_dir:
+        path = bdb_dir + '/' + basename(path)
+
+    # the map will grow as needed
+    bdb.open(path, size=2 ** 30)
+
+    if workers > 1:
+        files = get_files(mappings_dir, mappings_file_pattern)
+        mapped_proteins = summarise_proteins(proteins)
+
+        with TemporaryDirectory(dir=bdb.path.parent) as runs_dir:
+
+            map_file = partial(map_file_to_runs, runs_dir=runs_dir, make_snv_key=bdb.key_maker, run_size=run_size)
+            runs = []
+
+            with Pool(workers, initializer=set_worker_proteins, initargs=(mapped_proteins,)) as pool:
+                for file_runs, file_broken_seq in tqdm(pool.imap_unordered(map_file, files), total=len(files)):
+                    runs.extend(file_runs)
+                    for refseq, broken in file_broken_seq.items():
+                        broken_seq[refseq].extend(broken)
+
+            print(f'Merging {len(runs)} runs')
+            bdb.load_sorted(merge_runs(runs))
+    else:
+        with bdb.cached_session(memory_budget=current_app.config.get('HDB_IMPORT_MEMORY_BUDGET')):
+            add = bdb.cached_add
+            lines = read_from_gz_files(mappings_dir, mappings_file_pattern, after_batch=bdb.flush_cache)
+            for snv, item in genome_proteome_mappings(lines, proteins, broken_seq, bdb.make_snv_key):
                 add(snv, item)
 
+    print('Building filter of mapped SNVs')
+    bdb.build_filter()
+
     return broken_seq
 
 
@@ -134,26 +258,37 @@ def import_aminoacid_mutation_refseq_mappings(
     mappings_file_pattern='annot_*.txt.gz',
     bdb_dir=''
 ):
+    """Import the deprecated gene_to_isoform mappings (bdb_refseq).
+
+    These are no longer used by the search (see search.isoform_index)
+    and are only imported on request.
+    """
     print('Importing mappings:')
 
     chromosomes = get_human_chromosomes()
 
-    bdb_refseq.reset()
-    bdb_refseq.close()
-
     path = current_app.config['HDB_GENE_TO_ISOFORM_PATH']
 
     if bdb_dir:
         path = bdb_dir + '/' + basename(path)
 
-    bdb_refseq.open(path, size=2*1e10)
+    if bdb_refseq.is_open:
+        bdb_refseq.close()
+
+    # remove previously imported mappings
+    bdb_refseq.open(path)
+    bdb_refseq.drop()
+    bdb_refseq.close()
+
+    # the map will grow as needed
+    bdb_refseq.open(path, size=2 ** 30)
 
     genes = {
         protein: protein.gene_name
         for protein in proteins.values()
     }
 
-    with bdb_refseq.cached_session():
+    with bdb_refseq.cached_session(memory_budget=current_app.config.get('HDB_IMPORT_MEMORY_BUDGET')):
         add = bdb_refseq.cached_add_integer
         for line in read_from_gz_files(mappings_dir, mappings_file_pattern, after_batch=bdb_refseq.flush_cache):
             try:
@@ -1,6 +1,6 @@
 import re
 from collections import defaultdict
-from typing import Mapping, Iterable, Dict, TextIO, Union, NamedTuple
+from typing import Mapping, Iterable, Dict, Union, NamedTuple
 from xml.etree import ElementTree
 
 from sqlalchemy.orm.exc import NoResultFound
@@ -8,6 +8,7 @@ from models import InheritedMutation, Disease
 from models import ClinicalData, or_
 from helpers.parsers import tsv_file_iterator
 from helpers.parsers import gzip_open_text
+from helpers.parsers import ReadProgress
 from database.bulk import get_highest_id, bulk_orm_insert, restart_autoincrement
 from database import db
 
@@ -19,13 +20,6 @@ class MalformedRawError(Exception):
     pass
 
 
-def count_characters(file: TextIO):
-    return sum(
-        len(line)
-        for line in file
-    )
-
-
 class ReferenceData(NamedTuple):
     rcv_accession: ElementTree.Element
     variation_id: int
@@ -49,6 +43,7 @@ class ClinVarImporter(MutationImporter):
         'db_snp_ids',
         'combined_significances',
     )
+    parallel_parse = True
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -225,7 +220,6 @@ class ClinVarImporter(MutationImporter):
 
     def import_disease_associations(self):
         """Add disease association details to the already imported mutation-disease associations"""
-        from tqdm import tqdm
         import gzip
 
         ignored_traits = {
@@ -256,9 +250,6 @@ class ClinVarImporter(MutationImporter):
 
         opener = gzip.open if self.xml_path.endswith('.gz') else open
 
-        with opener(self.xml_path) as clinvar_full_release:
-            total_size = count_characters(clinvar_full_release)
-
         step = 0
 
         self.variants_of_interest = {
@@ -270,13 +261,12 @@ class ClinVarImporter(MutationImporter):
             for disease in Disease.query.all()
         }
 
-        with opener(self.xml_path) as clinvar_full_release:
+        progress = ReadProgress([self.xml_path])
+
+        with progress, opener(self.xml_path) as clinvar_full_release, progress.watch(clinvar_full_release):
             tree = iter(ElementTree.iterparse(clinvar_full_release, events=('start', 'end')))
             event, root = next(tree)
 
-            progress_bar = tqdm(total=1000)
-            last_progress = 0
-
             for event, element in tree:
                 if event != 'end' or element.tag != 'ClinVarSet':
                     continue
@@ -383,12 +373,7 @@ class ClinVarImporter(MutationImporter):
                 step += 1
 
                 if step % 550 == 0:
-                    progress = int(clinvar_full_release.tell() / total_size * 1000)
-
-                    if progress != last_progress:
-                        progress_bar.update(progress - last_progress)
-                        last_progress = progress
-
+                    progress.update()
                     root.clear()
 
         print(skipped_diseases)
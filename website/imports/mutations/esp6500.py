@@ -16,6 +16,7 @@ class ESP6500Importer(MutationImporter):
         'V12', 'V13', 'V14', 'V15', 'V16', 'V17', 'V18', 'V19', 'V20', 'V21'
     ]
     insert_keys = ('mutation_id', 'maf_ea', 'maf_aa', 'maf_all')
+    parallel_parse = True
 
     def iterate_lines(self, path):
         return tsv_file_iterator(path, self.header, file_opener=gzip_open_text)
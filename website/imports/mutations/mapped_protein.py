@@ -0,0 +1,37 @@
+from collections import defaultdict
+from typing import Dict, NamedTuple
+
+import numpy as np
+
+from database import db
+from models import Protein, Site
+
+
+class MappedProtein(NamedTuple):
+    """Data of a protein needed to map variants onto it.
+
+    Unlike Protein instances, these can be sent to import workers.
+    """
+    id: int
+    refseq: str
+    sequence: str
+    sites_positions: np.ndarray
+
+    def would_affect_any_sites(self, mutation_pos):
+        left, right = np.searchsorted(self.sites_positions, [mutation_pos - 7, mutation_pos + 7 + 1])
+        return right > left
+
+
+def summarise_proteins(proteins: Dict[str, Protein]) -> Dict[str, MappedProtein]:
+    """Create MappedProtein for each of given proteins, fetching positions of all sites at once."""
+    positions = defaultdict(list)
+    for protein_id, position in db.session.query(Site.protein_id, Site.position):
+        positions[protein_id].append(position)
+
+    return {
+        refseq: MappedProtein(
+            protein.id, protein.refseq, protein.sequence,
+            np.array(sorted(positions[protein.id]), dtype=np.int64)
+        )
+        for refseq, protein in proteins.items()
+    }
@@ -1,8 +1,10 @@
 from warnings import warn
 
+from werkzeug.utils import cached_property
+
 from models import MIMPMutation, SiteType
 from helpers.bioinf import decode_raw_mutation
-from helpers.parsers import tsv_file_iterator, count_lines_tsv
+from helpers.parsers import tsv_file_iterator, get_lines_index
 
 from .mutation_importer import ChunkedMutationImporter
 
@@ -32,7 +34,9 @@ class MIMPImporter(ChunkedMutationImporter):
         'site_id'
     )
     site_type = 'phosphorylation'
-    chunk_size = round(24227847 / 5)   # should be optimal for 8 GB of memory
+    # 24227847 lines were imported in five chunks with 8 GB of memory
+    memory_per_line = 1750
+    parallel_parse = True
 
     def iterate_lines(self, path):
         return tsv_file_iterator(path, self.header)
@@ -42,41 +46,75 @@ class MIMPImporter(ChunkedMutationImporter):
         return tsv_file_iterator(path, header, skip=chunk_start, limit=chunk_size)
 
     def count_lines(self, path) -> int:
-        return count_lines_tsv(path)
+        return get_lines_index(path).lines_count
 
-    def parse_chunk(self, path, chunk_start, chunk_size):
-        mimps = []
-        site_type = SiteType.query.filter_by(name=self.site_type).one()
-        skipped_predictions = 0
-        mismatched_sequences = 0
+    @cached_property
+    def sequences(self):
+        return {refseq: protein.sequence for refseq, protein in self.proteins.items()}
 
-        def parser(line):
-            nonlocal mimps, skipped_predictions, mismatched_sequences
+    def prepare_preparse(self):
+        return self.sequences
 
+    def preparse_lines(self, lines):
+        """Decode predictions for known proteins, checking the reference residues.
+
+        Returns:
+            list of (refseq, pos, alt, psite_pos, position_in_motif, effect, pwm, pwm_family, probability)
+            tuples, with None in place of mutations not matching the sequence of the protein
+        """
+        sequences = self.sequences
+        predictions = []
+
+        for line in lines:
             refseq = line[0]
-            mut = line[1]
-            psite_pos = line[2]
 
             try:
-                protein = self.proteins[refseq]
+                sequence = sequences[refseq]
             except KeyError:
-                return
+                continue
 
-            ref, pos, alt = decode_raw_mutation(mut)
+            ref, pos, alt = decode_raw_mutation(line[1])
 
             try:
-                assert ref == protein.sequence[pos - 1]
+                assert ref == sequence[pos - 1]
             except (AssertionError, IndexError):
-                mismatched_sequences += 1
-                return
+                predictions.append(None)
+                continue
 
             assert line[13] in ('gain', 'loss')
 
+            predictions.append((
+                refseq,
+                pos,
+                alt,
+                int(line[2]),
+                int(line[3]),
+                1 if line[13] == 'gain' else 0,
+                line[9],
+                line[10],
+                float(line[12])
+            ))
+
+        return predictions
+
+    def parse_chunk(self, path, chunk_start, chunk_size):
+        mimps = []
+        site_type = SiteType.query.filter_by(name=self.site_type).one()
+        skipped_predictions = 0
+        mismatched_sequences = 0
+
+        for prediction in self.preparsed_chunk(path, chunk_start, chunk_size):
+
+            if prediction is None:
+                mismatched_sequences += 1
+                continue
+
+            refseq, pos, alt, psite_pos, *values = prediction
+            protein = self.proteins[refseq]
+
             # MIMP mutations are always hardcoded PTM mutations
             mutation_id = self.get_or_make_mutation(pos, protein.id, alt, True)
 
-            psite_pos = int(psite_pos)
-
             affected_sites = [
                 site
                 for site in protein.sites
@@ -89,30 +127,18 @@ class MIMPImporter(ChunkedMutationImporter):
             assert len(affected_sites) <= 1
 
             if not affected_sites:
+                ref = protein.sequence[pos - 1]
                 warning = UserWarning(
                     f'Skipping {refseq}: {ref}{pos}{alt} (for site at position {psite_pos}): '
                     'MIMP site does not match to the database - given site not found.'
                 )
                 warn(warning)
                 skipped_predictions += 1
-                return
+                continue
 
             site_id = affected_sites[0].id
 
-            mimps.append(
-                (
-                    mutation_id,
-                    int(line[3]),
-                    1 if line[13] == 'gain' else 0,
-                    line[9],
-                    line[10],
-                    float(line[12]),
-                    site_id
-                )
-            )
-
-        for line in self.iterate_chunk(path, chunk_start, chunk_size):
-            parser(line)
+            mimps.append((mutation_id, *values, site_id))
 
         if skipped_predictions:
             ratio = skipped_predictions / (skipped_predictions + len(mimps))
@@ -2,6 +2,10 @@ import gc
 import gzip
 from abc import abstractmethod
 from collections import defaultdict
+from contextlib import contextmanager
+from itertools import chain
+from math import ceil
+from multiprocessing import Pool
 from typing import List, Iterable
 
 from sqlalchemy.orm import load_only
@@ -11,13 +15,13 @@ from werkzeug.utils import cached_property
 from database import db, create_key_model_dict
 from database.bulk import bulk_orm_insert, restart_autoincrement
 from database.manage import raw_delete_all, remove_model
-from helpers.bioinf import decode_mutation, is_sequence_broken
 from helpers.patterns import abstract_property
 from models import Protein, Mutation
 
 from ...importer import BioImporter
 from .base_importer import BaseMutationsImporter
 from .exporter import MutationExporter
+from .parallel import ParallelPreparser, decode_aa_changes, preparse_chunk_part, set_worker_importer
 
 
 # rename to MutationSourceManager?
@@ -31,6 +35,13 @@ class MutationImporter(BioImporter, MutationExporter):
     insert_keys = None
     model = None
 
+    # whether mutations can be preparsed by worker processes (with --workers);
+    # requires `parse` to read lines with `iterate_lines` and to get
+    # the mutations of each line with `get_or_make_mutations`
+    parallel_parse = False
+    # how many lines are sent to a worker at once
+    parallel_chunk_size = 10000
+
     def __init__(self, proteins=None):
         self.mutations_details_pointers_grouped_by_unique_mutations = defaultdict(list)
         self._proteins = proteins
@@ -39,6 +50,7 @@ class MutationImporter(BioImporter, MutationExporter):
         # used to save 'cores of mutations': Mutation objects which have
         # columns like 'position', 'alt', 'protein' and no other details.
         self.base_importer = BaseMutationsImporter()
+        self.preparser = None
 
     @cached_property
     def proteins(self):
@@ -110,9 +122,9 @@ class MutationImporter(BioImporter, MutationExporter):
 
     parse_kwargs = []
 
-    def _load(self, path, update, **kwargs):
+    def _load(self, path, update, preload_mutations=False, mutations_batch_size=None, workers=1, **kwargs):
 
-        self.base_importer.prepare()
+        self.base_importer.prepare(preload=preload_mutations, protein_batch_size=mutations_batch_size)
 
         gc.collect()
 
@@ -120,7 +132,15 @@ class MutationImporter(BioImporter, MutationExporter):
         # populate 'self.base_importer.mutations' with new tuples of data
         # necessary to create rows corresponding to 'Mutation' instances.
         parse_kwargs = {k: v for k, v in kwargs.items() if k in self.parse_kwargs}
-        mutation_details = self.parse(path, **parse_kwargs)
+        if workers > 1 and self.parallel_parse:
+            with self.parallel_preparsing(workers):
+                mutation_details = self.parse(path, **parse_kwargs)
+        else:
+            if workers > 1:
+                print(f'{self.name} importer does not support parallel parsing, using a single process')
+            mutation_details = self.parse(path, **parse_kwargs)
+
+        self.base_importer.report()
 
         # first insert new 'Mutation' data
         self.base_importer.insert()
@@ -136,6 +156,23 @@ class MutationImporter(BioImporter, MutationExporter):
         db.session.expire_all()
         gc.collect()
 
+    @contextmanager
+    def parallel_preparsing(self, workers):
+        """Preparse mutations of lines yielded by `iterate_lines` in worker processes.
+
+        Identifiers are still assigned (and duplicates detected) by `parse`
+        in the order of lines, so the results do not depend on the number of workers.
+        """
+        serial_iterate_lines = self.iterate_lines
+        with ParallelPreparser(self.proteins, workers, self.parallel_chunk_size) as preparser:
+            self.preparser = preparser
+            self.iterate_lines = lambda path: preparser.iterate_lines(serial_iterate_lines(path))
+            try:
+                yield preparser
+            finally:
+                del self.iterate_lines
+                self.preparser = None
+
     def test_line(self, line):
         """Whether the line should be imported/exported or not"""
         return True
@@ -323,29 +360,17 @@ class MutationImporter(BioImporter, MutationExporter):
 
         For more explanation, check #43 issue on GitHub.
         """
-        for mutation in [
-            m.split(':')
-            for m in line[9].split(';')[0].split(',')
-        ]:
-            refseq = mutation[1]
-
-            # if the mutation affects a protein
-            # which is not in our dataset, skip it
-            try:
-                protein = self.proteins[refseq]
-            except KeyError:
-                continue
+        mutations = self.preparser.preparsed_mutations(line) if self.preparser else None
 
-            ref, pos, alt = decode_mutation(mutation[4])
+        if mutations is None:
+            mutations = decode_aa_changes(line[9], self.proteins)
 
-            broken_sequence_tuple = is_sequence_broken(protein, pos, ref, alt)
+        for pos, protein, alt, ref, is_ptm_related, broken_sequence_tuple in mutations:
 
             if broken_sequence_tuple:
-                self.broken_seq[refseq].append(broken_sequence_tuple)
+                self.broken_seq[protein.refseq].append(broken_sequence_tuple)
                 continue
 
-            is_ptm_related = protein.has_sites_in_range(pos - 7, pos + 7)
-
             yield pos, protein, alt, ref, is_ptm_related
 
     def get_or_make_mutations(self, line: List[str]):
@@ -409,14 +434,27 @@ class ChunkedMutationImporter(MutationImporter):
 
     # if the input file is so large that it needs to be processed in chunks
     # (and the importer is able to handle chunk-by-chunk processing), what
-    # should be the size of each chunk (in number of lines)
+    # should be the size of each chunk (in number of lines); if not given,
+    # it is derived from the memory budget and `memory_per_line`
     chunk_size = None
+    # approximate memory (in bytes) needed to parse and insert a single line
+    memory_per_line = None
+    default_memory_budget = 8 * 2 ** 30
     parse_kwargs = ['chunk_start', 'chunk_size']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+        self.workers = 1
+
     @abstractmethod
     def count_lines(self, path) -> int:
         pass
 
+    @abstractmethod
+    def iterate_chunk(self, path, chunk_start, chunk_size) -> Iterable[List[str]]:
+        pass
+
     @abstractmethod
     def parse_chunk(self, path, chunk_start, chunk_size):
         pass
@@ -424,16 +462,66 @@ class ChunkedMutationImporter(MutationImporter):
     def parse(self, path, chunk_start, chunk_size):
         return self.parse_chunk(path, chunk_start, chunk_size)
 
-    def _load(self, path, update, chunk=None, **kwargs):
+    def get_chunk_size(self, memory_budget=None):
+        if self.chunk_size or not self.memory_per_line:
+            return self.chunk_size
+        return max(1, int((memory_budget or self.default_memory_budget) // self.memory_per_line))
+
+    def prepare_preparse(self):
+        """Gather the data needed by `preparse_lines` (called before the workers are started)."""
+
+    def preparse_lines(self, lines: Iterable[List[str]]) -> list:
+        """Parse lines into tuples of plain data, without access to the database.
+
+        A hook which has to be overridden by chunked importers setting
+        `parallel_parse = True`, so that parts of each chunk can be preparsed
+        by worker processes (see `parallel_preparsing`, which verifies that).
+        """
+        raise NotImplementedError
+
+    def preparsed_chunk(self, path, chunk_start, chunk_size) -> list:
+        """Results of `preparse_lines` for all lines of the chunk, in order.
+
+        With a pool of workers, the chunk is divided into parts,
+        each read (starting at its offset) and preparsed by a worker.
+        """
+        if self.pool is None:
+            return self.preparse_lines(self.iterate_chunk(path, chunk_start, chunk_size))
+
+        chunk_end = chunk_start + chunk_size
+        part_size = ceil(chunk_size / self.workers)
+        parts = [
+            (path, part_start, min(part_size, chunk_end - part_start))
+            for part_start in range(chunk_start, chunk_end, part_size)
+        ]
+        return list(chain.from_iterable(self.pool.starmap(preparse_chunk_part, parts)))
+
+    @contextmanager
+    def parallel_preparsing(self, workers):
+        if type(self).preparse_lines is ChunkedMutationImporter.preparse_lines:
+            raise NotImplementedError(
+                f'{self.name} importer sets parallel_parse but does not implement preparse_lines'
+            )
+        self.prepare_preparse()
+        with Pool(workers, initializer=set_worker_importer, initargs=(self,)) as pool:
+            self.pool = pool
+            self.workers = workers
+            try:
+                yield pool
+            finally:
+                self.pool = None
+                self.workers = 1
+
+    def _load(self, path, update, chunk=None, memory_budget=None, **kwargs):
         total = self.count_lines(path)
-        chunks = (
-            list(range(0, total, self.chunk_size))
-            if self.chunk_size else
-            [None]
-        )
+        if not total:
+            print(f'No lines to import in {path}')
+            return
+        chunk_size = self.get_chunk_size(memory_budget) or total
+        chunks = list(range(0, total, chunk_size))
         if chunk is not None:
             print(f'Limiting imported chunks to {chunk+1}-th chunk out of {len(chunks)}')
             chunks = [chunks[chunk]]
         for chunk_start in chunks:
-            print(f'Importing chunk from {chunk_start/total*100:.2f} to {(chunk_start + self.chunk_size)/total*100:.2f}:')
-            super()._load(path, update, chunk_start=chunk_start, chunk_size=self.chunk_size)
+            print(f'Importing chunk from {chunk_start/total*100:.2f} to {(chunk_start + chunk_size)/total*100:.2f}:')
+            super()._load(path, update, chunk_start=chunk_start, chunk_size=chunk_size, **kwargs)
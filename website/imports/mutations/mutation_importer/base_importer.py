@@ -1,14 +1,99 @@
+from collections import OrderedDict
+from itertools import islice
+from time import time
+from typing import Optional
+
+import numpy as np
+
 from database import db
 from database.bulk import get_highest_id
 from helpers.parsers import chunked_list
 from models import Mutation
 
 
+class MutationsIdsIndex:
+    """Map of (position, protein_id, alt) to identifiers of existing mutations.
+
+    Keys are packed into single 64-bit integers and kept in a sorted
+    array (with identifiers in a parallel array), so that millions of
+    mutations take only 16 bytes each and are looked up with binary search.
+    """
+
+    def __init__(self, keys: np.ndarray, ids: np.ndarray):
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.ids = ids[order]
+
+    @staticmethod
+    def encode(pos, protein_id, alt) -> int:
+        # positions of residues are far below 2 ** 24 and alt is a single character
+        return (protein_id << 32) | (pos << 8) | ord(alt)
+
+    @classmethod
+    def from_database(cls, first_protein_id=None, last_protein_id=None, chunk_size=100000):
+        """Load mutations of all proteins or of proteins with identifiers in given range (inclusive)."""
+        query = db.session.query(Mutation.id, Mutation.position, Mutation.protein_id, Mutation.alt)
+        if first_protein_id is not None:
+            query = query.filter(Mutation.protein_id.between(first_protein_id, last_protein_id))
+
+        encode = cls.encode
+        keys_chunks = []
+        ids_chunks = []
+        rows = iter(query.yield_per(chunk_size))
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            keys_chunks.append(np.array([encode(pos, protein_id, alt) for _, pos, protein_id, alt in chunk], dtype=np.int64))
+            ids_chunks.append(np.array([mutation_id for mutation_id, _, _, _ in chunk], dtype=np.int64))
+
+        if not keys_chunks:
+            return cls(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        return cls(np.concatenate(keys_chunks), np.concatenate(ids_chunks))
+
+    def get(self, pos, protein_id, alt) -> Optional[int]:
+        key = self.encode(pos, protein_id, alt)
+        i = np.searchsorted(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return int(self.ids[i])
+        return None
+
+    def extend(self, mutations):
+        """Add (pos, protein_id, alt) -> id items."""
+        encode = self.encode
+        keys = np.array([encode(*key) for key in mutations], dtype=np.int64)
+        ids = np.array(list(mutations.values()), dtype=np.int64)
+        self.__init__(np.concatenate([self.keys, keys]), np.concatenate([self.ids, ids]))
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + self.ids.nbytes
+
+
 class BaseMutationsImporter:
     """Imports 'cores of mutations' - data used to build 'Mutation' instances
     so columns common for different metadata like: 'position', 'alt' etc."""
 
-    def prepare(self):
+    # how many batches of proteins (in the streaming mode) can be kept in memory
+    max_loaded_batches = 4
+
+    def __init__(self):
+        self.index = None
+        self.loaded_batches = OrderedDict()
+
+    def prepare(self, preload=False, protein_batch_size=None):
+        """Prepare for a new run of the import.
+
+        Args:
+            preload: whether to load identifiers of all existing mutations
+                at once, rather than querying the database for each new key
+            protein_batch_size: if given (with preload), identifiers of existing
+                mutations will be loaded lazily, for batches of proteins of this
+                size (by protein id), to limit the memory use
+        """
         # reset base_mutations
         self.mutations = {}
 
@@ -16,19 +101,49 @@ class BaseMutationsImporter:
         # here the highest id currently in use in the database is retrieved.
         self.highest_base_id = self.get_highest_id()
 
+        self.preload = preload
+        self.protein_batch_size = protein_batch_size
+        self.lookups = 0
+        self.lookup_time = 0
+
+        if preload and not protein_batch_size and self.index is None:
+            self.index = MutationsIdsIndex.from_database()
+
     def get_highest_id(self):
         return get_highest_id(Mutation)
 
+    def find_mutation_id(self, pos, protein_id, alt) -> Optional[int]:
+        """Get identifier of a mutation which already exists in the database (if any)."""
+        if not self.preload:
+            return db.session.query(Mutation.id).filter_by(
+                position=pos, protein_id=protein_id, alt=alt
+            ).scalar()
+
+        if not self.protein_batch_size:
+            return self.index.get(pos, protein_id, alt)
+
+        batch = protein_id // self.protein_batch_size
+        if batch in self.loaded_batches:
+            self.loaded_batches.move_to_end(batch)
+        else:
+            if len(self.loaded_batches) >= self.max_loaded_batches:
+                self.loaded_batches.popitem(last=False)
+            self.loaded_batches[batch] = MutationsIdsIndex.from_database(
+                batch * self.protein_batch_size,
+                (batch + 1) * self.protein_batch_size - 1
+            )
+        return self.loaded_batches[batch].get(pos, protein_id, alt)
+
     def get_or_make_mutation(self, pos, protein_id, alt, is_ptm):
 
         key = (pos, protein_id, alt)
         if key in self.mutations:
             return self.mutations[key][0]
         else:
-
-            mutation_id = db.session.query(Mutation.id).filter_by(
-                position=pos, protein_id=protein_id, alt=alt
-            ).scalar()
+            start = time()
+            mutation_id = self.find_mutation_id(pos, protein_id, alt)
+            self.lookup_time += time() - start
+            self.lookups += 1
 
             if mutation_id is None:
                 self.highest_base_id += 1
@@ -37,6 +152,16 @@ class BaseMutationsImporter:
 
             return mutation_id
 
+    def report(self):
+        if not self.lookups:
+            return
+        indices = [self.index] if self.index is not None else self.loaded_batches.values()
+        memory = sum(index.nbytes for index in indices)
+        print(
+            f'Looked up {self.lookups} mutations at {self.lookups / max(self.lookup_time, 1e-9):.0f} lookups/s'
+            + (f', using {memory / 2 ** 20:.1f} MB for identifiers of existing mutations' if self.preload else '')
+        )
+
     def insert(self):
         for chunk in chunked_list(self.mutations.items()):
             db.session.bulk_insert_mappings(
@@ -53,3 +178,8 @@ class BaseMutationsImporter:
                 ]
             )
             db.session.flush()
+
+        # keep the preloaded identifiers up to date for the next run (e.g. chunk)
+        if self.index is not None and self.mutations:
+            self.index.extend({key: data[0] for key, data in self.mutations.items()})
+        self.loaded_batches.clear()
@@ -0,0 +1,153 @@
+"""Preparsing of mutations from Annovar annotation lines in worker processes.
+
+Decoding of mutations, sequence consistency checks and detection of
+nearby sites are done by the workers for chunks of lines, while lines
+are read and parsed (and mutations get their identifiers) in the main
+process, in the original order - so that the results of the import are
+exactly the same as of the serial parse.
+
+Chunked importers can instead have parts of each chunk read (seeking
+directly to their first line) and preparsed by the workers.
+"""
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from helpers.bioinf import decode_mutation, is_sequence_broken
+from models import Protein
+
+from ..mapped_protein import MappedProtein, summarise_proteins
+
+
+def decode_aa_changes(aa_changes: str, proteins: Dict[str, Union[Protein, MappedProtein]]):
+    """Decode mutations from the AAChange field of Annovar annotation line.
+
+    Yields:
+        (pos, protein, alt, ref, is_ptm_related, broken_sequence_tuple) tuples,
+        where broken_sequence_tuple is False for mutations consistent with
+        the sequence of the protein (and is_ptm_related is None otherwise).
+    """
+    for mutation in [
+        m.split(':')
+        for m in aa_changes.split(';')[0].split(',')
+    ]:
+        refseq = mutation[1]
+
+        # if the mutation affects a protein
+        # which is not in our dataset, skip it
+        try:
+            protein = proteins[refseq]
+        except KeyError:
+            continue
+
+        ref, pos, alt = decode_mutation(mutation[4])
+
+        broken_sequence_tuple = is_sequence_broken(protein, pos, ref, alt)
+
+        if broken_sequence_tuple:
+            yield pos, protein, alt, ref, None, broken_sequence_tuple
+            continue
+
+        is_ptm_related = protein.would_affect_any_sites(pos)
+
+        yield pos, protein, alt, ref, is_ptm_related, False
+
+
+worker_proteins: Dict[str, MappedProtein] = {}
+
+
+def set_worker_proteins(proteins: Dict[str, MappedProtein]):
+    global worker_proteins
+    worker_proteins = proteins
+
+
+def preparse_chunk(aa_changes_of_lines: List[Optional[str]]):
+    """Decode mutations of a chunk of lines, referring to proteins by id.
+
+    Lines without the AAChange field (None) are left to the main process.
+    """
+    return [
+        None if aa_changes is None else [
+            (pos, protein.id, alt, ref, is_ptm_related, broken_sequence_tuple)
+            for pos, protein, alt, ref, is_ptm_related, broken_sequence_tuple
+            in decode_aa_changes(aa_changes, worker_proteins)
+        ]
+        for aa_changes in aa_changes_of_lines
+    ]
+
+
+worker_importer = None
+
+
+def set_worker_importer(importer):
+    global worker_importer
+    worker_importer = importer
+
+
+def preparse_chunk_part(path, part_start, part_size):
+    """Preparse lines of a part of a chunk (in a worker of ChunkedMutationImporter)."""
+    return worker_importer.preparse_lines(worker_importer.iterate_chunk(path, part_start, part_size))
+
+
+class ParallelPreparser:
+    """Pool of workers preparsing mutations of lines yielded by `iterate_lines`.
+
+    Only a limited number of chunks is being processed at any given time,
+    so that the lines are not read ahead of the parser much more than needed.
+    """
+
+    def __init__(self, proteins: Dict[str, Protein], workers: int, chunk_size: int):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.proteins_by_id = {protein.id: protein for protein in proteins.values()}
+        self.summarised_proteins = summarise_proteins(proteins)
+        self.pool = None
+        self.current_line = None
+        self.current_mutations = None
+
+    def __enter__(self):
+        self.pool = Pool(self.workers, initializer=set_worker_proteins, initargs=(self.summarised_proteins,))
+        return self
+
+    def __exit__(self, *args):
+        self.pool.terminate()
+        self.pool.join()
+        self.pool = None
+        self.current_line = None
+        self.current_mutations = None
+
+    def iterate_lines(self, lines: Iterable[List[str]]) -> Iterator[List[str]]:
+        lines = iter(lines)
+        pending = deque()
+
+        while True:
+            chunk = list(islice(lines, self.chunk_size))
+            if chunk:
+                pending.append((
+                    chunk,
+                    self.pool.apply_async(
+                        preparse_chunk,
+                        ([line[9] if len(line) > 9 else None for line in chunk],)
+                    )
+                ))
+            if not pending:
+                break
+            if chunk and len(pending) <= 2 * self.workers:
+                continue
+
+            chunk, result = pending.popleft()
+            for line, mutations in zip(chunk, result.get()):
+                self.current_line = line
+                self.current_mutations = mutations
+                yield line
+
+    def preparsed_mutations(self, line: List[str]):
+        """Mutations of the line (as returned by `decode_aa_changes`) if already preparsed, None otherwise."""
+        if line is not self.current_line or self.current_mutations is None:
+            return None
+        proteins_by_id = self.proteins_by_id
+        return [
+            (pos, proteins_by_id[protein_id], alt, ref, is_ptm_related, broken_sequence_tuple)
+            for pos, protein_id, alt, ref, is_ptm_related, broken_sequence_tuple in self.current_mutations
+        ]
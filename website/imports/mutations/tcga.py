@@ -22,6 +22,7 @@ class TCGAImporter(MutationImporter):
         'GeneDetail.refGene', 'ExonicFunc.refGene', 'AAChange.refGene', 'V11'
     ]
     samples_to_skip = set()
+    parallel_parse = True
 
     def __init__(self, *args, export_samples=False, **kwargs):
         super().__init__(*args, **kwargs)
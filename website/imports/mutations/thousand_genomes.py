@@ -1,7 +1,7 @@
 from os.path import basename, dirname
 
 from models import The1000GenomesMutation
-from helpers.parsers import read_from_gz_files
+from helpers.parsers import read_batches_from_gz_files
 
 from .mutation_importer import MutationImporter
 from .mutation_importer.helpers import make_metadata_ordered_dict
@@ -21,6 +21,7 @@ class The1000GenomesImporter(MutationImporter):
         'maf_eur',
         'maf_sas',
     )
+    parallel_parse = True
 
     @staticmethod
     # TODO: there are some issues with this function
@@ -41,12 +42,13 @@ class The1000GenomesImporter(MutationImporter):
         return [seq[0] for seq in line[17].split(',')].index(dna_mut)
 
     def iterate_lines(self, path):
-        for line in read_from_gz_files(
+        for lines in read_batches_from_gz_files(
                 dirname(path),
                 basename(path),
-                skip_header=False
+                skip_header=False,
+                sep='\t'
         ):
-            yield line.rstrip().split('\t')
+            yield from lines
 
     maf_keys = (
         'AF',
@@ -1,22 +1,31 @@
+import re
+from bisect import bisect_left, bisect_right
 from collections import defaultdict, namedtuple
+from multiprocessing import Pool
 from pathlib import Path
-from typing import Callable, Type
+from typing import Callable, Dict, Type
 from warnings import warn
+from zlib import crc32
 
+import numpy as np
 from pandas import read_table
+from sqlalchemy import or_
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.util import identity_key
 from tqdm import tqdm
 from database import db, create_key_model_dict
 from database import get_or_create
 from helpers.bioinf import aa_symbols
-from helpers.parsers import parse_fasta_file, iterate_tsv_gz_file
+from helpers.parsers import parse_fasta_file, iterate_tsv_gz_file, chunked_list
 from helpers.parsers import parse_tsv_file
 from helpers.parsers import parse_text_file
 from imports.importer import simple_importer, BioImporter
 from models import (
     Domain, MC3Mutation, InheritedMutation, Mutation, SiteType,
-    SiteMotif, PCAWGMutation
+    SiteMotif, PCAWGMutation, PrecomputedImpact, Site, MIMPMutation, AffectedMotif
 )
 from models.bio.drug import DrugGroup, DrugType, Drug, DrugTarget
+from models.bio.sites import extract_padded_sequence
 from models import Gene
 from models import InterproDomain
 from models import Cancer
@@ -1128,18 +1137,109 @@ def active_pathways_lists(
     return pathways_lists
 
 
+# positions are encoded together with identifiers of proteins (as protein_id * POSITIONS_STRIDE + position)
+# so that positions in all proteins can be compared at once, using a single sorted array
+POSITIONS_STRIDE = 2 ** 32
+
+
+def sites_checksums(site_keys: np.ndarray) -> Dict[int, int]:
+    """Checksums of positions of sites of each protein having any sites.
+
+    Args:
+        site_keys: sorted, encoded positions of sites (see POSITIONS_STRIDE)
+    """
+    proteins_ids, starts = np.unique(site_keys // POSITIONS_STRIDE, return_index=True)
+    positions = site_keys % POSITIONS_STRIDE
+    ends = np.append(starts[1:], len(site_keys))
+    return {
+        int(protein_id): crc32(positions[start:end].tobytes())
+        for protein_id, start, end in zip(proteins_ids, starts, ends)
+    }
+
+
+def expire_instances(model, ids, attributes):
+    """Expire attributes of instances of the model with given ids which are in the session.
+
+    Needed after bulk updates, as those do not synchronise the session.
+    """
+    identity_map = db.session.identity_map
+    for model_id in ids:
+        instance = identity_map.get(identity_key(model, model_id))
+        if instance is not None:
+            db.session.expire(instance, attributes)
+
+
+def bulk_update(model, ids, values: dict, chunk_size=500):
+    """Set the same values for rows with given ids with a few UPDATE statements."""
+    for chunk in chunked_list(ids, chunk_size):
+        model.query.filter(model.id.in_(chunk)).update(values, synchronize_session=False)
+    expire_instances(model, ids, list(values))
+
+
 @simple_bio_importer(requires=[proteins_and_genes, *site_importers])
-def precompute_ptm_mutations():
-    print('Counting mutations...')
-    total = Mutation.query.filter_by(is_confirmed=True).count()
-    mismatch = 0
-    for mutation in tqdm(Mutation.query.filter_by(is_confirmed=True), total=total):
-        pos = mutation.position
-        is_ptm_related = mutation.protein.has_sites_in_range(pos - 7, pos + 7)
-        if is_ptm_related != mutation.precomputed_is_ptm:
-            mismatch += 1
-            mutation.precomputed_is_ptm = is_ptm_related
-    print(f'Precomputed values of {mismatch} mutations has been computed and updated')
+def precompute_ptm_mutations(incremental=True, distance=7):
+    """Precompute if confirmed mutations are PTM-related (have any sites within +/-7 residues).
+
+    Positions of all mutations and sites are compared at once (as sorted arrays);
+    only the flags which changed are written back, with bulk UPDATE statements.
+
+    Args:
+        incremental: only recompute mutations of proteins which sites changed
+            since the last run (as detected with checksums of positions of the
+            sites stored for proteins) and mutations without the flag computed
+    """
+    print('Loading positions of sites...')
+    sites = np.array(db.session.query(Site.protein_id, Site.position).all(), dtype=np.int64).reshape(-1, 2)
+    site_keys = np.sort(sites[:, 0] * POSITIONS_STRIDE + sites[:, 1])
+
+    checksums = sites_checksums(site_keys)
+    proteins_to_update = {
+        protein_id: checksums.get(protein_id, 0)
+        for protein_id, stored_checksum in db.session.query(Protein.id, Protein.sites_checksum)
+        if checksums.get(protein_id, 0) != stored_checksum
+    }
+
+    print('Loading positions of mutations...')
+    columns = (Mutation.id, Mutation.protein_id, Mutation.position, Mutation.precomputed_is_ptm)
+    query = db.session.query(*columns).filter_by(is_confirmed=True)
+
+    if incremental:
+        print(f'Sites of {len(proteins_to_update)} proteins changed since the last run')
+        mutations = query.filter(Mutation.precomputed_is_ptm == None).all()
+        for proteins_ids in chunked_list(list(proteins_to_update), 500):
+            mutations.extend(
+                query.filter(Mutation.protein_id.in_(proteins_ids)).filter(Mutation.precomputed_is_ptm != None)
+            )
+    else:
+        mutations = query.all()
+
+    mutations = np.array(
+        [
+            (mutation_id, protein_id, position, -1 if is_ptm is None else is_ptm)
+            for mutation_id, protein_id, position, is_ptm in mutations
+        ],
+        dtype=np.int64
+    ).reshape(-1, 4)
+    ids, proteins_ids, positions, stored_is_ptm = mutations.T
+
+    keys = proteins_ids * POSITIONS_STRIDE + positions
+    is_ptm = (
+        np.searchsorted(site_keys, keys + distance, side='right')
+        >
+        np.searchsorted(site_keys, keys - distance, side='left')
+    )
+    changed = is_ptm != stored_is_ptm
+
+    for value in [True, False]:
+        bulk_update(Mutation, ids[changed & (is_ptm == value)].tolist(), {'precomputed_is_ptm': value})
+
+    db.session.bulk_update_mappings(Protein, [
+        {'id': protein_id, 'sites_checksum': checksum}
+        for protein_id, checksum in proteins_to_update.items()
+    ])
+    expire_instances(Protein, proteins_to_update, ['sites_checksum'])
+
+    print(f'Precomputed values of {changed.sum()} out of {len(ids)} checked mutations have been updated')
     return []
 
 
@@ -1261,3 +1361,308 @@ def sites_motifs(data=None):
         motif.generate_pseudo_logo(sequences)
 
     return new_motifs
+
+
+ProteinSequence = namedtuple('ProteinSequence', ['sequence', 'length'])
+
+# motifs compiled in each of the workers, as (motif id, compiled pattern) lists by site type id
+worker_motifs = {}
+
+
+def set_worker_motifs(motifs):
+    """Compile patterns of given (motif id, site type id, pattern) motifs."""
+    global worker_motifs
+    worker_motifs = defaultdict(list)
+    for motif_id, site_type_id, pattern in motifs:
+        worker_motifs[site_type_id].append((motif_id, re.compile(pattern)))
+
+
+def find_affected_motifs(sequence: str, sites, mutations, offset=7):
+    """Find motifs changed by the mutations in sites of a protein, as `Mutation.affected_motifs` would.
+
+    Args:
+        sequence: sequence of the protein
+        sites: (id, position, site types ids) of the sites, sorted by position
+        mutations: (id, position, alt) of the mutations
+
+    Returns:
+        set of (mutation id, motif id, site id) tuples
+    """
+    protein = ProteinSequence(sequence, len(sequence.rstrip('*')))
+    positions = [position for site_id, position, types_ids in sites]
+    sites_sequences = {}
+    affected = set()
+
+    for mutation_id, position, alt in mutations:
+        first = bisect_left(positions, position - offset)
+        after_last = bisect_right(positions, position + offset)
+
+        for site_id, site_position, types_ids in sites[first:after_last]:
+            if site_position not in sites_sequences:
+                sites_sequences[site_position] = extract_padded_sequence(
+                    protein, site_position - offset - 1, site_position + offset
+                )
+            site_sequence = sites_sequences[site_position]
+
+            relative_position = position - site_position + offset
+            mutated_sequence = site_sequence[:relative_position] + alt + site_sequence[relative_position + 1:]
+
+            for site_type_id in types_ids:
+                for motif_id, motif in worker_motifs.get(site_type_id, []):
+                    if motif.match(site_sequence) and not motif.search(mutated_sequence):
+                        affected.add((mutation_id, motif_id, site_id))
+
+    return affected
+
+
+def find_affected_motifs_star(args):
+    return find_affected_motifs(*args)
+
+
+def load_types_of_sites() -> Dict[int, list]:
+    """Sorted ids of types of sites (which have any types), by id of the site."""
+    types_of_sites = defaultdict(list)
+    for site_id, site_type_id in db.session.query(Site.id, SiteType.id).select_from(Site).join(Site.types):
+        types_of_sites[site_id].append(site_type_id)
+    return {site_id: sorted(types_ids) for site_id, types_ids in types_of_sites.items()}
+
+
+@simple_bio_importer(requires=[proteins_and_genes, *site_importers, sites_motifs])
+def precompute_affected_motifs(incremental=True, workers=1):
+    """Precompute motifs changed by mutations in sites (as used by `Mutation.affected_motifs`).
+
+    Mutations are processed in per-protein batches, by given number of worker
+    processes. Unless `incremental` is False, only mutations which were not precomputed
+    yet and mutations of proteins which sites (or motifs of types of these sites)
+    changed since the last run are (re)computed.
+    """
+    motifs = [
+        tuple(motif)
+        for motif in db.session.query(SiteMotif.id, SiteMotif.site_type_id, SiteMotif.pattern).order_by(SiteMotif.id)
+    ]
+    motifs_by_type = defaultdict(list)
+    for motif in motifs:
+        motif_id, site_type_id, pattern = motif
+        motifs_by_type[site_type_id].append(motif)
+
+    print('Loading sites...')
+    types_of_sites = load_types_of_sites()
+    sites_of_proteins = defaultdict(list)
+    sites = db.session.query(Site.id, Site.protein_id, Site.position).order_by(Site.protein_id, Site.position, Site.id)
+    for site_id, protein_id, position in sites:
+        sites_of_proteins[protein_id].append((site_id, position, types_of_sites.get(site_id, [])))
+
+    def data_checksum(protein_sites):
+        site_types = sorted({site_type_id for site_id, position, types_ids in protein_sites for site_type_id in types_ids})
+        return crc32(repr((protein_sites, [motifs_by_type[site_type_id] for site_type_id in site_types])).encode())
+
+    proteins_to_update = {}
+    for protein_id, stored_checksum in db.session.query(Protein.id, Protein.motifs_checksum):
+        checksum = data_checksum(sites_of_proteins.get(protein_id, []))
+        if checksum != stored_checksum:
+            proteins_to_update[protein_id] = checksum
+
+    print('Loading mutations...')
+    query = db.session.query(Mutation.id, Mutation.protein_id, Mutation.position, Mutation.alt)
+
+    if incremental:
+        print(f'Sites or motifs of {len(proteins_to_update)} proteins changed since the last run')
+        not_precomputed = or_(
+            Mutation.were_affected_motifs_precomputed.is_(False),
+            Mutation.were_affected_motifs_precomputed.is_(None)
+        )
+        mutations = query.filter(not_precomputed).all()
+        for proteins_ids in chunked_list(list(proteins_to_update), 500):
+            mutations.extend(
+                query.filter(Mutation.protein_id.in_(proteins_ids)).filter(Mutation.were_affected_motifs_precomputed.is_(True))
+            )
+    else:
+        mutations = query.all()
+
+    mutations_of_proteins = defaultdict(list)
+    for mutation_id, protein_id, position, alt in mutations:
+        mutations_of_proteins[protein_id].append((mutation_id, position, alt))
+
+    # mutations of proteins without sites cannot change any motifs
+    proteins_ids = [protein_id for protein_id in mutations_of_proteins if protein_id in sites_of_proteins]
+    sequences = {}
+    for chunk in chunked_list(proteins_ids, 500):
+        sequences.update(db.session.query(Protein.id, Protein.sequence).filter(Protein.id.in_(chunk)))
+
+    tasks = [
+        (sequences[protein_id], sites_of_proteins[protein_id], mutations_of_proteins[protein_id])
+        for protein_id in proteins_ids
+    ]
+
+    print(f'Looking for motifs affected by {len(mutations)} mutations of {len(mutations_of_proteins)} proteins...')
+    if workers > 1:
+        pool = Pool(workers, initializer=set_worker_motifs, initargs=(motifs,))
+        results = pool.imap_unordered(find_affected_motifs_star, tasks, chunksize=100)
+    else:
+        pool = None
+        set_worker_motifs(motifs)
+        results = map(find_affected_motifs_star, tasks)
+
+    affected = set()
+    try:
+        for protein_affected in tqdm(results, total=len(tasks)):
+            affected.update(protein_affected)
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+
+    mutations_ids = [mutation_id for mutation_id, protein_id, position, alt in mutations]
+    table = AffectedMotif.__table__
+
+    for chunk in chunked_list(mutations_ids, 500):
+        db.session.execute(table.delete().where(table.c.mutation_id.in_(chunk)))
+
+    for chunk in chunked_list(sorted(affected)):
+        db.session.execute(table.insert(), [
+            {'mutation_id': mutation_id, 'motif_id': motif_id, 'site_id': site_id}
+            for mutation_id, motif_id, site_id in chunk
+        ])
+
+    bulk_update(Mutation, mutations_ids, {'were_affected_motifs_precomputed': True})
+    expire_instances(Mutation, mutations_ids, ['precomputed_affected_motifs'])
+
+    db.session.bulk_update_mappings(Protein, [
+        {'id': protein_id, 'motifs_checksum': checksum}
+        for protein_id, checksum in proteins_to_update.items()
+    ])
+    expire_instances(Protein, proteins_to_update, ['motifs_checksum'])
+
+    print(f'Found {len(affected)} motifs affected by {len({mutation_id for mutation_id, *_ in affected})} mutations')
+    return []
+
+
+def site_type_filter(site_type: SiteType):
+    """Select sites of given type, as the Site.types filter would."""
+
+    def site_filter(sites):
+        return [site for site in sites if SiteType.fuzzy_comparator(site.types, site_type)]
+
+    return site_filter
+
+
+def ptm_impact_checksum(mimp_sites_ids, affected_motifs, data_checksum: int) -> int:
+    """Checksum of the data which impacts of a mutation on PTM sites are computed from.
+
+    Args:
+        mimp_sites_ids: sorted ids of sites from MIMP predictions for the mutation
+        affected_motifs: sorted rows of precomputed affected motifs (None if not precomputed)
+        data_checksum: checksum of the sites of the protein and of the motifs
+    """
+    return crc32(repr((mimp_sites_ids, affected_motifs)).encode(), data_checksum)
+
+
+@simple_bio_importer(requires=[proteins_and_genes, *site_importers, sites_motifs, precompute_affected_motifs])
+def precompute_ptm_impacts():
+    """Store impact of confirmed mutations on PTM sites, for all sites and for each site type.
+
+    Only impacts of mutations which are new or for which the underlying data
+    (sites of the protein, motifs or MIMP predictions) changed are recomputed.
+    Checksums of the data are computed from identifiers fetched with bulk queries,
+    so that only the mutations to recompute are loaded as ORM objects.
+    """
+    site_filters = {None: None}
+    for site_type in SiteType.available_types():
+        site_filters[site_type] = site_type_filter(site_type)
+
+    motifs = SiteMotif.query.order_by(SiteMotif.id)
+    motifs_checksum = crc32(repr([(motif.id, motif.pattern, motif.site_type_id) for motif in motifs]).encode())
+
+    print('Loading sites...')
+    types_of_sites = load_types_of_sites()
+    sites_of_proteins = defaultdict(list)
+    sites = db.session.query(Site.id, Site.protein_id, Site.position).order_by(Site.protein_id, Site.position, Site.id)
+    for site_id, protein_id, position in sites:
+        sites_of_proteins[protein_id].append((site_id, position, types_of_sites.get(site_id, [])))
+
+    print('Loading MIMP predictions and affected motifs...')
+    mimp_sites = defaultdict(set)
+    for mutation_id, site_id in db.session.query(MIMPMutation.mutation_id, MIMPMutation.site_id):
+        if site_id is not None:
+            mimp_sites[mutation_id].add(site_id)
+
+    affected_motifs = defaultdict(list)
+    affected_motifs_rows = db.session.query(AffectedMotif.mutation_id, AffectedMotif.motif_id, AffectedMotif.site_id)
+    for mutation_id, motif_id, site_id in affected_motifs_rows:
+        affected_motifs[mutation_id].append((motif_id, site_id))
+
+    stored_checksums = dict(
+        db.session.query(PrecomputedImpact.mutation_id, PrecomputedImpact.checksum)
+        .filter(PrecomputedImpact.site_type_id.is_(None))
+    )
+
+    print('Comparing checksums of mutations...')
+    mutations = (
+        db.session.query(Mutation.id, Mutation.protein_id, Mutation.were_affected_motifs_precomputed)
+        .filter(Mutation.is_confirmed)
+        .order_by(Mutation.protein_id, Mutation.id)
+    )
+    data_checksums = {}
+    checksums = {}
+    outdated = []
+
+    for mutation_id, protein_id, were_affected_motifs_precomputed in mutations:
+        if protein_id not in data_checksums:
+            sites_data = sites_of_proteins.get(protein_id, [])
+            data_checksums[protein_id] = crc32(repr(sites_data).encode(), motifs_checksum)
+
+        checksum = ptm_impact_checksum(
+            sorted(mimp_sites.get(mutation_id, [])),
+            sorted(affected_motifs.get(mutation_id, [])) if were_affected_motifs_precomputed else None,
+            data_checksums[protein_id]
+        )
+        stored_checksum = stored_checksums.get(mutation_id)
+
+        if stored_checksum == checksum:
+            continue
+
+        if stored_checksum is not None:
+            outdated.append(mutation_id)
+
+        checksums[mutation_id] = checksum
+
+    for chunk in chunked_list(outdated, 500):
+        PrecomputedImpact.query.filter(
+            PrecomputedImpact.mutation_id.in_(chunk)
+        ).delete(synchronize_session='fetch')
+
+    print(f'Computing impacts on PTM sites of {len(checksums)} mutations...')
+
+    for chunk in chunked_list(list(checksums), 500):
+        mutations = Mutation.query.filter(Mutation.id.in_(chunk)).options(
+            selectinload(Mutation.meta_MIMP).joinedload(MIMPMutation.site),
+            selectinload(Mutation.precomputed_affected_motifs).joinedload(AffectedMotif.site)
+        )
+        impacts = []
+
+        for mutation in mutations:
+            checksum = checksums[mutation.id]
+            # sites of all types, the filters select subsets of these
+            all_affected_sites = mutation.get_affected_ptm_sites()
+
+            for site_type, site_filter in site_filters.items():
+                sites = site_filter(all_affected_sites) if site_filter else all_affected_sites
+                impact = mutation.impact_on_sites(sites)
+
+                if site_type and impact == 'none':
+                    continue
+
+                impacts.append(
+                    PrecomputedImpact(
+                        mutation_id=mutation.id,
+                        site_type_id=site_type.id if site_type else None,
+                        impact=impact,
+                        affected_sites_ids={site.id for site in sites},
+                        checksum=checksum
+                    )
+                )
+
+        db.session.add_all(impacts)
+
+    print(f'Impacts on PTM sites of {len(checksums)} mutations have been computed')
+    return []
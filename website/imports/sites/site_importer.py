@@ -65,6 +65,9 @@ class SiteImporter(BioImporter):
     # used for cross-isoform mapping
     sequence_offset = 7
 
+    # number of processes mapping the sites across isoforms (of different genes)
+    mapping_workers = 1
+
     @property
     @abstractmethod
     def source_name(self) -> str:
@@ -226,7 +229,7 @@ class SiteImporter(BioImporter):
         if sites.empty:
             return sites
 
-        mapper = SiteMapper(self.proteins, self.repr_site)
+        mapper = SiteMapper(self.proteins, self.repr_site, workers=self.mapping_workers)
 
         # sites loaded so far were explicitly defined in data files
         mapped_sites = mapper.map_sites_by_sequence(sites)
@@ -1,7 +1,8 @@
 import logging
 import re
-from collections import defaultdict
-from typing import List
+from collections import Counter, defaultdict
+from multiprocessing import Pool
+from typing import Dict, List
 from warnings import warn
 
 from pandas import DataFrame
@@ -61,15 +62,119 @@ def find_all_regex(longer_string: str, sub_string: str):
     ]
 
 
+class KmerIndex:
+    """Index of all k-mers of a group of sequences (e.g. isoforms of a gene).
+
+    All occurrences of a site sequence in all the sequences are found with
+    a single lookup of its first k residues (and comparison of the remaining
+    ones). Sequences shorter than k and the anchored ones ('^', '$') are
+    searched for with `find_all`.
+    """
+
+    def __init__(self, sequences: Dict[str, str], k: int):
+        self.k = k
+        self.sequences = sequences
+        occurrences = defaultdict(list)
+        for refseq, sequence in sequences.items():
+            for i in range(len(sequence) - k + 1):
+                occurrences[sequence[i:i + k]].append((refseq, i))
+        self.occurrences = occurrences
+
+    def find_all(self, sub_string: str) -> Dict[str, List[int]]:
+        """Returns positions of all overlapping matches in each of the sequences."""
+        k = self.k
+
+        if len(sub_string) < k or sub_string.startswith('^') or sub_string.endswith('$'):
+            return {
+                refseq: find_all(sequence, sub_string)
+                for refseq, sequence in self.sequences.items()
+            }
+
+        matches = {refseq: [] for refseq in self.sequences}
+        rest = sub_string[k:]
+
+        for refseq, position in self.occurrences.get(sub_string[:k], []):
+            if not rest or self.sequences[refseq].startswith(rest, position + k):
+                matches[refseq].append(position)
+
+        return matches
+
+
+def find_in_sequences(sequences: Dict[str, str], sub_strings: List[str], k: int, min_to_index: int):
+    """Find all occurrences of each of sub_strings in each of the sequences.
+
+    The sequences are indexed with `KmerIndex` only if there are enough
+    sub strings to look up for the index to pay off.
+    """
+    unique = list(set(sub_strings))
+
+    if len(unique) >= min_to_index:
+        find = KmerIndex(sequences, k).find_all
+    else:
+        def find(sub_string):
+            return {
+                refseq: find_all(sequence, sub_string)
+                for refseq, sequence in sequences.items()
+            }
+
+    matches = {sub_string: find(sub_string) for sub_string in unique}
+    return [matches[sub_string] for sub_string in sub_strings]
+
+
+def find_in_sequences_star(args):
+    return find_in_sequences(*args)
+
+
+class SameObject:
+    """Hashable key equal only to keys of the very same object."""
+
+    __slots__ = ['value']
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, SameObject) and other.value is self.value
+
+    def __hash__(self):
+        return id(self.value)
+
+
+def hashable(value):
+    """Hashable equivalent of a field of a site, to compare the sites by hash.
+
+    Collections are converted to their immutable counterparts; as NaN
+    is not equal to itself, it is compared by identity, just as the
+    elements of tuples are compared with the `==` comparison (so that
+    a NaN shared by the sites, e.g. in an object column, is equal).
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(hashable(element) for element in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(hashable(element) for element in value)
+    if isinstance(value, dict):
+        return frozenset((key, hashable(element)) for key, element in value.items())
+    if value != value:
+        return SameObject(value)
+    return value
+
+
 class OneBasedPosition(int):
     pass
 
 
 class SiteMapper:
 
-    def __init__(self, proteins, repr_site):
+    # site sequences of a gene are looked up in a k-mer index of its isoforms
+    # only if there are at least so many of them; otherwise a simple search
+    # in each of the isoforms is faster than building of the index (which
+    # costs about as much as a thousand of searches, regardless of length)
+    min_sites_to_index = 1000
+
+    def __init__(self, proteins, repr_site, workers=1):
         self.proteins = proteins
         self.repr_site = repr_site
+        self.workers = workers
         self.genes = create_key_model_dict(Gene, 'name')
         self.has_gene_names = None
         self.already_warned = None
@@ -110,21 +215,23 @@ class SiteMapper:
         self.already_warned = set()
         self.has_gene_names = 'gene' in sites.columns
 
-        known_sites_by_refseq = defaultdict(list)
-        for site in sites.itertuples(index=False):
-            known_sites_by_refseq[site.refseq].append(site)
+        sites = list(sites.itertuples(index=False))
+        isoforms_of_sites = [self.choose_isoforms_to_map(site) for site in sites]
+        occurrences_of_sites = self.find_occurrences(sites, isoforms_of_sites)
 
-        for site in tqdm(sites.itertuples(index=False), total=len(sites)):
+        # sites which were provided at input, to check if any of the sites is already mapped
+        # somewhere; site tuples can contain non-hashable elements, thus `hashable` is needed
+        known_sites = {hashable(site) for site in sites}
+
+        for site, isoforms_to_map, occurrences in zip(sites, isoforms_of_sites, occurrences_of_sites):
 
             was_mapped = False
             protein = self.proteins.get(site.refseq, None)
             positions = {}
 
-            isoforms_to_map = self.choose_isoforms_to_map(site)
-
             # find matches
             for isoform in isoforms_to_map:
-                positions[isoform] = self.map_site_to_isoform(site, isoform)
+                positions[isoform] = self.map_site_to_isoform(site, isoform, occurrences[isoform.refseq])
 
             if protein:
                 matches = positions[protein]
@@ -133,10 +240,6 @@ class SiteMapper:
             # create rows with sites
             for isoform, matched_positions in positions.items():
 
-                # to check if any other of the sites is already mapped here;
-                # note: it will not raise as it is a defaultdict
-                input_sites_of_this_isoform = known_sites_by_refseq[isoform.refseq]
-
                 for position in matched_positions:
 
                     # _replace() returns new namedtuple with replaced values;
@@ -153,12 +256,7 @@ class SiteMapper:
                     if (
                         # if a site were to be mapped to a place it was known to be at
                         # it shall not be repeated (to avoid duplicates)
-                        any(
-                            # note: using equality comparison as site tuple can contain
-                            # non-hashable elements at this point
-                            existing_site == new_site
-                            for existing_site in input_sites_of_this_isoform
-                        )
+                        hashable(new_site) in known_sites
                         # however, if we are in the isoform from which we are mapping
                         # so mapping onto itself, we should allow such matches
                         # (as otherwise we would not get the source site!)
@@ -195,7 +293,62 @@ class SiteMapper:
 
         return DataFrame(mapped_sites)
 
-    def map_site_to_isoform(self, site, isoform: Protein) -> List[OneBasedPosition]:
+    def find_occurrences(self, sites, isoforms_of_sites) -> List[Dict[str, List[int]]]:
+        """Find all (0-based) occurrences of sequences of the sites in isoforms chosen for them.
+
+        Sites are grouped by the isoforms (i.e. by gene), so that each group
+        is searched for in a k-mer index of its isoforms built only once;
+        the groups are processed in parallel if more than one worker was requested.
+        """
+        sites_by_isoforms = defaultdict(list)
+        sequences_of_isoforms = {}
+
+        for i, (site, isoforms) in enumerate(zip(sites, isoforms_of_sites)):
+            if not isoforms:
+                continue
+            key = frozenset(isoform.refseq for isoform in isoforms)
+            if key not in sequences_of_isoforms:
+                sequences_of_isoforms[key] = {
+                    # asterisks (*) representing stop codon are removed for the time of mapping
+                    # so expression like 'SOMECTERMINALSEQUENCE$' can be easily matched
+                    isoform.refseq: isoform.sequence.rstrip('*')
+                    for isoform in isoforms
+                }
+            sites_by_isoforms[key].append(i)
+
+        # index k-mers of the most common length of (not anchored) site sequences
+        lengths = Counter(
+            len(site.sequence)
+            for site in sites
+            if not (site.sequence.startswith('^') or site.sequence.endswith('$'))
+        )
+        k = lengths.most_common(1)[0][0] if lengths else 1
+
+        tasks = [
+            (sequences_of_isoforms[key], [sites[i].sequence for i in indices], k, self.min_sites_to_index)
+            for key, indices in sites_by_isoforms.items()
+        ]
+
+        if self.workers > 1:
+            pool = Pool(self.workers)
+            results = pool.imap(find_in_sequences_star, tasks, chunksize=16)
+        else:
+            pool = None
+            results = map(find_in_sequences_star, tasks)
+
+        occurrences_of_sites = [{} for _ in sites]
+        try:
+            for indices, occurrences in zip(sites_by_isoforms.values(), tqdm(results, total=len(tasks))):
+                for i, site_occurrences in zip(indices, occurrences):
+                    occurrences_of_sites[i] = site_occurrences
+        finally:
+            if pool:
+                pool.terminate()
+                pool.join()
+
+        return occurrences_of_sites
+
+    def map_site_to_isoform(self, site, isoform: Protein, occurrences: List[int] = None) -> List[OneBasedPosition]:
         """Finds all occurrences of a site (by exact sequence match)
         in provided sequence of an alternative isoform.
 
@@ -204,13 +357,19 @@ class SiteMapper:
         the one of the original site. This is based on premise that most of
         alternative isoform should not differ so much.
 
+        If already known, (0-based) occurrences of the site sequence
+        in the isoform can be provided (see `find_occurrences`).
+
         Returned positions are 1-based
         """
-        matches = [
-            m + 1 + site.left_sequence_offset
+        if occurrences is None:
             # asterisks (*) representing stop codon are removed for the time of mapping
             # so expression like 'SOMECTERMINALSEQUENCE$' can be easily matched
-            for m in find_all(isoform.sequence.rstrip('*'), site.sequence)
+            occurrences = find_all(isoform.sequence.rstrip('*'), site.sequence)
+
+        matches = [
+            m + 1 + site.left_sequence_offset
+            for m in occurrences
         ]
 
         if len(matches) > 1:
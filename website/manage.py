@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import argparse
+from pathlib import Path
 from contextlib import contextmanager
 from typing import Mapping, Text
 
@@ -9,7 +10,7 @@ from sqlalchemy.exc import OperationalError
 
 from app import create_app
 from database import bdb, get_engine
-from database import bdb_refseq
+from database import open_gene_to_isoform_mappings
 from database import db
 from database.manage import remove_model, reset_relational_db
 from database.migrate import basic_auto_migrate_relational_db, set_foreign_key_checks, set_unique_checks, set_autocommit
@@ -59,6 +60,25 @@ def automigrate(args, app=None):
     return True
 
 
+def migrate_mappings(args):
+    stores = {'dna_to_protein': lambda: bdb, 'gene_to_isoform': open_gene_to_isoform_mappings}
+    for name in args.databases:
+        store = stores[name]()
+        codec = store.available_codecs().get(args.format)
+        if not codec:
+            print(f'{args.format} format is not available for {name} mappings')
+            continue
+        print(f'Migrating {name} mappings from {store.codec.name} to {codec.name} values...')
+        count = store.migrate(codec)
+        print(f'Migrated {count} values of {name} mappings.')
+
+
+def migrate_mappings_keys(args):
+    print(f'Migrating keys of dna_to_protein mappings from {bdb.key_layout} to sortable layout...')
+    count = bdb.migrate_keys()
+    print(f'Migrated {count} keys of dna_to_protein mappings.')
+
+
 def get_all_models(module_name='bio') -> Mapping:
     from sqlalchemy.ext.declarative.clsregistry import _ModuleMarker
     module_name = 'models.' + module_name
@@ -126,12 +146,24 @@ class ProteinRelated(CommandTarget, ImportersMixin):
 
     @command
     def load(self, args):
-        self.import_manager.import_selected(args.importers)
+        self.import_manager.import_selected(args.importers, workers=args.workers)
 
     @load.argument
     def importers(self):
         return self.importers_choice(self.import_manager.importers_by_name)
 
+    @load.argument
+    def workers(self):
+        return argument_parameters(
+            '--workers',
+            type=int,
+            default=1,
+            help=(
+                'Number of processes used by importers which support parallel processing'
+                ' (e.g. precompute_affected_motifs); by default a single process is used.'
+            )
+        )
+
     @command
     def export(self, args):
         exporters = EXPORTERS
@@ -223,15 +255,16 @@ class Mappings(CommandTarget):
 
     @command
     def load(self, args):
-        print(f'Importing {args.restrict_to or "all"} mappings')
+        print(f'Importing {args.restrict_to or "genome_proteome"} mappings')
 
         if args.restrict_to != 'aminoacid_refseq':
             from sqlalchemy.orm import load_only
             proteins = get_proteins(options=load_only('id', 'refseq', 'sequence'))
 
-            import_genome_proteome_mappings(proteins, bdb_dir=args.path)
+            import_genome_proteome_mappings(proteins, bdb_dir=args.path, workers=args.workers)
 
-        if args.restrict_to != 'genome_proteome':
+        # aminoacid_refseq mappings are not used by the search anymore (see IsoformIndex)
+        if args.restrict_to == 'aminoacid_refseq':
             from models import Protein
             from sqlalchemy.orm import load_only, joinedload
 
@@ -251,7 +284,10 @@ class Mappings(CommandTarget):
             '--restrict_to', '-r',
             default=None,
             choices=['genome_proteome', 'aminoacid_refseq'],
-            help='Should only genome_proteome or aminoacid_refseq mappings be imported?'
+            help=(
+                'Should genome_proteome (default) or aminoacid_refseq mappings be imported?'
+                ' The latter are no longer needed by the search and are only imported on request.'
+            )
         )
 
     @load.argument
@@ -263,11 +299,44 @@ class Mappings(CommandTarget):
             help='A path to dir where mappings dbs should be created'
         )
 
+    @load.argument
+    def workers(self):
+        return argument_parameters(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of processes parsing the annotation files of genome_proteome mappings'
+        )
+
+    @command
+    def compact(self, args):
+        # the deprecated gene_to_isoform mappings are not served anymore
+        for store in [bdb]:
+            size_before = store.db.used_size
+            if args.destination:
+                destination = Path(args.destination) / store.path.name
+                print(f'Writing compacted copy of {store.path.name} mappings to {destination}')
+                store.compact(destination)
+            else:
+                print(f'Compacting {store.path.name} mappings')
+                store.compact()
+                print(f'Reduced size from {size_before / 2 ** 20:.1f} MB to {store.db.used_size / 2 ** 20:.1f} MB')
+
+    @compact.argument
+    def destination(self):
+        return argument_parameters(
+            '--destination',
+            type=str,
+            default='',
+            help='A path to dir where compacted copies of mappings dbs should be created (e.g. for read-only serving);'
+                 ' by default the databases are compacted in place'
+        )
+
     @command
     def remove(self, args):
         print('Removing mappings database...')
         bdb.reset()
-        bdb_refseq.reset()
+        open_gene_to_isoform_mappings().reset()
         print('Removing mappings database completed.')
 
 
@@ -365,6 +434,54 @@ class Mutations(CommandTarget):
             help='Limit import to n-th chunk, starts with 0. By default None.'
         )
 
+    @load.argument
+    def preload_mutations(self):
+        return argument_parameters(
+            '--preload_mutations',
+            action='store_true',
+            help=(
+                'Load identifiers of all existing mutations into memory before the import,'
+                ' rather than querying the database for each new mutation.'
+                ' Recommended when re-importing a source into a populated database.'
+            )
+        )
+
+    @load.argument
+    def mutations_batch_size(self):
+        return argument_parameters(
+            '--mutations_batch_size',
+            type=int,
+            default=None,
+            help=(
+                'With --preload_mutations, load identifiers of existing mutations lazily,'
+                ' for batches of this many proteins (by protein id) to limit the memory use.'
+            )
+        )
+
+    @load.argument
+    def workers(self):
+        return argument_parameters(
+            '--workers',
+            type=int,
+            default=1,
+            help=(
+                'Number of processes preparsing mutations from the annotation files.'
+                ' Sources which do not support parallel parsing are imported with a single process.'
+            )
+        )
+
+    @load.argument
+    def memory_budget(self):
+        return argument_parameters(
+            '--memory_budget',
+            type=lambda gibibytes: int(float(gibibytes) * 2 ** 30),
+            default=None,
+            help=(
+                'Memory (in GiB) available for a single chunk of sources imported in chunks (e.g. mimp);'
+                ' determines the size of chunks. By default 8 GiB.'
+            )
+        )
+
     @load.argument
     def disable_constraints(self):
         return argument_parameters(
@@ -581,6 +698,54 @@ def create_parser():
             'By default all binds will be used.'
         )
     )
+
+    mappings_databases = ('dna_to_protein', 'gene_to_isoform')
+    # gene_to_isoform mappings are deprecated and are only migrated on request
+    default_mappings_databases = ('dna_to_protein',)
+
+    migrate_mappings_parser = new_subparser(
+        subparsers,
+        'migrate_mappings',
+        migrate_mappings,
+        help=(
+            'should values of mappings databases be rewritten with a different format?'
+            ' Binary formats are faster to decode and are smaller than the text format.'
+        )
+    )
+
+    migrate_mappings_parser.add_argument(
+        '-f',
+        '--format',
+        type=str,
+        choices=['binary', 'text'],
+        default='binary',
+        help='the target format of values. By default: binary.'
+    )
+
+    migrate_mappings_parser.add_argument(
+        '-d',
+        '--databases',
+        type=str,
+        nargs='*',
+        choices=mappings_databases,
+        default=default_mappings_databases,
+        help=(
+            'which mappings databases should be migrated?'
+            ' Possible values: ' + ', '.join(mappings_databases) + '. '
+            'By default only the dna_to_protein mappings will be migrated,'
+            ' as gene_to_isoform mappings are deprecated.'
+        )
+    )
+
+    new_subparser(
+        subparsers,
+        'migrate_mappings_keys',
+        migrate_mappings_keys,
+        help=(
+            'should keys of dna_to_protein mappings be rewritten in the sortable layout?'
+            ' Sortable keys are required for queries of genomic regions.'
+        )
+    )
     return parser
 
 
@@ -14,8 +14,8 @@ from database.types import ScalarSet
 from helpers.models import generic_aggregator
 
 from .diseases import ClinicalData
-from .model import BioModel, make_association_table
-from .sites import Site, SiteMotif
+from .model import BioModel
+from .sites import Site, SiteIndex, SiteMotif
 
 
 if TYPE_CHECKING:
@@ -775,30 +775,50 @@ source_manager = Sources([
 ])
 
 
+class AffectedMotif(BioModel):
+    """Motif of a site changed by a mutation, as found by `MutatedMotifs.affected_motifs`.
+
+    Stored by `precompute_affected_motifs` importer.
+    """
+    mutation_id = db.Column(db.Integer, db.ForeignKey('mutation.id', ondelete='cascade'), index=True)
+
+    site_id = db.Column(db.Integer, db.ForeignKey('site.id', ondelete='cascade'))
+    site = db.relationship(Site)
+
+    motif_id = db.Column(db.Integer, db.ForeignKey('sitemotif.id', ondelete='cascade'))
+    motif = db.relationship(SiteMotif)
+
+
 class MutatedMotifs:
 
     were_affected_motifs_precomputed = db.Column(db.Boolean, default=False)
 
     @declared_attr
     def precomputed_affected_motifs(self):
-        mutation_motif_table = make_association_table(f'{self.__tablename__}.id', SiteMotif.id)
-        return db.relationship(
-            SiteMotif,
-            secondary=mutation_motif_table,
-            collection_class=set,
-            backref='mutations'
-        )
+        return db.relationship(AffectedMotif, cascade='all, delete-orphan')
 
     def affected_motifs(self, sites: Iterable[Site] = None):
+        """Motifs (of given or of all affected sites) changed by the mutation.
+
+        Returns:
+            list of (motif, position of the mutation in the motif) tuples
+        """
         if self.were_affected_motifs_precomputed:
-            return self.precomputed_affected_motifs
+            affected = self.precomputed_affected_motifs
+            if sites is not None:
+                sites_ids = {site.id for site in sites}
+                affected = [motif for motif in affected if motif.site_id in sites_ids]
+            return [
+                (motif.motif, self.position - motif.site.position + 7)
+                for motif in sorted(affected, key=lambda motif: (motif.site.position, motif.motif_id))
+            ]
 
         from analyses.motifs import mutate_sequence
         from analyses.motifs import has_motif
 
         affected_motifs = []
 
-        if not sites:
+        if sites is None:
             sites = self.affected_sites
 
         for site in sites:
@@ -836,6 +856,14 @@ class Mutation(BioModel, MutatedMotifs):
     # is different than None. Be careful with boolean evaluation!
     precomputed_is_ptm = db.Column(db.Boolean)
 
+    # impact on PTM sites (as returned by impact_on_ptm()), stored
+    # by `precompute_ptm_impacts` importer; see PrecomputedImpact
+    precomputed_impacts = db.relationship(
+        'PrecomputedImpact',
+        backref='mutation',
+        cascade='all, delete-orphan'
+    )
+
     types = ('direct', 'network-rewiring', 'motif-changing', 'proximal', 'distal', 'none')
 
     vars().update(source_manager.relationships)
@@ -924,9 +952,15 @@ class Mutation(BioModel, MutatedMotifs):
 
         This method works very similarly to is_ptm_distal property.
         """
-        sites = self.protein.sites
         if filter_manager:
-            sites = filter_manager.apply(sites)
+            # the bound method is created anew on each access, so the index is cached under
+            # the state of the filters (the same for all calls with unchanged filters)
+            sites = self.protein.get_site_index(
+                filter_manager.apply,
+                cache_key=('filter_manager', filter_manager.url_string(expanded=True))
+            )
+        else:
+            sites = self.protein.site_index
         return self.is_close_to_some_site(7, 7, sites)
 
     @hybrid_property
@@ -962,51 +996,13 @@ class Mutation(BioModel, MutatedMotifs):
         # otherwise it's a novel mutation - let's check proximity
         return self.is_close_to_some_site(7, 7)
 
-    def get_affected_ptm_sites(self, site_filter=lambda x: x):
+    def get_affected_ptm_sites(self, site_filter=None):
         """Get PTM sites that might be affected by this mutation,
 
         when taking into account -7 to +7 spans of each PTM site.
         """
-        sites = site_filter(self.protein.sites)
         pos = self.position
-        a = 0
-        b = len(sites)
-        sites_affected = set()
-
-        while a != b:
-            pivot = (b - a) // 2 + a
-            site_pos = sites[pivot].position
-            if site_pos - 7 <= pos <= site_pos + 7:
-                hit = pivot
-                sites_affected.add(sites[pivot])
-                break
-            if pos > site_pos:
-                a = pivot + 1
-            else:
-                b = pivot
-        else:
-            return tuple()
-
-        def cond():
-            try:
-                site_pos = sites[pivot].position
-                return site_pos - 7 <= pos <= site_pos + 7
-            except IndexError:
-                return tuple()
-
-        # go to right from found site, check if there is more overlapping sites
-        pivot = hit + 1
-        while cond():
-            sites_affected.add(sites[pivot])
-            pivot += 1
-
-        # and then go to the left
-        pivot = hit - 1
-        while cond():
-            sites_affected.add(sites[pivot])
-            pivot -= 1
-
-        return sorted(sites_affected, key=lambda site: site.position)
+        return self.protein.get_site_index(site_filter).in_range(pos - 7, pos + 7)
 
     def impact_on_specific_ptm(self, site: Site, ignore_mimp=False):
         if self.position == site.position:
@@ -1028,41 +1024,26 @@ class Mutation(BioModel, MutatedMotifs):
         It describes impact on the closest PTM site or on a site chosen by
         MIMP algorithm (so it applies only when 'network-rewiring' is returned)
         """
-        if site_filter is None:
-            sites = self.sites
-        else:
-            sites = site_filter(self.sites)
+        return self.impact_on_sites(self.get_affected_ptm_sites(site_filter))
 
-        if self.is_close_to_some_site(0, 0, sites):
+    def impact_on_sites(self, sites: List[Site]):
+        """Impact of the mutation on given sites (affected by the mutation), as in `impact_on_ptm`."""
+        site_index = SiteIndex(sites)
+
+        if self.is_close_to_some_site(0, 0, site_index):
             return 'direct'
         elif any(site in sites for site in self.meta_MIMP.sites):
             return 'network-rewiring'
         elif self.affected_motifs(sites):
             return 'motif-changing'
-        elif self.is_close_to_some_site(2, 2, sites):
+        elif self.is_close_to_some_site(2, 2, site_index):
             return 'proximal'
-        elif self.is_close_to_some_site(7, 7, sites):
+        elif self.is_close_to_some_site(7, 7, site_index):
             return 'distal'
         return 'none'
 
-    def find_closest_sites(self, distance=7, site_filter=lambda x: x):
-        # TODO: implement site type filter
-        pos = self.position
-
-        sites = Site.query.filter(
-            and_(
-                Site.protein_id == self.protein_id,
-                Site.position.between(pos - distance, pos + distance)
-            )
-        ).order_by(func.abs(Site.position - pos)).limit(2).all()
-
-        if(
-            len(sites) == 2 and
-            abs(sites[0].position - pos) != abs(sites[1].position - pos)
-        ):
-            return sites[:1]
-        else:
-            return sites
+    def find_closest_sites(self, distance=7, site_filter=None):
+        return self.protein.get_site_index(site_filter).closest(self.position, distance)
 
     @hybrid_method
     def is_close_to_some_site(self, left, right, sites=None):
@@ -1072,24 +1053,15 @@ class Mutation(BioModel, MutatedMotifs):
         (site_pos - left, site_pos + right)
         site_pos is the position of a site
 
-        Algorithm is based on bisection and an assumption,
-        that sites are sorted by position in the database.
+        Args:
+            sites: a list of sites or a SiteIndex; sites of the protein by default
         """
         if sites is None:
-            sites = self.protein.sites
+            sites = self.protein.site_index
+        elif not isinstance(sites, SiteIndex):
+            sites = SiteIndex(sites)
         pos = self.position
-        a = 0
-        b = len(sites)
-        while a != b:
-            p = (b - a) // 2 + a
-            site_pos = sites[p].position
-            if site_pos - left <= pos <= site_pos + right:
-                return True
-            if pos > site_pos:
-                a = p + 1
-            else:
-                b = p
-        return False
+        return sites.count_in_range(pos - right, pos + left) > 0
 
     @is_close_to_some_site.expression
     def is_close_to_some_site(self, left, right):
@@ -1133,6 +1105,64 @@ class Mutation(BioModel, MutatedMotifs):
         )
 
 
+class PrecomputedImpact(BioModel):
+    """Impact of a mutation on PTM sites, as returned by `Mutation.impact_on_ptm`.
+
+    The impact is stored for all sites (site_type_id is null) and for sites
+    of each of the site types (selected as by the Site.types filter, i.e.
+    including sites of types which names contain the name of the type).
+    Rows for specific site types are stored only if the impact is other
+    than 'none', so once the row for all sites exists, a missing row means
+    that the impact on sites of given type is 'none'.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('mutation_id', 'site_type_id'),
+    )
+
+    mutation_id = db.Column(db.Integer, db.ForeignKey('mutation.id'), index=True)
+    site_type_id = db.Column(db.Integer, db.ForeignKey('sitetype.id'), nullable=True)
+    impact = db.Column(db.Enum(*Mutation.types))
+    affected_sites_ids = db.Column(ScalarSet(separator=',', element_type=int), default=set)
+
+    # checksum of the data which the impact was computed from (sites of
+    # the protein, motifs, MIMP predictions), used for incremental updates
+    checksum = db.Column(db.BigInteger)
+
+    @classmethod
+    def impacts_of(cls, mutations: Iterable['Mutation'], site_type=None, chunk_size=500) -> Dict[int, str]:
+        """Get precomputed impacts of given mutations (on sites of given type, or on all sites).
+
+        Returns:
+            mapping: mutation id => impact, for mutations which have the impact precomputed
+        """
+        ids = list({mutation.id for mutation in mutations if mutation.id is not None})
+        impacts = {}
+        specific_impacts = {}
+
+        for start in range(0, len(ids), chunk_size):
+            query = (
+                db.session.query(cls.mutation_id, cls.site_type_id, cls.impact)
+                .filter(cls.mutation_id.in_(ids[start:start + chunk_size]))
+            )
+            if site_type:
+                query = query.filter(or_(cls.site_type_id == None, cls.site_type_id == site_type.id))
+            else:
+                query = query.filter(cls.site_type_id == None)
+
+            for mutation_id, site_type_id, impact in query:
+                if site_type_id is None:
+                    impacts[mutation_id] = impact
+                else:
+                    specific_impacts[mutation_id] = impact
+
+        if site_type:
+            return {
+                mutation_id: specific_impacts.get(mutation_id, 'none')
+                for mutation_id in impacts
+            }
+        return impacts
+
+
 def confirmed_mutation_sources():
     return {
         source.name: source
@@ -1,6 +1,8 @@
+from contextlib import suppress
 from typing import List, TYPE_CHECKING
+from weakref import WeakKeyDictionary
 
-from sqlalchemy import select, case, exists, and_, func, distinct
+from sqlalchemy import select, case, exists, and_, func, distinct, event
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.ext.hybrid import hybrid_property
 from werkzeug.utils import cached_property
@@ -10,7 +12,7 @@ from database import db, client_side_defaults, fast_count
 from .diseases import Cancer, Disease, ClinicalData
 from .model import BioModel, make_association_table
 from .mutations import Mutation, InheritedMutation
-from .sites import Site
+from .sites import Site, SiteIndex
 
 if TYPE_CHECKING:
     from .gene import Gene
@@ -144,6 +146,14 @@ class Protein(BioModel):
     cds_start = db.Column(db.Integer)
     cds_end = db.Column(db.Integer)
 
+    # checksum of positions of the sites, as of the last precomputation of
+    # precomputed_is_ptm of mutations of this protein (for incremental updates)
+    sites_checksum = db.Column(db.BigInteger)
+
+    # checksum of the sites and of motifs of their types, as of the last
+    # precomputation of motifs affected by mutations of this protein
+    motifs_checksum = db.Column(db.BigInteger)
+
     sites: List['Site'] = db.relationship(
         'Site',
         order_by='Site.position',
@@ -358,37 +368,46 @@ class Protein(BioModel):
         return kinase_groups
 
     @cached_property
-    def sites_affecting_positions(self):
-        return set(
-            i
-            for position, in db.session.query(Site.position).filter_by(protein=self)
-            for i in range(position - 7, position + 7 + 1)
-        )
+    def site_index(self) -> SiteIndex:
+        return SiteIndex(self.sites)
 
-    def would_affect_any_sites(self, mutation_pos):
-        return mutation_pos in self.sites_affecting_positions
+    @cached_property
+    def _filtered_site_indices(self):
+        return WeakKeyDictionary()
 
-    def has_sites_in_range(self, left, right):
-        """Test if there are any sites in given range defined as <left, right>, inclusive.
+    @cached_property
+    def _site_indices_by_key(self):
+        return {}
+
+    def get_site_index(self, site_filter=None, cache_key=None) -> SiteIndex:
+        """Get index of sites of this protein, including only sites passing given filter (if any).
 
-        Algorithm is based on bisection and an assumption,
-        that sites are sorted by position in the database.
+        Indices of filtered sites are cached for as long as the filter exists,
+        or - if given - under the cache_key, which should identify the state of
+        the filter (use it for filters re-created on each call, e.g. bound methods).
         """
-        assert left < right
+        if site_filter is None:
+            return self.site_index
+        if cache_key is not None:
+            if cache_key not in self._site_indices_by_key:
+                self._site_indices_by_key[cache_key] = SiteIndex(site_filter(self.sites))
+            return self._site_indices_by_key[cache_key]
+        try:
+            return self._filtered_site_indices[site_filter]
+        except (KeyError, TypeError):
+            index = SiteIndex(site_filter(self.sites))
+            with suppress(TypeError):
+                self._filtered_site_indices[site_filter] = index
+            return index
 
-        sites = self.sites
+    def would_affect_any_sites(self, mutation_pos):
+        return self.has_sites_in_range(mutation_pos - 7, mutation_pos + 7)
 
-        for i, site in enumerate(sites):
-            if site.position >= left:
-                start = i
-                break
-        else:
-            return False
+    def has_sites_in_range(self, left, right):
+        """Test if there are any sites in given range defined as <left, right>, inclusive."""
+        assert left < right
 
-        for i, site in enumerate(reversed(sites)):
-            if site.position <= right:
-                return start <= len(sites) - i - 1
-        return False
+        return self.site_index.count_in_range(left, right) > 0
 
     @property
     def disease_names_by_id(self):
@@ -415,6 +434,15 @@ class Protein(BioModel):
         return len(self.kinases) + len(self.kinase_groups)
 
 
+@event.listens_for(Protein.sites, 'append')
+@event.listens_for(Protein.sites, 'remove')
+@event.listens_for(Protein.sites, 'set')
+def invalidate_site_indices(protein, *args):
+    protein.__dict__.pop('site_index', None)
+    protein.__dict__.pop('_filtered_site_indices', None)
+    protein.__dict__.pop('_site_indices_by_key', None)
+
+
 class InterproDomain(BioModel):
     # Interpro ID
     accession = db.Column(db.String(64), unique=True)
@@ -3,8 +3,10 @@ from functools import lru_cache
 
 from pathlib import Path
 from sys import float_info
-from typing import List, TYPE_CHECKING
+from operator import attrgetter
+from typing import Iterable, List, TYPE_CHECKING
 
+import numpy as np
 from sqlalchemy import func, case
 from sqlalchemy.ext.hybrid import hybrid_property, hybrid_method
 
@@ -359,6 +361,54 @@ class Site(BioModel):
         return data
 
 
+class SiteIndex:
+    """Sites sorted by position, with positions kept in an array for range queries.
+
+    All range queries (e.g. for sites within +/-7 residues from a mutation)
+    use binary search over the positions, and are therefore O(log n).
+    """
+
+    def __init__(self, sites: Iterable[Site]):
+        self.sites = sorted(sites, key=attrgetter('position'))
+        self.positions = np.array([site.position for site in self.sites], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.sites)
+
+    def bounds(self, start, end):
+        """Indices of the first site at or after `start` and of the first site after `end`.
+
+        Both `start` and `end` can be arrays (of the same shape).
+        """
+        return (
+            np.searchsorted(self.positions, start, side='left'),
+            np.searchsorted(self.positions, end, side='right')
+        )
+
+    def count_in_range(self, start, end) -> int:
+        """Count sites with positions within <start, end> (inclusive)."""
+        first, after_last = self.bounds(start, end)
+        return max(int(after_last - first), 0)
+
+    def in_range(self, start, end) -> List[Site]:
+        """Get sites with positions within <start, end> (inclusive), sorted by position."""
+        first, after_last = self.bounds(start, end)
+        return self.sites[first:after_last]
+
+    def closest(self, position, distance) -> List[Site]:
+        """Get the site closest to the position (or two sites, if equally distant).
+
+        Only sites within the given distance from the position are considered.
+        """
+        candidates = sorted(
+            self.in_range(position - distance, position + distance),
+            key=lambda site: abs(site.position - position)
+        )[:2]
+        if len(candidates) == 2 and abs(candidates[0].position - position) != abs(candidates[1].position - position):
+            return candidates[:1]
+        return candidates
+
+
 class SiteMotif(BioModel):
     name = db.Column(db.String(32))
     pattern = db.Column(db.String(32))
@@ -21,6 +21,7 @@ from exceptions import ValidationError
 from .model import Model
 
 if TYPE_CHECKING:
+    from search.columnar_results import ColumnarSearchResults
     from search.mutation import MutationSearch
 
 
@@ -153,20 +154,32 @@ class UsersMutationsDataset(CMSModel):
         return cls.query.filter_by(uri=uri.rstrip('/')).one()
 
     @property
-    def data(self) -> 'MutationSearch':
-        if not hasattr(self, '_data'):
+    def results(self) -> 'ColumnarSearchResults':
+        """The saved results, loaded lazily (use to retrieve a subset of results)."""
+        if not hasattr(self, '_results'):
             try:
-                self._data = self._load_from_file()
+                self._results = self._load_from_file()
             except FileNotFoundError:
                 # None if associated file was deleted.
                 # Be aware of this line when debugging.
                 return
+        return self._results
+
+    @property
+    def data(self) -> 'MutationSearch':
+        """The complete MutationSearch, with all proteins and mutations resolved."""
+        if not hasattr(self, '_data'):
+            if self.results is None:
+                return
+            self._data = self.results.to_search()
         return self._data
 
     @data.setter
     def data(self, data):
+        from search.columnar_results import ColumnarSearchResults
         self._data = data
-        uri = self._save_to_file(data, self.uri)
+        self._results = ColumnarSearchResults.from_search(data) if data is not None else None
+        uri = self._save_to_file(self._results, self.uri)
         self.uri = uri
 
     def remove(self, commit=True):
@@ -186,13 +199,15 @@ class UsersMutationsDataset(CMSModel):
         # prompt python interpreter to remove data from memory
         with suppress(AttributeError):
             del self._data
+        with suppress(AttributeError):
+            del self._results
 
         # and delete from session
         db.session.delete(self)
         if commit:
             db.session.commit()
 
-    def _save_to_file(self, data, uri=None):
+    def _save_to_file(self, data: 'ColumnarSearchResults', uri=None):
         """Saves data to a file identified by uri argument.
 
         If no uri is given, new unique file is created and new uri returned.
@@ -221,7 +236,9 @@ class UsersMutationsDataset(CMSModel):
                 delete=False
             )
 
-        pickle.dump(data, db_file, protocol=4)
+        if data is not None:
+            data.save(db_file)
+        db_file.close()
 
         uri_code = os.path.basename(db_file.name)[:-3]
 
@@ -234,11 +251,22 @@ class UsersMutationsDataset(CMSModel):
         file_name = unquote(self.uri) + '.db'
         return os.path.join(self.mutations_dir, file_name)
 
-    def _load_from_file(self):
+    def _load_from_file(self) -> 'ColumnarSearchResults':
+        from search.columnar_results import ColumnarSearchResults
 
         with open(self._path, 'rb') as f:
-            data = pickle.load(f)
-        return data
+            header = f.read(1)
+
+        # saved before the search completed
+        if not header:
+            return
+
+        if header == pickle.PROTO:
+            # datasets saved before the columnar format was introduced
+            with open(self._path, 'rb') as f:
+                return ColumnarSearchResults.from_search(pickle.load(f))
+
+        return ColumnarSearchResults.load(self._path)
 
     @hybrid_property
     def is_expired(self):
@@ -256,28 +284,39 @@ class UsersMutationsDataset(CMSModel):
     @property
     def query_size(self):
         if self.query_count is None:
-            new_lines = self.data.query.count('\n')
+            new_lines = self.results.query.count('\n')
             return new_lines + 1 if new_lines else 0
         return self.query_count
 
     @property
     def mutations(self):
-        mutations = []
-        results = self.data.results
-        for results in results.values():
-            for result in results:
-                mutations.append(result.mutation)
-        return mutations
+        return self.get_mutations()
+
+    def get_mutations(self, protein=None):
+        """Mutations from the results (only the mutations of given protein, if provided)."""
+        from search.mutation_result import resolve_mutations
+
+        rows = self.results.rows_of_protein(protein.id) if protein else None
+        keys = self.results.mutations_keys(rows)
+        resolved = resolve_mutations(keys)
+
+        return [resolved[key][1] for key in keys if key in resolved]
+
+    def has_mutation(self, mutation):
+        protein_id = mutation.protein.id
+        rows = self.results.rows_of_protein(protein_id)
+        return (protein_id, mutation.position, mutation.alt) in self.results.mutations_keys(rows)
 
     @property
     def mutations_count(self):
         if self.results_count is None:
-            return len(self.mutations)
+            return len(self.results)
         return self.results_count
 
     def get_mutation_details(self, protein, pos, alt):
-        protein_results = self.data.results_by_refseq[protein.refseq]
-        return protein_results[pos, alt].meta_user
+        from models import UserUploadedMutation
+        details = self.results.get_details(protein.id, pos, alt)
+        return UserUploadedMutation(mutation=None, **details)
 
 
 class User(CMSModel):
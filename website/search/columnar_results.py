@@ -0,0 +1,197 @@
+from typing import Dict, List, Mapping, TYPE_CHECKING
+
+import numpy as np
+
+from .mutation_result import SearchResult, resolve_mutations
+
+if TYPE_CHECKING:
+    from .mutation import MutationSearch
+
+
+def pack_strings(strings: List[str]):
+    """Pack strings into a single utf-8 encoded array and an array of offsets."""
+    encoded = [string.encode() for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(string) for string in encoded], out=offsets[1:])
+    blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return blob, offsets
+
+
+def unpack_strings(blob, offsets) -> List[str]:
+    data = blob.tobytes()
+    return [
+        data[start:end].decode()
+        for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+    ]
+
+
+class LazyColumns(dict):
+    """Columns of an .npz archive, each read on the first access."""
+
+    def __init__(self, archive):
+        super().__init__()
+        self.archive = archive
+
+    def __missing__(self, name):
+        column = self[name] = self.archive[name]
+        return column
+
+    def keys(self):
+        return self.archive.files
+
+
+class ColumnarSearchResults:
+    """Results of a MutationSearch stored as columns (NumPy arrays).
+
+    Only the identifiers of proteins, positions and alternative residues
+    of mutations are stored (in addition to the counts and query lines);
+    proteins and mutations are resolved in bulk when needed. The results
+    are saved as an (uncompressed) .npz archive in which columns are read
+    lazily, so that e.g. retrieving the results for a single protein does
+    not require loading the query nor the details of all other results.
+
+    Each row corresponds to a single SearchResult, rows are stored in the
+    order of results (grouped by the query line).
+    """
+
+    def __init__(self, columns: Mapping[str, np.ndarray]):
+        self.columns = columns
+
+    @classmethod
+    def load(cls, path_or_file):
+        return cls(LazyColumns(np.load(path_or_file, allow_pickle=False)))
+
+    def save(self, path_or_file):
+        np.savez(path_or_file, **self.columns)
+
+    @classmethod
+    def from_search(cls, search: 'MutationSearch'):
+        rows = []
+        result_lines = []
+
+        for line_index, (query_line, results) in enumerate(search.results.items()):
+            result_lines.append(query_line)
+            for result in results:
+                rows.append((line_index, result))
+
+        winners = {
+            id(result)
+            for refseq_results in search.results_by_refseq.values()
+            for result in refseq_results.values()
+        }
+
+        def column(getter, dtype):
+            return np.array([getter(result) for line_index, result in rows], dtype=dtype)
+
+        columns = {
+            'hidden_results_cnt': np.array(search.hidden_results_cnt, dtype=np.int64),
+            'line': np.array([line_index for line_index, result in rows], dtype=np.int32),
+            'protein_id': column(lambda result: result.protein.id, np.int32),
+            'position': column(lambda result: result.mutation.position, np.int32),
+            'alt': column(lambda result: result.mutation.alt, np.str_),
+            'ref': column(lambda result: getattr(result, 'ref', ''), np.str_),
+            'type': column(lambda result: result.type, np.str_),
+            'count': column(lambda result: result.meta_user.count, np.int32),
+            # -1 if not known
+            'is_ptm': column(lambda result: -1 if getattr(result, 'is_ptm', None) is None else result.is_ptm, np.int8),
+            'is_in_results_by_refseq': column(lambda result: id(result) in winners, np.bool_),
+        }
+        columns['protein_order'] = np.argsort(columns['protein_id'], kind='stable')
+
+        for name, strings in [
+            ('query', [search.query]),
+            ('result_lines', result_lines),
+            ('without_mutations', search.without_mutations),
+            ('badly_formatted', search.badly_formatted),
+        ]:
+            columns[name + '_blob'], columns[name + '_offsets'] = pack_strings(strings)
+
+        return cls(columns)
+
+    def strings(self, name) -> List[str]:
+        return unpack_strings(self.columns[name + '_blob'], self.columns[name + '_offsets'])
+
+    @property
+    def query(self) -> str:
+        return self.strings('query')[0]
+
+    def __len__(self):
+        return len(self.columns['line'])
+
+    def rows_of_protein(self, protein_id) -> np.ndarray:
+        """Indices of rows with results for given protein (in order of results)."""
+        order = self.columns['protein_order']
+        sorted_ids = self.columns['protein_id'][order]
+        start, end = np.searchsorted(sorted_ids, [protein_id, protein_id + 1])
+        return np.sort(order[start:end])
+
+    def mutations_keys(self, rows=None) -> List[tuple]:
+        """(protein_id, position, alt) of mutations in given rows (or in all rows)."""
+        protein_ids, positions, alts = (
+            self.columns[name] if rows is None else self.columns[name][rows]
+            for name in ['protein_id', 'position', 'alt']
+        )
+        return list(zip(protein_ids.tolist(), positions.tolist(), alts.tolist()))
+
+    def get_details(self, protein_id, position, alt) -> Dict:
+        """Count and query of the result shown for given mutation (as in `results_by_refseq`)."""
+        rows = self.rows_of_protein(protein_id)
+        rows = rows[self.columns['is_in_results_by_refseq'][rows]]
+        rows = rows[
+            (self.columns['position'][rows] == position)
+            & (self.columns['alt'][rows] == alt)
+        ]
+        if not len(rows):
+            raise KeyError((protein_id, position, alt))
+        row = rows[-1]
+        line = self.columns['line'][row]
+        lines_offsets = self.columns['result_lines_offsets']
+        query_line = self.columns['result_lines_blob'][lines_offsets[line]:lines_offsets[line + 1]].tobytes().decode()
+        return {'count': int(self.columns['count'][row]), 'query': query_line}
+
+    def to_search(self) -> 'MutationSearch':
+        """Recreate the MutationSearch, resolving all proteins and mutations in bulk."""
+        from models import UserUploadedMutation
+        from .mutation import MutationSearch
+
+        search = MutationSearch()
+        search.query = self.query
+        search.without_mutations = self.strings('without_mutations')
+        search.badly_formatted = self.strings('badly_formatted')
+        search.hidden_results_cnt = int(self.columns['hidden_results_cnt'])
+
+        keys = self.mutations_keys()
+        resolved = resolve_mutations(keys)
+        result_lines = self.strings('result_lines')
+
+        rows = zip(
+            keys,
+            self.columns['line'].tolist(),
+            self.columns['ref'].tolist(),
+            self.columns['type'].tolist(),
+            self.columns['count'].tolist(),
+            self.columns['is_ptm'].tolist(),
+            self.columns['is_in_results_by_refseq'].tolist()
+        )
+
+        for key, line, ref, result_type, count, is_ptm, is_in_results_by_refseq in rows:
+            protein_id, position, alt = key
+            protein, mutation, created = resolved[key]
+            query_line = result_lines[line]
+
+            details = {'ref': ref, 'pos': position, 'alt': alt}
+            if is_ptm != -1:
+                details['is_ptm'] = bool(is_ptm)
+
+            result = SearchResult(protein, mutation, created, result_type, **details)
+            result.meta_user = UserUploadedMutation(count=count, query=query_line, mutation=mutation)
+            mutation.meta_user = result.meta_user
+
+            if query_line not in search.results:
+                search.results[query_line] = []
+            search.results[query_line].append(result)
+
+            if is_in_results_by_refseq:
+                search.results_by_refseq[protein.refseq][position, alt] = result
+
+        return search
@@ -0,0 +1,91 @@
+from collections import defaultdict
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+
+from database import db
+from helpers.bioinf import can_be_result_of_single_snv
+from models import Gene, Protein
+from models.bio.sites import cache
+
+
+class GeneIsoforms(NamedTuple):
+    """Sequences of all isoforms of a gene, concatenated into a single array of bytes."""
+    protein_ids: np.ndarray
+    # lengths without the trailing stop (*) character, as Protein.length
+    lengths: np.ndarray
+    offsets: np.ndarray
+    residues: np.ndarray
+
+
+class IsoformIndex:
+    """Isoform sequences grouped by gene name, answering which isoforms have given residue at given position.
+
+    It replaces lookups in the precomputed gene_to_isoform (bdb_refseq)
+    mappings for protein-level search: candidate isoforms of a mutation
+    are resolved from the sequences directly.
+    """
+
+    def __init__(self, genes: Dict[str, GeneIsoforms]):
+        self.genes = genes
+
+    @classmethod
+    def from_database(cls):
+        isoforms = defaultdict(list)
+        query = (
+            db.session.query(Gene.name, Protein.id, Protein.sequence)
+            .select_from(Protein)
+            .join(Protein.gene)
+            .order_by(Protein.id)
+        )
+        for gene_name, protein_id, sequence in query:
+            isoforms[gene_name].append((protein_id, sequence or ''))
+
+        return cls({
+            gene_name: cls.pack(gene_isoforms)
+            for gene_name, gene_isoforms in isoforms.items()
+        })
+
+    @staticmethod
+    def pack(isoforms) -> GeneIsoforms:
+        sequences = [sequence.encode() for protein_id, sequence in isoforms]
+        offsets = np.zeros(len(sequences), dtype=np.int64)
+        np.cumsum([len(sequence) for sequence in sequences[:-1]], out=offsets[1:])
+        return GeneIsoforms(
+            protein_ids=np.array([protein_id for protein_id, sequence in isoforms], dtype=np.int64),
+            lengths=np.array([len(sequence.rstrip(b'*')) for sequence in sequences], dtype=np.int64),
+            offsets=offsets,
+            residues=np.frombuffer(b''.join(sequences), dtype=np.uint8)
+        )
+
+    def __contains__(self, gene_name):
+        return gene_name in self.genes
+
+    def count_isoforms(self, gene_name) -> int:
+        isoforms = self.genes.get(gene_name)
+        return 0 if isoforms is None else len(isoforms.protein_ids)
+
+    def isoforms_with_residue(self, gene_name, residue: str, pos: int) -> List[int]:
+        """Identifiers of isoforms of the gene which have given residue at given position."""
+        isoforms = self.genes.get(gene_name)
+        if isoforms is None or pos < 1 or len(residue) != 1:
+            return []
+        covering = isoforms.lengths >= pos
+        matching = isoforms.residues[isoforms.offsets[covering] + pos - 1] == ord(residue)
+        return isoforms.protein_ids[covering][matching].tolist()
+
+    def affected_isoforms(self, gene_name, ref: str, pos: int, alt: str) -> List[int]:
+        """Identifiers of isoforms in which the mutation (caused by a single SNV) might happen."""
+        if not can_be_result_of_single_snv(ref, alt):
+            return []
+        return self.isoforms_with_residue(gene_name, ref, pos)
+
+
+@cache
+def get_isoform_index() -> IsoformIndex:
+    """Load the index once per process.
+
+    Proteins are not expected to change after the import; the index is
+    reset together with other cached data of models (e.g. between tests).
+    """
+    return IsoformIndex.from_database()
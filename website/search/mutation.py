@@ -1,11 +1,12 @@
+import os
+import re
 from collections import defaultdict
+from itertools import islice
 from operator import attrgetter
-from typing import List
-
-from werkzeug.datastructures import FileStorage
+from typing import List, Optional, Tuple
 
 from app import celery
-from database import bdb
+from database import bdb, db
 from helpers.bioinf import complement
 from models import UserUploadedMutation
 
@@ -13,20 +14,50 @@ from .mutation_result import SearchResult
 from .protein_mutations import get_protein_muts
 
 
+region_pattern = re.compile(r'chr(?P<chrom>\w+):(?P<start>\d+)-(?P<end>\d+)', re.IGNORECASE)
+
+# regions longer than this are not searched, not to exhaust resources
+max_region_length = 10 ** 6
+
+
+def parse_genomic_region(query: str) -> Optional[Tuple[str, int, int]]:
+    """Parse a genomic region query, e.g. chr17:7570000-7590000.
+
+    Returns:
+        (chromosome, start, end) tuple or None if the query is not a region
+    """
+    match = region_pattern.fullmatch(query.strip())
+    if not match:
+        return
+    start, end = int(match.group('start')), int(match.group('end'))
+    if end < start:
+        return
+    return match.group('chrom').upper(), start, end
+
+
 class MutationSearch:
 
-    def __init__(self, vcf_file=None, text_query=None, filter_manager=None):
+    # number of lines of a VCF file to be parsed and looked up together
+    chunk_size = 10000
+
+    def __init__(self, vcf_file=None, text_query=None, filter_manager=None, store=None, chunk_size=None):
         """Performs search for known and novel mutations from provided VCF file and/or text query.
 
         Stop codon mutations are not considered.
 
         Args:
-            vcf_file: a file object containing data in Variant Call Format
+            vcf_file: a file object (or a list of lines) containing data in Variant Call Format
             text_query: a string of multiple lines, where each line represents either:
-                 - a genomic mutation (e.g. chr12 57490358 C A) or
-                 - a protein mutation (e.g. STAT6 W737C)
+                 - a genomic mutation (e.g. chr12 57490358 C A),
+                 - a protein mutation (e.g. STAT6 W737C) or
+                 - a genomic region (e.g. chr17:7570000-7590000); all known
+                   mutations of the region will be included
                 Entries from both VCF file and text input will be merged.
             filter_manager: FilterManager instance used to filter out unwanted mutations
+            store: SearchResultsStore to stream the results to; if given, results
+                of each chunk are appended to the store and then dropped from memory
+                (use `store.load()` to retrieve them)
+            chunk_size: number of lines of the VCF file to process at once
         """
         self.query = ''
         self.results = {}
@@ -34,13 +65,19 @@ class MutationSearch:
         self.without_mutations = []
         self.badly_formatted = []
         self.hidden_results_cnt = 0
+        self.store = store
+        if chunk_size:
+            self.chunk_size = chunk_size
         self._progress = 0
         self._total = 0
         if vcf_file:
-            if type(vcf_file) is FileStorage:
-                # as bad as it can be, but usually the vcf file will be a list of lines already
-                vcf_file = vcf_file.readlines()
-            self._total += len(vcf_file)
+            if hasattr(vcf_file, 'seek'):
+                # file objects are read lazily; progress is measured in bytes
+                vcf_file.seek(0, os.SEEK_END)
+                self._total += vcf_file.tell()
+                vcf_file.seek(0)
+            else:
+                self._total += len(vcf_file)
         if text_query:
             self._total += sum(1 for _ in text_query.splitlines())
 
@@ -62,22 +99,77 @@ class MutationSearch:
         if text_query:
             self.query += text_query
             self.parse_text(text_query)
+            self.flush()
 
         # when parsing is complete, quickly forget where is such complex object
         # like filter_manager so any instance of this class can be pickled.
         self.data_filter = None
+        self.store = None
 
-    def progress(self):
-        self._progress += 1
-        if celery.current_task:
+    def progress(self, done=1):
+        self._progress += done
+        # tasks called directly (not by a worker) have no state to update
+        if celery.current_task and celery.current_task.request.id:
             celery.current_task.update_state(
                 state='PROGRESS',
                 meta={'progress': self._progress / self._total}
             )
 
-    def add_mutation_items(self, items: List[SearchResult], query_line: str):
+    def flush(self):
+        """Move results gathered so far to the store (if streaming to a store)."""
+        if not self.store:
+            return
+
+        self.store.append(self)
+
+        # novel mutations are not needed anymore, do not let these accumulate in the session
+        for results in self.results.values():
+            for result in results:
+                if result.is_mutation_novel and result.mutation in db.session:
+                    db.session.expunge(result.mutation)
+
+        self.query = ''
+        self.results = {}
+        self.results_by_refseq = defaultdict(dict)
+        self.without_mutations = []
+        self.badly_formatted = []
+        self.hidden_results_cnt = 0
+
+    def merge(self, other: 'MutationSearch'):
+        """Merge results of another search, as if its input was appended to the input of this search."""
+        self.query += other.query
+        self.without_mutations.extend(other.without_mutations)
+        self.badly_formatted.extend(other.badly_formatted)
+        self.hidden_results_cnt += other.hidden_results_cnt
+
+        for query_line, results in other.results.items():
+            if query_line in self.results:
+                count = results[0].meta_user.count
+                for result in self.results[query_line]:
+                    result.meta_user.count += count
+            else:
+                self.results[query_line] = results
+
+        # results of the same line can come in a different order from each of the
+        # searches (e.g. run by different workers), thus are matched by the mutation
+        results_by_mutation = {}
+
+        for refseq, refseq_results in other.results_by_refseq.items():
+            for key, result in refseq_results.items():
+                query_line = result.meta_user.query
+                if query_line not in results_by_mutation:
+                    results_by_mutation[query_line] = {
+                        self.mutation_key(own_result): own_result
+                        for own_result in self.results[query_line]
+                    }
+                self.results_by_refseq[refseq][key] = results_by_mutation[query_line][self.mutation_key(result)]
+
+    @staticmethod
+    def mutation_key(result: SearchResult):
+        mutation = result.mutation
+        return mutation.protein.refseq, mutation.position, mutation.alt
 
-        self.progress()
+    def add_mutation_items(self, items: List[SearchResult], query_line: str):
 
         if not items:
             self.without_mutations.append(query_line)
@@ -107,8 +199,36 @@ class MutationSearch:
             self.results[query_line] = items
 
     def parse_vcf(self, vcf_file):
+        """Parse the VCF file in chunks, looking up the variants of each chunk in a single batch."""
+        lines = iter(vcf_file)
+        measure_progress_in_bytes = hasattr(vcf_file, 'seek')
+
+        while True:
+            chunk = list(islice(lines, self.chunk_size))
+            if not chunk:
+                break
+
+            is_complete = self.parse_vcf_chunk(chunk)
+
+            self.progress(sum(map(len, chunk)) if measure_progress_in_bytes else len(chunk))
+            self.flush()
 
-        for line in vcf_file:
+            if is_complete:
+                break
+
+    def parse_vcf_chunk(self, lines) -> bool:
+        """Parse given lines of a VCF file.
+
+        Returns:
+            True if the end of the file was reached
+        """
+        variants = []
+        query_lines = []
+        is_complete = False
+
+        for line in lines:
+            if isinstance(line, bytes):
+                line = line.decode()
             line = line.strip()
             if line.startswith('#') or line.startswith('Chr	Start'):
                 continue
@@ -116,6 +236,7 @@ class MutationSearch:
 
             if len(data) < 5:
                 if not line:    # if we reached end of the file
+                    is_complete = True
                     break
                 self.badly_formatted.append(line)
                 continue
@@ -125,19 +246,20 @@ class MutationSearch:
             if chrom.startswith('chr'):
                 chrom = chrom[3:]
 
-            alts = alts.split(',')
-            for alt in alts:
+            for alt in alts.split(','):
+                variants.append((chrom, pos, ref, alt))
+                # we don't have queries in our format for vcf files:
+                # those need to be built this way
+                query_lines.append(' '.join(('chr' + chrom, pos, ref, alt)) + '\n')
 
-                items = bdb.get_genomic_muts(chrom, pos, ref, alt)
+        results = bdb.get_genomic_muts_batch(variants)
 
-                chrom = 'chr' + chrom
-                parsed_line = ' '.join((chrom, pos, ref, alt)) + '\n'
+        for items, parsed_line in zip(results, query_lines):
+            self.add_mutation_items(items, parsed_line)
 
-                self.add_mutation_items(items, parsed_line)
+        self.query += ''.join(query_lines)
 
-                # we don't have queries in our format for vcf files:
-                # those need to be built this way
-                self.query += parsed_line
+        return is_complete
 
     def parse_text(self, text_query):
         complement_prefix = 'Complement of '
@@ -161,8 +283,27 @@ class MutationSearch:
                 gene, mut = [x.upper() for x in data]
 
                 items = get_protein_muts(gene, mut)
+            elif len(data) == 1 and parse_genomic_region(line):
+                self.parse_region(line, *parse_genomic_region(line))
+                continue
             else:
                 self.badly_formatted.append(line)
                 continue
 
             self.add_mutation_items(items, line)
+
+        self.progress(len(text_query.splitlines()))
+
+    def parse_region(self, line, chrom, start, end):
+        """Add results for all mutations mapped to SNVs within given genomic region."""
+        if end - start + 1 > max_region_length:
+            self.badly_formatted.append(line)
+            return
+
+        region_results = bdb.get_genomic_muts_in_region(chrom, start, end)
+
+        if not region_results:
+            self.without_mutations.append(line)
+
+        for (pos, ref, alt), items in region_results:
+            self.add_mutation_items(items, f'chr{chrom} {pos} {ref} {alt}')
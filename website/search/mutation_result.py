@@ -1,6 +1,10 @@
+from typing import Dict, Iterable, Tuple
+
 from models import Protein, Mutation
 from database import get_or_create
 
+MutationKey = Tuple[int, int, str]
+
 
 class SearchResult:
 
@@ -46,3 +50,57 @@ class SearchResult:
         state['mutation'].meta_user = state['meta_user']
 
         self.__dict__.update(state)
+
+
+def resolve_mutations(keys: Iterable[MutationKey], chunk_size=300) -> Dict[MutationKey, Tuple[Protein, Mutation, bool]]:
+    """Bulk equivalent of `get_or_create(Mutation, ...)` for many mutations.
+
+    Proteins and already known mutations are retrieved with a few IN
+    queries (one pair of queries per chunk of keys); Mutation objects
+    are created only for the keys which are not in the database yet.
+    Keys referring to non-existent proteins are omitted.
+
+    Args:
+        keys: (protein_id, position, alt) tuples
+
+    Returns:
+        mapping: key -> (protein, mutation, was_mutation_created)
+    """
+    keys = sorted(set(keys))
+
+    protein_ids = sorted({protein_id for protein_id, position, alt in keys})
+    proteins = {}
+
+    for i in range(0, len(protein_ids), chunk_size):
+        chunk = protein_ids[i:i + chunk_size]
+        for protein in Protein.query.filter(Protein.id.in_(chunk)):
+            proteins[protein.id] = protein
+
+    known_mutations = {}
+
+    for i in range(0, len(keys), chunk_size):
+        chunk = keys[i:i + chunk_size]
+        query = Mutation.query.filter(
+            Mutation.protein_id.in_({protein_id for protein_id, position, alt in chunk}),
+            Mutation.position.in_({position for protein_id, position, alt in chunk})
+        )
+        for mutation in query:
+            known_mutations[mutation.protein_id, mutation.position, mutation.alt] = mutation
+
+    # novel mutations are created only after all queries were issued,
+    # so that these are not auto-flushed in the middle of the resolution
+    resolved = {}
+
+    for key in keys:
+        protein_id, position, alt = key
+        protein = proteins.get(protein_id)
+        if not protein:
+            continue
+        mutation = known_mutations.get(key)
+        if mutation:
+            resolved[key] = protein, mutation, False
+        else:
+            mutation = Mutation(protein=protein, protein_id=protein_id, position=position, alt=alt)
+            resolved[key] = protein, mutation, True
+
+    return resolved
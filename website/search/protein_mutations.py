@@ -1,9 +1,10 @@
 from typing import List
 
-from database import bdb_refseq, get_or_create
+from database import get_or_create
 from helpers.bioinf import decode_raw_mutation
 from models import Protein, Mutation
 
+from .isoform_index import get_isoform_index
 from .mutation_result import SearchResult
 
 
@@ -47,9 +48,13 @@ def iterate_affected_isoforms(gene_name, ref, pos, alt):
             if (isoform.length >= pos and
                 isoform.sequence[pos - 1] == ref)
         ]
+
+    which is answered from the in-memory IsoformIndex of sequences.
     """
-    hash_key = gene_name + ' ' + ref + str(pos) + alt
-    protein_ids = bdb_refseq[hash_key]
+    protein_ids = get_isoform_index().affected_isoforms(gene_name, ref, pos, alt)
+
+    if not protein_ids:
+        return []
 
     return Protein.query.filter(Protein.id.in_(protein_ids))
 
@@ -60,7 +65,7 @@ def get_protein_muts(gene_name, mut) -> List[SearchResult]:
     associated with given gene which are correct (i.e. they do not
     lie outside the range of a protein isoform and have the same
     reference residues).
-    To speed up the lookup we use precomputed hashmap.
+    To speed up the lookup we use an in-memory index of isoform sequences.
     """
     ref, pos, alt = decode_raw_mutation(mut)
 
@@ -0,0 +1,133 @@
+import os
+import pickle
+from shutil import copyfileobj
+from tempfile import mkstemp
+from typing import Iterable, Iterator, TYPE_CHECKING
+
+from .mutation_result import SearchResult, resolve_mutations
+
+if TYPE_CHECKING:
+    from .mutation import MutationSearch
+
+
+class SearchResultsStore:
+    """Append-only, on-disk store of MutationSearch results.
+
+    A search running in the streaming mode appends the (partial) results
+    of every processed chunk of the input as a separate frame. Frames hold
+    only the identifiers of proteins and mutations (no ORM objects) so the
+    size of each frame is proportional to the size of the chunk.
+    """
+
+    directory = 'search_results'
+
+    def __init__(self, path):
+        self.path = path
+
+    @classmethod
+    def create(cls):
+        os.makedirs(cls.directory, exist_ok=True)
+        handle, path = mkstemp(dir=cls.directory, suffix='.results')
+        os.close(handle)
+        return cls(path)
+
+    def remove(self):
+        os.remove(self.path)
+
+    def append(self, search: 'MutationSearch'):
+        """Write results of given (partial) search as a new frame."""
+        frame = {
+            'query': search.query,
+            'without_mutations': search.without_mutations,
+            'badly_formatted': search.badly_formatted,
+            'hidden_results_cnt': search.hidden_results_cnt,
+            'results': [
+                (
+                    query_line,
+                    results[0].meta_user.count,
+                    [self._dump_result(result) for result in results]
+                )
+                for query_line, results in search.results.items()
+            ],
+            'results_by_refseq': [
+                (result.meta_user.query, result.protein.id, position, alt)
+                for refseq_results in search.results_by_refseq.values()
+                for (position, alt), result in refseq_results.items()
+            ]
+        }
+        with open(self.path, 'ab') as f:
+            pickle.dump(frame, f, protocol=4)
+
+    @staticmethod
+    def _dump_result(result: SearchResult):
+        details = {
+            key: value
+            for key, value in result.__dict__.items()
+            if key not in {'protein', 'mutation', 'is_mutation_novel', 'type', 'meta_user'}
+        }
+        mutation = result.mutation
+        return result.protein.id, mutation.position, mutation.alt, result.type, details
+
+    def extend(self, stores: Iterable['SearchResultsStore']):
+        """Move frames of given stores (in order) to the end of this store."""
+        with open(self.path, 'ab') as f:
+            for store in stores:
+                with open(store.path, 'rb') as source:
+                    copyfileobj(source, f)
+                store.remove()
+
+    def frames(self) -> Iterator[dict]:
+        with open(self.path, 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def iterate_searches(self) -> Iterator['MutationSearch']:
+        """Yield a partial MutationSearch for each of the frames.
+
+        Proteins and mutations of a frame are resolved in bulk.
+        """
+        from models import UserUploadedMutation
+        from .mutation import MutationSearch
+
+        for frame in self.frames():
+            search = MutationSearch()
+            search.query = frame['query']
+            search.without_mutations = frame['without_mutations']
+            search.badly_formatted = frame['badly_formatted']
+            search.hidden_results_cnt = frame['hidden_results_cnt']
+
+            resolved = resolve_mutations(
+                (protein_id, position, alt)
+                for query_line, count, results in frame['results']
+                for protein_id, position, alt, result_type, details in results
+            )
+
+            for query_line, count, dumped_results in frame['results']:
+                results = []
+                for protein_id, position, alt, result_type, details in dumped_results:
+                    protein, mutation, created = resolved[protein_id, position, alt]
+                    result = SearchResult(protein, mutation, created, result_type, **details)
+                    result.meta_user = UserUploadedMutation(count=count, query=query_line, mutation=mutation)
+                    mutation.meta_user = result.meta_user
+                    results.append(result)
+                search.results[query_line] = results
+
+            for query_line, protein_id, position, alt in frame['results_by_refseq']:
+                protein, mutation, created = resolved[protein_id, position, alt]
+                for result in search.results[query_line]:
+                    if result.mutation is mutation:
+                        search.results_by_refseq[protein.refseq][position, alt] = result
+
+            yield search
+
+    def load(self) -> 'MutationSearch':
+        """Load all the frames, merging them into a single MutationSearch."""
+        from .mutation import MutationSearch
+
+        search = MutationSearch()
+        for partial_search in self.iterate_searches():
+            search.merge(partial_search)
+        return search
@@ -1,16 +1,65 @@
+import os
 import pickle
-from typing import Dict
+from itertools import islice
+from tempfile import mkstemp
+from typing import Dict, List, Tuple
+
+from celery import chord
+from celery.result import GroupResult
 
 from app import celery
 from helpers.pickle import pickle_as_str, unpickle_str
 from search.mutation import MutationSearch
+from search.results_store import SearchResultsStore
 
 from search.filters import SearchViewFilters
 
 
+uploads_dir = 'search_uploads'
+
+# number of lines of an uploaded VCF file to be searched by a single task
+lines_per_shard = 100000
+
+
+def split_uploaded_file(file_storage, shard_size=None) -> List[str]:
+    """Save the uploaded file to the disk, as shards of at most `shard_size` lines.
+
+    Just as MutationSearch, stops reading at the first blank line.
+
+    Returns:
+        paths to the shards, in order
+    """
+    shard_size = shard_size or lines_per_shard
+    os.makedirs(uploads_dir, exist_ok=True)
+
+    paths = []
+    lines = iter(file_storage)
+    is_complete = False
+
+    while not is_complete:
+        shard = []
+        for line in islice(lines, shard_size):
+            if not line.strip():
+                is_complete = True
+                break
+            shard.append(line)
+
+        if len(shard) < shard_size:
+            is_complete = True
+
+        if shard:
+            handle, path = mkstemp(dir=uploads_dir, suffix='.vcf')
+            with os.fdopen(handle, 'wb') as f:
+                f.writelines(shard)
+            paths.append(path)
+
+    return paths
+
+
 class SearchTask:
 
     def __init__(self, vcf_file, textarea_query: str, filter_manager: SearchViewFilters, dataset_uri=None):
+        # vcf_file is a path to the uploaded file (file objects are not serializable)
         self.vcf_file = vcf_file
         self.textarea_query = textarea_query
         self.filter_manager = filter_manager
@@ -42,6 +91,102 @@ class SearchTask:
 
 @celery.task
 def search_task(task_data):
+    """Stream the search results (of a single shard) into a SearchResultsStore.
+
+    Returns:
+        path to the store with the results and the uri of a dataset to save the results to
+    """
     task = SearchTask.from_serialized(**task_data)
-    mutation_search = MutationSearch(task.vcf_file, task.textarea_query, task.filter_manager)
-    return pickle_as_str(mutation_search), task.dataset_uri
+    store = SearchResultsStore.create()
+
+    if task.vcf_file:
+        with open(task.vcf_file, 'rb') as vcf_file:
+            MutationSearch(vcf_file, task.textarea_query, task.filter_manager, store=store)
+        os.remove(task.vcf_file)
+    else:
+        MutationSearch(None, task.textarea_query, task.filter_manager, store=store)
+
+    return store.path, task.dataset_uri
+
+
+@celery.task
+def merge_search_results(shards_results: List[Tuple[str, str]], dataset_uri=None):
+    """Merge the stores of the results of search shards (in order of shards)."""
+    store = SearchResultsStore.create()
+    store.extend(SearchResultsStore(path) for path, shard_dataset_uri in shards_results)
+    return store.path, dataset_uri
+
+
+def shards_group_id(search_id):
+    return search_id + '-shards'
+
+
+def start_sharded_search(vcf_file, textarea_query: str, filter_manager: SearchViewFilters, dataset_uri=None):
+    """Split the search into shards (line ranges of the VCF file) searched in parallel.
+
+    The text query is searched together with the last shard as it comes
+    after the VCF file in the serial search.
+
+    Returns:
+        AsyncResult of the task merging the results of shards
+    """
+    paths = split_uploaded_file(vcf_file) if vcf_file else []
+    if not paths:
+        paths = [None]
+
+    serialized_filter_manager = pickle.dumps(filter_manager)
+
+    shards = [
+        search_task.s(
+            SearchTask(
+                path,
+                textarea_query if i == len(paths) - 1 else None,
+                serialized_filter_manager
+            ).serialize()
+        )
+        for i, path in enumerate(paths)
+    ]
+
+    result = chord(shards)(merge_search_results.s(dataset_uri=dataset_uri))
+
+    # so that the shards (and their progress) can be retrieved using id of the search
+    GroupResult(shards_group_id(result.id), result.parent.results, app=celery).save()
+
+    return result
+
+
+def search_progress(search_id) -> Tuple[str, float]:
+    """Aggregate the progress of all shards of a search.
+
+    Returns:
+        status and progress (a fraction) of the search
+    """
+    celery_task = celery.AsyncResult(search_id)
+    status = celery_task.status
+
+    if status == 'SUCCESS':
+        return status, 1
+
+    shards = GroupResult.restore(shards_group_id(search_id), app=celery)
+    if not shards:
+        return status, 0
+
+    progress = 0
+    for shard in shards.results:
+        if shard.status == 'FAILURE':
+            return shard.status, 0
+        if shard.status == 'SUCCESS':
+            progress += 1
+        elif shard.status == 'PROGRESS':
+            progress += shard.result.get('progress', 0)
+            status = 'PROGRESS'
+
+    return status, progress / len(shards.results)
+
+
+def forget_search(search_id):
+    shards = GroupResult.restore(shards_group_id(search_id), app=celery)
+    if shards:
+        shards.forget()
+        shards.delete()
+    celery.AsyncResult(search_id).forget()
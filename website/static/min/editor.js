@@ -0,0 +1,66 @@
+function append(destination,new_content)
+{Array.prototype.push.apply(destination,new_content)}
+function update_object(modified_obj,modifying_obj)
+{$.extend(modified_obj,modifying_obj)}
+function get_remote_if_needed(new_config,name,callback)
+{var value=new_config[name]
+if(typeof value==='string')
+{$.get({url:value,success:function(data)
+{new_config[name]=data
+if(callback)
+{return callback()}}})}
+else
+{if(callback)
+{return callback()}}}
+function get_url_params()
+{var params_string=decodeURIComponent(window.location.search)
+params_string=params_string.substr(1)
+var params_list=params_string.split('&')
+var params={}
+for(var i=0;i<params_list.length;i++)
+{var param=params_list[i].split('=')
+var key=param[0]
+var value=param[1]
+if(key)
+params[key]=value}
+return params}
+function affix(element,bottom_element)
+{element.css('position','static');element.css('width','');element.width(element.width());element.css('position','');element.affix({offset:{top:function(){return(this.top=element.offset().top)},bottom:function(){return(this.bottom=bottom_element.outerHeight())}}})
+var parent=$(element.parent());function update_min_height()
+{element.css('position','static');parent.css('min-height','');parent.css('min-height',parent.height())
+element.css('position','');}
+update_min_height();element.on('PotentialAffixChange',update_min_height);$(window).on('resize',function()
+{affix(element,bottom_element)})}
+$('body').off().on('click','.list-expand',function(){var elem=$(this)
+var parent=$(elem.parent())
+parent.toggleClass('list-collapsed')
+if(elem.text()==='more')
+elem.text('less')
+else
+elem.text('more')
+parent.trigger('PotentialAffixChange');return false})
+var p=console.log
+function format(template,variables)
+{return template.replace(/{{ (\w+) }}/g,function(full_match,match){if(!(match in variables)){console.warn(match,'not found in',variables,'for',template);}
+return variables[match]});}
+function set_csrf_token(token)
+{$.ajaxPrefilter(function(options,originalOptions,jqXHR){jqXHR.setRequestHeader('X-Csrftoken',token);})}
+function decode_url_pattern(flask_url_pattern)
+{return decodeURIComponent(flask_url_pattern).replace(/\+/g,' ');}
+function flash(message,category){if(!category)
+category='warning'
+$('.flashes').append('<div class="alert alert-'+category+'" role="alert">'+message+' </div>')}
+function init_tinymce(config)
+{var default_config={selector:'textarea',body_class:'page-content',content_css:['/static/min/page.css','https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/css/bootstrap.min.css'],images_upload_url:'/admin/upload/image',file_picker_types:'file image',file_picker_callback:function(callback,value,meta){var input=document.createElement('input');input.setAttribute('type','file');input.setAttribute('accept','image/*, application/pdf');input.onchange=function(){var file=this.files[0];var form_data=new FormData();form_data.append('file',file);$.ajax({url:'/admin/upload/image',type:'POST',data:form_data,async:true,success:function(response){callback(response.location,{title:file.name});},cache:false,contentType:false,processData:false});}
+input.click()},height:260,branding:false,browser_spellcheck:true,plugins:'anchor advlist autolink link image lists charmap print preview fullscreen table imagetools textcolor colorpicker searchreplace code codesample autoresize visualblocks',toolbar:'undo redo | styleselect | bold italic | alignleft aligncenter alignright alignjustify | bullist numlist outdent indent | link image | codesample visualblocks',table_default_attributes:{'class':'table table-bordered table-hover'},autoresize_max_height:600,table_class_list:[{title:'Default',value:'table table-bordered table-hover'},{title:'Hover, Striped',value:'table table-bordered table-hover table-striped '},{title:'Hover, Striped, without borders',value:'table table-hover table-striped table-borderless'},{title:'Hover, without borders',value:'table table-hover table-borderless'},{title:'Outer Border Only',value:'table table-outer-border'},{title:'Clear',value:'table table-borderless'}],codesample_languages:[{text:'HTML/XML',value:'markup'},{text:'JavaScript',value:'javascript'},{text:'CSS',value:'css'},{text:'Python',value:'python'},{text:'Bash',value:'bash'}]}
+$(document).ready(function(){update_object(default_config,config)
+var editors=$(default_config.selector);delete default_config.selector
+editors.each(function(){var config={}
+update_object(config,default_config)
+if($(this).data('compact'))
+{config.elementpath=false
+config.statusbar=false
+config.menubar=false
+config.content_style='body{padding-bottom:0!important}'}
+config.target=this
+tinymce.init(config)})})}
\ No newline at end of file
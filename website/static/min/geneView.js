@@ -0,0 +1,150 @@
+function append(destination,new_content)
+{Array.prototype.push.apply(destination,new_content)}
+function update_object(modified_obj,modifying_obj)
+{$.extend(modified_obj,modifying_obj)}
+function get_remote_if_needed(new_config,name,callback)
+{var value=new_config[name]
+if(typeof value==='string')
+{$.get({url:value,success:function(data)
+{new_config[name]=data
+if(callback)
+{return callback()}}})}
+else
+{if(callback)
+{return callback()}}}
+function get_url_params()
+{var params_string=decodeURIComponent(window.location.search)
+params_string=params_string.substr(1)
+var params_list=params_string.split('&')
+var params={}
+for(var i=0;i<params_list.length;i++)
+{var param=params_list[i].split('=')
+var key=param[0]
+var value=param[1]
+if(key)
+params[key]=value}
+return params}
+function affix(element,bottom_element)
+{element.css('position','static');element.css('width','');element.width(element.width());element.css('position','');element.affix({offset:{top:function(){return(this.top=element.offset().top)},bottom:function(){return(this.bottom=bottom_element.outerHeight())}}})
+var parent=$(element.parent());function update_min_height()
+{element.css('position','static');parent.css('min-height','');parent.css('min-height',parent.height())
+element.css('position','');}
+update_min_height();element.on('PotentialAffixChange',update_min_height);$(window).on('resize',function()
+{affix(element,bottom_element)})}
+$('body').off().on('click','.list-expand',function(){var elem=$(this)
+var parent=$(elem.parent())
+parent.toggleClass('list-collapsed')
+if(elem.text()==='more')
+elem.text('less')
+else
+elem.text('more')
+parent.trigger('PotentialAffixChange');return false})
+var p=console.log
+function format(template,variables)
+{return template.replace(/{{ (\w+) }}/g,function(full_match,match){if(!(match in variables)){console.warn(match,'not found in',variables,'for',template);}
+return variables[match]});}
+function set_csrf_token(token)
+{$.ajaxPrefilter(function(options,originalOptions,jqXHR){jqXHR.setRequestHeader('X-Csrftoken',token);})}
+function decode_url_pattern(flask_url_pattern)
+{return decodeURIComponent(flask_url_pattern).replace(/\+/g,' ');}
+function flash(message,category){if(!category)
+category='warning'
+$('.flashes').append('<div class="alert alert-'+category+'" role="alert">'+message+' </div>')}
+var AsyncFiltersHandler=function()
+{var config;var form;var current_state_checksum;var filters_separator=';'
+var field_separator=':'
+var sub_value_separator=','
+var quote_char='\''
+function make_checksum(query)
+{return md5(query);}
+function serialize_new_format($form)
+{var filters_list=$form.serializeArray()
+var filters={}
+var others=[]
+filters_list.forEach(function(filter){var name=filter.name;if(name.match(/filter\[(.*)\]/)==null)
+{if(name==='fallback')
+filter.value=false
+others.push(name+'='+filter.value)
+return}
+name=name.slice(7,-1)
+if(name in filters)
+filters[name]+=sub_value_separator+filter.value
+else
+filters[name]=filter.value})
+var filter_strings=[]
+$.each(filters,function(key,value){filter_strings.push(key+field_separator+'None'+field_separator+value)})
+var query=filter_strings.join(filters_separator)
+if(query)
+query='filters='+query
+if(others){query+=query?'&':'?';query+=others.join('&')}
+return query}
+function serialize_form($form)
+{var filters_query=$form.serialize()
+var checksum=make_checksum(filters_query);if(filters_query.length>=1800)
+filters_query=serialize_new_format($form)
+filters_query+=filters_query?'&':'?';filters_query+='checksum='+checksum;return filters_query}
+function make_query_url(parameters)
+{var location=window.location.href;var splitted=location.split('#');var hash=splitted.length>0?splitted[1]:'';location=splitted[0].split('?')[0];if(parameters){location+='?'+parameters;}
+if(hash){location+='#'+hash;}
+return location;}
+function on_update(do_not_save)
+{if(form.find('.block').length!==0){return false}
+var filters_query=serialize_form(form);apply(filters_query,do_not_save);}
+function serialize_fragment($dom_fragment)
+{return $dom_fragment.find('input,select').serialize()}
+function is_response_actual(data)
+{return make_checksum(form.serialize())===data.checksum;}
+function does_response_differ_from_current_state(data)
+{return current_state_checksum!=data.checksum}
+function update_form_html(data,from_future)
+{var html=$.parseHTML(data.dynamic_widgets);if(from_future)
+{form.get(0).reset()
+form.deserialize(history.state.form)
+form.trigger('PotentialAffixChange');}
+var dynamic_widgets=$('.dynamic-widgets');if(serialize_fragment(dynamic_widgets)!==serialize_fragment($(html)))
+{dynamic_widgets.html(html);dynamic_widgets.trigger('PotentialAffixChange');}}
+function update_link(element,filters_string)
+{var $a=$(element);var pattern=decode_url_pattern($a.data('url-pattern'));var new_href=format(pattern,{filters:filters_string});new_href=new_href.replace(/(&|\?)(.*?)=(&|$)/,'');$a.attr('href',new_href);}
+function load(data,from_future)
+{var filters_data=data.filters;if(!(is_response_actual(filters_data)&&does_response_differ_from_current_state(filters_data))&&!from_future)
+{console.log('Skipping outdated response');return}
+current_state_checksum=filters_data.checksum
+config.data_handler(data.content,filters_data);update_form_html(filters_data,from_future);if(config.links_to_update)
+{config.links_to_update.each(function(){update_link(this,filters_data.query)});}
+config.on_loading_end();}
+function update_history(query,replace)
+{var history_action=history.pushState;if(replace)
+history_action=history.replaceState;var state={filters_query:query,form:form.serialize(),handler:'filters'};history_action(state,'',make_query_url(query));}
+function apply(filters_query,do_not_save,from_future)
+{config.on_loading_start();current_state_checksum=null;$.ajax({url:config.endpoint_url,data:filters_query,success:function(data){var filters_query=''
+if(data.filters.query)
+filters_query+='filters='+data.filters.query
+load(data,from_future)
+update_history(filters_query,do_not_save)}});}
+function get_value(filter_name)
+{var matched=form.serializeArray().filter(function(o){return o.name==='filter['+filter_name+']'})
+if(matched.length!==1)
+return undefined
+return matched[0].value}
+return{init:function(new_config)
+{config=new_config;form=config.form;form.on('change','select, input:not([type=text]):not(.programmatic)',function(){on_update()});var timer;form.on('input','input[type=text]:not(.programmatic)',function(){if(timer)
+window.clearTimeout(timer)
+timer=window.setTimeout(function(){timer=null
+on_update()},config.input_delay||200)});form.find('.save').hide()
+update_history(window.location.search.substring(1),true)},value:get_value,load:load,apply:apply,on_update:on_update};};var Widgets=(function(){var form
+var select_sth_popover={content:'You should select at least one option',placement:'top',trigger:'manual'}
+function update(){form.submit()}
+function checkbox_list(uls)
+{function block(ul)
+{ul.popover('show');ul.addClass('block');}
+function release(ul)
+{ul.popover('hide');ul.removeClass('block');}
+uls.each(function(){var ul=$(this);var checkboxes=ul.find('input[type=checkbox]:not(.programmatic)');var check_all=ul.find('.check-all input');ul.popover(select_sth_popover);check_all.click(function(){checkboxes.prop('checked',this.checked);if(this.checked){release(ul);$(checkboxes[0]).trigger('change')}
+else{block(ul);}});checkboxes.change(function(){if(this.checked){release(ul);if(checkboxes.filter(':not(:checked)').length===0){check_all.prop('checked',true)}}
+else if(checkboxes.filter(':checked').length===0){block(ul);event.stopImmediatePropagation()}
+else{check_all.prop('checked',false)}})})}
+return{init:function(form_to_submit,onupdate)
+{form=$(form_to_submit);if(onupdate)
+{update=function()
+{onupdate(form)}}
+form.find('.save').hide();form.on('change','.widget select,.widget input:not(.programmatic)',update);checkbox_list(form.find('.widget .checkbox-list:not(.nullable)'));}};}());
\ No newline at end of file
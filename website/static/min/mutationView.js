@@ -0,0 +1,268 @@
+function append(destination,new_content)
+{Array.prototype.push.apply(destination,new_content)}
+function update_object(modified_obj,modifying_obj)
+{$.extend(modified_obj,modifying_obj)}
+function get_remote_if_needed(new_config,name,callback)
+{var value=new_config[name]
+if(typeof value==='string')
+{$.get({url:value,success:function(data)
+{new_config[name]=data
+if(callback)
+{return callback()}}})}
+else
+{if(callback)
+{return callback()}}}
+function get_url_params()
+{var params_string=decodeURIComponent(window.location.search)
+params_string=params_string.substr(1)
+var params_list=params_string.split('&')
+var params={}
+for(var i=0;i<params_list.length;i++)
+{var param=params_list[i].split('=')
+var key=param[0]
+var value=param[1]
+if(key)
+params[key]=value}
+return params}
+function affix(element,bottom_element)
+{element.css('position','static');element.css('width','');element.width(element.width());element.css('position','');element.affix({offset:{top:function(){return(this.top=element.offset().top)},bottom:function(){return(this.bottom=bottom_element.outerHeight())}}})
+var parent=$(element.parent());function update_min_height()
+{element.css('position','static');parent.css('min-height','');parent.css('min-height',parent.height())
+element.css('position','');}
+update_min_height();element.on('PotentialAffixChange',update_min_height);$(window).on('resize',function()
+{affix(element,bottom_element)})}
+$('body').off().on('click','.list-expand',function(){var elem=$(this)
+var parent=$(elem.parent())
+parent.toggleClass('list-collapsed')
+if(elem.text()==='more')
+elem.text('less')
+else
+elem.text('more')
+parent.trigger('PotentialAffixChange');return false})
+var p=console.log
+function format(template,variables)
+{return template.replace(/{{ (\w+) }}/g,function(full_match,match){if(!(match in variables)){console.warn(match,'not found in',variables,'for',template);}
+return variables[match]});}
+function set_csrf_token(token)
+{$.ajaxPrefilter(function(options,originalOptions,jqXHR){jqXHR.setRequestHeader('X-Csrftoken',token);})}
+function decode_url_pattern(flask_url_pattern)
+{return decodeURIComponent(flask_url_pattern).replace(/\+/g,' ');}
+function flash(message,category){if(!category)
+category='warning'
+$('.flashes').append('<div class="alert alert-'+category+'" role="alert">'+message+' </div>')}
+var Tooltip=function()
+{var body=d3.select('body').node()
+var element
+var tooltip
+var cached_tooltip_size
+var tooltip_content
+var ignore_next_signal=false;var active=true;var viewport
+var preprocess_data
+var callback
+var pointerOffsetX=0
+var pointerOffsetY=0
+var stuck=false
+var visible=false
+function addEventListener(selection,type,listener)
+{if(selection.empty())
+return
+var old_callback=selection.on(type)
+if(old_callback)
+{selection.on(type,function(e)
+{old_callback.call(this,e)
+listener.call(this,e)})}
+else
+{selection.on(type,listener)}}
+var _render_local=function(d)
+{tooltip_content.html(_template.call(element,d))
+_update_tooltip_size()}
+var _render_with_preprocess=function(d)
+{tooltip_content.html('Loading...')
+_update_tooltip_size()
+preprocess_data.call(element,d,_render_local)}
+var render_template=_render_local
+var _template=function(d)
+{return d.title}
+var _update_tooltip_size=function(){cached_tooltip_size=tooltip.node().getBoundingClientRect()}
+function _move(left,top)
+{if(!cached_tooltip_size)
+_update_tooltip_size()
+var viewport_size=viewport.getBoundingClientRect()
+left=Math.min(left,viewport_size.right-cached_tooltip_size.width)
+left=Math.max(left,viewport_size.left)
+top=Math.max(top,viewport_size.top)
+top=Math.min(top,viewport_size.bottom-cached_tooltip_size.height)
+var scrollTop=window.pageYOffset||document.documentElement.scrollTop||document.body.scrollTop
+var scrollLeft=window.pageXOffset||document.documentElement.scrollLeft||document.body.scrollLeft
+tooltip.style('left',scrollLeft+left+'px').style('top',scrollTop+top+'px')}
+var publicSpace={init:function(config)
+{tooltip=d3.select('body').append('div').attr('class','tooltip popover').style('opacity',0).style('pointer-events','none')
+var wrapper=tooltip.append('div').attr('class','wrapper')
+tooltip_content=wrapper.append('div').attr('class','popover-content')
+if(config.template)
+_template=config.template
+if(config.callback)
+callback=config.callback
+d3.select('body').on('mouseup.'+config.id,publicSpace.unstick)
+wrapper.append('button').attr('class','close').html('x').on('click',publicSpace.unstick)
+if(config.viewport)
+viewport=config.viewport
+else
+viewport=body
+if(config.preprocess_data)
+{preprocess_data=config.preprocess_data
+render_template=_render_with_preprocess}},show:function(d)
+{if(ignore_next_signal)
+{ignore_next_signal=false
+return}
+if(!active)
+return
+if(stuck)
+return
+if(element!==this)
+{element=this
+render_template(d)
+if(callback)
+callback(tooltip_content.node())}
+visible=true
+publicSpace.moveToPointer()
+tooltip.transition().duration(50).style('opacity',1)},hide:function(keep_element)
+{if(stuck||!visible)
+return
+tooltip.transition().duration(200).style('opacity',0)
+if(!keep_element)
+element=null
+visible=false},ignore_next_signal:function()
+{ignore_next_signal=true;},active:function(value)
+{active=value},stick:function(d)
+{if(ignore_next_signal)
+{ignore_next_signal=false
+return}
+if(d3.event.defaultPrevented)return
+publicSpace.unstick()
+publicSpace.show.call(this,d)
+tooltip.style('pointer-events','auto')
+stuck=true
+d3.event.stopPropagation()},unstick:function()
+{stuck=false
+publicSpace.hide(true)
+tooltip.style('pointer-events','none')},moveToPointer:function()
+{if(stuck||!visible)
+return
+var size=element.getBoundingClientRect()
+pointerOffsetX=d3.event.clientX-size.left
+pointerOffsetY=d3.event.clientY-size.top
+_move(d3.event.clientX,d3.event.clientY)},moveToElement:function()
+{if(!element||!visible)
+return
+var size=element.getBoundingClientRect()
+_move(size.left+pointerOffsetX,size.top+pointerOffsetY)},bind:function(selection)
+{addEventListener(selection,'click',publicSpace.stick)
+addEventListener(selection,'mouseover',publicSpace.show)
+addEventListener(selection,'mousemove',publicSpace.moveToPointer)
+addEventListener(selection,'mouseout',publicSpace.hide)
+tooltip.on('mouseup',function(){d3.event.stopPropagation()})
+tooltip.on('click',function(){setTimeout(function(){_update_tooltip_size()
+publicSpace.moveToElement()},0)})},remove:function()
+{tooltip.remove()}}
+return publicSpace}
+function get_protein_details_url(refseq)
+{var href='/protein/details/'+refseq
+var params=get_url_params()
+var query_string=$.param(params)
+if(query_string)
+{href+='?'+query_string}
+return href}
+function initializeKinaseTooltips(selection)
+{var kinase_tooltip=Tooltip()
+kinase_tooltip.init({id:'kinase',preprocess_data:function(d,render_template_cb){var context=this
+$.ajax({url:get_protein_details_url($(this).data('refseq')),success:function(data){render_template_cb.call(context,data)}})},template:function(kinase){return nunjucks.render('kinase_tooltip.njk',{kinase:kinase,site:$(this).data('site')})}})
+if(!selection)
+selection=d3.selectAll('.kinase')
+selection.call(kinase_tooltip.bind)
+return kinase_tooltip}
+var Export=function()
+{var svg_element
+var file_name
+var style_url
+var styles
+function get_styles()
+{$.ajax({url:style_url,type:'GET',success:function(code)
+{styles=code
+publicSpace.export_svg()}})}
+var publicSpace={init:function(element,title,style_address,custom_exporters,initial_style)
+{svg_element=element
+file_name=title
+style_url=style_address
+styles=initial_style
+$('.export_svg').click(publicSpace.export_svg)
+$('.export_print').click(publicSpace.export_print)
+if(custom_exporters)
+{publicSpace.set_custom_exporters(custom_exporters)}},set_custom_exporters:function(exporters)
+{var menu=$('.export-menu')
+menu.find('.custom_exporter').remove()
+exporters.forEach(function(exporter){var element=$('<li><a href="'+exporter.url+'" class="custom_exporter" target="_blank"><span class="glyphicon glyphicon-'+exporter.icon+'"></span> '+exporter.name+'</a>')
+menu.append(element)})},update_title:function(title)
+{file_name=title},export_svg:function(event)
+{if(style_url&&styles===undefined)
+{get_styles()
+return}
+var element_code=svg_element.innerHTML
+if(!element_code.match(/<svg[^>]+xmlns="http\:\/\/www\.w3\.org\/2000\/svg"/))
+{element_code=element_code.replace(/<svg/,'<svg xmlns="http://www.w3.org/2000/svg"')}
+if(!element_code.match(/<svg[^>]+"http\:\/\/www\.w3\.org\/1999\/xlink"/)){element_code=element_code.replace(/<svg/,'<svg xmlns:xlink="http://www.w3.org/1999/xlink"')}
+var css=''
+if(styles)
+css+=styles
+element_code=element_code.replace(/<svg(.*?)>/,'<svg $1><style type="text/css">/* <![CDATA[ */\n'+css+'\n/* ]]> */\n</style>')
+var svg_blob=new Blob([element_code],{type:'image/svg+xml;charset=utf-8'})
+var svg_content_url=URL.createObjectURL(svg_blob)
+var temp_link=document.createElement('a')
+temp_link.href=svg_content_url
+temp_link.style.display='none'
+temp_link.download=file_name+'.svg'
+document.body.appendChild(temp_link)
+temp_link.click()
+document.body.removeChild(temp_link)
+event.preventDefault()},export_print:function(event)
+{window.print()
+event.preventDefault()}}
+return publicSpace}
+var ShortURL=function()
+{var config={endpoint_get:'/get_shorthand_for_url_provided_in_get/',endpoint_use:'/use_shorthand/<shorthand>'}
+function getCurrentAddress()
+{var full_url=window.location.href.split('/')
+var address=''
+for(var i=3;i<full_url.length;i++)
+{address+='/'
+address+=full_url[i]}
+return address}
+function getShortURL(btn,dropdown)
+{$.ajax({url:config.endpoint_get,type:'GET',data:{address:encodeURIComponent(getCurrentAddress())},success:function(btn,dropdown)
+{return function(result)
+{btn.data('shorthand',result)
+var html=get_html(btn)
+dropdown.html(html)
+activate_copy_button(dropdown)}}(btn,dropdown)})}
+function activate_copy_button(dropdown)
+{var copy_btn=dropdown.find('.copy-btn')[0]
+if(copy_btn)
+new Clipboard(copy_btn)}
+function get_html(btn,dropdown){var shorthand=btn.data('shorthand')
+if(!shorthand)
+{getShortURL(btn,dropdown)
+return'Generating short URL, just for you... <span class="glyphicon glyphicon-refresh glyphicon-spin"></span>'}
+return nunjucks.render('short_url_popup.njk',{url:config.endpoint_use.replace('<shorthand>',shorthand)})}
+var publicSpace={init:function(endpoint_get,endpoint_use)
+{config.endpoint_get=decodeURIComponent(endpoint_get)
+config.endpoint_use=decodeURIComponent(endpoint_use)
+var dropdown_wrapper=$('.short-url-btn').parent()
+dropdown_wrapper.on('show.bs.dropdown',function()
+{var btn=$(this).find('.short-url-btn')
+var dropdown=$(this).find('.dropdown-menu')
+dropdown.html(get_html(btn,dropdown))
+activate_copy_button(dropdown)})
+dropdown_wrapper.find('.dropdown-menu').on('click',function(event){event.stopPropagation()})},reset:function()
+{var btn=$('.short-url-btn');btn.data('shorthand','');var dropdown=btn.parent().find('.dropdown.open .dropdown-toggle')
+dropdown.dropdown('toggle');}}
+return publicSpace}
\ No newline at end of file
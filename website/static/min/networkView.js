@@ -0,0 +1,983 @@
+function append(destination,new_content)
+{Array.prototype.push.apply(destination,new_content)}
+function update_object(modified_obj,modifying_obj)
+{$.extend(modified_obj,modifying_obj)}
+function get_remote_if_needed(new_config,name,callback)
+{var value=new_config[name]
+if(typeof value==='string')
+{$.get({url:value,success:function(data)
+{new_config[name]=data
+if(callback)
+{return callback()}}})}
+else
+{if(callback)
+{return callback()}}}
+function get_url_params()
+{var params_string=decodeURIComponent(window.location.search)
+params_string=params_string.substr(1)
+var params_list=params_string.split('&')
+var params={}
+for(var i=0;i<params_list.length;i++)
+{var param=params_list[i].split('=')
+var key=param[0]
+var value=param[1]
+if(key)
+params[key]=value}
+return params}
+function affix(element,bottom_element)
+{element.css('position','static');element.css('width','');element.width(element.width());element.css('position','');element.affix({offset:{top:function(){return(this.top=element.offset().top)},bottom:function(){return(this.bottom=bottom_element.outerHeight())}}})
+var parent=$(element.parent());function update_min_height()
+{element.css('position','static');parent.css('min-height','');parent.css('min-height',parent.height())
+element.css('position','');}
+update_min_height();element.on('PotentialAffixChange',update_min_height);$(window).on('resize',function()
+{affix(element,bottom_element)})}
+$('body').off().on('click','.list-expand',function(){var elem=$(this)
+var parent=$(elem.parent())
+parent.toggleClass('list-collapsed')
+if(elem.text()==='more')
+elem.text('less')
+else
+elem.text('more')
+parent.trigger('PotentialAffixChange');return false})
+var p=console.log
+function format(template,variables)
+{return template.replace(/{{ (\w+) }}/g,function(full_match,match){if(!(match in variables)){console.warn(match,'not found in',variables,'for',template);}
+return variables[match]});}
+function set_csrf_token(token)
+{$.ajaxPrefilter(function(options,originalOptions,jqXHR){jqXHR.setRequestHeader('X-Csrftoken',token);})}
+function decode_url_pattern(flask_url_pattern)
+{return decodeURIComponent(flask_url_pattern).replace(/\+/g,' ');}
+function flash(message,category){if(!category)
+category='warning'
+$('.flashes').append('<div class="alert alert-'+category+'" role="alert">'+message+' </div>')}
+var AsyncFiltersHandler=function()
+{var config;var form;var current_state_checksum;var filters_separator=';'
+var field_separator=':'
+var sub_value_separator=','
+var quote_char='\''
+function make_checksum(query)
+{return md5(query);}
+function serialize_new_format($form)
+{var filters_list=$form.serializeArray()
+var filters={}
+var others=[]
+filters_list.forEach(function(filter){var name=filter.name;if(name.match(/filter\[(.*)\]/)==null)
+{if(name==='fallback')
+filter.value=false
+others.push(name+'='+filter.value)
+return}
+name=name.slice(7,-1)
+if(name in filters)
+filters[name]+=sub_value_separator+filter.value
+else
+filters[name]=filter.value})
+var filter_strings=[]
+$.each(filters,function(key,value){filter_strings.push(key+field_separator+'None'+field_separator+value)})
+var query=filter_strings.join(filters_separator)
+if(query)
+query='filters='+query
+if(others){query+=query?'&':'?';query+=others.join('&')}
+return query}
+function serialize_form($form)
+{var filters_query=$form.serialize()
+var checksum=make_checksum(filters_query);if(filters_query.length>=1800)
+filters_query=serialize_new_format($form)
+filters_query+=filters_query?'&':'?';filters_query+='checksum='+checksum;return filters_query}
+function make_query_url(parameters)
+{var location=window.location.href;var splitted=location.split('#');var hash=splitted.length>0?splitted[1]:'';location=splitted[0].split('?')[0];if(parameters){location+='?'+parameters;}
+if(hash){location+='#'+hash;}
+return location;}
+function on_update(do_not_save)
+{if(form.find('.block').length!==0){return false}
+var filters_query=serialize_form(form);apply(filters_query,do_not_save);}
+function serialize_fragment($dom_fragment)
+{return $dom_fragment.find('input,select').serialize()}
+function is_response_actual(data)
+{return make_checksum(form.serialize())===data.checksum;}
+function does_response_differ_from_current_state(data)
+{return current_state_checksum!=data.checksum}
+function update_form_html(data,from_future)
+{var html=$.parseHTML(data.dynamic_widgets);if(from_future)
+{form.get(0).reset()
+form.deserialize(history.state.form)
+form.trigger('PotentialAffixChange');}
+var dynamic_widgets=$('.dynamic-widgets');if(serialize_fragment(dynamic_widgets)!==serialize_fragment($(html)))
+{dynamic_widgets.html(html);dynamic_widgets.trigger('PotentialAffixChange');}}
+function update_link(element,filters_string)
+{var $a=$(element);var pattern=decode_url_pattern($a.data('url-pattern'));var new_href=format(pattern,{filters:filters_string});new_href=new_href.replace(/(&|\?)(.*?)=(&|$)/,'');$a.attr('href',new_href);}
+function load(data,from_future)
+{var filters_data=data.filters;if(!(is_response_actual(filters_data)&&does_response_differ_from_current_state(filters_data))&&!from_future)
+{console.log('Skipping outdated response');return}
+current_state_checksum=filters_data.checksum
+config.data_handler(data.content,filters_data);update_form_html(filters_data,from_future);if(config.links_to_update)
+{config.links_to_update.each(function(){update_link(this,filters_data.query)});}
+config.on_loading_end();}
+function update_history(query,replace)
+{var history_action=history.pushState;if(replace)
+history_action=history.replaceState;var state={filters_query:query,form:form.serialize(),handler:'filters'};history_action(state,'',make_query_url(query));}
+function apply(filters_query,do_not_save,from_future)
+{config.on_loading_start();current_state_checksum=null;$.ajax({url:config.endpoint_url,data:filters_query,success:function(data){var filters_query=''
+if(data.filters.query)
+filters_query+='filters='+data.filters.query
+load(data,from_future)
+update_history(filters_query,do_not_save)}});}
+function get_value(filter_name)
+{var matched=form.serializeArray().filter(function(o){return o.name==='filter['+filter_name+']'})
+if(matched.length!==1)
+return undefined
+return matched[0].value}
+return{init:function(new_config)
+{config=new_config;form=config.form;form.on('change','select, input:not([type=text]):not(.programmatic)',function(){on_update()});var timer;form.on('input','input[type=text]:not(.programmatic)',function(){if(timer)
+window.clearTimeout(timer)
+timer=window.setTimeout(function(){timer=null
+on_update()},config.input_delay||200)});form.find('.save').hide()
+update_history(window.location.search.substring(1),true)},value:get_value,load:load,apply:apply,on_update:on_update};};var Widgets=(function(){var form
+var select_sth_popover={content:'You should select at least one option',placement:'top',trigger:'manual'}
+function update(){form.submit()}
+function checkbox_list(uls)
+{function block(ul)
+{ul.popover('show');ul.addClass('block');}
+function release(ul)
+{ul.popover('hide');ul.removeClass('block');}
+uls.each(function(){var ul=$(this);var checkboxes=ul.find('input[type=checkbox]:not(.programmatic)');var check_all=ul.find('.check-all input');ul.popover(select_sth_popover);check_all.click(function(){checkboxes.prop('checked',this.checked);if(this.checked){release(ul);$(checkboxes[0]).trigger('change')}
+else{block(ul);}});checkboxes.change(function(){if(this.checked){release(ul);if(checkboxes.filter(':not(:checked)').length===0){check_all.prop('checked',true)}}
+else if(checkboxes.filter(':checked').length===0){block(ul);event.stopImmediatePropagation()}
+else{check_all.prop('checked',false)}})})}
+return{init:function(form_to_submit,onupdate)
+{form=$(form_to_submit);if(onupdate)
+{update=function()
+{onupdate(form)}}
+form.find('.save').hide();form.on('change','.widget select,.widget input:not(.programmatic)',update);checkbox_list(form.find('.widget .checkbox-list:not(.nullable)'));}};}());var Orbits=function()
+{var nodes=null
+var central_node=null
+var by_node={}
+var orbits=[]
+var config={order_by:'r',stroke:2.2,spacing:15,first_ring_scale:1.5}
+function configure(new_config)
+{if(!new_config)return
+update_object(config,new_config)}
+function perimeter(R)
+{return 2*Math.PI*R}
+function compareNodes(a,b)
+{if(a[config.order_by]<b[config.order_by])
+return-1
+if(a[config.order_by]>b[config.order_by])
+return 1
+return 0}
+function Orbit(number,initial_outer_radius)
+{this.number=number
+this.nodes_count=0
+this.outer_radius=initial_outer_radius
+this.radius=null
+this.width=0
+this.space_available=perimeter(this.outer_radius)
+this.addNode=function(node)
+{by_node[node.name]=this.number
+this.nodes_count+=1}
+this.setDimensions=function(outer_radius)
+{this.radius=outer_radius-this.width}
+this.getSpaceRequiredForNewNode=function()
+{var angle=2*Math.asin(this.width/this.outer_radius)
+return this.outer_radius*angle}
+this.recalculateSpace=function(old_perimeter)
+{var percent_available=this.space_available/old_perimeter
+this.space_available=perimeter(this.outer_radius)*percent_available}}
+function newOrbit(initial_outer_radius)
+{var orbit=new Orbit(orbits.length,initial_outer_radius)
+orbits.push(orbit)
+return orbit}
+function calculateOrbits()
+{var base_length=central_node.r*config.first_ring_scale
+var orbit=newOrbit(base_length)
+for(var i=0;i<nodes.length;i++)
+{var node=nodes[i]
+var node_width=node.r+config.stroke
+if(node_width>orbit.width)
+{var old_perimeter=perimeter(orbit.outer_radius)
+orbit.width=node_width
+orbit.outer_radius=base_length+orbit.width*2
+orbit.recalculateSpace(old_perimeter)}
+var space_for_node=orbit.getSpaceRequiredForNewNode()
+if(orbit.space_available<space_for_node)
+{orbit.setDimensions(orbit.outer_radius)
+base_length=orbit.outer_radius+config.spacing
+orbit=newOrbit(base_length+node_width*2)
+orbit.width=node_width
+space_for_node=orbit.getSpaceRequiredForNewNode()}
+orbit.addNode(node)
+orbit.space_available-=space_for_node}
+orbit.setDimensions(orbit.outer_radius)}
+function getSlots()
+{var slots=new Array(orbits.length)
+for(var i=0;i<orbits.length;i++)
+slots[i]=orbits[i].nodes_count
+return slots}
+var publicSpace={init:function(orbiting_nodes,the_central_node,config)
+{nodes=orbiting_nodes
+central_node=the_central_node
+configure(config)
+nodes.sort(compareNodes)
+calculateOrbits()},getRadiusByNode:function(node)
+{return orbits[by_node[node.name]].radius},getOrbit:function(node)
+{return orbits[by_node[node.name]]},getMaximalRadius:function()
+{var orbit=orbits[orbits.length-1]
+return orbit.radius+orbit.width},placeNodes:function()
+{var slots=getSlots()
+for(var i=0;i<nodes.length;i++)
+{var node=nodes[i]
+var orbit_id=by_node[node.name]
+var orbit=orbits[orbit_id]
+var full_circle=Math.PI*2
+var fraction_occupied=slots[orbit_id]/orbit.nodes_count
+var angle=full_circle*fraction_occupied
+node.x=orbit.radius*Math.cos(angle)+central_node.x
+node.y=orbit.radius*Math.sin(angle)+central_node.y
+slots[orbit_id]-=1}}}
+return publicSpace}
+var Tooltip=function()
+{var body=d3.select('body').node()
+var element
+var tooltip
+var cached_tooltip_size
+var tooltip_content
+var ignore_next_signal=false;var active=true;var viewport
+var preprocess_data
+var callback
+var pointerOffsetX=0
+var pointerOffsetY=0
+var stuck=false
+var visible=false
+function addEventListener(selection,type,listener)
+{if(selection.empty())
+return
+var old_callback=selection.on(type)
+if(old_callback)
+{selection.on(type,function(e)
+{old_callback.call(this,e)
+listener.call(this,e)})}
+else
+{selection.on(type,listener)}}
+var _render_local=function(d)
+{tooltip_content.html(_template.call(element,d))
+_update_tooltip_size()}
+var _render_with_preprocess=function(d)
+{tooltip_content.html('Loading...')
+_update_tooltip_size()
+preprocess_data.call(element,d,_render_local)}
+var render_template=_render_local
+var _template=function(d)
+{return d.title}
+var _update_tooltip_size=function(){cached_tooltip_size=tooltip.node().getBoundingClientRect()}
+function _move(left,top)
+{if(!cached_tooltip_size)
+_update_tooltip_size()
+var viewport_size=viewport.getBoundingClientRect()
+left=Math.min(left,viewport_size.right-cached_tooltip_size.width)
+left=Math.max(left,viewport_size.left)
+top=Math.max(top,viewport_size.top)
+top=Math.min(top,viewport_size.bottom-cached_tooltip_size.height)
+var scrollTop=window.pageYOffset||document.documentElement.scrollTop||document.body.scrollTop
+var scrollLeft=window.pageXOffset||document.documentElement.scrollLeft||document.body.scrollLeft
+tooltip.style('left',scrollLeft+left+'px').style('top',scrollTop+top+'px')}
+var publicSpace={init:function(config)
+{tooltip=d3.select('body').append('div').attr('class','tooltip popover').style('opacity',0).style('pointer-events','none')
+var wrapper=tooltip.append('div').attr('class','wrapper')
+tooltip_content=wrapper.append('div').attr('class','popover-content')
+if(config.template)
+_template=config.template
+if(config.callback)
+callback=config.callback
+d3.select('body').on('mouseup.'+config.id,publicSpace.unstick)
+wrapper.append('button').attr('class','close').html('x').on('click',publicSpace.unstick)
+if(config.viewport)
+viewport=config.viewport
+else
+viewport=body
+if(config.preprocess_data)
+{preprocess_data=config.preprocess_data
+render_template=_render_with_preprocess}},show:function(d)
+{if(ignore_next_signal)
+{ignore_next_signal=false
+return}
+if(!active)
+return
+if(stuck)
+return
+if(element!==this)
+{element=this
+render_template(d)
+if(callback)
+callback(tooltip_content.node())}
+visible=true
+publicSpace.moveToPointer()
+tooltip.transition().duration(50).style('opacity',1)},hide:function(keep_element)
+{if(stuck||!visible)
+return
+tooltip.transition().duration(200).style('opacity',0)
+if(!keep_element)
+element=null
+visible=false},ignore_next_signal:function()
+{ignore_next_signal=true;},active:function(value)
+{active=value},stick:function(d)
+{if(ignore_next_signal)
+{ignore_next_signal=false
+return}
+if(d3.event.defaultPrevented)return
+publicSpace.unstick()
+publicSpace.show.call(this,d)
+tooltip.style('pointer-events','auto')
+stuck=true
+d3.event.stopPropagation()},unstick:function()
+{stuck=false
+publicSpace.hide(true)
+tooltip.style('pointer-events','none')},moveToPointer:function()
+{if(stuck||!visible)
+return
+var size=element.getBoundingClientRect()
+pointerOffsetX=d3.event.clientX-size.left
+pointerOffsetY=d3.event.clientY-size.top
+_move(d3.event.clientX,d3.event.clientY)},moveToElement:function()
+{if(!element||!visible)
+return
+var size=element.getBoundingClientRect()
+_move(size.left+pointerOffsetX,size.top+pointerOffsetY)},bind:function(selection)
+{addEventListener(selection,'click',publicSpace.stick)
+addEventListener(selection,'mouseover',publicSpace.show)
+addEventListener(selection,'mousemove',publicSpace.moveToPointer)
+addEventListener(selection,'mouseout',publicSpace.hide)
+tooltip.on('mouseup',function(){d3.event.stopPropagation()})
+tooltip.on('click',function(){setTimeout(function(){_update_tooltip_size()
+publicSpace.moveToElement()},0)})},remove:function()
+{tooltip.remove()}}
+return publicSpace}
+function prepareZoom(min,max,callback)
+{return d3.behavior.zoom().scaleExtent([min,max]).on('zoom',callback).on('zoomstart',function(){if(d3.event.sourceEvent)d3.event.sourceEvent.stopPropagation()})}
+var Zoom=function(css_zoom)
+{var svg;var min;var max;var config;var zoom;var viewport;var svg_canvas;var viewport_size=[];function callback()
+{transform(d3.event.translate,d3.event.scale,0);config.on_move(this)}
+function transform(translate,scale,animation_speed)
+{zoom.translate(translate);zoom.scale(scale);if(animation_speed)
+{svg_canvas.transition().duration(animation_speed).attr('transform','translate('+translate+')scale('+scale+')');}
+else
+{svg_canvas.attr('transform','translate('+translate+')scale('+scale+')');}}
+function set_viewport_size(width,height)
+{viewport_size[0]=width;viewport_size[1]=height;svg.attr('viewBox','0 0 '+width+' '+height);svg.attr('width',width+'px');svg.attr('height',height+'px');svg.style('transform-origin','top left');}
+function trim_scale(new_scale)
+{zoom.scale(new_scale);return zoom.scale();}
+var public_space={init:function(user_config,new_transform){if(new_transform)
+transform=new_transform
+config=user_config;svg=config.element;svg_canvas=config.inner_element;min=config.min;max=config.max;zoom=prepareZoom(min,max,callback);viewport=d3.select(config.viewport);viewport.call(zoom).on('dblclick.zoom',null)},viewport_to_canvas:function(position){return position},canvas_to_viewport:function(position){return position},set_viewport_size:set_viewport_size,set_zoom:function(new_scale)
+{new_scale=trim_scale(new_scale)
+var translate=zoom.translate();transform(translate,new_scale,600)},center_on:function(position,radius,animation_speed)
+{animation_speed=(typeof animation_speed==='undefined')?750:animation_speed;var scale=Math.min(viewport_size[0],viewport_size[1])/radius;scale=trim_scale(scale)
+position[0]*=-scale;position[1]*=-scale;position[0]+=viewport_size[0]/2;position[1]+=viewport_size[1]/2;transform(position,scale,animation_speed)},fit_contents:function(animation_speed)
+{var bbox=svg_canvas.node().getBBox();var w=bbox.width;var h=bbox.height;var ratio=viewport_size[1]/viewport_size[0];var scale=Math.max(w*ratio,h);public_space.center_on([bbox.x+w/2,bbox.y+h/2],scale,animation_speed);},get_zoom:function(){return zoom.scale();}}
+var CSS_Zoom=function(my_parent)
+{var parent=my_parent
+var canvas_size=[];function transform(translate,scale,animation_speed)
+{translate[0]=Math.min(0,Math.max(viewport_size[0]-canvas_size[0]*scale,translate[0]));translate[1]=Math.min(0,Math.max(viewport_size[1]-canvas_size[1]*scale,translate[1]));zoom.translate(translate);zoom.scale(scale);if(animation_speed)
+{svg.transition().duration(animation_speed).attr('transform','translate('+translate+')scale('+scale+')');}
+else
+{svg.attr('transform','translate('+translate+')scale('+scale+')');}}
+function set_viewport_size(width,height)
+{canvas_size[0]=Math.max(width*config.max,width/config.min);canvas_size[1]=Math.max(height*config.max,height/config.min);parent.set_viewport_size(canvas_size[0],canvas_size[1])
+viewport_size[0]=width;viewport_size[1]=height;}
+function viewport_to_canvas(position)
+{return[position[0]/viewport_size[0]*canvas_size[0],position[1]/viewport_size[1]*canvas_size[1]]}
+function canvas_to_viewport(position)
+{return[position[0]*viewport_size[0]/canvas_size[0],position[1]*viewport_size[1]/canvas_size[1]]}
+var public_space={init:function(user_config)
+{parent.init(user_config,transform)},viewport_to_canvas:viewport_to_canvas,canvas_to_viewport:canvas_to_viewport,set_viewport_size:set_viewport_size,set_zoom:function(new_scale)
+{var old_scale=zoom.scale();new_scale=trim_scale(new_scale)
+var translate=zoom.translate();var factor=old_scale-new_scale;translate=[translate[0]+factor*canvas_size[0]/2,translate[1]+factor*canvas_size[1]/2];transform(translate,new_scale,600)}}
+return $.extend({},parent,public_space);}
+if(css_zoom)
+return CSS_Zoom(public_space)
+else
+return public_space}
+var CSSZoom=function()
+{return Zoom(true)}
+function choose_best_zoom()
+{var agent=navigator.userAgent;var is_ie=!!document.documentMode;var is_edge=agent.indexOf('Edge')>-1;var is_safari=agent.indexOf('Safari')>-1;var is_chrome=agent.indexOf('Chrome')>-1;var is_opera=agent.indexOf('Opera')>-1;if(is_safari&&is_chrome)
+is_safari=false;var match=navigator.userAgent.match(/Chrom(e|ium)\/([0-9]+)\./)
+var old_chrome=match?parseInt(match[2],10)<57:false
+if(is_safari||is_edge||is_ie||is_opera||old_chrome)
+return Zoom;else
+return CSSZoom;}
+function prepareSVG(element)
+{return d3.select(element).append('svg').attr('preserveAspectRatio','xMinYMin meet').attr('class','svg-content-responsive')}
+function clone(object)
+{return JSON.parse(JSON.stringify(object))}
+var Network=function()
+{var sites
+var groups
+var central_node
+var force_manager
+var nodes
+var svg
+var links
+var zoom
+var edges=[]
+var orbits
+var dispatch=d3.dispatch('networkmove')
+var types={kinase:new String('Kinase'),drug:new String('Drug'),group:new String('Family or group'),site:new String('Site'),central:new String('Analysed protein')}
+var tooltip
+function fitTextIntoCircle(d,context)
+{var radius=d.r
+return Math.min(2*radius,(2*radius-8)/context.getComputedTextLength()*24)}
+function calculateRadius()
+{return config.radius}
+function createProteinNode(protein)
+{var radius=calculateRadius()
+var name=protein.name
+if(!protein.is_preferred)
+{name+='\n('+protein.refseq+')'}
+var pos=zoom.viewport_to_canvas([(config.width-radius)/2,(config.height-radius)/2]);return{type:types.central,name:name,r:radius,x:pos[0],y:pos[1],fixed:true,protein:protein}}
+var config={element:null,data:null,width:600,height:null,ratio:1,responsive:true,show_sites:true,clone_by_site:true,default_link_distance:100,site_kinase_link_weight:1.15,collide_drugs:true,site_size_unit:5,radius:6,nodeURL:(function(node){return window.location.href+'#'+node.protein.refseq}),min_zoom:1/4,max_zoom:3}
+function configure(new_config,callback)
+{update_object(config,new_config);get_remote_if_needed(config,'data',callback)}
+function select_kinases_by_name(names,kinases)
+{var all_matching_kinases=[];for(var i=0;i<names.length;i++)
+{var name=names[i];var matching_kinases=kinases.filter(function(kinase){return kinase.name===name});append(all_matching_kinases,matching_kinases);}
+return all_matching_kinases}
+function addEdge(source,target,weight)
+{weight=weight||1
+edges.push({source:source,target:target,weight:weight})}
+function prepareSites(sites,standalone_kinases)
+{var cloned_kinases=[]
+function parse(site)
+{site.visible_interactors=0
+site.name=site.position+' '+site.residue
+site.size=Math.max(site.name.length,6)*config.site_size_unit
+site.size+=site.mutations_count/2
+site.r=Math.sqrt(site.size*site.size/4)
+site.type=types.site
+site.collisions_active=true
+site.group=undefined
+addEdge(site,central_node)
+var site_kinases=select_kinases_by_name(site.kinases,standalone_kinases);append(site_kinases,select_kinases_by_name(site.kinase_groups,groups));site.interactors=[];function associate_kinase_with_site(kinase_template)
+{var kinase;if(config.clone_by_site)
+{if(kinase_template.used)
+{kinase=clone(kinase_template);cloned_kinases.push(kinase)}
+else{kinase_template.used=true
+kinase=kinase_template}}
+else{kinase=kinase_template}
+addEdge(kinase,site,config.site_kinase_link_weight);site.interactors.push(kinase);site.visible_interactors+=1}
+site_kinases.forEach(associate_kinase_with_site);}
+sites.forEach(parse);return cloned_kinases}
+function prepareKinases(all_kinases)
+{var kinases=[]
+for(var i=0;i<all_kinases.length;i++)
+{var kinase=all_kinases[i]
+kinase.type=types.kinase
+kinase.collisions_active=false
+kinase.r=calculateRadius()
+kinase.group=undefined
+kinase.site=undefined
+if(central_node.protein.kinases.indexOf(kinase.name)!==-1)
+{kinase=clone(kinase)
+kinases.push(kinase)
+if(!config.show_sites)
+{addEdge(kinase,central_node)}}}
+return kinases}
+function prepareKinaseGroups(groups,all_kinases)
+{var cloned_kinases=[];function parse(group)
+{group.kinases_names=group.kinases;group.type=types.group;group.drugs=[];function is_in_group(kinase)
+{return group.kinases_names.indexOf(kinase.name)!==-1}
+var group_kinases=all_kinases.filter(is_in_group);var mutations_in_kinases=0;function associate_kinase_with_group(kinase_template)
+{var kinase=clone(kinase_template);cloned_kinases.push(kinase);kinase.group=group;mutations_in_kinases+=kinase.protein?kinase.protein.mutations_count:0;addEdge(kinase,group);}
+group_kinases.forEach(associate_kinase_with_group);group.r=calculateRadius();if(!config.show_sites)
+addEdge(group,central_node)}
+groups.forEach(parse);return cloned_kinases;}
+function linkDistance(edge)
+{if(edge.source.link_distance)
+{return edge.source.link_distance}
+if(edge.target.index===0)
+{return orbits.getRadiusByNode(edge.source)}
+if(edge.target.type===types.group)
+{if(edge.target.expanded)
+{return edge.target.r+edge.source.r}
+return 0}
+return config.default_link_distance/edge.weight}
+function ForceManager(config)
+{var force_affected_nodes=[];var force_affected_links=[];var force;force=d3.layout.force().friction(0.5).gravity(0).distance(100).charge(charge).size(config.size).linkDistance(linkDistance);var public_space={drag:force.drag,charge:force.charge,start:force.start,stop:force.stop,on:force.on,set_size:function(size){force.size(size)},hide_nodes_links:function(node)
+{var to_remove=[];for(var e=0;e<force_affected_links.length;e++)
+{var edge=force_affected_links[e];if(edge.source==node)
+to_remove.push(edge)}
+for(var r=0;r<to_remove.length;r++)
+{var index=force_affected_links.indexOf(to_remove[r]);force_affected_links.splice(index,1);}
+node._removed_links=to_remove;},restore_nodes_links:function(node)
+{if(node._removed_links)
+{for(var e=0;e<node._removed_links.length;e++)
+{force_affected_links.push(node._removed_links[e])}}},hide_from_force:function(node)
+{var index=force_affected_nodes.indexOf(node);if(index!==-1)
+force_affected_nodes.splice(index,1)},make_visible_for_force:function(node)
+{force_affected_nodes.push(node)},settle_force:function(n)
+{force.start();for(var i=n;i>0;--i)force.tick()
+force.stop();},update_force_affected_nodes:function(nodes_data,links_data)
+{if(nodes_data)
+append(force_affected_nodes,nodes_data);if(links_data)
+append(force_affected_links,links_data);force.nodes(force_affected_nodes);force.links(force_affected_links);}}
+return public_space;}
+function create_versor(x,y)
+{var length=Math.sqrt(Math.pow(x,2)+Math.pow(y,2))
+if(length===0)
+return[0,0]
+else
+return[x/length,y/length]}
+function switchGroupState(group,state,time)
+{time=(time===undefined)?600:time
+group.expanded=(state===undefined)?!group.expanded:state
+function inGroup(d)
+{return group===d.group}
+function fadeInOut(selection)
+{selection.transition().ease('linear').duration(time).attr('opacity',group.expanded?1:0)}
+refresh_group_collisions_state(group);nodes.filter(inGroup).each(function(node){node.collapsed=!group.expanded;group.visible_interactors+=(node.collapsed?-1:+1)
+if(node.collapsed)
+{node.x=group.x;node.y=group.y;force_manager.hide_from_force(node);force_manager.hide_nodes_links(node);}
+else
+{var center_of_interest;if(group.site&&group.site.exposed)
+center_of_interest=group.site;else
+center_of_interest=central_node;var versor=create_versor(center_of_interest.x-group.x,center_of_interest.y-group.y);versor=versor.map(function(c){return Math.random()*2*node.r*c});node.x=group.x-versor[0];node.y=group.y-versor[1];force_manager.restore_nodes_links(node);force_manager.make_visible_for_force(node);}})
+var scale=group.expanded?1:0
+nodes.selectAll('.shape').filter(inGroup).transition().ease('linear').duration(time).attr('transform','scale('+scale+')')
+nodes.selectAll('.name').filter(inGroup).call(fadeInOut)
+links.filter(function(e){return inGroup(e.source)}).call(fadeInOut)
+force_manager.update_force_affected_nodes()}
+function focusOn(node,radius,animation_speed)
+{var area=radius*2.2
+zoom.center_on([node.x,node.y],area,animation_speed)}
+function charge(node)
+{if(node.group){if(node.collapsed)
+{return 0}
+if(!node.site)
+return-10
+return-150/node.group.site.visible_interactors}
+if((node.type==types.kinase||node.type==types.drug||node.type==types.group)&&!(node.site&&node.site.exposed)){if(!node.site)
+return-10
+return-150/node.site.visible_interactors}
+return 0}
+function refresh_group_collisions_state(group){if(!config.show_sites)return
+var site=group.site
+for(var j=0;j<group.kinases.length;j++){var kinase=group.kinases[j]
+kinase.collisions_active=group.expanded&&site.exposed}}
+function is_site_protein_edge(site)
+{return function(edge){return edge.source===site}}
+function stop_exposing_site(site)
+{site.exposed=false
+site.fixed=false
+site.link_distance=site.previous_link_distance
+force_manager.charge(charge)
+force_manager.start()
+var link=links.filter(is_site_protein_edge(site)).transition().duration(3000)
+link.attr('class','link')
+tooltip.unstick()
+tooltip.hide()
+tooltip.ignore_next_signal()}
+function expose_site(site,camera_speed)
+{var link=links.filter(is_site_protein_edge(site)).transition().duration(3000)
+site.exposed=true
+var shift=get_max_radius()*1.5
+var max_distance_squared=0
+for(var i=0;i<site.interactors.length;i++)
+{var interactor=site.interactors[i]
+var distance_squared=Math.pow(site.x-interactor.x,2)+Math.pow(site.y-interactor.y,2)
+if(distance_squared>max_distance_squared)
+max_distance_squared=distance_squared}
+var versor=create_versor(site.x-central_node.x,site.y-central_node.y)
+var screen_ratio=1.2
+shift=shift*Math.abs(versor[0])*screen_ratio+shift*Math.abs(versor[1])/screen_ratio
+var dest=[central_node.x+shift*versor[0],central_node.y+shift*versor[1]]
+site.previous_link_distance=site.link_distance
+site.link_distance=shift
+site.x=dest[0]
+site.y=dest[1]
+tooltip.active(false);focusOn({x:dest[0],y:dest[1]},Math.sqrt(max_distance_squared)*1.15,camera_speed);setTimeout(function(){tooltip.active(true);site.fixed=true},camera_speed);force_manager.start()
+tooltip.unstick()
+tooltip.hide()
+tooltip.ignore_next_signal()
+link.attr('class','link link-dimmed')}
+function node_dbl_click(node)
+{if(d3.event.defaultPrevented===false)
+{if(node.type===types.group)
+{switchGroupState(node)
+tooltip.unstick()
+tooltip.hide()
+force_manager.start()}
+else if(node.type===types.site)
+{node.fixed=false
+var site=node
+var camera_speed=2500
+if(site.exposed)
+{var return_camera_speed=camera_speed/5;stop_exposing_site(site);tooltip.active(false);public_space.zoom_fit(return_camera_speed);setTimeout(function(){tooltip.active(true)},return_camera_speed);}
+else
+{for(var s=0;s<sites.length;s++)
+{var tested_site=sites[s]
+if(tested_site.exposed)
+{stop_exposing_site(tested_site)}}
+expose_site(site,camera_speed)
+force_manager.charge(0)}
+for(var i=0;i<site.interactors.length;i++)
+{var interactor=site.interactors[i]
+interactor.fixed=false
+interactor.collisions_active=site.exposed
+if(interactor.type==types.group)
+{refresh_group_collisions_state(interactor);}
+for(var d=0;d<interactor.drugs.length;d++)
+{interactor.drugs[d].fixed=false}}}
+force_manager.on('tick',create_ticker())}}
+function node_click(node)
+{if(d3.event.shiftKey&&node!==central_node)
+{node.fixed=false
+tooltip.ignore_next_signal()}}
+function nodeHover(node,hover_in)
+{if(node.type===types.site)
+{nodes.filter(function(d){return node.interactors.indexOf(d)!==-1}).classed('hover',hover_in)}
+else
+{nodes.filter(function(d){return d.name===node.name}).classed('hover',hover_in)}}
+function collide(node_1,node_2,min_dist,min_dist_pow)
+{var x=node_1.x-node_2.x
+var y=node_1.y-node_2.y
+var distance=Math.pow(x,2)+Math.pow(y,2)
+if(distance<min_dist_pow)
+{var l=Math.sqrt(distance)
+var change=(min_dist-l)/2
+if(l)
+{x/=l
+x*=change
+y/=l
+y*=change}
+else{x=min_dist/2
+y=min_dist/2}
+node_1.x+=x
+node_1.y+=y
+node_2.x-=x
+node_2.y-=y}}
+function arrange_in_line(node_1,node_2,node_3,drugs_count_minus_one)
+{var x=node_1.x-node_2.x
+var y=node_1.y-node_2.y
+var angle=Math.atan2(y,x)
+x=node_2.x-node_3.x
+y=node_2.y-node_3.y
+var drug_angle=Math.atan2(y,x)
+if(Math.abs(angle-drug_angle)<0.4*drugs_count_minus_one)
+return
+var distance=Math.pow(x,2)+Math.pow(y,2)
+var l=Math.sqrt(distance)
+var dx=Math.cos(angle)
+var dy=Math.sin(angle)
+node_3.x=(2*node_3.x+node_2.x-dx*l)/3
+node_3.y=(2*node_3.y+node_2.y-dy*l)/3}
+function collide_nodes(nodes,padding,constant_radius)
+{var collide_node
+nodes=nodes.data()
+if(constant_radius)
+{var min_dist=2*constant_radius+padding
+var min_dist_squared=Math.pow(min_dist,2)
+collide_node=function(node)
+{for(var i=0;i<nodes.length;i++)
+{var other_node=nodes[i]
+if(node!==other_node)
+{collide(node,other_node,min_dist,min_dist_squared)}}}}
+else
+{collide_node=function(node)
+{for(var i=0;i<nodes.length;i++)
+{var other_node=nodes[i]
+if(node!==other_node)
+{var min_dist=node.r+other_node.r+padding
+collide(node,other_node,min_dist,min_dist*min_dist)}}}}
+return collide_node}
+function collide_nodes_belonging_to_exposed_sites(exposed_sites,padding)
+{var r=config.radius
+var d=2*r+padding
+var d2=Math.pow(d,2)
+var kinases=[]
+var groups=[]
+exposed_sites.each(function(site){var interactors=site.interactors;append(kinases,interactors);append(groups,interactors.filter(function(node){return node.type==types.group&&node.expanded}))})
+for(var g=0;g<groups.length;g++)
+{var group=groups[g];append(kinases,group.kinases);}
+kinases=kinases.filter(function(kinase){return kinase.collisions_active})
+function collide_sites_nodes()
+{for(var i=0;i<kinases.length;i++)
+{var kinase_one=kinases[i]
+for(var j=i+1;j<kinases.length;j++)
+{var kinase_two=kinases[j]
+collide(kinase_one,kinase_two,d,d2)}}}
+return collide_sites_nodes}
+function create_ticker()
+{var site_nodes=nodes.filter(is_of_type(types.site));var drug_nodes=nodes.filter(is_of_type(types.drug));var site_collider=collide_nodes(site_nodes,3)
+var drugs_collider=collide_nodes(drug_nodes,1,config.radius*0.8)
+var exposed_sites=site_nodes.filter(function(node){return node.exposed});var nodes_collider=collide_nodes_belonging_to_exposed_sites(exposed_sites,3);var drugs_by_site={}
+exposed_sites.each(function(site)
+{drugs_by_site[site]=[]
+site.interactors.forEach(function(kinase)
+{append(drugs_by_site[site],kinase.drugs)})})
+function force_tick(e)
+{exposed_sites.each(function(site)
+{site.interactors.forEach(function(kinase)
+{var l=kinase.drugs.length-1
+kinase.drugs.forEach(function(drug)
+{arrange_in_line(site,kinase,drug,l)})})})
+site_nodes.each(site_collider);exposed_sites.each(nodes_collider);if(config.collide_drugs)
+drug_nodes.each(drugs_collider);links.attr('x1',function(d){return d.source.x}).attr('y1',function(d){return d.source.y}).attr('x2',function(d){return d.target.x}).attr('y2',function(d){return d.target.y})
+nodes.attr('transform',function(d){return'translate('+[d.x,d.y]+')'});force_manager.start()
+dispatch.networkmove(this)}
+return force_tick}
+function resize()
+{if(config.responsive)
+{var dimensions=$(svg.node()).parent().get(0).getBoundingClientRect()
+config.width=dimensions.width
+config.height=dimensions.height
+config.ratio=dimensions.height/dimensions.width}
+else{config.height=config.height||config.width*config.ratio}
+zoom.set_viewport_size(config.width,config.height)}
+function is_of_type(type,negation)
+{if(negation)
+return function(node)
+{return node.type!=type}
+return function(node)
+{return node.type==type}}
+function create_drug_nodes(kinase_nodes)
+{var drugs=[]
+kinase_nodes.forEach(function(kinase){var kinase_drugs=[]
+kinase.drugs_targeting_kinase_gene.forEach(function(target_data)
+{var drug_node={name:target_data['drug'].name,r:config.radius,type:types.drug,group:kinase.group,data:target_data}
+addEdge(drug_node,kinase)
+kinase_drugs.push(drug_node)})
+kinase.drugs=kinase_drugs
+append(drugs,kinase_drugs)})
+return drugs}
+function create_nodes(data)
+{groups=data.kinase_groups;central_node=createProteinNode(data.protein);var nodes_data=[central_node];var standalone_kinases=prepareKinases(data.kinases);append(nodes_data,standalone_kinases);if(config.show_sites)
+{var cloned_kinases=prepareSites(data.sites,standalone_kinases);sites=data.sites;append(nodes_data,cloned_kinases.filter(is_of_type(types.kinase)));append(nodes_data,sites);append(groups,cloned_kinases.filter(is_of_type(types.kinase,true)))}
+else
+{sites=[]}
+var kinases_which_are_in_groups=prepareKinaseGroups(groups,data.kinases);append(nodes_data,groups);append(nodes_data,kinases_which_are_in_groups);var kinase_nodes=nodes_data.filter(is_of_type(types.kinase));groups.forEach(function(group){group.kinases=[]
+kinase_nodes.forEach(function(node){if(node.group&&node.group==group)
+{group.kinases.push(node)}})})
+var drug_nodes=create_drug_nodes(kinase_nodes)
+append(nodes_data,drug_nodes);sites.forEach(function(site){site.interactors.forEach(function(kinase){kinase.site=site});});nodes_data.forEach(function(node,index){node.id=index})
+return{all:nodes_data,groups:groups,sites:sites,standalone:standalone_kinases,kinases:kinase_nodes}}
+function place_interactors(node,interactors,angles_per_actor,link_distance){var sx=central_node.x-node.x
+var sy=central_node.y-node.y
+var alpha=Math.atan2(sy,sx)
+if(interactors.length>1)
+angles_per_actor/=interactors.length-1
+var angle=alpha-(interactors.length-1)/2*angles_per_actor
+for(var k=0;k<interactors.length;k++){var x=Math.cos(angle)*link_distance
+var y=Math.sin(angle)*link_distance
+var interactor=interactors[k]
+interactor.x=node.x-x
+interactor.y=node.y-y
+angle+=angles_per_actor}}
+function placeNodes(sites,standalone_kinases,kinases)
+{var orbiting_nodes
+orbits=Orbits()
+if(config.show_sites)
+orbiting_nodes=sites
+else
+orbiting_nodes=standalone_kinases.concat(groups)
+orbits.init(orbiting_nodes,central_node,{spacing:95,order_by:config.show_sites?'kinases_count':'r'})
+orbits.placeNodes()
+if(config.show_sites)
+{var link_distance=config.default_link_distance/config.site_kinase_link_weight
+for(var i=0;i<sites.length;i++)
+{var site=sites[i]
+var site_orbit=orbits.getOrbit(site)
+var angles_available_for_site=Math.PI*2/site_orbit.nodes_count
+place_interactors(site,site.interactors,angles_available_for_site,link_distance)}}
+var link=config.default_link_distance/config.site_kinase_link_weight
+for(var j=0;j<kinases.length;j++)
+{var kinase=kinases[j]
+place_interactors(kinase,kinase.drugs,Math.PI*2/360,link)}}
+function create_color_scale(domain,range)
+{return d3.scale.linear().domain(domain).interpolate(d3.interpolateRgb).range(range)}
+function get_max_radius()
+{var radius=orbits.getMaximalRadius()
+if(config.show_sites)
+radius+=config.default_link_distance
+return radius}
+function create_shapes()
+{function radians(x){return x*Math.PI/180}
+var ich_outer_angle=radians(150)
+var ich_inner_angle=radians(180)-ich_outer_angle
+function isotoxal_concave_hexagon_points(d){var points=[];var outscribed_triangle_edge=2*(d.r*Math.sqrt(3)/2)
+var edge=(outscribed_triangle_edge/2)/Math.sin(ich_outer_angle/2)
+var x=0;var y=-d.r;var x_change=Math.sin(ich_inner_angle/2)*edge
+var y_change=Math.cos(ich_inner_angle/2)*edge
+points.push([x,y])
+x+=x_change
+y+=y_change
+points.push([x,y])
+var lx=outscribed_triangle_edge/2-x_change
+var ly=Math.sin((radians(180)-ich_outer_angle)/2+ich_inner_angle)*edge
+x+=lx
+y+=ly
+points.push([x,y])
+x-=y_change
+y-=x_change
+points.push([x,y])
+x-=y_change
+y+=x_change
+points.push([x,y])
+x+=lx
+y-=ly
+points.push([x,y])
+return points}
+var octagon_cr_to_a_ratio=1/(Math.sqrt(4+2*Math.sqrt(2))/2);var octagon_angle=(180-135)*(2*Math.PI)/360;function octagon_points(d){var points=[];var a=d.r*octagon_cr_to_a_ratio;var x=-d.r+1;var y=d.r/2;for(var i=0;i<8;i++)
+{var angle=octagon_angle*(i+1);x+=a*Math.sin(angle);y+=a*Math.cos(angle);points.push([x,y])}
+return points}
+return{isotoxal_concave_hexagon:isotoxal_concave_hexagon_points,octagon:octagon_points}}
+function init_edges(vis,edges)
+{links=vis.selectAll('.link').data(edges).enter().append('line').attr('class','link')
+function kinase_site_with_mimp_effect(effect)
+{var effect_accessor='mimp_'+effect
+return function(d)
+{var site=d.target;if(site.type!=types.site)return false;var kinase=d.source
+return((kinase.type==types.kinase&&site[effect_accessor].indexOf(kinase.name)!==-1)||(kinase.type==types.group&&site[effect_accessor+'_family'].indexOf(kinase.name)!==-1))}}
+['losses','gains'].forEach(function(effect)
+{var effect_accessor='mimp_'+effect
+links.filter(kinase_site_with_mimp_effect(effect)).classed(effect+'-prediction',true).style('stroke-width',function(d){var kinase=d.source
+var accessor=effect_accessor
+if(kinase.type==types.group){accessor+='_family'}
+var site=d.target
+var count=0
+var mimp=site[accessor]
+for(var i=0;i<mimp.length;i++)
+{count+=(mimp[i]===kinase.name)}
+return count*1.5})})}
+function init_tooltips()
+{var tooltip=Tooltip()
+tooltip.init({id:'node',template:function(node){return nunjucks.render('node_tooltip.njk',{refseq:central_node.protein.refseq,node:node,types:types,nodeURL:config.nodeURL})},viewport:document.body,callback:function(element){$(element).find('.site-muts-table').bootstrapTable()}})
+dispatch.on('networkmove',function(){tooltip.moveToElement()})
+return tooltip}
+function init_nodes(vis,nodes_data,created_nodes)
+{tooltip=init_tooltips()
+nodes=vis.selectAll('.node').data(nodes_data).enter().append('g').attr('class','node').call(force_manager.drag).on('click',node_click).on('dblclick',node_dbl_click).on('mouseover',function(d){nodeHover(d,true)}).on('mouseout',function(d){nodeHover(d,false)}).on('mousedown',function(d){d3.event.stopPropagation()}).call(tooltip.bind)
+function nodes_subset(type){return nodes.filter(is_of_type(type));}
+var kinase_nodes=nodes_subset(types.kinase);var group_nodes=nodes_subset(types.group);var central_nodes=nodes_subset(types.central);var drug_nodes=nodes_subset(types.drug);var site_nodes=nodes_subset(types.site);var kinases_color_scale=create_color_scale([0,d3.max(created_nodes.standalone,function(d){return d.protein?d.protein.mutations_count:0})||0],['#ffffff','#007FFF']);kinase_nodes.append('circle').attr('r',function(d){return d.r}).attr('class','kinase protein-like shape')
+var shapes=create_shapes()
+drug_nodes.append('polygon').attr('points',shapes.isotoxal_concave_hexagon).attr('class','drug shape')
+group_nodes.append('polygon').attr('points',shapes.octagon).attr('class','group shape')
+central_nodes.append('ellipse').attr('rx',function(d){return d.r}).attr('ry',function(d){return d.r/5*4}).attr('class','central protein-like shape')
+nodes.selectAll('.protein-like').attr('fill',function(d){if(d.protein)
+return kinases_color_scale(d.protein.mutations_count)})
+site_nodes.attr('class',function(d){return'node '+d.impact}).append('rect').attr('width',function(d){return d.size+'px'}).attr('height',function(d){return d.size+'px'}).attr('class','site shape').attr('transform',function(d){return'translate('+[-d.size/2,-d.size/2]+')'})
+nodes.append('text').attr('class','name').text(function(d){return d.name}).style('font-size',function(d){if(d.type!==types.site)
+return fitTextIntoCircle(d,this)+'px'}).attr('y',function(d){if(d.type===types.drug)
+return d.r*0.8})
+site_nodes.selectAll('.name').style('font-size','8px').attr('dy','-0.5em')
+site_nodes.append('text').text(function(d){return d.sequence.slice(4,-4)}).style('font-size','5.5px').attr('dy','1.5em')
+group_nodes.append('text').attr('class','type').text(function(d){return'family '+d.kinases.length+'/'+d.total_cnt}).style('font-size',function(d){return fitTextIntoCircle(d,this)*0.5+'px'}).attr('dy',function(d){return fitTextIntoCircle(d,this)*0.35+'px'})}
+function init()
+{svg=prepareSVG(config.element)
+var vis=svg.append('g')
+zoom=(choose_best_zoom())()
+zoom.init({element:svg,inner_element:vis,min:config.min_zoom,max:config.max_zoom,viewport:svg.node().parentNode,on_move:function(event){dispatch.networkmove(event)}})
+svg.on('click',function(){if(d3.event.defaultPrevented)d3.event.stopPropagation()})
+resize()
+var created_nodes=create_nodes(config.data);var nodes_data=created_nodes.all;placeNodes(created_nodes.sites,created_nodes.standalone,created_nodes.kinases);force_manager=ForceManager({size:zoom.viewport_to_canvas([config.width,config.height])})
+force_manager.update_force_affected_nodes(nodes_data,edges)
+force_manager.drag().on('dragstart',function(d){d3.event.sourceEvent.stopPropagation()
+d.fixed=true})
+init_edges(vis,edges)
+init_nodes(vis,nodes_data,created_nodes)
+force_manager.start()
+groups.forEach(function(group){switchGroupState(group,false,0)});$(window).on('resize',resize)
+force_manager.settle_force(10);var ticker=create_ticker();force_manager.on('tick',ticker);ticker();public_space.zoom_fit(0)
+window.setTimeout(public_space.zoom_fit,1000)
+config.onload()}
+var public_space={init:function(user_config)
+{if(!user_config)
+{init()}
+else
+{configure(user_config,public_space.init)}},zoom_in:function(){zoom.set_zoom(zoom.get_zoom()*1.25)},zoom_out:function(){zoom.set_zoom(zoom.get_zoom()/1.25)},show_central:function(animation_speed)
+{var radius=get_max_radius();focusOn(central_node,radius,animation_speed)},zoom_fit:function(animation_speed){zoom.fit_contents(animation_speed)},destroy:function()
+{svg.remove()},resize:function(){resize();force_manager.set_size(zoom.viewport_to_canvas([config.width,config.height]))
+force_manager.start();}}
+return public_space}
+var Export=function()
+{var svg_element
+var file_name
+var style_url
+var styles
+function get_styles()
+{$.ajax({url:style_url,type:'GET',success:function(code)
+{styles=code
+publicSpace.export_svg()}})}
+var publicSpace={init:function(element,title,style_address,custom_exporters,initial_style)
+{svg_element=element
+file_name=title
+style_url=style_address
+styles=initial_style
+$('.export_svg').click(publicSpace.export_svg)
+$('.export_print').click(publicSpace.export_print)
+if(custom_exporters)
+{publicSpace.set_custom_exporters(custom_exporters)}},set_custom_exporters:function(exporters)
+{var menu=$('.export-menu')
+menu.find('.custom_exporter').remove()
+exporters.forEach(function(exporter){var element=$('<li><a href="'+exporter.url+'" class="custom_exporter" target="_blank"><span class="glyphicon glyphicon-'+exporter.icon+'"></span> '+exporter.name+'</a>')
+menu.append(element)})},update_title:function(title)
+{file_name=title},export_svg:function(event)
+{if(style_url&&styles===undefined)
+{get_styles()
+return}
+var element_code=svg_element.innerHTML
+if(!element_code.match(/<svg[^>]+xmlns="http\:\/\/www\.w3\.org\/2000\/svg"/))
+{element_code=element_code.replace(/<svg/,'<svg xmlns="http://www.w3.org/2000/svg"')}
+if(!element_code.match(/<svg[^>]+"http\:\/\/www\.w3\.org\/1999\/xlink"/)){element_code=element_code.replace(/<svg/,'<svg xmlns:xlink="http://www.w3.org/1999/xlink"')}
+var css=''
+if(styles)
+css+=styles
+element_code=element_code.replace(/<svg(.*?)>/,'<svg $1><style type="text/css">/* <![CDATA[ */\n'+css+'\n/* ]]> */\n</style>')
+var svg_blob=new Blob([element_code],{type:'image/svg+xml;charset=utf-8'})
+var svg_content_url=URL.createObjectURL(svg_blob)
+var temp_link=document.createElement('a')
+temp_link.href=svg_content_url
+temp_link.style.display='none'
+temp_link.download=file_name+'.svg'
+document.body.appendChild(temp_link)
+temp_link.click()
+document.body.removeChild(temp_link)
+event.preventDefault()},export_print:function(event)
+{window.print()
+event.preventDefault()}}
+return publicSpace}
+var ShortURL=function()
+{var config={endpoint_get:'/get_shorthand_for_url_provided_in_get/',endpoint_use:'/use_shorthand/<shorthand>'}
+function getCurrentAddress()
+{var full_url=window.location.href.split('/')
+var address=''
+for(var i=3;i<full_url.length;i++)
+{address+='/'
+address+=full_url[i]}
+return address}
+function getShortURL(btn,dropdown)
+{$.ajax({url:config.endpoint_get,type:'GET',data:{address:encodeURIComponent(getCurrentAddress())},success:function(btn,dropdown)
+{return function(result)
+{btn.data('shorthand',result)
+var html=get_html(btn)
+dropdown.html(html)
+activate_copy_button(dropdown)}}(btn,dropdown)})}
+function activate_copy_button(dropdown)
+{var copy_btn=dropdown.find('.copy-btn')[0]
+if(copy_btn)
+new Clipboard(copy_btn)}
+function get_html(btn,dropdown){var shorthand=btn.data('shorthand')
+if(!shorthand)
+{getShortURL(btn,dropdown)
+return'Generating short URL, just for you... <span class="glyphicon glyphicon-refresh glyphicon-spin"></span>'}
+return nunjucks.render('short_url_popup.njk',{url:config.endpoint_use.replace('<shorthand>',shorthand)})}
+var publicSpace={init:function(endpoint_get,endpoint_use)
+{config.endpoint_get=decodeURIComponent(endpoint_get)
+config.endpoint_use=decodeURIComponent(endpoint_use)
+var dropdown_wrapper=$('.short-url-btn').parent()
+dropdown_wrapper.on('show.bs.dropdown',function()
+{var btn=$(this).find('.short-url-btn')
+var dropdown=$(this).find('.dropdown-menu')
+dropdown.html(get_html(btn,dropdown))
+activate_copy_button(dropdown)})
+dropdown_wrapper.find('.dropdown-menu').on('click',function(event){event.stopPropagation()})},reset:function()
+{var btn=$('.short-url-btn');btn.data('shorthand','');var dropdown=btn.parent().find('.dropdown.open .dropdown-toggle')
+dropdown.dropdown('toggle');}}
+return publicSpace}
\ No newline at end of file
@@ -0,0 +1,60 @@
+var Export=function()
+{var svg_element
+var file_name
+var style_url
+var styles
+function get_styles()
+{$.ajax({url:style_url,type:'GET',success:function(code)
+{styles=code
+publicSpace.export_svg()}})}
+var publicSpace={init:function(element,title,style_address,custom_exporters,initial_style)
+{svg_element=element
+file_name=title
+style_url=style_address
+styles=initial_style
+$('.export_svg').click(publicSpace.export_svg)
+$('.export_print').click(publicSpace.export_print)
+if(custom_exporters)
+{publicSpace.set_custom_exporters(custom_exporters)}},set_custom_exporters:function(exporters)
+{var menu=$('.export-menu')
+menu.find('.custom_exporter').remove()
+exporters.forEach(function(exporter){var element=$('<li><a href="'+exporter.url+'" class="custom_exporter" target="_blank"><span class="glyphicon glyphicon-'+exporter.icon+'"></span> '+exporter.name+'</a>')
+menu.append(element)})},update_title:function(title)
+{file_name=title},export_svg:function(event)
+{if(style_url&&styles===undefined)
+{get_styles()
+return}
+var element_code=svg_element.innerHTML
+if(!element_code.match(/<svg[^>]+xmlns="http\:\/\/www\.w3\.org\/2000\/svg"/))
+{element_code=element_code.replace(/<svg/,'<svg xmlns="http://www.w3.org/2000/svg"')}
+if(!element_code.match(/<svg[^>]+"http\:\/\/www\.w3\.org\/1999\/xlink"/)){element_code=element_code.replace(/<svg/,'<svg xmlns:xlink="http://www.w3.org/1999/xlink"')}
+var css=''
+if(styles)
+css+=styles
+element_code=element_code.replace(/<svg(.*?)>/,'<svg $1><style type="text/css">/* <![CDATA[ */\n'+css+'\n/* ]]> */\n</style>')
+var svg_blob=new Blob([element_code],{type:'image/svg+xml;charset=utf-8'})
+var svg_content_url=URL.createObjectURL(svg_blob)
+var temp_link=document.createElement('a')
+temp_link.href=svg_content_url
+temp_link.style.display='none'
+temp_link.download=file_name+'.svg'
+document.body.appendChild(temp_link)
+temp_link.click()
+document.body.removeChild(temp_link)
+event.preventDefault()},export_print:function(event)
+{window.print()
+event.preventDefault()}}
+return publicSpace}
+function add_venn_tooltip(div,name){var tooltip=d3.select("body").append("div").attr("class","tooltip venn-tooltip");div.selectAll("g").on("mouseover",function(d,i){venn.sortAreas(div,d);tooltip.transition().duration(400).style("opacity",.9);tooltip.text(d.size+" "+name);var selection=d3.select(this).transition("tooltip").duration(400);selection.select("path").style("fill-opacity",d.sets.length==1?.4:.1).style("stroke-opacity",1);}).on("mousemove",function(){tooltip.style("left",(d3.event.pageX+10)+"px").style("top",(d3.event.pageY+10)+"px");}).on("mouseout",function(d,i){tooltip.transition().duration(400).style("opacity",0);var selection=d3.select(this).transition("tooltip").duration(400);selection.select("path").style("fill-opacity",d.sets.length==1?.25:.0).style("stroke-opacity",0);});}
+(function(){var resize_all=function(){if(Plotly===undefined)return
+$('.js-plotly-plot').each(function(i){Plotly.Plots.resize(this);})};$(document).on('click','.nav-tabs li',function(){if(Plotly===undefined)return
+var tab=$(this).find('a').attr('href')
+var plot=$(tab).find('.js-plotly-plot').get(0)
+if(plot!==undefined)
+Plotly.Plots.resize(plot);})
+window.onresize=resize_all})()
+plot=(function(){function save_svg(gd){console.log($(gd).width())
+Plotly.downloadImage(gd,{format:'svg',width:$(gd).width(),height:$(gd).height(),filename:gd.id})}
+function plot(element_id,data,layout){var COMMON_PLOT_OPTIONS={displaylogo:false,modeBarButtonsToAdd:[{name:'Save as SVG',icon:Plotly.Icons.camera,click:save_svg}]}
+return Plotly.newPlot(element_id,data,layout,COMMON_PLOT_OPTIONS)}
+return plot})()
\ No newline at end of file
@@ -0,0 +1,86 @@
+function append(destination,new_content)
+{Array.prototype.push.apply(destination,new_content)}
+function update_object(modified_obj,modifying_obj)
+{$.extend(modified_obj,modifying_obj)}
+function get_remote_if_needed(new_config,name,callback)
+{var value=new_config[name]
+if(typeof value==='string')
+{$.get({url:value,success:function(data)
+{new_config[name]=data
+if(callback)
+{return callback()}}})}
+else
+{if(callback)
+{return callback()}}}
+function get_url_params()
+{var params_string=decodeURIComponent(window.location.search)
+params_string=params_string.substr(1)
+var params_list=params_string.split('&')
+var params={}
+for(var i=0;i<params_list.length;i++)
+{var param=params_list[i].split('=')
+var key=param[0]
+var value=param[1]
+if(key)
+params[key]=value}
+return params}
+function affix(element,bottom_element)
+{element.css('position','static');element.css('width','');element.width(element.width());element.css('position','');element.affix({offset:{top:function(){return(this.top=element.offset().top)},bottom:function(){return(this.bottom=bottom_element.outerHeight())}}})
+var parent=$(element.parent());function update_min_height()
+{element.css('position','static');parent.css('min-height','');parent.css('min-height',parent.height())
+element.css('position','');}
+update_min_height();element.on('PotentialAffixChange',update_min_height);$(window).on('resize',function()
+{affix(element,bottom_element)})}
+$('body').off().on('click','.list-expand',function(){var elem=$(this)
+var parent=$(elem.parent())
+parent.toggleClass('list-collapsed')
+if(elem.text()==='more')
+elem.text('less')
+else
+elem.text('more')
+parent.trigger('PotentialAffixChange');return false})
+var p=console.log
+function format(template,variables)
+{return template.replace(/{{ (\w+) }}/g,function(full_match,match){if(!(match in variables)){console.warn(match,'not found in',variables,'for',template);}
+return variables[match]});}
+function set_csrf_token(token)
+{$.ajaxPrefilter(function(options,originalOptions,jqXHR){jqXHR.setRequestHeader('X-Csrftoken',token);})}
+function decode_url_pattern(flask_url_pattern)
+{return decodeURIComponent(flask_url_pattern).replace(/\+/g,' ');}
+function flash(message,category){if(!category)
+category='warning'
+$('.flashes').append('<div class="alert alert-'+category+'" role="alert">'+message+' </div>')}
+function initTable($table,query,additional_columns)
+{var initial_query=query
+function detailFormatter(index,row,$element)
+{$element.html('Loading...');var url;if(row.reactome)
+url=format(reactome_url,row);else
+url=format(gene_ontology_url,row);$.get(url,function(details){$element.html(nunjucks.render('pathway_details.njk',{pathway:details}))});}
+function pathway_formatter(value,row,index)
+{if(row.reactome){return'<a href="'+format(reactome_show,{id:row.reactome})+'">'+value+'</a>'}
+if(row.gene_ontology){return'<a href="'+format(gene_ontology_show,{id:row.gene_ontology})+'">'+value+'</a>'}
+return value}
+function idFormatter(value,row,index)
+{var ids=[]
+if(row.reactome)
+ids.push(format('Reactome: <a href="http://www.reactome.org/content/detail/R-HSA-{{ reactome }}">{{ reactome }}</a>',row))
+if(row.gene_ontology)
+ids.push(format('GO: <a href="http://amigo.geneontology.org/amigo/term/GO:{{ gene_ontology }}">{{ gene_ontology }}</a>',row))
+return ids.join('\n')}
+function genesFormatter(value,row,index)
+{return nunjucks.render('pathways_gene_list.njk',{genes:value,more:true})}
+var columns=[{title:'Name',field:'description',align:'center',valign:'middle',sortable:true,formatter:pathway_formatter},{title:'Pathway ID',align:'center',width:'150px',valign:'middle',formatter:idFormatter},{field:'gene_ontology',title:'Gene Ontology ID',sortable:true,visible:false,align:'center'},{field:'reactome',title:'Reactome ID',sortable:true,visible:false,align:'center'},{title:'# Genes',sortable:true,valign:'middle',align:'center',field:'gene_count'},{title:'Genes',valign:'middle',align:'center',field:'genes',formatter:genesFormatter}]
+if(additional_columns)
+append(columns,additional_columns)
+$table.bootstrapTable({detailFormatter:detailFormatter,columns:columns,formatLoadingMessage:function()
+{return'Loading, please wait... <span class="glyphicon glyphicon-refresh glyphicon-spin"></span>'},onSearch:function(){$table.bootstrapTable('showLoading')},silentSort:false,queryParams:function(params){if(initial_query)
+{params['search']=initial_query
+initial_query=null}
+return params}})
+$table.on('click-row.bs.table',function(e,row,$element)
+{$table.bootstrapTable('expandRow',$element.data('index'));})
+setTimeout(function(){$('.bootstrap-table .search input').val(query)},0)}
+function show_all_genes(btn)
+{var btn=$(btn)
+btn.closest('.gene-list').find('li').css('display','inline');btn.hide();event.stopPropagation()
+return false}
\ No newline at end of file
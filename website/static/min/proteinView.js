@@ -0,0 +1,635 @@
+function append(destination,new_content)
+{Array.prototype.push.apply(destination,new_content)}
+function update_object(modified_obj,modifying_obj)
+{$.extend(modified_obj,modifying_obj)}
+function get_remote_if_needed(new_config,name,callback)
+{var value=new_config[name]
+if(typeof value==='string')
+{$.get({url:value,success:function(data)
+{new_config[name]=data
+if(callback)
+{return callback()}}})}
+else
+{if(callback)
+{return callback()}}}
+function get_url_params()
+{var params_string=decodeURIComponent(window.location.search)
+params_string=params_string.substr(1)
+var params_list=params_string.split('&')
+var params={}
+for(var i=0;i<params_list.length;i++)
+{var param=params_list[i].split('=')
+var key=param[0]
+var value=param[1]
+if(key)
+params[key]=value}
+return params}
+function affix(element,bottom_element)
+{element.css('position','static');element.css('width','');element.width(element.width());element.css('position','');element.affix({offset:{top:function(){return(this.top=element.offset().top)},bottom:function(){return(this.bottom=bottom_element.outerHeight())}}})
+var parent=$(element.parent());function update_min_height()
+{element.css('position','static');parent.css('min-height','');parent.css('min-height',parent.height())
+element.css('position','');}
+update_min_height();element.on('PotentialAffixChange',update_min_height);$(window).on('resize',function()
+{affix(element,bottom_element)})}
+$('body').off().on('click','.list-expand',function(){var elem=$(this)
+var parent=$(elem.parent())
+parent.toggleClass('list-collapsed')
+if(elem.text()==='more')
+elem.text('less')
+else
+elem.text('more')
+parent.trigger('PotentialAffixChange');return false})
+var p=console.log
+function format(template,variables)
+{return template.replace(/{{ (\w+) }}/g,function(full_match,match){if(!(match in variables)){console.warn(match,'not found in',variables,'for',template);}
+return variables[match]});}
+function set_csrf_token(token)
+{$.ajaxPrefilter(function(options,originalOptions,jqXHR){jqXHR.setRequestHeader('X-Csrftoken',token);})}
+function decode_url_pattern(flask_url_pattern)
+{return decodeURIComponent(flask_url_pattern).replace(/\+/g,' ');}
+function flash(message,category){if(!category)
+category='warning'
+$('.flashes').append('<div class="alert alert-'+category+'" role="alert">'+message+' </div>')}
+var AsyncFiltersHandler=function()
+{var config;var form;var current_state_checksum;var filters_separator=';'
+var field_separator=':'
+var sub_value_separator=','
+var quote_char='\''
+function make_checksum(query)
+{return md5(query);}
+function serialize_new_format($form)
+{var filters_list=$form.serializeArray()
+var filters={}
+var others=[]
+filters_list.forEach(function(filter){var name=filter.name;if(name.match(/filter\[(.*)\]/)==null)
+{if(name==='fallback')
+filter.value=false
+others.push(name+'='+filter.value)
+return}
+name=name.slice(7,-1)
+if(name in filters)
+filters[name]+=sub_value_separator+filter.value
+else
+filters[name]=filter.value})
+var filter_strings=[]
+$.each(filters,function(key,value){filter_strings.push(key+field_separator+'None'+field_separator+value)})
+var query=filter_strings.join(filters_separator)
+if(query)
+query='filters='+query
+if(others){query+=query?'&':'?';query+=others.join('&')}
+return query}
+function serialize_form($form)
+{var filters_query=$form.serialize()
+var checksum=make_checksum(filters_query);if(filters_query.length>=1800)
+filters_query=serialize_new_format($form)
+filters_query+=filters_query?'&':'?';filters_query+='checksum='+checksum;return filters_query}
+function make_query_url(parameters)
+{var location=window.location.href;var splitted=location.split('#');var hash=splitted.length>0?splitted[1]:'';location=splitted[0].split('?')[0];if(parameters){location+='?'+parameters;}
+if(hash){location+='#'+hash;}
+return location;}
+function on_update(do_not_save)
+{if(form.find('.block').length!==0){return false}
+var filters_query=serialize_form(form);apply(filters_query,do_not_save);}
+function serialize_fragment($dom_fragment)
+{return $dom_fragment.find('input,select').serialize()}
+function is_response_actual(data)
+{return make_checksum(form.serialize())===data.checksum;}
+function does_response_differ_from_current_state(data)
+{return current_state_checksum!=data.checksum}
+function update_form_html(data,from_future)
+{var html=$.parseHTML(data.dynamic_widgets);if(from_future)
+{form.get(0).reset()
+form.deserialize(history.state.form)
+form.trigger('PotentialAffixChange');}
+var dynamic_widgets=$('.dynamic-widgets');if(serialize_fragment(dynamic_widgets)!==serialize_fragment($(html)))
+{dynamic_widgets.html(html);dynamic_widgets.trigger('PotentialAffixChange');}}
+function update_link(element,filters_string)
+{var $a=$(element);var pattern=decode_url_pattern($a.data('url-pattern'));var new_href=format(pattern,{filters:filters_string});new_href=new_href.replace(/(&|\?)(.*?)=(&|$)/,'');$a.attr('href',new_href);}
+function load(data,from_future)
+{var filters_data=data.filters;if(!(is_response_actual(filters_data)&&does_response_differ_from_current_state(filters_data))&&!from_future)
+{console.log('Skipping outdated response');return}
+current_state_checksum=filters_data.checksum
+config.data_handler(data.content,filters_data);update_form_html(filters_data,from_future);if(config.links_to_update)
+{config.links_to_update.each(function(){update_link(this,filters_data.query)});}
+config.on_loading_end();}
+function update_history(query,replace)
+{var history_action=history.pushState;if(replace)
+history_action=history.replaceState;var state={filters_query:query,form:form.serialize(),handler:'filters'};history_action(state,'',make_query_url(query));}
+function apply(filters_query,do_not_save,from_future)
+{config.on_loading_start();current_state_checksum=null;$.ajax({url:config.endpoint_url,data:filters_query,success:function(data){var filters_query=''
+if(data.filters.query)
+filters_query+='filters='+data.filters.query
+load(data,from_future)
+update_history(filters_query,do_not_save)}});}
+function get_value(filter_name)
+{var matched=form.serializeArray().filter(function(o){return o.name==='filter['+filter_name+']'})
+if(matched.length!==1)
+return undefined
+return matched[0].value}
+return{init:function(new_config)
+{config=new_config;form=config.form;form.on('change','select, input:not([type=text]):not(.programmatic)',function(){on_update()});var timer;form.on('input','input[type=text]:not(.programmatic)',function(){if(timer)
+window.clearTimeout(timer)
+timer=window.setTimeout(function(){timer=null
+on_update()},config.input_delay||200)});form.find('.save').hide()
+update_history(window.location.search.substring(1),true)},value:get_value,load:load,apply:apply,on_update:on_update};};var Widgets=(function(){var form
+var select_sth_popover={content:'You should select at least one option',placement:'top',trigger:'manual'}
+function update(){form.submit()}
+function checkbox_list(uls)
+{function block(ul)
+{ul.popover('show');ul.addClass('block');}
+function release(ul)
+{ul.popover('hide');ul.removeClass('block');}
+uls.each(function(){var ul=$(this);var checkboxes=ul.find('input[type=checkbox]:not(.programmatic)');var check_all=ul.find('.check-all input');ul.popover(select_sth_popover);check_all.click(function(){checkboxes.prop('checked',this.checked);if(this.checked){release(ul);$(checkboxes[0]).trigger('change')}
+else{block(ul);}});checkboxes.change(function(){if(this.checked){release(ul);if(checkboxes.filter(':not(:checked)').length===0){check_all.prop('checked',true)}}
+else if(checkboxes.filter(':checked').length===0){block(ul);event.stopImmediatePropagation()}
+else{check_all.prop('checked',false)}})})}
+return{init:function(form_to_submit,onupdate)
+{form=$(form_to_submit);if(onupdate)
+{update=function()
+{onupdate(form)}}
+form.find('.save').hide();form.on('change','.widget select,.widget input:not(.programmatic)',update);checkbox_list(form.find('.widget .checkbox-list:not(.nullable)'));}};}());var Tooltip=function()
+{var body=d3.select('body').node()
+var element
+var tooltip
+var cached_tooltip_size
+var tooltip_content
+var ignore_next_signal=false;var active=true;var viewport
+var preprocess_data
+var callback
+var pointerOffsetX=0
+var pointerOffsetY=0
+var stuck=false
+var visible=false
+function addEventListener(selection,type,listener)
+{if(selection.empty())
+return
+var old_callback=selection.on(type)
+if(old_callback)
+{selection.on(type,function(e)
+{old_callback.call(this,e)
+listener.call(this,e)})}
+else
+{selection.on(type,listener)}}
+var _render_local=function(d)
+{tooltip_content.html(_template.call(element,d))
+_update_tooltip_size()}
+var _render_with_preprocess=function(d)
+{tooltip_content.html('Loading...')
+_update_tooltip_size()
+preprocess_data.call(element,d,_render_local)}
+var render_template=_render_local
+var _template=function(d)
+{return d.title}
+var _update_tooltip_size=function(){cached_tooltip_size=tooltip.node().getBoundingClientRect()}
+function _move(left,top)
+{if(!cached_tooltip_size)
+_update_tooltip_size()
+var viewport_size=viewport.getBoundingClientRect()
+left=Math.min(left,viewport_size.right-cached_tooltip_size.width)
+left=Math.max(left,viewport_size.left)
+top=Math.max(top,viewport_size.top)
+top=Math.min(top,viewport_size.bottom-cached_tooltip_size.height)
+var scrollTop=window.pageYOffset||document.documentElement.scrollTop||document.body.scrollTop
+var scrollLeft=window.pageXOffset||document.documentElement.scrollLeft||document.body.scrollLeft
+tooltip.style('left',scrollLeft+left+'px').style('top',scrollTop+top+'px')}
+var publicSpace={init:function(config)
+{tooltip=d3.select('body').append('div').attr('class','tooltip popover').style('opacity',0).style('pointer-events','none')
+var wrapper=tooltip.append('div').attr('class','wrapper')
+tooltip_content=wrapper.append('div').attr('class','popover-content')
+if(config.template)
+_template=config.template
+if(config.callback)
+callback=config.callback
+d3.select('body').on('mouseup.'+config.id,publicSpace.unstick)
+wrapper.append('button').attr('class','close').html('x').on('click',publicSpace.unstick)
+if(config.viewport)
+viewport=config.viewport
+else
+viewport=body
+if(config.preprocess_data)
+{preprocess_data=config.preprocess_data
+render_template=_render_with_preprocess}},show:function(d)
+{if(ignore_next_signal)
+{ignore_next_signal=false
+return}
+if(!active)
+return
+if(stuck)
+return
+if(element!==this)
+{element=this
+render_template(d)
+if(callback)
+callback(tooltip_content.node())}
+visible=true
+publicSpace.moveToPointer()
+tooltip.transition().duration(50).style('opacity',1)},hide:function(keep_element)
+{if(stuck||!visible)
+return
+tooltip.transition().duration(200).style('opacity',0)
+if(!keep_element)
+element=null
+visible=false},ignore_next_signal:function()
+{ignore_next_signal=true;},active:function(value)
+{active=value},stick:function(d)
+{if(ignore_next_signal)
+{ignore_next_signal=false
+return}
+if(d3.event.defaultPrevented)return
+publicSpace.unstick()
+publicSpace.show.call(this,d)
+tooltip.style('pointer-events','auto')
+stuck=true
+d3.event.stopPropagation()},unstick:function()
+{stuck=false
+publicSpace.hide(true)
+tooltip.style('pointer-events','none')},moveToPointer:function()
+{if(stuck||!visible)
+return
+var size=element.getBoundingClientRect()
+pointerOffsetX=d3.event.clientX-size.left
+pointerOffsetY=d3.event.clientY-size.top
+_move(d3.event.clientX,d3.event.clientY)},moveToElement:function()
+{if(!element||!visible)
+return
+var size=element.getBoundingClientRect()
+_move(size.left+pointerOffsetX,size.top+pointerOffsetY)},bind:function(selection)
+{addEventListener(selection,'click',publicSpace.stick)
+addEventListener(selection,'mouseover',publicSpace.show)
+addEventListener(selection,'mousemove',publicSpace.moveToPointer)
+addEventListener(selection,'mouseout',publicSpace.hide)
+tooltip.on('mouseup',function(){d3.event.stopPropagation()})
+tooltip.on('click',function(){setTimeout(function(){_update_tooltip_size()
+publicSpace.moveToElement()},0)})},remove:function()
+{tooltip.remove()}}
+return publicSpace}
+function get_protein_details_url(refseq)
+{var href='/protein/details/'+refseq
+var params=get_url_params()
+var query_string=$.param(params)
+if(query_string)
+{href+='?'+query_string}
+return href}
+function initializeKinaseTooltips(selection)
+{var kinase_tooltip=Tooltip()
+kinase_tooltip.init({id:'kinase',preprocess_data:function(d,render_template_cb){var context=this
+$.ajax({url:get_protein_details_url($(this).data('refseq')),success:function(data){render_template_cb.call(context,data)}})},template:function(kinase){return nunjucks.render('kinase_tooltip.njk',{kinase:kinase,site:$(this).data('site')})}})
+if(!selection)
+selection=d3.selectAll('.kinase')
+selection.call(kinase_tooltip.bind)
+return kinase_tooltip}
+var MutationTable=function()
+{var element
+var mutations
+var impact_importances={}
+var mutation_template
+var tooltips=[]
+function detailFormatter(index,row_data,element)
+{var mutation_id=row_data._id
+var mutation=mutations[mutation_id]
+return nunjucks.render('row_details.njk',{mutation:mutation})}
+function getMutationRow(mutation_id)
+{return $('#'+mutation_id)}
+function initializeTooltips()
+{var tooltip=initializeKinaseTooltips()
+tooltips.push(tooltip)}
+function showMutation(mutation_id)
+{var data=element.bootstrapTable('getData',false);var index=null;for(var i=0;i<data.length;i++)
+{if(data[i]._id===mutation_id)
+{index=i;break;}}
+if(index!==null)
+{var options=element.bootstrapTable('getOptions');var page=Math.floor(index/options.pageSize)+1;element.bootstrapTable('selectPage',page);var row=getMutationRow(mutation_id);if(row)
+{publicSpace.expandRow(mutation_id);$('html, body').animate({scrollTop:row.offset().top},2500);}}}
+var publicSpace={init:function(table_element,mutations_list,impacts,mutation_url)
+{mutation_template=decodeURIComponent(mutation_url)
+mutations={}
+for(var i=0;i<mutations_list.length;i++)
+{var mutation=mutations_list[i]
+mutations[mutation.pos+mutation.alt]=mutation}
+element=table_element
+element.bootstrapTable({detailFormatter:detailFormatter,onClickRow:function(row_data){publicSpace.expandRow(row_data._id)}})
+if(window.location.hash)
+{var mutation_id=window.location.hash.substring(1);showMutation(mutation_id)}
+initializeTooltips()
+for(var j=0;j<impacts.length;j++)
+{impact_importances[impacts[j]]=j}},expandRow:function(mutation_id)
+{var expanded_row=element.bootstrapTable('expandRow',getMutationRow(mutation_id).data('index'))
+var tooltip=initializeKinaseTooltips(d3.select(expanded_row.get(0)).selectAll('.kinase'))
+tooltips.push(tooltip)},showMutation:showMutation,impactFormatter:function(value,row,index)
+{var mutation=mutations[row.pos+row.alt]
+return'<div class="'+mutation.category+' badge">'+value+'</div>'},impactSorter:function(a,b)
+{a=a.split(' ')[0]
+b=b.split(' ')[0]
+if(impact_importances[a]<impact_importances[b])return 1
+if(impact_importances[a]>impact_importances[b])return-1},dbSNPFormatter:function(value,row,index)
+{var ids=mutations[row.pos+row.alt].meta['ClinVar']['dbSNP id'];var results=[]
+for(var i=0;i<ids.length;i++)
+{var id=ids[i]
+results.push('<a href="https://www.ncbi.nlm.nih.gov/snp/rs'+id+'" target="_blank">rs'+id+'</a>')}
+return results.join(', ')},URLFormatter:function(value,row,index)
+{return'<a href="'+format(mutation_template,row)+'" title="Show mutation page">'+value.replace(' ','&nbsp;')+'</a>'},positionFormatter:function(value,row,index){return'<a href="#" onclick="tracks.scrollTo('+value+')" title="Show in visualisation">'+value+'</a>'},destroy:function(){var tooltip
+while(tooltip=tooltips.pop())tooltip.remove()}}
+return publicSpace}
+var Tracks=function()
+{var scale=1.0
+var scrollArea,scalableArea,scalableElem,tracks
+var needle_plot
+var position=0
+var dispatch=d3.dispatch('zoomAndMove')
+var first_scale_factor
+var sequence_elements,baseCharSize
+var is_ready=false
+var controls,box
+var is_animation_running
+var tooltip
+var config={scroll_step:0.8,zoom_step:2,zoom_speed:100,animations_speed:300,animations_ease:'quad',box:null,min_zoom:1,max_zoom:10};function configure(new_config)
+{update_object(config,new_config)}
+function calculate_zoom(direction)
+{var new_zoom=scale+direction*scale/15;if(new_zoom>config.max_zoom)
+{return config.max_zoom}
+else if(new_zoom<config.min_zoom)
+{return config.min_zoom}
+else
+{return new_zoom}}
+function get_scale_factor()
+{var content_width=scalableElem.scrollWidth;var width=scalableArea.width();return width/content_width}
+function _setAAPosition(new_position,stop_callback,update_zoom)
+{position=trim_position(new_position)
+scrollTo(position)
+if(update_zoom)
+_setZoom(scale,true)
+if(!stop_callback&&needle_plot)
+{needle_plot.setAAPosition(position,true)}
+dispatch.zoomAndMove(this)}
+function _getZoom()
+{return first_scale_factor*scale}
+function _setZoom(new_zoom,stop_callback)
+{return _setZoomAndMove(new_zoom,_getAAPosition(),stop_callback,true)}
+function trim_position(new_position,new_zoom,skip_zoom_effect)
+{if(new_position<0)
+return 0
+else{var end=config.sequenceLength
+if(!skip_zoom_effect)
+end-=_visibleAminoacidsCount(new_zoom)
+if(new_position>end)
+return end
+else
+return new_position}}
+function _setZoomAndMove(new_zoom,new_pos,stop_callback,skip_animation,center_view)
+{new_pos=trim_position(new_pos,new_zoom)
+var styles=scalableElem.style;var invoke_callback=(!stop_callback&&needle_plot)
+var initial_scale=scale
+var step=function(now,fx)
+{if(fx.prop==='p')
+{if(center_view)
+return
+position=now
+scrollTo(position)
+return}
+scale=now
+config.char_size=getCharSize()
+if(center_view)
+{position=new_pos+_visibleAminoacidsCount()/2*(1-initial_scale/scale)}
+styles.transform='scaleX('+first_scale_factor*scale+')'
+scrollTo(position)
+if(invoke_callback)
+needle_plot.setZoomAndAAPosition(scale,position,true)}
+is_animation_running=true
+$({s:scale,p:position}).animate({s:new_zoom,p:new_pos},{duration:skip_animation?0:config.zoom_speed,ease:config.animations_ease,queue:false,step:step,complete:function(){dispatch.zoomAndMove(this)
+is_animation_running=false}})}
+function zoomKeepingCentral(direction)
+{var zoom=calculate_zoom(direction)
+var first_visible_aa=_getAAPosition()
+_setZoomAndMove(zoom,first_visible_aa,false,false,true)}
+function zoomIn()
+{zoomKeepingCentral(+config.zoom_step)}
+function zoomOut()
+{zoomKeepingCentral(-config.zoom_step)}
+function _getAAPosition()
+{return position}
+function _visibleAminoacidsCount(scale_to_use)
+{return config.min_zoom*config.sequenceLength/(scale_to_use?scale_to_use:scale)}
+function scroll(direction,animate)
+{var new_pos_screen=_getAAPosition()+_visibleAminoacidsCount()*direction
+new_pos_screen=trim_position(new_pos_screen)
+if(new_pos_screen===position)
+return
+is_animation_running=true
+$({screen_position:position}).animate({screen_position:new_pos_screen},{duration:animate?config.animations_speed:0,ease:config.animations_ease,queue:false,step:function(now)
+{position=now
+scrollTo(now)
+needle_plot.setAAPosition(now,true)
+dispatch.zoomAndMove(this)},complete:function(){is_animation_running=false}})}
+function scrollLeft()
+{scroll(-config.scroll_step,true)}
+function scrollRight()
+{scroll(+config.scroll_step,true)}
+function computeBaseCharSize()
+{sequence_elements.wrapInner('<span></span>');var span=sequence_elements.children('span');var charSize=span.innerWidth()/config.sequenceLength;span.contents().unwrap();return charSize;}
+function getCharSize()
+{return baseCharSize*_getZoom();}
+function getSequenceLength()
+{var seq=$.trim(sequence_elements.text())
+return seq.length}
+function scrollTo(new_position)
+{scrollArea.scrollLeft(new_position*config.char_size)}
+function parsePosition(position_string)
+{if(position_string===undefined)
+return undefined
+return trim_position(parseInt(position_string,10),undefined,true)}
+function scrollToCallback()
+{var input=$('.scroll-to-input')
+var user_input=$(input).val()
+var pos
+var zoom
+var correct_expression=/^\s*(\d+)\s*([-|:]\s*(\d+))?\s*$/
+var matched_range=user_input.match(correct_expression)
+var feedback=$('.scroll-feedback')
+function warn(){feedback.html('<span class="glyphicon glyphicon-warning-sign"></span>')}
+if(matched_range)
+{var range=[matched_range[1],matched_range[3]]
+range=range.map(parsePosition)
+pos=range[0]-1
+if(range[1]!==undefined)
+{var len=range[1]-range[0]
+if(len<1)
+return warn()
+zoom=config.min_zoom*config.sequenceLength/len
+zoom=Math.min(zoom,config.max_zoom)}
+else
+{zoom=config.max_zoom
+pos-=_visibleAminoacidsCount(zoom)/2}
+feedback.html('')}
+else
+{warn()}
+_setZoomAndMove(zoom,pos,false,false,false)}
+function initButtons(buttons,func,context)
+{for(var i=0;i<buttons.length;i++)
+{var button=$(buttons[i])
+if(context)
+{button.click($.proxy(func,context))}
+else
+{button.click(func)}}}
+function initFields(fields,func)
+{function call(e)
+{if(e.keyCode===13)
+{func.call(this)}}
+for(var i=0;i<fields.length;i++)
+{$(fields[i]).keyup(call)}}
+function initControls()
+{var buttons=controls.find('.scroll-left')
+initButtons(buttons,scrollLeft,scrollArea)
+buttons=controls.find('.scroll-right')
+initButtons(buttons,scrollRight,scrollArea)
+var innerDiv=box.children('.inner')
+buttons=controls.find('.zoom-out')
+initButtons(buttons,zoomOut,innerDiv)
+buttons=controls.find('.zoom-in')
+initButtons(buttons,zoomIn,innerDiv)
+buttons=controls.find('.scroll-to')
+initButtons(buttons,scrollToCallback)
+buttons=controls.find('.scroll-to-input')
+initFields(buttons,scrollToCallback)}
+function onManualScroll(event)
+{var scroll=$(event.target).scrollLeft()
+if(!is_animation_running)
+{_setAAPosition(scroll/config.char_size,false)}}
+var publicSpace={init:function(new_config)
+{configure(new_config)
+box=$(config.box)
+tracks=box.find('.tracks')
+scrollArea=tracks.find('.scroll-area')
+scrollArea.on('scroll',onManualScroll)
+scalableArea=tracks.find('.scalable')
+scalableElem=scalableArea.get(0)
+var sequence=tracks.find('.sequence')
+sequence_elements=sequence.children('.elements')
+var conservation=tracks.find('.conservation')
+var scores=conservation.find('i')
+var values=scores.map(function(i,obj){return parseFloat($(this).attr('v'))})
+var min=Math.min.apply(null,values)
+var max=Math.max.apply(null,values)
+scores.each(function(i,obj)
+{var obj=$(this)
+var value=parseFloat(obj.attr('v'))
+var text=value+': '
+if(value>=0){obj.css('background','rgb('+(255-(value/max*255))+', 255, 255)')
+text+='conserved'}
+else{var r=255-(value/min*255)
+obj.css('background','rgb(255, '+r+', '+r+')')
+text+='accelerated'}
+obj.attr('title',text)})
+config.sequenceLength=getSequenceLength()
+config.char_size=getCharSize()
+controls=$($.find('.tracks-controls'))
+initControls()
+publicSpace.refreshScaleFactor()
+_setZoom(1)
+tooltip=Tooltip()
+tooltip.init({id:'tracks',template:function(data){var elem=$(this)
+var templated=('<h5>'+elem.data('title')+'</h5>'+
+elem.data('content'))
+return templated},viewport:scrollArea.get(0)})
+var kinases=d3.selectAll('.has-tooltip').each(function(data){$(this).data('title',this.title)
+this.title=''}).call(tooltip.bind)
+dispatch.on('zoomAndMove',function(){tooltip.moveToElement()})
+$('.subtracks_collapsed').click(function(){var track_name=$(this).data('track');$('.'+track_name+' .collapsible').toggleClass('hidden')})
+publicSpace.show()
+is_ready=true;},setNeedlePlotInstance:function(instance)
+{needle_plot=instance},setZoom:_setZoom,setAAPosition:_setAAPosition,adjustMaxZoom:function()
+{config.max_zoom=1/first_scale_factor
+return config.max_zoom},setZoomAndMove:_setZoomAndMove,refreshScaleFactor:function()
+{first_scale_factor=get_scale_factor();baseCharSize=computeBaseCharSize();},isReady:function()
+{return is_ready;},hide:function()
+{box.find('.tracks-box').addClass('invisible');controls.addClass('invisible');if(config.animations_speed)
+box.animate({height:0},config.animations_speed);},show:function()
+{var internal_box=box.find('.tracks-box');internal_box.removeClass('invisible');controls.removeClass('invisible');if(config.animations_speed)
+box.animate({height:internal_box.height()},{duration:config.animations_speed,complete:function(){box.css('height','')}});},scrollTo:function(position){$('.scroll-to-input').val(position)
+scrollToCallback();},destroy:function()
+{if(tooltip)tooltip.remove()}}
+return publicSpace}
+var Export=function()
+{var svg_element
+var file_name
+var style_url
+var styles
+function get_styles()
+{$.ajax({url:style_url,type:'GET',success:function(code)
+{styles=code
+publicSpace.export_svg()}})}
+var publicSpace={init:function(element,title,style_address,custom_exporters,initial_style)
+{svg_element=element
+file_name=title
+style_url=style_address
+styles=initial_style
+$('.export_svg').click(publicSpace.export_svg)
+$('.export_print').click(publicSpace.export_print)
+if(custom_exporters)
+{publicSpace.set_custom_exporters(custom_exporters)}},set_custom_exporters:function(exporters)
+{var menu=$('.export-menu')
+menu.find('.custom_exporter').remove()
+exporters.forEach(function(exporter){var element=$('<li><a href="'+exporter.url+'" class="custom_exporter" target="_blank"><span class="glyphicon glyphicon-'+exporter.icon+'"></span> '+exporter.name+'</a>')
+menu.append(element)})},update_title:function(title)
+{file_name=title},export_svg:function(event)
+{if(style_url&&styles===undefined)
+{get_styles()
+return}
+var element_code=svg_element.innerHTML
+if(!element_code.match(/<svg[^>]+xmlns="http\:\/\/www\.w3\.org\/2000\/svg"/))
+{element_code=element_code.replace(/<svg/,'<svg xmlns="http://www.w3.org/2000/svg"')}
+if(!element_code.match(/<svg[^>]+"http\:\/\/www\.w3\.org\/1999\/xlink"/)){element_code=element_code.replace(/<svg/,'<svg xmlns:xlink="http://www.w3.org/1999/xlink"')}
+var css=''
+if(styles)
+css+=styles
+element_code=element_code.replace(/<svg(.*?)>/,'<svg $1><style type="text/css">/* <![CDATA[ */\n'+css+'\n/* ]]> */\n</style>')
+var svg_blob=new Blob([element_code],{type:'image/svg+xml;charset=utf-8'})
+var svg_content_url=URL.createObjectURL(svg_blob)
+var temp_link=document.createElement('a')
+temp_link.href=svg_content_url
+temp_link.style.display='none'
+temp_link.download=file_name+'.svg'
+document.body.appendChild(temp_link)
+temp_link.click()
+document.body.removeChild(temp_link)
+event.preventDefault()},export_print:function(event)
+{window.print()
+event.preventDefault()}}
+return publicSpace}
+var ShortURL=function()
+{var config={endpoint_get:'/get_shorthand_for_url_provided_in_get/',endpoint_use:'/use_shorthand/<shorthand>'}
+function getCurrentAddress()
+{var full_url=window.location.href.split('/')
+var address=''
+for(var i=3;i<full_url.length;i++)
+{address+='/'
+address+=full_url[i]}
+return address}
+function getShortURL(btn,dropdown)
+{$.ajax({url:config.endpoint_get,type:'GET',data:{address:encodeURIComponent(getCurrentAddress())},success:function(btn,dropdown)
+{return function(result)
+{btn.data('shorthand',result)
+var html=get_html(btn)
+dropdown.html(html)
+activate_copy_button(dropdown)}}(btn,dropdown)})}
+function activate_copy_button(dropdown)
+{var copy_btn=dropdown.find('.copy-btn')[0]
+if(copy_btn)
+new Clipboard(copy_btn)}
+function get_html(btn,dropdown){var shorthand=btn.data('shorthand')
+if(!shorthand)
+{getShortURL(btn,dropdown)
+return'Generating short URL, just for you... <span class="glyphicon glyphicon-refresh glyphicon-spin"></span>'}
+return nunjucks.render('short_url_popup.njk',{url:config.endpoint_use.replace('<shorthand>',shorthand)})}
+var publicSpace={init:function(endpoint_get,endpoint_use)
+{config.endpoint_get=decodeURIComponent(endpoint_get)
+config.endpoint_use=decodeURIComponent(endpoint_use)
+var dropdown_wrapper=$('.short-url-btn').parent()
+dropdown_wrapper.on('show.bs.dropdown',function()
+{var btn=$(this).find('.short-url-btn')
+var dropdown=$(this).find('.dropdown-menu')
+dropdown.html(get_html(btn,dropdown))
+activate_copy_button(dropdown)})
+dropdown_wrapper.find('.dropdown-menu').on('click',function(event){event.stopPropagation()})},reset:function()
+{var btn=$('.short-url-btn');btn.data('shorthand','');var dropdown=btn.parent().find('.dropdown.open .dropdown-toggle')
+dropdown.dropdown('toggle');}}
+return publicSpace}
\ No newline at end of file
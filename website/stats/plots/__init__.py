@@ -93,6 +93,10 @@ class Datasets(CountStore):
     storage_model = Dataset
     default = DataFrame()
 
+    def calc_all(self, limit_to=None):
+        with table.shared_positions_indices():
+            super().calc_all(limit_to=limit_to)
+
     @counter
     def sites_counts(self):
         return compute(
@@ -1,44 +1,173 @@
 from collections import defaultdict
+from contextlib import contextmanager
 from typing import Iterable, Dict, Callable
 
-from sqlalchemy import distinct, and_
+import numpy as np
+from sqlalchemy import distinct, and_, or_
 from tqdm import tqdm
+from werkzeug.utils import cached_property
 
 import models
 from database import db
-from models import Mutation, Protein, Site
+from models import Mutation, Protein, Site, SiteType
 from models import confirmed_mutation_sources as mutation_sources, ensure_mutations_are_precomputed
 
 
-PROTEINS_CACHE = {}
+# positions are encoded together with proteins identifiers (as protein_id * STRIDE + position)
+# so that positions of all proteins can be kept in a single sorted array
+STRIDE = 2 ** 32
+
+
+def encode_positions(protein_ids, positions) -> np.ndarray:
+    return np.sort(np.asarray(protein_ids, dtype=np.int64) * STRIDE + np.asarray(positions, dtype=np.int64))
+
+
+def is_close_to_any(positions: np.ndarray, other_positions: np.ndarray, distance=7) -> np.ndarray:
+    """For each of positions, check if any of other positions (sorted) is no further than given distance."""
+    left = np.searchsorted(other_positions, positions - distance, side='left')
+    right = np.searchsorted(other_positions, positions + distance, side='right')
+    return right > left
+
+
+class PositionsIndex:
+    """Positions of sites and mutations (encoded with encode_positions) loaded in bulk.
+
+    Sites (and their types) are loaded once, on the first use; positions
+    of mutations are loaded with a single query per mutations group.
+    """
+
+    def __init__(self, only_primary=False):
+        self.only_primary = only_primary
+        self.mutations_by_group = {}
+
+    def _restrict_proteins(self, query):
+        if self.only_primary:
+            query = query.join(Protein).filter(Protein.is_preferred_isoform)
+        return query
+
+    @cached_property
+    def _sites(self):
+        sites = self._restrict_proteins(
+            db.session.query(Site.id, Site.protein_id, Site.position)
+        ).all()
+        ids, protein_ids, positions = np.array(sites, dtype=np.int64).reshape(-1, 3).T
+        positions = protein_ids * STRIDE + positions
+        order = np.argsort(positions, kind='stable')
+        return ids[order], positions[order]
+
+    @property
+    def sites(self) -> np.ndarray:
+        """Sorted positions of all sites"""
+        ids, positions = self._sites
+        return positions
+
+    @cached_property
+    def _site_types(self):
+        """Identifiers of site types and indices of sites (in `sites`) for each of (site, site type) pairs"""
+        ids, positions = self._sites
+        site_types = self._restrict_proteins(
+            db.session.query(Site.id, SiteType.id).select_from(Site).join(Site.types)
+        ).all()
+        site_ids, types_ids = np.array(site_types, dtype=np.int64).reshape(-1, 2).T
+        ids_order = np.argsort(ids)
+        return types_ids, ids_order[np.searchsorted(ids, site_ids, sorter=ids_order)]
+
+    def sites_of_types(self, site_types: Iterable[SiteType], site_mode='any') -> np.ndarray:
+        """Positions of sites of any (site_mode='any') or all (site_mode='all') of given types.
+
+        A SiteType with empty name matches sites of all types.
+        """
+        site_types = set(site_types)
+        sites = self.sites
+
+        if len(site_types) == 1 and next(iter(site_types)).name == '':
+            return sites
+
+        types_ids = [site_type.id for site_type in site_types]
+        all_types_ids, types_sites = self._site_types
+        matched_types_sites = types_sites[np.isin(all_types_ids, types_ids)]
+
+        if site_mode == 'any':
+            selected = np.zeros(len(sites), dtype=bool)
+            selected[matched_types_sites] = True
+        else:
+            selected = np.bincount(matched_types_sites, minlength=len(sites)) == len(types_ids)
+
+        return sites[selected]
+
+    def mutations(self, models=None, custom_filters=None, custom_joins=None, group=None) -> np.ndarray:
+        """Positions of mutations from given sources (models) - one per mutation.
+
+        Args:
+            group: name of the group of mutations for caching the positions
+        """
+        if group in self.mutations_by_group:
+            return self.mutations_by_group[group]
+
+        query = db.session.query(Mutation.id, Mutation.protein_id, Mutation.position)
+
+        if custom_joins:
+            for join in custom_joins:
+                query = query.join(join)
+
+        if custom_filters:
+            for filter in custom_filters:
+                query = query.filter(filter)
+
+        if models:
+            query = query.filter(Mutation.in_sources(*models, conjunction=or_))
+
+        mutations = self._restrict_proteins(query).distinct().all()
+        _, protein_ids, positions = np.array(mutations, dtype=np.int64).reshape(-1, 3).T
+        mutations = encode_positions(protein_ids, positions)
+
+        if group is not None:
+            self.mutations_by_group[group] = mutations
+
+        return mutations
+
+
+SHARED_INDICES: Dict[bool, PositionsIndex] = {}
+sharing_indices = False
+
+
+@contextmanager
+def shared_positions_indices():
+    """Reuse positions of sites and mutations across table functions called within this context."""
+    global sharing_indices
+    if sharing_indices:
+        yield
+        return
+    sharing_indices = True
+    try:
+        yield
+    finally:
+        sharing_indices = False
+        SHARED_INDICES.clear()
+
+
+def get_positions_index(only_primary=False) -> PositionsIndex:
+    if not sharing_indices:
+        return PositionsIndex(only_primary)
+    if only_primary not in SHARED_INDICES:
+        SHARED_INDICES[only_primary] = PositionsIndex(only_primary)
+    return SHARED_INDICES[only_primary]
 
 
 def count_mutations_in_sites(
     site_types: Iterable[models.SiteType] = tuple(), models=None,
     only_primary=False,
     custom_filters=None,
-    custom_joins=None
+    custom_joins=None,
+    group=None
 ):
     def counter(mutations, sites):
-        count = 0
-        positions_of_matched_sites = [
-            site.position for site in sites
-        ]
-        for mutation in mutations:
-            mutation_position = mutation.position
-            affects_any_site = False
-            for site_position in positions_of_matched_sites:
-                if abs(mutation_position - site_position) < 8:
-                    affects_any_site = True
-                    break
-            if affects_any_site:
-                count += 1
-        return count
+        return int(np.count_nonzero(is_close_to_any(mutations, sites)))
 
     return count_ptm(
         site_types=site_types, models=models, only_primary=only_primary,
         counter=counter, custom_filters=custom_filters,
-        custom_joins=custom_joins
+        custom_joins=custom_joins, group=group
     )
 
 
@@ -46,26 +175,16 @@ def count_mutated_sites(
     site_types: Iterable[models.SiteType] = tuple(), models=None,
     only_primary=False,
     custom_filters=None,
-    custom_joins=None
+    custom_joins=None,
+    group=None
 ):
     def counter(mutations, sites):
-        count = 0
-        mutation_positions = {
-            mutation.position
-            for mutation in mutations
-        }
-        for site in sites:
-            site_position = site.position
-            for mutation_position in mutation_positions:
-                if abs(mutation_position - site_position) < 8:
-                    count += 1
-                    break
-        return count
+        return int(np.count_nonzero(is_close_to_any(sites, mutations)))
 
     return count_ptm(
         site_types=site_types, models=models, only_primary=only_primary,
         counter=counter, custom_filters=custom_filters,
-        custom_joins=custom_joins
+        custom_joins=custom_joins, group=group
     )
 
 
@@ -73,18 +192,13 @@ def count_sites(
     site_types: Iterable[models.SiteType] = tuple(),
     only_primary=False
 ):
-    def counter(mutations, sites):
-        return len(sites)
-
-    return count_ptm(
-        counter=counter,
-        site_types=site_types, only_primary=only_primary
-    )
+    index = get_positions_index(only_primary)
+    return len(index.sites_of_types(site_types))
 
 
 def count_mutations(**kwargs):
     def counter(mutations, sites):
-        return len(list(mutations))
+        return len(mutations)
 
     return count_ptm(
         counter=counter,
@@ -96,79 +210,29 @@ def count_ptm(
     counter, site_types: Iterable[models.SiteType] = tuple(), models=None,
     only_primary=False, site_mode='any',
     custom_filters=None,
-    custom_joins=None
+    custom_joins=None,
+    group=None
 ):
-    assert site_mode in {'any', 'all', 'none'}
+    """Count with given counter, which receives sorted (encoded) positions of mutations and sites.
 
-    from sqlalchemy.orm import load_only, subqueryload
-
-    site_types = set(site_types)
-
-    if only_primary in PROTEINS_CACHE:
-        print('Reusing cached proteins...')
-        proteins = PROTEINS_CACHE[only_primary]
-    else:
-        print('Retrieving and caching proteins...')
-        proteins = Protein.query.options(
-            load_only('id'),
-            subqueryload(Protein.sites)
-        )
-        print(proteins)
-        if only_primary:
-            proteins = proteins.filter(Protein.is_preferred_isoform)
-        proteins = proteins.all()
-        PROTEINS_CACHE[only_primary] = proteins
-
-    count = 0
+    Unless site_mode is 'none', only mutations in proteins with at least one
+    of the selected sites are passed to the counter.
+    """
+    assert site_mode in {'any', 'all', 'none'}
 
-    is_any_site_type = len(site_types) == 1 and next(iter(site_types)).name == ''
+    index = get_positions_index(only_primary)
 
-    mutation_query_base = (
-        Mutation.query
-        .options(load_only('position'))
+    mutations = index.mutations(
+        models=models, custom_filters=custom_filters, custom_joins=custom_joins, group=group
     )
 
-    if custom_joins:
-        for join in custom_joins:
-            mutation_query_base = mutation_query_base.join(join)
-
-    if custom_filters:
-        for filter in custom_filters:
-            mutation_query_base = mutation_query_base.filter(filter)
-
-    any_site_mode = site_mode == 'any'
-    none_site_mode = site_mode == 'none'
-
-    for protein in tqdm(proteins):
-        if none_site_mode:
-            sites = None
-        else:
-            if is_any_site_type:
-                sites = list(protein.sites)
-            elif any_site_mode:
-                sites = [
-                    site for site in protein.sites
-                    # if any in intersection
-                    if site_types & site.types
-                ]
-            else:
-                sites = [
-                    site for site in protein.sites
-                    # if all site_types are present in site.types
-                    if not site_types - site.types
-                ]
-            if not sites:
-                continue
-        from sqlalchemy import or_
-        mutations = (
-            mutation_query_base
-            .filter(Mutation.protein == protein)
-        )
-        if models:
-            mutations = mutations.filter(Mutation.in_sources(*models, conjunction=or_))
-        count += counter(mutations, sites)
+    if site_mode == 'none':
+        sites = None
+    else:
+        sites = index.sites_of_types(site_types, site_mode)
+        mutations = mutations[np.isin(mutations // STRIDE, sites // STRIDE)]
 
-    return count
+    return counter(mutations, sites)
 
 
 TableChunk = Dict[str, Dict[str, int]]
@@ -209,7 +273,6 @@ def source_specific_proteins_with_ptm_mutations() -> TableChunk:
 
 def source_specific_nucleotide_mappings() -> TableChunk:
     from database import bdb
-    from genomic_mappings import decode_csv
     from models import Mutation
     from tqdm import tqdm
     from gc import collect
@@ -250,8 +313,8 @@ def source_specific_nucleotide_mappings() -> TableChunk:
 
     def iterate_known_muts_sources():
         for value in tqdm(bdb.values(), total=len(bdb.db)):
-            for item in map(decode_csv, value):
-                sources = mutations.get(str(item['protein_id']) + item['alt'] + str(item['pos']))
+            for variant in value:
+                sources = mutations.get(str(variant.protein_id) + variant.alt + str(variant.pos))
                 if sources:
                     yield sources
 
@@ -345,6 +408,7 @@ def get_mutation_groups():
     return groups
 
 
+@shared_positions_indices()
 def source_specific(counter, only_primary=False) -> TableChunk:
     site_type_queries = get_site_type_queries()
 
@@ -358,7 +422,7 @@ def source_specific(counter, only_primary=False) -> TableChunk:
         site_progress = tqdm(site_type_queries.items(), total=len(site_type_queries))
         for site_query_name, site_types in site_progress:
             site_progress.set_postfix({'site': site_query_name})
-            counts[name][site_query_name] = counter(site_types, only_primary=only_primary, **kwargs)
+            counts[name][site_query_name] = counter(site_types, only_primary=only_primary, group=name, **kwargs)
 
     return dict(counts)
 
@@ -371,6 +435,7 @@ def source_specific_mutations_in_sites(only_primary=False) -> TableChunk:
     return source_specific(counter=count_mutations_in_sites, only_primary=only_primary)
 
 
+@shared_positions_indices()
 def sites_counts(only_primary=False, method='client-side') -> TableChunk:
     assert method in {'client-side', 'server-side'}
 
@@ -391,6 +456,7 @@ def sites_counts(only_primary=False, method='client-side') -> TableChunk:
     return {'PTM sites': counts}
 
 
+@shared_positions_indices()
 def mutations_counts(only_primary=False) -> TableChunk:
     counts = {}
 
@@ -399,7 +465,7 @@ def mutations_counts(only_primary=False) -> TableChunk:
     mutations_progress = tqdm(mutations_groups.items(), total=len(mutations_groups))
     for name, kwargs in mutations_progress:
         mutations_progress.set_postfix({'mutation': name})
-        counts[name] = count_mutations(only_primary=only_primary, **kwargs, site_mode='none')
+        counts[name] = count_mutations(only_primary=only_primary, **kwargs, site_mode='none', group=name)
 
     return {'Mutations': counts}
 
@@ -416,12 +482,13 @@ def generate_source_specific_summary_table():
         'Mutations': mutations_counts
     }
     table = {}
-    for chunk_name, table_chunk_generator in table_chunks.items():
-        print(chunk_name)
-        chunk = table_chunk_generator()
-        print(chunk)
-        table[chunk_name] = chunk
-        collect()
+    with shared_positions_indices():
+        for chunk_name, table_chunk_generator in table_chunks.items():
+            print(chunk_name)
+            chunk = table_chunk_generator()
+            print(chunk)
+            table[chunk_name] = chunk
+            collect()
 
     print(table)
 
@@ -1,6 +1,6 @@
 """"This tests should be passed after successful data import and fail before"""
 from database import bdb
-from genomic_mappings import make_snv_key, decode_csv
+from genomic_mappings import make_snv_key
 import app  # this will take some time (stats initialization)
 from models import Protein
 
@@ -33,8 +33,8 @@ def test_mappings():
         snv = make_snv_key(*genomic_data)
 
         items = [
-            decode_csv(item)
-            for item in bdb[snv]
+            variant.as_dict()
+            for variant in bdb[snv]
         ]
 
         retrieved_data = None
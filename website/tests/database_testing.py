@@ -126,7 +126,9 @@ class DatabaseTest(TestCase):
         db.session.remove()
         db.drop_all()
         bdb.drop()
-        bdb_refseq.drop()
+        if bdb_refseq.is_open:
+            bdb_refseq.drop()
+            bdb_refseq.close()
         try:
             scheduler.shutdown()
         except SchedulerNotRunningError:
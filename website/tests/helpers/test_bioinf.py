@@ -80,3 +80,15 @@ def test_is_sequence_broken():
 
     broken_tuple = bioinf.is_sequence_broken(p, 2, 'M', 'A')
     assert broken_tuple == ('NM_0001', 'E', 'M', '2', 'A')
+
+
+def test_can_be_result_of_single_snv():
+    assert bioinf.genetic_code['ATG'] == 'M'
+    assert bioinf.genetic_code['TGA'] == '*'
+
+    # CGT -> CAT
+    assert bioinf.can_be_result_of_single_snv('R', 'H')
+    # TGG -> TAG
+    assert bioinf.can_be_result_of_single_snv('W', '*')
+    # TTT/TTC -> TGG requires two substitutions
+    assert not bioinf.can_be_result_of_single_snv('F', 'W')
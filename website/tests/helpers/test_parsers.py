@@ -1,3 +1,6 @@
+import gzip
+import os
+
 import pytest
 from io import StringIO
 from helpers import parsers
@@ -68,3 +71,96 @@ def test_tsv_file_iterator(tmpdir):
     assert ['4'] == test(skip=3)
     assert ['3', '4'] == test(skip=2, limit=2)
     assert ['3'] == test(skip=2, limit=1)
+
+
+def test_lines_index(tmpdir):
+    temp_file = tmpdir.join('some_tsv_file.tsv')
+    temp_file.write('\n'.join(f'line\t{i}' for i in range(10)))
+    file_name = str(temp_file)
+
+    index = parsers.get_lines_index(file_name, step=3)
+    assert index.lines_count == 10
+    assert list(index.offsets) == [0, 21, 42, 63]
+
+    # the index is stored next to the file and reused
+    assert tmpdir.join('some_tsv_file.tsv.lines.npy').exists()
+    assert parsers.get_lines_index(file_name, step=5).step == 3
+
+    with open(file_name) as f:
+        for line_number in [0, 2, 3, 7, 9]:
+            index.seek(f, line_number)
+            assert f.readline().rstrip() == f'line\t{line_number}'
+        index.seek(f, 10)
+        assert f.readline() == ''
+
+    # and rebuilt once the file changes
+    temp_file.write('\n'.join(f'line\t{i}' for i in range(20)))
+    assert parsers.get_lines_index(file_name, step=5).lines_count == 20
+
+    def test(**kwargs):
+        return [line[1] for line in parsers.tsv_file_iterator(file_name, **kwargs)]
+
+    assert test(skip=18) == ['18', '19']
+    assert test(skip=4, limit=3) == ['4', '5', '6']
+    assert test(skip=25, limit=3) == []
+
+
+def test_read_progress(tmpdir):
+    lines = [f'{i}\tsome description' for i in range(1000)]
+    files = []
+    for name in ['first.tsv.gz', 'second.tsv.gz']:
+        file_name = str(tmpdir.join(name))
+        with gzip.open(file_name, 'wt') as f:
+            f.write('\n'.join(['id\tdescription', *lines]))
+        files.append(file_name)
+
+    # progress is measured in compressed bytes
+    with parsers.ReadProgress(files, update_every=100) as progress:
+        with open(files[0], 'rb') as compressed, progress.watch(compressed):
+            with parsers.fast_gzip_read(compressed, as_str=True) as f:
+                assert sum(1 for _ in progress.track(f)) == 1001
+        assert progress.progress_bar.n == os.path.getsize(files[0])
+    assert progress.progress_bar.total == sum(os.path.getsize(file_name) for file_name in files)
+
+    expected = [line.split('\t') for line in lines]
+    header = ['id', 'description']
+    assert list(parsers.iterate_tsv_gz_file(files[0], header)) == expected
+    assert list(parsers.tsv_file_iterator(files[1], header, file_opener=parsers.gzip_open_text)) == expected
+    assert len(list(parsers.read_from_gz_files(str(tmpdir), '*.tsv.gz'))) == 2000
+
+
+@pytest.mark.parametrize('pigz_available', [True, False])
+def test_read_batches_from_gz_files(tmpdir, monkeypatch, pigz_available):
+    monkeypatch.setattr(parsers, 'is_pigz_available', lambda: pigz_available)
+
+    for i in range(3):
+        with gzip.open(str(tmpdir.join(f'{i}.tsv.gz')), 'wt') as f:
+            f.write('\n'.join(['header', *[f'{i}\t{j}' for j in range(500)]]) + '\n')
+
+    files_done = []
+
+    batches = list(parsers.read_batches_from_gz_files(
+        str(tmpdir), '*.tsv.gz', sep='\t', after_batch=lambda: files_done.append(True),
+        # small batches and queues, so that the read-ahead threads have to wait for the consumer
+        batch_size=100, queue_size=2, files_ahead=2
+    ))
+    assert len(batches) > 3
+    assert len(files_done) == 3
+
+    fields = sum(batches, [])
+    assert sorted(fields) == sorted([str(i), str(j)] for i in range(3) for j in range(500))
+    # lines of each file are kept in order
+    assert [j for i, j in fields if i == '1'] == [str(j) for j in range(500)]
+
+    lines = list(parsers.read_from_gz_files(str(tmpdir), '*.tsv.gz', skip_header=False))
+    assert len(lines) == 3 * 501
+    assert all(line.endswith('\n') for line in lines)
+
+    # consumer can stop early
+    for lines in parsers.read_batches_from_gz_files(str(tmpdir), '*.tsv.gz', batch_size=100, queue_size=1):
+        break
+
+    # errors of the decompression are passed to the consumer
+    tmpdir.join('3.tsv.gz').write('not compressed')
+    with pytest.raises(OSError):
+        list(parsers.read_batches_from_gz_files(str(tmpdir), '3.tsv.gz'))
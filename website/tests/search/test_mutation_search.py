@@ -0,0 +1,210 @@
+from database import db
+from database_testing import DatabaseTest
+from models import Protein, Mutation
+from search.mutation_result import resolve_mutations
+
+
+VCF_FILE_CONTENT = b'\n'.join([
+    b'#CHROM POS ID REF ALT',
+    b'20 14370 . G A',
+    b'20 17330 . T A,C',
+    b'20 1110696 . A G',
+    b'malformed line',
+    b'chr20 14370 . G A',
+    b'20 17330 . T A',
+])
+
+
+def assert_same_results(search, expected):
+    assert search.query == expected.query
+    assert search.without_mutations == expected.without_mutations
+    assert search.badly_formatted == expected.badly_formatted
+    assert search.hidden_results_cnt == expected.hidden_results_cnt
+
+    assert search.results.keys() == expected.results.keys()
+    for query_line, results in expected.results.items():
+        search_results = search.results[query_line]
+        assert [r.mutation.id for r in search_results] == [r.mutation.id for r in results]
+        assert [r.meta_user.count for r in search_results] == [r.meta_user.count for r in results]
+
+    assert search.results_by_refseq.keys() == expected.results_by_refseq.keys()
+    for refseq, results in expected.results_by_refseq.items():
+        assert search.results_by_refseq[refseq].keys() == results.keys()
+
+
+class TestMutationSearch(DatabaseTest):
+
+    def test_resolve_mutations(self):
+        p = Protein(refseq='NM_007', id=7, sequence='MSKGEEL')
+        known = Mutation(protein=p, position=2, alt='K')
+        other = Mutation(protein=p, position=3, alt='S')
+        db.session.add_all([p, known, other])
+        db.session.commit()
+
+        keys = [(7, 2, 'K'), (7, 3, 'A'), (7, 3, 'A'), (99, 1, 'K')]
+        resolved = resolve_mutations(keys, chunk_size=1)
+
+        # unknown proteins are skipped, duplicated keys resolved once
+        assert set(resolved) == {(7, 2, 'K'), (7, 3, 'A')}
+
+        protein, mutation, created = resolved[7, 2, 'K']
+        assert protein == p
+        assert mutation == known
+        assert not created
+
+        protein, mutation, created = resolved[7, 3, 'A']
+        assert created
+        assert mutation.position == 3 and mutation.alt == 'A'
+        assert mutation.protein == p
+
+    def add_mappings(self):
+        from database import bdb
+
+        p = Protein(refseq='NM_007', id=7, sequence='MSKGEEL')
+        m = Mutation(protein=p, position=2, alt='K')
+        db.session.add_all([p, m])
+        db.session.commit()
+
+        bdb.add_genomic_mut('20', 14370, 'G', 'A', m, is_ptm=True)
+        bdb.add_genomic_mut('20', 17330, 'T', 'A', Mutation(protein=p, position=3, alt='A'))
+
+    def test_streaming_search(self):
+        from io import BytesIO
+        from tempfile import NamedTemporaryFile
+        from search.mutation import MutationSearch
+        from search.results_store import SearchResultsStore
+
+        self.add_mappings()
+        text_query = 'chr20 14370 G A'
+
+        serial = MutationSearch(VCF_FILE_CONTENT.decode().splitlines(), text_query)
+
+        with NamedTemporaryFile() as f:
+            store = SearchResultsStore(f.name)
+            MutationSearch(BytesIO(VCF_FILE_CONTENT), text_query, store=store, chunk_size=2)
+
+            # results of every chunk (and of the text query) are written as separate frames
+            assert len(list(store.frames())) == 5
+
+            streamed = store.load()
+
+        assert_same_results(streamed, serial)
+
+        assert streamed.without_mutations == ['chr20 17330 T C\n', 'chr20 1110696 A G\n']
+        assert streamed.badly_formatted == ['malformed line']
+        assert streamed.results['chr20 14370 G A\n'][0].meta_user.count == 2
+        assert streamed.results['chr20 17330 T A\n'][0].is_ptm is False
+
+    def test_sharded_search(self):
+        import pickle
+        from io import BytesIO
+        from search.mutation import MutationSearch
+        from search.results_store import SearchResultsStore
+        from search.task import SearchTask, search_task, merge_search_results, split_uploaded_file
+
+        self.add_mappings()
+        text_query = 'chr20 14370 G A'
+
+        serial = MutationSearch(VCF_FILE_CONTENT.decode().splitlines(), text_query)
+
+        # lines after the first blank line are ignored
+        paths = split_uploaded_file(BytesIO(VCF_FILE_CONTENT + b'\n\n20 14370 . G A'), shard_size=3)
+        assert len(paths) == 3
+
+        # tasks are run directly, as these would be by a worker
+        shards_results = [
+            search_task.run(
+                SearchTask(
+                    path,
+                    text_query if i == len(paths) - 1 else None,
+                    pickle.dumps(None)
+                ).serialize()
+            )
+            for i, path in enumerate(paths)
+        ]
+
+        store_path, dataset_uri = merge_search_results.run(shards_results, dataset_uri='some_uri')
+        assert dataset_uri == 'some_uri'
+
+        store = SearchResultsStore(store_path)
+        sharded = store.load()
+        store.remove()
+
+        assert_same_results(sharded, serial)
+
+    def test_merge_results_in_different_order(self):
+        from database import bdb
+        from search.mutation import MutationSearch
+
+        self.add_mappings()
+        other_protein = Protein(refseq='NM_008', id=8, sequence='MSKGEEL')
+        db.session.add(other_protein)
+        db.session.commit()
+        bdb.add_genomic_mut('20', 14370, 'G', 'A', Mutation(protein=other_protein, position=4, alt='A'))
+
+        query = 'chr20 14370 G A'
+        first = MutationSearch(text_query=query)
+        second = MutationSearch(text_query=query)
+        assert len(first.results[query]) == 2
+
+        # as if the shards were searched by workers iterating the variants in a different order
+        second.results[query].reverse()
+
+        first.merge(second)
+
+        assert [result.meta_user.count for result in first.results[query]] == [2, 2]
+        for refseq, results in first.results_by_refseq.items():
+            for (position, alt), result in results.items():
+                assert MutationSearch.mutation_key(result) == (refseq, position, alt)
+                assert any(result is own_result for own_result in first.results[query])
+
+    def test_region_search(self):
+        from database import bdb
+        from search.mutation import MutationSearch, parse_genomic_region
+
+        self.add_mappings()
+
+        assert parse_genomic_region('chr20:14000-18000') == ('20', 14000, 18000)
+        assert parse_genomic_region('chrx:1-2') == ('X', 1, 2)
+        assert parse_genomic_region('chr20:18000-14000') is None
+        assert parse_genomic_region('chr20 14370 G A') is None
+
+        # mappings are returned in genomic order, limited to the region
+        region = bdb.get_genomic_muts_in_region('20', 14370, 17330)
+        assert [snv for snv, results in region] == [(14370, 'G', 'A'), (17330, 'T', 'A')]
+        assert [snv for snv, results in bdb.get_genomic_muts_in_region('20', 14371, 17329)] == []
+
+        search = MutationSearch(text_query='chr20:14000-18000\nchr20:1-100\nchr20:1-100000000')
+        assert set(search.results) == {'chr20 14370 G A', 'chr20 17330 T A'}
+        assert search.results['chr20 14370 G A'][0].mutation.position == 2
+        assert search.without_mutations == ['chr20:1-100']
+        assert search.badly_formatted == ['chr20:1-100000000']
+
+    def test_isoform_index(self):
+        from models import Gene
+        from search.isoform_index import get_isoform_index
+        from search.protein_mutations import get_protein_muts
+
+        gene = Gene(name='BRCA2')
+        short = Protein(refseq='NM_001', sequence='MRS*', gene=gene)
+        long = Protein(refseq='NM_002', sequence='MRSRK*', gene=gene)
+        other = Protein(refseq='NM_003', sequence='MKSRK*', gene=gene)
+        db.session.add_all([short, long, other])
+        db.session.commit()
+
+        index = get_isoform_index()
+        assert index.count_isoforms('BRCA2') == 3
+        assert 'TP53' not in index
+
+        assert index.isoforms_with_residue('BRCA2', 'R', 2) == [short.id, long.id]
+        # the position has to be covered by the isoform (excluding the stop codon)
+        assert index.isoforms_with_residue('BRCA2', 'R', 4) == [long.id, other.id]
+        assert index.isoforms_with_residue('BRCA2', 'R', 7) == []
+
+        # R -> H is possible with a single SNV (CGT -> CAT), R -> D is not
+        assert index.affected_isoforms('BRCA2', 'R', 2, 'H') == [short.id, long.id]
+        assert index.affected_isoforms('BRCA2', 'R', 2, 'D') == []
+
+        results = get_protein_muts('BRCA2', 'R4H')
+        assert {result.protein for result in results} == {long, other}
+        assert all(result.mutation.position == 4 for result in results)
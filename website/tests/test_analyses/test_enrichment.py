@@ -1,4 +1,6 @@
-from analyses.enrichment import most_mutated_sites
+from interval import interval
+
+from analyses.enrichment import most_mutated_sites, sample_sums, sample_ptm_counts
 from database import db
 from models import Mutation, Site, Protein, InheritedMutation, MC3Mutation, ClinicalData, Gene, SiteType
 from database_testing import DatabaseTest
@@ -67,3 +69,40 @@ class MutationTest(DatabaseTest):
 
         glyco_sites_with_mc3 = most_mutated_sites([MC3Mutation], site_type=glycosylation).all()
         assert glyco_sites_with_mc3 == [(sites['U'], 3)]
+
+    def test_sample_sums(self):
+        import numpy as np
+
+        values = np.zeros(1000)
+        values[[1, 10, 100]] = [1, 2, 3]
+
+        sums = sample_sums(values, size=500, repeats=2000, seed=0, max_draws_per_block=100)
+        assert len(sums) == 2000
+        assert abs(sums.mean() - 500 * values.mean()) < 0.1
+
+        # results depend only on the seed
+        assert (sums == sample_sums(values, size=500, repeats=2000, seed=0, max_draws_per_block=100)).all()
+        assert (sums == sample_sums(values, size=500, repeats=2000, seed=0, max_draws_per_block=100, processes=2)).all()
+        assert (sums != sample_sums(values, size=500, repeats=2000, seed=1, max_draws_per_block=100)).any()
+
+        assert (sample_sums(np.zeros(10), size=5, repeats=3) == 0).all()
+
+    def test_sample_ptm_counts(self):
+        p = Protein(refseq='NM_007', sequence='ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+        # two components: of size 4 and 2
+        intervals_by_protein = {p: interval[2, 6] | interval[10, 12]}
+
+        ptm_muts = [
+            (MC3Mutation(count=2), Mutation(position=position, alt='X', protein=p))
+            for position in [3, 4, 5, 6, 11, 12]
+        ]
+        # outside of the region
+        ptm_muts.append((MC3Mutation(count=2), Mutation(position=8, alt='X', protein=p)))
+
+        # every position of the region is mutated, so each draw hits a mutation
+        counts = sample_ptm_counts(ptm_muts, intervals_by_protein, 6, repeats=10, distinct=True)
+        assert (counts == 6).all()
+
+        counts = sample_ptm_counts(ptm_muts, intervals_by_protein, 6, repeats=10, distinct=False)
+        assert (counts == 12).all()
@@ -17,6 +17,23 @@ def test_make_snv_key():
         assert result_1 == result_2
 
 
+def test_sortable_snv_keys():
+    variants = [('1', 9, 'A', 'C'), ('1', 10, 'A', 'C'), ('1', 255, 'G', 'T'), ('1', 4096, 'A', 'G'), ('2', 1, 'T', 'C')]
+    keys = [genomic_mappings.make_snv_key(*variant) for variant in variants]
+
+    # keys sort in genomic order within a chromosome
+    assert sorted(keys) == keys
+    assert keys[2] == '01:000000ffgt'
+
+    for (chrom, pos, ref, alt), key in zip(variants, keys):
+        assert genomic_mappings.parse_snv_key(key) == (chrom, pos, ref.lower(), alt.lower())
+        assert genomic_mappings.is_sortable_snv_key(key)
+
+        legacy_key = genomic_mappings.make_legacy_snv_key(chrom, pos, ref, alt)
+        assert not genomic_mappings.is_sortable_snv_key(legacy_key)
+        assert genomic_mappings.parse_legacy_snv_key(legacy_key) == genomic_mappings.parse_snv_key(key)
+
+
 def test_encode_csv():
     test_data = (
         # strand, ref, alt, cdna_pos, exon, protein_id, is_ptm
@@ -39,6 +56,24 @@ def test_decode_csv():
         assert result == dict(zip(keys, correct_result))
 
 
+def test_coding_sequence_variants_codecs():
+    variants = {
+        genomic_mappings.CodingSequenceVariant('+', 'R', 'H', 204, '12', 123, False),
+        genomic_mappings.CodingSequenceVariant('-', 'R', '*', 1, 'EX1', 2 ** 31, True),
+    }
+    text_codec = genomic_mappings.CodingSequenceVariantsTextCodec()
+    record_codec = genomic_mappings.CodingSequenceVariantsRecordCodec()
+
+    for codec in [text_codec, record_codec]:
+        assert set(codec.decode(codec.encode(variants))) == variants
+
+    # legacy values should be decoded by the record codec too
+    assert set(record_codec.decode(text_codec.encode(variants))) == variants
+
+    variant = next(iter(text_codec.decode(b'+RH0cc:exon1:7b')))
+    assert variant.as_dict() == genomic_mappings.decode_csv('+RH0cc:exon1:7b')
+
+
 MYSQL_DISEASE = """\
 CREATE TABLE `disease` (
   `name` varchar(255) NOT NULL,
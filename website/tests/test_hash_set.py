@@ -1,4 +1,7 @@
-from hash_set_db import HashSet
+import pytest
+
+from database.codecs import BinaryCodec, IntegerTextCodec, UInt32SetCodec
+from hash_set_db import HashSet, HashSetWithCache
 
 
 def are_the_same(view_one, view_two, cast):
@@ -52,3 +55,234 @@ def test_hash_set(tmpdir):
     # values of bhs return iterator [per key] of iterators [per set item] (!)
     assert are_the_same(bhs.values(), expected_representation.values(), value_as_set)
     assert are_the_same(bhs.items(), expected_representation.items(), item_with_set)
+
+    # retrieve many sets at once
+    assert bhs.get_many(['brca2', 'tp53', 'unknown']) == {
+        'brca2': {'breast', 'cancer', 'DNA repair'},
+        'tp53': {'tumour', 'antigen', 'p53', 'oligomerization domain'},
+        'unknown': set()
+    }
+
+
+def test_integer_values_codecs(tmpdir):
+    bhs = HashSet(tmpdir, integer_values=True)
+
+    bhs['BRCA2 R2K'] = {1, 5}
+    bhs.add('BRCA2 R2K', 3)
+    bhs['TP53 S20L'] = {2}
+    assert bhs['BRCA2 R2K'] == {1, 3, 5}
+
+    assert bhs.migrate(UInt32SetCodec(), batch_size=1) == 2
+
+    assert bhs.codec.name == 'uint32-set'
+    assert bhs['BRCA2 R2K'] == {1, 3, 5}
+    assert bhs['TP53 S20L'] == {2}
+
+    # values written with the text codec can still be read
+    bhs.db[b'TTN A1G'] = b'7|8'
+    assert bhs['TTN A1G'] == {7, 8}
+
+    bhs['TTN A1G'].add(9)
+    assert bhs.db[b'TTN A1G'].startswith(UInt32SetCodec.header)
+    assert bhs['TTN A1G'] == {7, 8, 9}
+
+    # the codec is restored when the database is re-opened
+    bhs.close()
+    reopened = HashSet(tmpdir, integer_values=True)
+    assert reopened.codec.name == 'uint32-set'
+    assert reopened['BRCA2 R2K'] == {1, 3, 5}
+
+
+def test_incomplete_codec():
+
+    class PackOnlyCodec(BinaryCodec):
+        name = 'pack-only'
+        header = b'\xff'
+        legacy = IntegerTextCodec()
+
+        def pack(self, items):
+            return bytes(items)
+
+    # a codec which does not implement all methods cannot be created
+    with pytest.raises(TypeError):
+        PackOnlyCodec()
+
+
+def test_resume_interrupted_migration(tmpdir, monkeypatch):
+    bhs = HashSet(tmpdir, integer_values=True)
+    for i in range(10):
+        bhs['k%s' % i] = {i, i + 1}
+
+    write = bhs.db.write
+    batches = []
+
+    def interrupted_write(operation):
+        if batches:
+            raise KeyboardInterrupt
+        batches.append(write(operation))
+        return batches[-1]
+
+    monkeypatch.setattr(bhs.db, 'write', interrupted_write)
+    with pytest.raises(KeyboardInterrupt):
+        bhs.migrate(UInt32SetCodec(), batch_size=3)
+    monkeypatch.undo()
+
+    # the database in mixed formats remains readable after re-opening
+    bhs.close()
+    reopened = HashSet(tmpdir, integer_values=True)
+    assert reopened.db[b'k0'].startswith(UInt32SetCodec.header)
+    assert not reopened.db[b'k9'].startswith(UInt32SetCodec.header)
+    assert reopened['k0'] == {0, 1}
+    assert reopened['k9'] == {9, 10}
+
+    # and the migration can be resumed
+    assert reopened.migrate(UInt32SetCodec(), batch_size=3) == 10
+    assert reopened.codec.name == 'uint32-set'
+    assert all(value.startswith(UInt32SetCodec.header) for key, value in reopened.db.items())
+    assert reopened['k9'] == {9, 10}
+
+    # migrating back to the text format is resumable too
+    assert reopened.migrate(IntegerTextCodec(), batch_size=3) == 10
+    assert reopened.codec.name == 'integer-text'
+    assert reopened['k0'] == {0, 1}
+
+
+def test_bloom_filter(tmpdir, monkeypatch):
+    bhs = HashSetWithCache(tmpdir)
+    for i in range(1000):
+        bhs['key_%s' % i] = {'value_%s' % i}
+
+    bloom_filter = bhs.build_filter(false_positive_rate=0.01)
+    assert all(bytes('key_%s' % i, 'utf-8') in bloom_filter for i in range(1000))
+
+    false_positives = sum(bytes('absent_%s' % i, 'utf-8') in bloom_filter for i in range(10000))
+    assert false_positives < 300
+
+    # absent keys are rejected before reaching the database
+    absent = next(key for key in ['absent_%s' % i for i in range(10)] if bytes(key, 'utf-8') not in bloom_filter)
+
+    def no_lookups(*args):
+        raise AssertionError('The database should not be queried')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(bhs.db, 'get', no_lookups)
+        patch.setattr(bhs.db, 'get_many', no_lookups)
+        assert bhs[absent] == set()
+        assert bhs.get_many([absent]) == {absent: set()}
+
+    # keys added after the filter was built are found
+    bhs['new'] = {'a'}
+    bhs.add('another', 'b')
+    with bhs.cached_session():
+        bhs.cached_add('cached', 'c')
+
+    assert bhs.get_many(['new', 'another', 'cached', 'key_1', 'absent']) == {
+        'new': {'a'}, 'another': {'b'}, 'cached': {'c'}, 'key_1': {'value_1'}, 'absent': set()
+    }
+
+    # the filter is restored when the database is re-opened
+    bhs.close()
+    reopened = HashSet(tmpdir, integer_values=True)
+    assert reopened.bloom_filter is not None
+    assert b'cached' in reopened.bloom_filter
+
+
+def test_cache_flush_policy(tmpdir):
+    bhs = HashSetWithCache(tmpdir, integer_values=True)
+    bhs['a'] = {1}
+
+    with bhs.cached_session(max_entries=10):
+        for i in range(25):
+            bhs.cached_add_integer('key_%s' % i, i)
+        bhs.cached_add_integer('a', 2)
+        # the cache is flushed as soon as it reaches the limit
+        assert len(bhs.cache) < 10
+        assert bhs.flush_statistics.flushes == 2
+
+    assert bhs.flush_statistics.flushes == 3
+    assert bhs.flush_statistics.entries_written == 26
+    assert bhs['a'] == {1, 2}
+    assert bhs['key_24'] == {24}
+
+    with bhs.cached_session(memory_budget=1000):
+        for i in range(100):
+            bhs.cached_add_integer('a', i)
+            # adding a duplicate does not increase the estimated size
+            bhs.cached_add_integer('a', i)
+            assert bhs.cache_size < 1000
+        assert bhs.flush_statistics.flushes > 1
+
+    assert bhs['a'] == set(range(100))
+
+
+def test_batch(tmpdir):
+    bhs = HashSet(tmpdir)
+    bhs['a'] = {'1'}
+
+    def last_transaction():
+        return bhs.db.env.info()['last_txnid']
+
+    transaction_before = last_transaction()
+
+    with bhs.batch():
+        bhs['a'].add('2')
+        bhs.add('b', '1')
+        with bhs.batch():
+            bhs.update('b', {'2', '3'})
+        # writes are visible before the commit
+        assert bhs['b'] == {'1', '2', '3'}
+        assert bhs.get_many(['a', 'c']) == {'a': {'1', '2'}, 'c': set()}
+        assert last_transaction() == transaction_before
+
+    # all the writes were committed in a single transaction
+    assert last_transaction() == transaction_before + 1
+    assert bhs.get_many(['a', 'b']) == {'a': {'1', '2'}, 'b': {'1', '2', '3'}}
+
+    # nothing is written if the batch fails
+    try:
+        with bhs.batch():
+            bhs['c'] = {'1'}
+            raise ValueError
+    except ValueError:
+        pass
+    assert bhs['c'] == set()
+
+
+def test_load_sorted(tmpdir):
+    bhs = HashSet(tmpdir, integer_values=True)
+    items = [('key_%03d' % i, {i, i + 1}) for i in range(300)]
+
+    assert bhs.load_sorted(iter(items), batch_size=100) == 300
+    assert len(bhs) == 300
+    assert bhs['key_042'] == {42, 43}
+
+    # keys out of order (or already present) cannot be appended
+    with pytest.raises(ValueError):
+        bhs.load_sorted([('key_500', {1}), ('key_400', {2}), ('key_600', {3})])
+    with pytest.raises(ValueError):
+        bhs.load_sorted([('key_042', {1})])
+    assert len(bhs) == 300
+
+
+def test_compact(tmpdir):
+    bhs = HashSet(tmpdir.mkdir('db'))
+    for i in range(1000):
+        bhs['key_%s' % i] = {'x' * 100}
+    bhs.build_filter()
+
+    removed_keys = [bytes('key_%s' % i, 'utf-8') for i in range(900)]
+    bhs.db.write(lambda transaction: [transaction.delete(key) for key in removed_keys])
+    size_before = bhs.db.used_size
+
+    # a copy, e.g. for read-only serving
+    copy_path = tmpdir.join('copy')
+    bhs.compact(copy_path)
+    copy = HashSet(copy_path)
+    assert copy['key_999'] == {'x' * 100}
+    assert copy.bloom_filter is not None
+    assert copy.db.used_size < size_before
+
+    bhs.compact()
+    assert bhs.db.used_size < size_before
+    assert len(bhs) == 100
+    assert bhs['key_999'] == {'x' * 100}
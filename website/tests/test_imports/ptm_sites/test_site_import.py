@@ -3,14 +3,15 @@ from timeit import Timer
 from types import SimpleNamespace as RawSite
 from functools import partial
 
-from pandas import DataFrame
+from numpy import nan
+from pandas import DataFrame, Series
 from pytest import warns
 
 from database import db, create_key_model_dict
 from database_testing import DatabaseTest
 from imports.protein_data import precompute_ptm_mutations
 from imports.sites.site_importer import SiteImporter
-from imports.sites.site_mapper import find_all, find_all_regex
+from imports.sites.site_mapper import find_all, find_all_regex, KmerIndex
 from imports.sites.site_mapper import SiteMapper
 from models import Protein, Gene, Mutation, MC3Mutation, MIMPMutation, Site
 
@@ -46,6 +47,18 @@ def test_find_all():
             f'by {custom_time / regexp_time * 100}%')
 
 
+def test_kmer_index():
+
+    sequences = {'NM_01': 'Lorem ipsum dololor L', 'NM_02': 'olo L'}
+    index = KmerIndex(sequences, k=2)
+
+    for query in ['L', 'o', 'olo', 'ol', '^L', '^ol', 'L$', ' L$', 'dololor', 'not matching']:
+        assert index.find_all(query) == {
+            refseq: find_all(sequence, query)
+            for refseq, sequence in sequences.items()
+        }
+
+
 def create_importer(*args, offset=7, **kwargs):
 
     class MinimalSiteImporter(SiteImporter):
@@ -117,6 +130,41 @@ class TestImport(DatabaseTest):
         assert mutations[2].precomputed_is_ptm
         assert not mutations[3].precomputed_is_ptm
 
+    def test_precompute_ptm_mutations_incrementally(self):
+        proteins = [
+            Protein(refseq=f'NM_000{i}', sequence='MSSSGTPDLPVLLTDLKIQYTKIFINNEWHDSVSGK')
+            for i in range(2)
+        ]
+        sites = [Site(position=2, residue='S', protein=protein) for protein in proteins]
+        mutations = [
+            Mutation(position=position, alt='X', protein=protein)
+            for protein in proteins
+            for position in [9, 10, 30]
+        ]
+        db.session.add_all(sites + [MC3Mutation(mutation=mutation) for mutation in mutations])
+        db.session.commit()
+
+        def is_ptm():
+            return [mutation.precomputed_is_ptm for mutation in mutations]
+
+        precompute_ptm_mutations.load()
+        db.session.commit()
+        assert is_ptm() == [True, False, False] * 2
+
+        # the site in the first protein moved, the second protein is not changed
+        # (its mutation is corrupted on purpose, to check that it will not be revisited)
+        sites[0].position = 25
+        mutations[4].precomputed_is_ptm = True
+        db.session.commit()
+
+        precompute_ptm_mutations.load()
+        db.session.commit()
+        assert is_ptm() == [False, False, True] + [True, True, False]
+
+        precompute_ptm_mutations.load(incremental=False)
+        db.session.commit()
+        assert is_ptm() == [False, False, True] + [True, False, False]
+
     def test_map_site_to_isoform(self):
 
         mapper = SiteMapper([], lambda s: f'{s.position}{s.sequence}')
@@ -204,6 +252,53 @@ class TestImport(DatabaseTest):
         assert len(mapped_sites) == 2
         assert set(sites_by_isoform) == {'NM_01', 'NM_02'}
 
+    def test_indexed_and_parallel_mapping(self):
+
+        genes = [
+            Gene(name=name, isoforms=[
+                Protein(refseq=f'NM_{name}1', sequence=f'{name}AXAXAYAYA{name}*'),
+                Protein(refseq=f'NM_{name}2', sequence='AXAXA*'),
+                Protein(refseq=f'NM_{name}3', sequence=f'AYAYA{name}AXA*'),
+            ])
+            for name in 'BCDEF'
+        ]
+        db.session.add_all(genes)
+        db.session.commit()
+
+        sites = DataFrame.from_dict(data={
+            f'{name} {i}': (name, f'NM_{name}1', position, sequence, residue, offset, [name])
+            for name in 'BCDEF'
+            for i, (position, sequence, residue, offset) in enumerate([
+                (3, 'AXA', 'X', 1),
+                (5, 'AXAY', 'X', 1),
+                (7, 'AYA', 'Y', 1),
+                (2, f'^{name}A', 'A', 1),
+                (11, f'A{name}$', name, 1),
+            ])
+        }, orient='index')
+        sites.columns = [
+            'gene', 'refseq', 'position', 'sequence', 'residue', 'left_sequence_offset', 'kinases'
+        ]
+
+        def map_sites(min_sites_to_index=1, **kwargs):
+            mapper = SiteMapper(
+                create_key_model_dict(Protein, 'refseq'),
+                lambda s: f'{s.position}{s.residue}',
+                **kwargs
+            )
+            mapper.min_sites_to_index = min_sites_to_index
+            return mapper.map_sites_by_sequence(sites)
+
+        expected = map_sites()
+
+        assert expected.equals(map_sites(min_sites_to_index=1000))
+        assert expected.equals(map_sites(workers=2))
+
+        mapped = {(site.refseq, site.position) for site in expected.itertuples(index=False)}
+        assert {('NM_B1', 3), ('NM_B1', 5), ('NM_B2', 2), ('NM_B2', 4), ('NM_B3', 8)} < mapped
+        # the sites provided at input are not duplicated, despite having non-hashable kinases field
+        assert len(expected) == len(expected.drop(columns=['kinases']).drop_duplicates())
+
     def test_edge_cases_mapping(self):
 
         gene_t = Gene(name='T', isoforms=[
@@ -329,3 +424,11 @@ class TestImport(DatabaseTest):
         result = mapper.map_sites_by_sequence(sites)
 
         assert len(result) == 2
+
+        # missing values shared by the sites (as in object columns) do not prevent de-duplication
+        sites['kinases'] = Series([nan, nan], index=sites.index, dtype=object)
+        assert sites.kinases.iloc[0] is sites.kinases.iloc[1]
+
+        result = mapper.map_sites_by_sequence(sites)
+
+        assert len(result) == 2
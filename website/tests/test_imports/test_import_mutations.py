@@ -1,8 +1,11 @@
 import pytest
+from unittest.mock import patch
 
 from database_testing import DatabaseTest
 from imports.mutations import MutationImportManager, MutationImporter
 from imports.mutations.clinvar import ClinVarImporter
+from imports.mutations.esp6500 import ESP6500Importer
+from imports.mutations.mutation_importer.base_importer import BaseMutationsImporter, MutationsIdsIndex
 from models import (
     Protein, InheritedMutation, Disease, ExomeSequencingMutation, The1000GenomesMutation, MIMPMutation,
     Site, SiteType,
@@ -182,6 +185,67 @@ class TestImport(DatabaseTest):
             new_mc3_mutation = first_row_mutation.meta_MC3[0]
             assert new_mc3_mutation.samples == 'TCGA-02-0003-01A-01D-1490-08'
 
+    def test_preloaded_mutations_ids(self):
+        proteins = create_proteins({'NM_0001': 'MSK', 'NM_0002': 'MKS'})
+        first, second = proteins['NM_0001'], proteins['NM_0002']
+        existing = [Mutation(protein=first, position=2, alt='A'), Mutation(protein=second, position=2, alt='A')]
+        db.session.add_all(existing)
+        db.session.commit()
+
+        for options in [{}, {'preload': True}, {'preload': True, 'protein_batch_size': 1}]:
+            importer = BaseMutationsImporter()
+            importer.prepare(**options)
+
+            assert importer.get_or_make_mutation(2, first.id, 'A', False) == existing[0].id
+            assert importer.get_or_make_mutation(2, second.id, 'A', False) == existing[1].id
+
+            new_id = importer.get_or_make_mutation(3, first.id, 'A', False)
+            assert new_id not in {mutation.id for mutation in existing}
+            assert importer.get_or_make_mutation(3, first.id, 'A', False) == new_id
+            assert importer.lookups == 3
+
+        # mutations inserted in the previous run (e.g. chunk) are added to the preloaded
+        # identifiers, so that they are known to the next run without reloading these
+        importer = BaseMutationsImporter()
+        importer.prepare(preload=True)
+        new_id = importer.get_or_make_mutation(3, second.id, 'A', False)
+        importer.insert()
+        db.session.commit()
+
+        with patch.object(MutationsIdsIndex, 'from_database', side_effect=AssertionError('should not reload')):
+            importer.prepare(preload=True)
+            assert len(importer.index) == 3
+            assert importer.get_or_make_mutation(3, second.id, 'A', False) == new_id
+            assert importer.get_or_make_mutation(2, first.id, 'A', False) == existing[0].id
+        assert importer.mutations == {}
+
+    def test_parallel_parse(self):
+        muts_filename = make_named_gz_file(esp_mutations)
+        # NM_001126118 has a truncated sequence so its mutations are broken
+        proteins = create_proteins({**tp53, **tp53_alt, 'NM_001126118': 'MEEP'})
+        proteins['NM_000546'].sites = [Site(position=343, residue='E')]
+        db.session.commit()
+
+        def parse(workers):
+            importer = ESP6500Importer(proteins)
+            importer.parallel_chunk_size = 1
+            importer.base_importer.prepare()
+            if workers > 1:
+                with importer.parallel_preparsing(workers):
+                    details = importer.parse(muts_filename)
+            else:
+                details = importer.parse(muts_filename)
+            return details, importer.base_importer.mutations, importer.broken_seq
+
+        serial_details, serial_mutations, serial_broken_seq = parse(workers=1)
+        details, mutations, broken_seq = parse(workers=2)
+
+        assert details == serial_details
+        assert mutations == serial_mutations
+        assert broken_seq == serial_broken_seq
+        assert len(broken_seq['NM_001126118']) == 2
+        assert {is_ptm for mutation_id, is_ptm in mutations.values()} == {False, True}
+
     def test_hypermutated_finder(self):
         from stats import hypermutated_samples
         muts_filename = make_named_gz_file(with_hypermutated_samples)
@@ -469,6 +533,54 @@ class TestImport(DatabaseTest):
         # MIMP mutations are always affecting some PTM site (by definition)
         assert all(mimp.mutation.is_ptm for mimp in mutations)
 
+        # importing an empty file is not an error (even if the chunk size is not known in advance)
+        with patch.object(MIMPImporter, 'chunk_size', None), patch.object(MIMPImporter, 'memory_per_line', None):
+            self.run_importer('load', 'mimp', proteins, make_named_temp_file(data=''))
+        assert MIMPMutation.query.count() == 4
+
+    def test_mimp_parallel_parse(self):
+
+        from imports.mutations.mimp import MIMPImporter
+
+        muts_filename = make_named_temp_file(data=mimp_mutations)
+        proteins = create_proteins(tp53)
+        phosphorylation = SiteType(name='phosphorylation')
+        db.session.add_all([
+            Site(protein=proteins['NM_000546'], position=site_pos, types={phosphorylation})
+            for site_pos in [20, 215, 315, 106]
+        ])
+        db.session.commit()
+
+        def parse(workers):
+            importer = MIMPImporter(proteins)
+            importer.base_importer.prepare()
+            with pytest.warns(UserWarning):
+                if workers > 1:
+                    with importer.parallel_preparsing(workers):
+                        mimps = importer.parse_chunk(muts_filename, 1, 5)
+                else:
+                    mimps = importer.parse_chunk(muts_filename, 1, 5)
+            return mimps, importer.base_importer.mutations
+
+        serial_mimps, serial_mutations = parse(workers=1)
+        mimps, mutations = parse(workers=3)
+
+        assert len(mimps) == 4
+        assert mimps == serial_mimps
+        assert mutations == serial_mutations
+
+        # chunked importers which do not implement preparse_lines cannot be parsed in parallel
+        from imports.mutations.mutation_importer import ChunkedMutationImporter
+        with patch.object(MIMPImporter, 'preparse_lines', ChunkedMutationImporter.preparse_lines):
+            with pytest.raises(NotImplementedError, match='does not implement preparse_lines'):
+                with MIMPImporter(proteins).parallel_preparsing(2):
+                    pass
+
+        # the chunk size is derived from the memory budget unless given explicitly
+        importer = MIMPImporter(proteins)
+        importer.chunk_size = None
+        assert importer.get_chunk_size(memory_budget=importer.memory_per_line * 100) == 100
+
     def test_thousand_genomes_import(self):
 
         muts_filename = make_named_gz_file(thousand_genomes_mutations)
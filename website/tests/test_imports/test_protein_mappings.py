@@ -78,6 +78,24 @@ class TestImport(DatabaseTest):
         assert set(broken_sequences.keys()) == {'NM_002749'}
         assert [('NM_002749', 'L', 'A', '5', 'Q')] in list(broken_sequences.values())
 
+    @pytest.mark.serial
+    def test_parallel_genome_proteome_mappings(self):
+
+        mappings_filename, gene, proteins = create_test_data()
+        import_arguments = (proteins, path.dirname(mappings_filename), path.basename(mappings_filename))
+
+        serial_broken_sequences = import_genome_proteome_mappings(*import_arguments)
+        bdb.reload()
+        serial_mappings = {key: set(value) for key, value in bdb.items()}
+
+        # small runs, so that the mappings of a single file have to be merged
+        broken_sequences = import_genome_proteome_mappings(*import_arguments, workers=2, run_size=2)
+        bdb.reload()
+
+        assert {key: set(value) for key, value in bdb.items()} == serial_mappings
+        assert broken_sequences == serial_broken_sequences
+        assert bdb[make_snv_key('17', 19282216, 'G', 'A')]
+
     @pytest.mark.serial
     def test_gene_mutation_mappings(self):
 
@@ -0,0 +1,151 @@
+from unittest.mock import patch
+
+from database import db
+from database_testing import DatabaseTest
+from imports.protein_data import precompute_ptm_impacts, precompute_affected_motifs
+from models import Protein, Mutation, Site, SiteType, MC3Mutation, MIMPMutation, PrecomputedImpact, SiteMotif, AffectedMotif
+
+
+def motifs_of(mutation):
+    return {affected.motif for affected in mutation.precomputed_affected_motifs}
+
+
+class TestImport(DatabaseTest):
+
+    def test_precompute_ptm_impacts(self):
+        phosphorylation = SiteType(name='phosphorylation')
+        glycosylation = SiteType(name='N-glycosylation')
+
+        protein = Protein(refseq='NM_0001', sequence='MSKGEELFTGVVPILVELDGDVNGHKFSVS')
+        protein.sites = [
+            Site(position=10, residue='G', types={phosphorylation}),
+            Site(position=20, residue='G', types={glycosylation}),
+        ]
+        direct, proximal, distal = mutations = [
+            Mutation(protein=protein, position=position, alt='A')
+            for position in [10, 18, 3]
+        ]
+        db.session.add_all(mutations)
+        db.session.add_all([MC3Mutation(mutation=mutation, count=1) for mutation in mutations])
+        db.session.commit()
+
+        precompute_ptm_impacts.load()
+        db.session.commit()
+
+        assert PrecomputedImpact.impacts_of(mutations) == {
+            direct.id: 'direct',
+            proximal.id: 'proximal',
+            distal.id: 'distal'
+        }
+        assert PrecomputedImpact.impacts_of(mutations, phosphorylation) == {
+            direct.id: 'direct',
+            proximal.id: 'none',
+            distal.id: 'distal'
+        }
+        assert PrecomputedImpact.impacts_of(mutations, glycosylation) == {
+            direct.id: 'none',
+            proximal.id: 'proximal',
+            distal.id: 'none'
+        }
+
+        all_sites_impact = PrecomputedImpact.query.filter_by(mutation=direct, site_type_id=None).one()
+        assert all_sites_impact.affected_sites_ids == {protein.sites[0].id}
+
+        # no rows are stored for site types which are not affected
+        assert PrecomputedImpact.query.count() == 3 + 2 + 1
+
+        # impacts of novel (not stored) mutations are not returned
+        novel = Mutation(position=11, alt='A')
+        assert PrecomputedImpact.impacts_of([direct, novel]) == {direct.id: 'direct'}
+
+        # nothing is recomputed (nor loaded) if the data did not change
+        stored_ids = {impact.id for impact in PrecomputedImpact.query}
+
+        with patch.object(Mutation, 'impact_on_sites', side_effect=AssertionError('should not be recomputed')):
+            precompute_ptm_impacts.load()
+        db.session.commit()
+
+        assert stored_ids == {impact.id for impact in PrecomputedImpact.query}
+
+        # impacts are updated once MIMP predictions of a mutation change
+        db.session.add(MIMPMutation(mutation=proximal, site=protein.sites[1], probability=0.9, effect='loss'))
+        db.session.commit()
+
+        precompute_ptm_impacts.load()
+        db.session.commit()
+
+        assert PrecomputedImpact.impacts_of(mutations)[proximal.id] == 'network-rewiring'
+        assert PrecomputedImpact.impacts_of(mutations)[direct.id] == 'direct'
+
+        # impacts are updated once sites of the protein change
+        protein.sites.append(Site(position=3, residue='K', types={phosphorylation}))
+        db.session.commit()
+
+        precompute_ptm_impacts.load()
+        db.session.commit()
+
+        assert PrecomputedImpact.impacts_of(mutations, phosphorylation)[distal.id] == 'direct'
+        assert PrecomputedImpact.query.count() == 3 + 2 + 1
+
+    def test_precompute_affected_motifs(self):
+        glycosylation = SiteType(name='N-glycosylation')
+        phosphorylation = SiteType(name='phosphorylation')
+        sequon = SiteMotif(name='sequon', pattern='.{7}N[^P][ST]', site_type=glycosylation)
+
+        #                                             11  15
+        glycosylated = Protein(refseq='NM_0001', sequence='AAAAAAAAAANKSAAAAAAAAA*')
+        glycosylated.sites = [Site(position=11, residue='N', types={glycosylation})]
+        phosphorylated = Protein(refseq='NM_0002', sequence='AAAAAAAAAANKSAAAAAAAAA*')
+        phosphorylated.sites = [Site(position=13, residue='S', types={phosphorylation})]
+
+        mutations = [
+            Mutation(protein=glycosylated, position=position, alt=alt)
+            for position, alt in [(11, 'Q'), (12, 'P'), (13, 'T'), (14, 'G'), (20, 'G')]
+        ]
+        phosphorylated_mutation = Mutation(protein=phosphorylated, position=12, alt='P')
+        db.session.add_all([sequon, phosphorylated_mutation] + mutations)
+        db.session.commit()
+
+        expected = [mutation.affected_motifs() for mutation in mutations]
+        assert expected == [[(sequon, 7)], [(sequon, 8)], [], [], []]
+
+        precompute_affected_motifs.load(workers=1)
+        db.session.commit()
+
+        assert all(mutation.were_affected_motifs_precomputed for mutation in mutations)
+        assert [motifs_of(mutation) for mutation in mutations] == [{sequon}, {sequon}, set(), set(), set()]
+        assert mutations[0].precomputed_affected_motifs[0].site == glycosylated.sites[0]
+
+        # the stored motifs are returned without matching the patterns again
+        with patch.object(Site, 'has_motif', side_effect=AssertionError('should not be matched')):
+            assert [mutation.affected_motifs() for mutation in mutations] == expected
+            assert mutations[0].affected_motifs(glycosylated.sites) == [(sequon, 7)]
+            assert mutations[0].affected_motifs([]) == []
+            assert not phosphorylated_mutation.affected_motifs()
+
+        # a new motif of sites of the first protein only
+        alanine = SiteMotif(name='alanine', pattern='.{7}N..A', site_type=glycosylation)
+        # will not be revisited as neither sites nor their motifs changed
+        phosphorylated_mutation.precomputed_affected_motifs = [
+            AffectedMotif(motif=alanine, site=phosphorylated.sites[0])
+        ]
+        db.session.commit()
+
+        precompute_affected_motifs.load(workers=2)
+        db.session.commit()
+
+        assert [motifs_of(mutation) for mutation in mutations] == [
+            {sequon, alanine}, {sequon}, set(), {alanine}, set()
+        ]
+        assert mutations[3].affected_motifs() == [(alanine, 10)]
+        assert motifs_of(phosphorylated_mutation) == {alanine}
+
+        # after a new site was added, mutations of its protein are updated
+        phosphorylated.sites.append(Site(position=11, residue='N', types={glycosylation}))
+        db.session.commit()
+
+        precompute_affected_motifs.load(workers=1)
+        db.session.commit()
+
+        assert motifs_of(phosphorylated_mutation) == {sequon}
+        assert phosphorylated_mutation.affected_motifs() == [(sequon, 8)]
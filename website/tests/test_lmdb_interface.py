@@ -22,3 +22,44 @@ def test_basic_interface(tmpdir):
 
     assert b'x' in db
     assert b'z' not in db
+
+
+def test_get_many(tmpdir):
+    db = LightningInterface(tmpdir)
+    db[b'b'] = b'2'
+    db[b'a'] = b'1'
+
+    assert db.get_many([b'b', b'c', b'a', b'b']) == {b'a': b'1', b'b': b'2'}
+    assert db.get_many([]) == {}
+
+
+def test_items_in_range(tmpdir):
+    db = LightningInterface(tmpdir)
+    for key in [b'a1', b'a2', b'b1', b'b3', b'c1']:
+        db[key] = key.upper()
+
+    # the first key is inclusive, the last one - exclusive
+    assert list(db.items_in_range(b'a2', b'b3')) == [(b'a2', b'A2'), (b'b1', b'B1')]
+    assert list(db.items_in_range(b'b2', b'z')) == [(b'b3', b'B3'), (b'c1', b'C1')]
+    assert list(db.items_in_range(b'd', b'z')) == []
+
+
+def test_append_sorted(tmpdir):
+    db = LightningInterface(tmpdir)
+    items = [(b'k%03d' % i, b'%d' % i) for i in range(250)]
+
+    assert db.append_sorted(iter(items), batch_size=100) == 250
+    assert list(db.items()) == items
+
+
+def test_map_growth(tmpdir):
+    db = LightningInterface(tmpdir, map_size=2 ** 16)
+
+    # the values do not fit in the initial map
+    for i in range(100):
+        db[b'%d' % i] = b'x' * 4096
+
+    assert db.map_size > 2 ** 16
+    assert db.used_size <= db.map_size
+    assert len(db) == 100
+    assert db[b'99'] == b'x' * 4096
@@ -91,6 +91,7 @@ class ManageTest(DatabaseTest):
         # sites included:
         assert '- hprd' in help_message
         assert '- phospho_site_plus' in help_message
+        assert '--workers' in help_message
 
         # test export help
         help_message = get_help('export mutations -h')
@@ -119,6 +120,79 @@ class ManageTest(DatabaseTest):
         assert 'bio' in help_message
         assert 'cms' in help_message
 
+    def test_load_with_workers(self):
+        # workers are passed only to the importers which support them
+        msg, error = self.run_command(
+            'load protein_related -i precompute_affected_motifs precompute_ptm_impacts --workers 2'
+        )
+        assert 'Success: precompute_affected_motifs done!' in msg
+        assert 'Success: precompute_ptm_impacts done!' in msg
+
+    def test_migrate_mappings(self):
+        from database import bdb, bdb_refseq, open_gene_to_isoform_mappings
+        from models import Protein, Mutation
+
+        protein = Protein(refseq='NM_0001', sequence='MEL')
+        mutation = Mutation(protein=protein, position=2, alt='K')
+        db.session.add(mutation)
+        db.session.commit()
+
+        bdb.add_genomic_mut('1', 10, 'A', 'T', mutation, exon='EX1')
+        # the deprecated gene_to_isoform mappings are not opened by the app
+        assert not bdb_refseq.is_open
+        open_gene_to_isoform_mappings()
+        bdb_refseq['G E2K'] = [protein.id]
+        protein_id, mutation_id = protein.id, mutation.id
+
+        msg, error = self.run_command('migrate_mappings --format binary -d dna_to_protein gene_to_isoform')
+        assert 'Migrated 1 values of dna_to_protein mappings' in msg
+        assert 'Migrated 1 values of gene_to_isoform mappings' in msg
+
+        assert bdb.codec.name == 'csv-record'
+        assert bdb_refseq.codec.name == 'uint32-set'
+
+        results = bdb.get_genomic_muts('1', 10, 'A', 'T')
+        assert len(results) == 1
+        assert results[0].mutation.id == mutation_id
+        assert results[0].exon == 'EX1'
+        assert bdb_refseq['G E2K'] == {protein_id}
+
+        # the codec should be remembered after re-opening
+        bdb.reload()
+        assert bdb.codec.name == 'csv-record'
+
+        self.run_command('migrate_mappings --format text')
+        assert bdb.codec.name == 'csv-text'
+        assert len(bdb.get_genomic_muts('1', 10, 'A', 'T')) == 1
+
+    def test_migrate_mappings_keys(self):
+        from database import bdb
+        from genomic_mappings import make_legacy_snv_key
+        from models import Protein, Mutation
+
+        protein = Protein(refseq='NM_0001', sequence='MEL')
+        mutation = Mutation(protein=protein, position=2, alt='K')
+        db.session.add(mutation)
+        db.session.commit()
+
+        # simulate a database populated before the sortable keys were introduced
+        bdb.key_layout = 'legacy'
+        bdb.add_genomic_mut('1', 10, 'A', 'T', mutation)
+        bdb.add_genomic_mut('1', 300, 'A', 'T', mutation)
+        assert make_legacy_snv_key('1', 10, 'A', 'T') in dict(bdb.items())
+
+        msg, error = self.run_command('migrate_mappings_keys')
+        assert 'Migrated 2 keys of dna_to_protein mappings' in msg
+
+        # the layout should be remembered after re-opening
+        bdb.reload()
+        assert bdb.key_layout == 'sortable'
+
+        assert len(bdb.get_genomic_muts('1', 10, 'A', 'T')) == 1
+        assert [snv for snv, results in bdb.get_genomic_muts_in_region('1', 1, 1000)] == [
+            (10, 'A', 'T'), (300, 'A', 'T')
+        ]
+
     def test_export_paths(self):
 
         name_1 = make_named_temp_file()
@@ -82,3 +82,62 @@ class DatasetTest(ModelTest):
 
         assert dataset.is_expired
         assert dataset.data is None
+
+    def test_columnar_results(self):
+        import pickle
+        from database import bdb
+        from models import Protein, Mutation
+        from search.mutation import MutationSearch
+
+        p = Protein(refseq='NM_007', id=7, sequence='MSKGEEL')
+        other = Protein(refseq='NM_008', id=8, sequence='MSKGEEL')
+        m = Mutation(protein=p, position=2, alt='K')
+        db.session.add_all([p, other, m])
+        db.session.commit()
+
+        bdb.add_genomic_mut('20', 14370, 'G', 'A', m, is_ptm=True)
+        bdb.add_genomic_mut('20', 14370, 'G', 'A', Mutation(protein=other, position=3, alt='A'))
+
+        query = 'chr20 14370 G A\nchr20 14370 G A\nchr1 1 A C\nwrong'
+        search = MutationSearch(text_query=query)
+
+        dataset = UsersMutationsDataset(name='test', data=search)
+        db.session.add(dataset)
+        db.session.commit()
+
+        # load from the file
+        dataset = UsersMutationsDataset.query.filter_by(uri=dataset.uri).one()
+        del dataset._data, dataset._results
+
+        assert dataset.query_size == 4
+        assert dataset.mutations_count == 2
+        assert dataset.get_mutations(p) == [m]
+        assert [mutation.position for mutation in dataset.get_mutations(other)] == [3]
+        assert dataset.has_mutation(m)
+        assert not dataset.has_mutation(Mutation(protein=p, position=3, alt='A'))
+
+        details = dataset.get_mutation_details(p, 2, 'K')
+        assert details.count == 2
+        assert details.query == 'chr20 14370 G A'
+
+        loaded = dataset.data
+        assert loaded.query == search.query
+        assert loaded.without_mutations == search.without_mutations == ['Complement of chr1 1 A C']
+        assert loaded.badly_formatted == search.badly_formatted == ['wrong']
+        assert loaded.results.keys() == search.results.keys()
+
+        result = loaded.results_by_refseq['NM_007'][2, 'K']
+        assert result.mutation == m
+        assert result.meta_user.count == 2
+        assert result.is_ptm
+        assert result.ref == search.results_by_refseq['NM_007'][2, 'K'].ref
+
+        # datasets saved in the legacy format (pickled MutationSearch) can be loaded too
+        with open(dataset._path, 'wb') as f:
+            pickle.dump(search, f, protocol=4)
+        del dataset._data, dataset._results
+
+        assert dataset.get_mutations(p) == [m]
+        assert dataset.data.results_by_refseq['NM_007'][2, 'K'].meta_user.count == 2
+
+        dataset.remove()
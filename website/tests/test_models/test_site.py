@@ -172,3 +172,60 @@ class SiteTest(ModelTest):
         assert not query.filter(Protein.sites.any(Site.types.contains(phosphorylation))).all()
         assert query.filter(Protein.sites.any(~Site.types.contains(phosphorylation))).one()
         assert Site.query.filter(Site.types.contains(phosphorylation)).count() == 0
+
+    def test_site_index(self):
+        from models import SiteIndex
+
+        p = Protein(refseq='NM_007', id=1, sequence='X' * 100)
+        sites = [Site(position=pos, protein=p) for pos in (50, 10, 14, 15)]
+        db.session.add(p)
+
+        index = SiteIndex(sites)
+        assert index.positions.tolist() == [10, 14, 15, 50]
+
+        assert index.count_in_range(11, 14) == 1
+        assert index.count_in_range(16, 49) == 0
+        assert [site.position for site in index.in_range(10, 15)] == [10, 14, 15]
+        assert [site.position for site in index.in_range(0, 9)] == []
+
+        assert [site.position for site in index.closest(12, 7)] == [10, 14]
+        assert [site.position for site in index.closest(13, 7)] == [14]
+        assert index.closest(30, 7) == []
+
+        # bounds can be computed for many ranges at once
+        starts, ends = index.bounds([0, 10, 40], [9, 14, 60])
+        assert starts.tolist() == [0, 0, 3]
+        assert ends.tolist() == [0, 2, 4]
+
+        # the index of protein's sites is updated when sites change
+        assert p.site_index.count_in_range(60, 70) == 0
+        p.sites.append(Site(position=65))
+        assert p.site_index.count_in_range(60, 70) == 1
+
+        def site_filter(sites):
+            return [site for site in sites if site.position > 14]
+
+        assert [site.position for site in p.get_site_index(site_filter).sites] == [15, 50, 65]
+
+    def test_site_index_of_filter_manager(self):
+        from helpers.filters import Filter, FilterManager
+        from models import Mutation
+
+        p = Protein(refseq='NM_007', id=1, sequence='X' * 100)
+        p.sites = [Site(position=pos) for pos in (10, 50)]
+        mutation = Mutation(protein=p, position=15, alt='A')
+        db.session.add(mutation)
+
+        manager = FilterManager([Filter(Site, 'position', comparators=['gt', 'lt'])])
+
+        assert mutation.is_ptm(manager)
+        index = p.get_site_index(manager.apply, cache_key=('filter_manager', manager.url_string(expanded=True)))
+        # the index is re-used on subsequent calls, although the bound method is a new object each time
+        assert mutation.is_ptm(manager)
+        assert len(p._site_indices_by_key) == 1
+        assert p.get_site_index(manager.apply, cache_key=('filter_manager', manager.url_string(expanded=True))) is index
+
+        # but a new one is created when the filters change
+        manager.filters['Site.position'].update(20, 'gt')
+        assert not mutation.is_ptm(manager)
+        assert len(p._site_indices_by_key) == 2
@@ -222,9 +222,6 @@ class StatisticsTest(DatabaseTest):
 
     def test_table_source_specific_mutated_sites(self):
         from stats.table import source_specific_mutated_sites
-        from stats.table import PROTEINS_CACHE
-
-        PROTEINS_CACHE.clear()
 
         self.create_test_mutations_and_sites()
 
@@ -260,9 +257,6 @@ class StatisticsTest(DatabaseTest):
 
     def test_table_mutations_in_sites(self):
         from stats.table import mutations_in_sites, source_specific_mutations_in_sites
-        from stats.table import PROTEINS_CACHE
-
-        PROTEINS_CACHE.clear()
 
         self.create_test_mutations_and_sites()
 
@@ -300,9 +294,6 @@ class StatisticsTest(DatabaseTest):
 
     def test_table_mutations_in_sites_edge_cases(self):
         from stats.table import mutations_in_sites, source_specific_mutations_in_sites
-        from stats.table import PROTEINS_CACHE
-
-        PROTEINS_CACHE.clear()
 
         mutations = create_mutations_with_impact_on_site_at_pos_1()
 
@@ -333,7 +324,6 @@ class StatisticsTest(DatabaseTest):
 
     def test_table_sites_mutated_edge_cases(self):
         from stats.table import source_specific_mutated_sites
-        from stats.table import PROTEINS_CACHE
 
         all_mutations = create_mutations_with_impact_on_site_at_pos_1()
         hydroxylation = SiteType(name='hydroxylation')
@@ -367,7 +357,6 @@ class StatisticsTest(DatabaseTest):
 
             precompute_ptm_mutations.load()
             db.session.commit()
-            PROTEINS_CACHE.clear()
 
             sites_affected = DataFrame(source_specific_mutated_sites())
 
@@ -381,3 +370,23 @@ class StatisticsTest(DatabaseTest):
             assert sites_affected.loc['phosphorylation', 'MC3'] == 0
             assert sites_affected.loc['hydroxylation', 'ClinVar'] == 0
             assert sites_affected.loc['hydroxylation', 'Any mutation'] == affected_sites
+
+    def test_positions_index(self):
+        from stats.table import PositionsIndex, is_close_to_any, encode_positions
+
+        self.create_test_mutations_and_sites()
+
+        phosphorylation, hydroxylation = SiteType.query.order_by(SiteType.name.desc())
+        index = PositionsIndex()
+
+        assert len(index.sites) == 2
+        assert len(index.sites_of_types([phosphorylation])) == 1
+        assert len(index.sites_of_types([phosphorylation, hydroxylation])) == 2
+        assert len(index.sites_of_types([phosphorylation, hydroxylation], site_mode='all')) == 0
+        assert len(index.sites_of_types([SiteType(name='')], site_mode='all')) == 2
+
+        # the mutation at position 2 has two ClinicalData entries, but is counted once
+        assert len(index.mutations(models=[InheritedMutation], custom_joins=[InheritedMutation, ClinicalData])) == 2
+
+        positions = encode_positions([1, 1, 2], [1, 9, 5])
+        assert list(is_close_to_any(positions, encode_positions([1, 2], [8, 20]), distance=7)) == [True, True, False]
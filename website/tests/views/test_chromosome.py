@@ -19,9 +19,10 @@ class TestChromosomeView(ViewTest):
 
         muts = {13: 14370, 15: 14376}
 
-        for aa_pos, dna_pos in muts.items():
-            muts[aa_pos] = Mutation(protein=p, position=aa_pos, alt='V')
-            bdb.add_genomic_mut('20', dna_pos, 'G', 'A', muts[aa_pos], is_ptm=True)
+        with bdb.batch():
+            for aa_pos, dna_pos in muts.items():
+                muts[aa_pos] = Mutation(protein=p, position=aa_pos, alt='V')
+                bdb.add_genomic_mut('20', dna_pos, 'G', 'A', muts[aa_pos], is_ptm=True)
 
         query_url = '/chromosome/mutation/{chrom}/{pos}/{ref}/{alt}'
 
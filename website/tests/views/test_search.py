@@ -196,6 +196,12 @@ class TestSearchView(ViewTest):
         assert response.status_code == 200
         assert b'NM_007' in response.data
 
+        # batch lookup should return results in order of given variants
+        results = bdb.get_genomic_muts_batch([('20', '1110696', 'A', 'G'), ('20', '14370', 'G', 'A')])
+        assert len(results) == 2
+        assert not results[0]
+        assert results[1][0].mutation == m_in_site
+
     def test_autocomplete_all_proteins(self):
         # MC3 GeneList is required as a target (a href for links) where users will be pointed
         # after clicking of cancer autocomplete suggestion
@@ -233,8 +239,7 @@ class TestSearchView(ViewTest):
             self.visit_returned_urls(r)
             return r
 
-        from database import bdb_refseq, bdb
-        bdb_refseq['BR V6E'] = [p.id]  # required for mutation search
+        from database import bdb
         bdb.add_genomic_mut('1', 10000, 'T', 'C', mut)
 
         # Gene and mutations
@@ -350,7 +355,6 @@ class TestSearchView(ViewTest):
 
         # let's add a mutation
         m = Mutation(protein=p, position=1, alt='Y')
-        bdb_refseq['BR X1Y'] = ['NM_007']
         # note: sig_code is required here
         data = ClinicalData(disease=diseases['Cystic fibrosis'], sig_code=1)
         disease_mutation = InheritedMutation(mutation=m, clin_data=[data])
@@ -469,6 +473,7 @@ class TestSearchView(ViewTest):
 
         # search task is declared to celery worker
         assert celery_worker.search_task
+        assert celery_worker.merge_search_results
 
     def basic_save_search(self, name='Test Dataset', query='chr18 19282310 T C'):
         save_response = self.search_mutations(
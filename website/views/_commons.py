@@ -1,10 +1,10 @@
 import gzip
 from collections import defaultdict
-from typing import Dict, Set
+from typing import Dict, Iterable, Set
 
 from flask import request, Response
 
-from models import Gene
+from models import Gene, Mutation, PrecomputedImpact, Site
 from models.bio.drug import Drug, DrugTarget
 
 
@@ -26,6 +26,37 @@ def represent_mutation(mutation, data_filter, representation_type=dict):
     )
 
 
+def ptm_impacts(mutations: Iterable[Mutation], filter_manager) -> Dict[Mutation, str]:
+    """Impacts of mutations on PTM sites passing the filters.
+
+    Precomputed impacts are used where possible (when no Site filters other
+    than Site.types are active); impacts of remaining mutations (e.g. novel
+    mutations uploaded by users) are computed on the fly.
+    """
+    site_filters = [
+        the_filter
+        for the_filter in filter_manager.filters.values()
+        if the_filter.is_active and Site in the_filter.targets
+    ]
+
+    data_filter = filter_manager.apply
+    precomputed = {}
+
+    if all(the_filter.id == 'Site.types' for the_filter in site_filters):
+        site_type = site_filters[0].mapped_value if site_filters else None
+        if not isinstance(site_type, list):
+            precomputed = PrecomputedImpact.impacts_of(mutations, site_type)
+
+    return {
+        mutation: (
+            precomputed[mutation.id]
+            if mutation.id in precomputed else
+            mutation.impact_on_ptm(data_filter)
+        )
+        for mutation in mutations
+    }
+
+
 def drugs_interacting_with_kinases(filter_manager, kinases) -> Dict[Gene, Set[DrugTarget]]:
     from sqlalchemy import and_
 
@@ -107,7 +107,7 @@ def get_raw_mutations(protein, filter_manager, count=False):
         filter_manager.filters['Mutation.sources']._value = 'user'
 
         mutation_filters.append(
-            Mutation.id.in_([m.id for m in dataset.mutations])
+            Mutation.id.in_([m.id for m in dataset.get_mutations(protein)])
         )
 
     getter = filter_manager.query_count if count else filter_manager.query_all
@@ -6,7 +6,7 @@ from database import bdb
 from models import source_manager
 from helpers.filters.manager import FilterManager
 from .filters import common_filters
-from ._commons import represent_mutation
+from ._commons import represent_mutation, ptm_impacts
 from operator import attrgetter
 from collections import OrderedDict
 
@@ -22,6 +22,8 @@ def represent_mutations(mutations, filter_manager):
 
     data_filter = filter_manager.apply
 
+    impacts = ptm_impacts(mutations, filter_manager)
+
     response = []
 
     for mutation in mutations:
@@ -39,7 +41,7 @@ def represent_mutations(mutations, filter_manager):
         needle.move_to_end('protein', last=False)
         needle.move_to_end('gene', last=False)
 
-        needle['ptm_impact'] = mutation.impact_on_ptm(data_filter)
+        needle['ptm_impact'] = impacts[mutation]
 
         if source_name:
             field = get_source_data(mutation)
@@ -23,7 +23,7 @@ def prepare_datasets(mutation):
     user_datasets = []
 
     for dataset in current_user.datasets:
-        if mutation in dataset.mutations:
+        if dataset.has_mutation(mutation):
             datasets.append({
                 'filter': 'UserMutations.sources:in:' + dataset.uri,
                 'name': dataset.name,
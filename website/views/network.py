@@ -1,5 +1,6 @@
 from collections import namedtuple
 
+import numpy as np
 from flask import jsonify
 from flask import redirect
 from flask import render_template as template
@@ -9,7 +10,7 @@ from flask_login import current_user
 
 from helpers.filters import Filter
 from helpers.widgets import FilterWidget
-from models import Mutation
+from models import Mutation, SiteIndex
 from views._commons import drugs_interacting_with_kinases, compress
 from views.abstract_protein import AbstractProteinView, get_raw_mutations, GracefulFilterManager, ProteinRepresentation
 from .filters import common_filters, ProteinFiltersData
@@ -55,30 +56,16 @@ def divide_muts_by_sites(mutations, sites):
     sites.sort(key=lambda site: site.position)
     mutations.sort(key=lambda mutation: mutation.position)
 
-    mutation_index = 0
-    for site in sites:
-        site_flank_start = site.position - 7
-        site_flank_end = site.position + 7
-        # while the mutation that we look at is is far before the site we look at
-        while mutations[mutation_index].position < site_flank_start:
-            # we can just look at the next mutation
-            mutation_index += 1
-            # unless we already checked all mutations
-            if mutation_index == len(mutations):
-                # and in that case our work is done; this is the case because
-                # sites and mutations are sorted by positions (see above),
-                # so it is guaranteed that all mutations are before all the sites
-                return muts_by_site
-        # we now look at a mutations which are either within the range of the site,
-        # or maybe are behind them (we do not know yet)
-        candidate_mut_index = mutation_index
-        # while the candidate mutation is in range of the site flanks:
-        while mutations[candidate_mut_index].position <= site_flank_end:
-            # append it to the mutations associated with site that we currently analyze
-            muts_by_site[site].append(mutations[candidate_mut_index])
-            candidate_mut_index += 1
-            if candidate_mut_index == len(mutations):
-                break
+    site_index = SiteIndex(sites)
+    positions = np.array([mutation.position for mutation in mutations])
+
+    # indices of the first and after the last site within the range of each of mutations
+    first_sites, after_last_sites = site_index.bounds(positions - 7, positions + 7)
+
+    for mutation, first, after_last in zip(mutations, first_sites.tolist(), after_last_sites.tolist()):
+        for site in site_index.sites[first:after_last]:
+            muts_by_site[site].append(mutation)
+
     return muts_by_site
 
 
@@ -1,4 +1,3 @@
-import pickle
 from collections import defaultdict
 from urllib.parse import unquote
 
@@ -13,7 +12,6 @@ from flask_classful import FlaskView
 from flask_classful import route
 from flask_login import current_user
 from sqlalchemy.orm import Load
-from sqlalchemy.orm.exc import NoResultFound
 
 from app import celery
 from helpers.bioinf import complement
@@ -23,7 +21,7 @@ from models import (
     List,
 )
 from search.filters import SearchViewFilters
-from search.mutation import MutationSearch
+from search.mutation import MutationSearch, parse_genomic_region, max_region_length
 from models import Gene
 from models import Mutation
 from models import UsersMutationsDataset
@@ -31,8 +29,10 @@ from sqlalchemy import exists, or_, text
 from helpers.filters.manager import quote_if_needed
 from helpers.widgets import FilterWidget
 from search.mutation_result import SearchResult
-from search.task import SearchTask, search_task
+from search.results_store import SearchResultsStore
+from search.task import start_sharded_search, search_progress, forget_search
 from views.gene import prepare_subqueries
+from search.isoform_index import get_isoform_index
 from search.protein_mutations import get_protein_muts
 from database import db, levenshtein_sorted, bdb
 from search.gene import GeneMatch, search_feature_engines
@@ -228,32 +228,26 @@ class SearchView(FlaskView):
         return redirect(url_for('ContentManagementSystem:my_datasets'))
 
     def raw_progress(self, task_id):
-        celery_task = celery.AsyncResult(task_id)
-        status = celery_task.status
+        status, progress = search_progress(task_id)
 
-        progress = 0
         if status == 'SUCCESS':
             progress = 100
-        elif status == 'PROGRESS':
-            progress = celery_task.result.get('progress', 0)
 
         return jsonify({'status': status, 'progress': int(progress * 100)})
 
     def progress(self, task_id):
 
         celery_task = celery.AsyncResult(task_id)
-        status = celery_task.status
+        status, progress = search_progress(task_id)
 
         if status == 'SUCCESS':
-            mutation_search, dataset_uri = celery_task.result
+            store_path, dataset_uri = celery_task.result
             if dataset_uri:
                 dataset = UsersMutationsDataset.query.filter_by(uri=dataset_uri).one()
-                dataset.data = mutation_search
+                dataset.data = SearchResultsStore(store_path).load()
                 db.session.commit()
             return redirect(url_for('SearchView:mutations', task_id=task_id))
 
-        progress = celery_task.result.get('progress', 0) if status == 'PROGRESS' else 0
-
         return make_response(template(
             'search/progress.html',
             task=celery_task,
@@ -274,11 +268,6 @@ class SearchView(FlaskView):
             store_on_server = request.form.get('store_on_server', False)
 
             if not use_celery:
-                if vcf_file:
-                    vcf_file = [
-                        line.decode()
-                        for line in vcf_file
-                    ]
                 mutation_search = MutationSearch(
                     vcf_file, textarea_query, filter_manager
                 )
@@ -308,14 +297,11 @@ class SearchView(FlaskView):
                 db.session.commit()
 
             if use_celery:
-                mutation_search = search_task.delay(
-                    SearchTask(
-                        # vcf_file is not serializable but list of lines is
-                        vcf_file.readlines() if vcf_file else None,
-                        textarea_query,
-                        pickle.dumps(filter_manager),
-                        dataset_uri=dataset.uri if store_on_server else None
-                    ).serialize()
+                mutation_search = start_sharded_search(
+                    vcf_file,
+                    textarea_query,
+                    filter_manager,
+                    dataset_uri=dataset.uri if store_on_server else None
                 )
 
                 return redirect(url_for('SearchView:progress', task_id=mutation_search.task_id))
@@ -328,10 +314,9 @@ class SearchView(FlaskView):
                     'warning'
                 )
                 return redirect(url_for('SearchView:mutations'))
-            mutation_search, dataset_uri = celery_task.result
-
-            from helpers.pickle import unpickle_str
-            mutation_search = unpickle_str(mutation_search)
+            store_path, dataset_uri = celery_task.result
+            store = SearchResultsStore(store_path)
+            mutation_search = store.load()
 
             if dataset_uri:
                 url = url_for(
@@ -347,7 +332,8 @@ class SearchView(FlaskView):
                     'success'
                 )
 
-            celery_task.forget()
+            forget_search(task_id)
+            store.remove()
         else:
             mutation_search = MutationSearch()
 
@@ -425,6 +411,7 @@ class SearchView(FlaskView):
             Mutation:
             {gene} {ref}{pos}{alt}
             {chr} {pos} {ref} {alt}
+            {chr}:{start}-{end}
 
             Pathway:
             {pathway}
@@ -712,9 +699,8 @@ def autocomplete_gene(query, limit=5):
 
 def match_aa_mutation(gene, mut, query):
     import re
-    try:
-        gene_obj = Gene.query.filter_by(name=gene).one()
-    except NoResultFound:
+    isoform_index = get_isoform_index()
+    if gene not in isoform_index:
         # return json_message('No isoforms for %s found' % gene)
         return []
 
@@ -738,20 +724,10 @@ def match_aa_mutation(gene, mut, query):
             )
 
         # validate if ref is correct
-        valid = False
-        for isoform in gene_obj.isoforms:
-            try:
-                if isoform.sequence[pos - 1] == ref:
-                    valid = True
-                    break
-            except IndexError:
-                # not in range of this isoform, nothing scary.
-                pass
-
-        if not valid:
+        if not isoform_index.isoforms_with_residue(gene, ref, pos):
             return json_message(
                 f'Given reference residue <code>{ref}</code> does not match any of'
-                f' {len(gene_obj.isoforms)} isoforms of {gene} gene at position <code>{pos}</code>'
+                f' {isoform_index.count_isoforms(gene)} isoforms of {gene} gene at position <code>{pos}</code>'
             )
 
     if ref_and_pos:
@@ -804,7 +780,16 @@ def autocomplete_mutation(query, limit=None):
     items = []
     messages = []
 
-    if len(data) == 1:
+    if len(data) == 1 and parse_genomic_region(query):
+        chrom, start, end = parse_genomic_region(query)
+
+        if end - start + 1 > max_region_length:
+            return json_message(f'The region is too long; please limit it to {max_region_length} nucleotides')
+
+        for (pos, ref, alt), results in bdb.get_genomic_muts_in_region(chrom, start, end):
+            items += prepare_items(results, f'chr{chrom} {pos} {ref} {alt}', 'nucleotide mutation')
+
+    elif len(data) == 1:
 
         if query.startswith('CHR'):
             messages += json_message('Awaiting for mutation in <code>{chrom} {pos} {ref} {alt}</code> format')
@@ -18,7 +18,7 @@ from helpers.tracks import TrackElement
 from models import Domain, source_manager, SiteType, Site
 from models import Mutation
 from .abstract_protein import AbstractProteinView, GracefulFilterManager, ProteinRepresentation
-from ._commons import represent_mutation, compress
+from ._commons import represent_mutation, compress, ptm_impacts
 from .filters import common_filters, ProteinFiltersData
 from .filters import create_widgets
 
@@ -111,6 +111,8 @@ class SequenceRepresentation(ProteinRepresentation):
 
         data_filter = self.filter_manager.apply
 
+        impacts = ptm_impacts(self.protein_mutations, self.filter_manager)
+
         response = []
 
         for mutation in self.protein_mutations:
@@ -143,7 +145,7 @@ class SequenceRepresentation(ProteinRepresentation):
             needle['summary'] = field.summary(data_filter)
             needle['value'] = field.get_value(data_filter)
             needle['meta'] = metadata
-            needle['category'] = mutation.impact_on_ptm(data_filter)
+            needle['category'] = impacts[mutation]
 
             response.append(needle)
 